@@ -11,17 +11,26 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import Command
 from aiogram.exceptions import TelegramBadRequest
 from datetime import datetime, timedelta
+import html
 import json
 import os
 
+from async_data_access import get_data_access
 from config import ADMIN_IDS, CHANNELS
 from database import db
+from log_retention import format_retention_report, get_retention_manager
+from publish_retry import list_dead_letters, replay_dead_letters
+from query_profiler import format_query_report
+from stats_counters import get_stats_counters
 # from dynamic_pricing import get_dynamic_pricing  # Removed during cleanup
 from states import AdminStates
 # Admin UI control removed during cleanup
 
 logger = logging.getLogger(__name__)
 
+# Statistics come from trigger-maintained counters, read on the analytics connections
+stats_counters = get_stats_counters(db.db_path)
+
 # Safe callback answer function to handle expired queries
 async def safe_callback_answer(callback_query, text: str = None, show_alert: bool = False):
     """Safely answer callback queries with error handling for expired queries"""
@@ -461,17 +470,16 @@ Select an option to continue:
 
     async def show_user_management(self, callback_query: CallbackQuery):
         """Show user management interface"""
-        total_users = await self.get_total_users()
-        active_users = await self.get_active_users()
+        summary = await self.get_statistics_summary()
         
         text = f"""
 <b>User Management</b>
 
 <b>User Statistics:</b>
-Total Users: {total_users}
-Active Users: {active_users}
-- New Users Today: {await self.get_new_users_today()}
-- Paid Users: {await self.get_paid_users()}
+Total Users: {summary.get('users_total', 0)}
+Active Users: {summary.get('active_users', 0)}
+- New Users Today: {summary.get('new_users_today', 0)}
+- Paid Users: {summary.get('paid_users', 0)}
 
 <b>User Actions:</b>
         """.strip()
@@ -506,8 +514,16 @@ Active Users: {active_users}
         channels = await db.get_channels(active_only=False)
         active_channels = [ch for ch in channels if ch.get('is_active', False)]
         total_subscribers = sum(ch.get('subscribers', 0) for ch in channels)
+        summary = await self.get_statistics_summary()
         
         text = f"""
+<b>STATS: Platform Statistics</b>
+
+<b>Users:</b> {summary.get('users_total', 0):,} total, {summary.get('new_users_today', 0):,} new today, {summary.get('paid_users', 0):,} paid
+<b>Revenue:</b> ${summary.get('revenue_today', 0.0):,.2f} today, ${summary.get('revenue_week', 0.0):,.2f} this week, ${summary.get('revenue_month', 0.0):,.2f} this month
+<b>Campaigns:</b> {summary.get('campaigns_active', 0):,} active, {summary.get('campaigns_completed', 0):,} completed
+<b>Posts Published Today:</b> {summary.get('posts_today', 0):,}
+
 <b>STATS: Channel Statistics</b>
 
 <b>Total Channels:</b> {len(channels)}
@@ -548,115 +564,52 @@ Active Users: {active_users}
             parse_mode='HTML'
         )
 
-    # Helper methods for statistics
-    async def get_total_users(self) -> int:
+    # Helper methods for statistics (served from the materialized counters)
+    async def get_statistics_summary(self) -> dict:
         try:
-            async with db.get_connection() as conn:
-                result = await conn.execute("SELECT COUNT(*) FROM users")
-                return (await result.fetchone())[0]
+            return await stats_counters.get_summary()
         except Exception as e:
-            logger.error(f"Error getting total users: {e}")
-            return 0
+            logger.error(f"Error getting statistics summary: {e}")
+            return {}
+
+    async def get_total_users(self) -> int:
+        return (await self.get_statistics_summary()).get('users_total', 0)
 
     async def get_active_users(self) -> int:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT COUNT(*) FROM users WHERE last_activity > datetime('now', '-7 days')"
-                )
-                return (await result.fetchone())[0]
-        except Exception as e:
-            logger.error(f"Error getting active users: {e}")
-            return 0
+        return (await self.get_statistics_summary()).get('active_users', 0)
 
     async def get_new_users_today(self) -> int:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT COUNT(*) FROM users WHERE created_at > datetime('now', '-1 day')"
-                )
-                return (await result.fetchone())[0]
-        except Exception as e:
-            logger.error(f"Error getting new users today: {e}")
-            return 0
+        return (await self.get_statistics_summary()).get('new_users_today', 0)
 
     async def get_paid_users(self) -> int:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT COUNT(DISTINCT user_id) FROM payments WHERE status = 'confirmed'"
-                )
-                return (await result.fetchone())[0]
-        except Exception as e:
-            logger.error(f"Error getting paid users: {e}")
-            return 0
+        return (await self.get_statistics_summary()).get('paid_users', 0)
 
     async def get_daily_revenue(self) -> float:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT SUM(amount) FROM payments WHERE status = 'confirmed' AND created_at > datetime('now', '-1 day')"
-                )
-                amount = (await result.fetchone())[0]
-                return amount if amount else 0.0
-        except:
-            return 0.0
+        return (await self.get_statistics_summary()).get('revenue_today', 0.0)
 
     async def get_weekly_revenue(self) -> float:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT SUM(amount) FROM payments WHERE status = 'confirmed' AND created_at > datetime('now', '-7 days')"
-                )
-                amount = (await result.fetchone())[0]
-                return amount if amount else 0.0
-        except:
-            return 0.0
+        return (await self.get_statistics_summary()).get('revenue_week', 0.0)
 
     async def get_monthly_revenue(self) -> float:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT SUM(amount) FROM payments WHERE status = 'confirmed' AND created_at > datetime('now', '-30 days')"
-                )
-                amount = (await result.fetchone())[0]
-                return amount if amount else 0.0
-        except:
-            return 0.0
+        return (await self.get_statistics_summary()).get('revenue_month', 0.0)
 
     async def get_active_campaigns(self) -> int:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT COUNT(*) FROM subscriptions WHERE status = 'active'"
-                )
-                return (await result.fetchone())[0]
-        except:
-            return 0
+        return (await self.get_statistics_summary()).get('subscriptions_active', 0)
 
     async def get_completed_campaigns(self) -> int:
-        try:
-            async with db.get_connection() as conn:
-                result = await conn.execute(
-                    "SELECT COUNT(*) FROM subscriptions WHERE status = 'completed'"
-                )
-                return (await result.fetchone())[0]
-        except:
-            return 0
+        return (await self.get_statistics_summary()).get('subscriptions_completed', 0)
 
     async def get_success_rate(self) -> float:
-        try:
-            total = await self.get_active_campaigns() + await self.get_completed_campaigns()
-            completed = await self.get_completed_campaigns()
-            return (completed / total * 100) if total > 0 else 0.0
-        except:
-            return 0.0
+        summary = await self.get_statistics_summary()
+        completed = summary.get('subscriptions_completed', 0)
+        total = summary.get('subscriptions_active', 0) + completed
+        return (completed / total * 100) if total > 0 else 0.0
 
     async def get_total_posts(self) -> int:
         return 1500  # Mock data
 
     async def get_posts_today(self) -> int:
-        return 25  # Mock data
+        return (await self.get_statistics_summary()).get('posts_today', 0)
 
     async def get_engagement_rate(self) -> float:
         return 12.5  # Mock data
@@ -2186,6 +2139,96 @@ async def admin_channel_details_handler(message: Message):
         logger.error(f"Admin channel details error: {e}")
         await message.reply("Error retrieving channel details.")
 
+@router.message(Command("admin_queries"))
+async def admin_queries_handler(message: Message):
+    """Show the slowest SQL statements collected by the query profiler"""
+    if not admin_system.is_admin(message.from_user.id):
+        await message.answer("ERROR: Access denied. Admin privileges required.")
+        return
+    
+    try:
+        # /admin_queries [total_ms|p95_ms|p99_ms|count|rows]
+        parts = (message.text or "").split()
+        order_by = parts[1] if len(parts) > 1 else 'total_ms'
+        report = format_query_report(limit=10, order_by=order_by)
+        if len(report) > 3800:
+            report = report[:3800] + "\n... (truncated for length)"
+        
+        await message.reply(f"STATS: <b>Top Queries by {order_by}</b>\n\n<pre>{html.escape(report)}</pre>",
+                            parse_mode='HTML')
+        
+    except Exception as e:
+        logger.error(f"Admin queries error: {e}")
+        await message.reply("Error retrieving query statistics.")
+
+@router.message(Command("admin_retention"))
+async def admin_retention_handler(message: Message):
+    """Show the last log retention run and current database space (``run`` to purge now)"""
+    if not admin_system.is_admin(message.from_user.id):
+        await message.answer("ERROR: Access denied. Admin privileges required.")
+        return
+    
+    try:
+        manager = get_retention_manager()
+        parts = (message.text or "").split()
+        if len(parts) > 1 and parts[1] == 'run':
+            await manager.run_once()
+        
+        space = await manager.get_space_report()
+        report = (
+            f"Database: {space['pages'] * space['page_size'] / 1048576:.1f} MB "
+            f"({space['free_bytes'] / 1048576:.1f} MB free, auto_vacuum {space['auto_vacuum']})\n\n"
+        )
+        if manager.last_report:
+            report += format_retention_report(manager.last_report)
+        else:
+            report += "No retention run yet."
+        
+        await message.reply(f"STATS: <b>Log Retention</b>\n\n<pre>{html.escape(report)}</pre>",
+                            parse_mode='HTML')
+        
+    except Exception as e:
+        logger.error(f"Admin retention error: {e}")
+        await message.reply("Error retrieving retention report.")
+
+@router.message(Command("admin_dead_letters"))
+async def admin_dead_letters_handler(message: Message):
+    """List posts that could not be delivered (``replay all`` or ``replay <id> ...`` to retry them)"""
+    if not admin_system.is_admin(message.from_user.id):
+        await message.answer("ERROR: Access denied. Admin privileges required.")
+        return
+    
+    try:
+        data = get_data_access(db.db_path)
+        parts = (message.text or "").split()
+        if len(parts) > 2 and parts[1] == 'replay':
+            entry_ids = None if parts[2] == 'all' else [int(part) for part in parts[2:] if part.isdigit()]
+            campaigns = await replay_dead_letters(data, entry_ids)
+            from enhanced_campaign_publisher import notify_posts_scheduled
+            for campaign_id in campaigns:
+                await notify_posts_scheduled(campaign_id)
+            await message.reply(f"SUCCESS: Replaying posts for {len(campaigns)} campaigns.")
+            return
+        
+        entries = await list_dead_letters(data)
+        if not entries:
+            await message.reply("No dead-lettered posts.")
+            return
+        lines = [
+            f"#{entry['id']} post {entry['post_id']} {entry['campaign_id']} -> {entry['channel_id']}\n"
+            f"   {entry['error_kind']} after {entry['attempts']} attempts: {(entry['error'] or '')[:80]}"
+            for entry in entries
+        ]
+        await message.reply(
+            f"STATS: <b>Dead-Lettered Posts</b>\n\n<pre>{html.escape(chr(10).join(lines))}</pre>\n"
+            f"Use /admin_dead_letters replay all (or replay &lt;id&gt; ...) to retry.",
+            parse_mode='HTML'
+        )
+        
+    except Exception as e:
+        logger.error(f"Admin dead letters error: {e}")
+        await message.reply("Error retrieving dead-lettered posts.")
+
 def setup_admin_handlers(dp):
     """Setup admin handlers"""
     dp.include_router(router)
@@ -2203,9 +2246,10 @@ def setup_admin_handlers(dp):
             from gamification import GamificationSystem
             gamification = GamificationSystem(admin_system.db, callback_query.message.bot)
             
-            # Get gamification statistics
-            total_users = await admin_system.get_total_users()
-            active_users = await admin_system.get_active_users()
+            # Get gamification statistics (one summary read for the whole panel)
+            summary = await admin_system.get_statistics_summary()
+            total_users = summary.get('users_total', 0)
+            active_users = summary.get('active_users', 0)
             
             # Get level distribution
             xp_leaderboard = await gamification.get_leaderboard('xp', 50)
@@ -0,0 +1,280 @@
+"""
+Analytics read path for I3lani Telegram Bot
+Dedicated read-only connections for admin statistics and dashboards, kept
+apart from the pooled connections that serve user traffic, optionally
+pointed at a periodically refreshed snapshot copy of the database
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiosqlite
+
+from async_data_access import run_blocking
+from config import ANALYTICS_CONNECTIONS, ANALYTICS_SNAPSHOT, ANALYTICS_SNAPSHOT_INTERVAL
+from query_profiler import get_query_profiler
+
+logger = logging.getLogger(__name__)
+_profiler = get_query_profiler()
+
+ANALYTICS_PRAGMAS = {
+    'query_only': 'ON',
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+    'cache_size': -8000,  # ~8 MB, separate from the OLTP page caches
+}
+
+
+def _readonly_uri(path: str) -> str:
+    return f"file:{os.path.abspath(path)}?mode=ro"
+
+
+def connect_readonly(path: str) -> sqlite3.Connection:
+    """Synchronous read-only connection for analytics code that is not async"""
+    conn = sqlite3.connect(_readonly_uri(path), uri=True, timeout=30, check_same_thread=False)
+    for name, value in ANALYTICS_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def copy_snapshot(db_path: str, snapshot_path: str) -> int:
+    """Consistent point-in-time copy of ``db_path`` (written beside, then swapped in)"""
+    tmp_path = f"{snapshot_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    source = sqlite3.connect(_readonly_uri(db_path), uri=True, timeout=30)
+    target = sqlite3.connect(tmp_path)
+    try:
+        # One step: the copy is taken inside a single read transaction, so
+        # concurrent writes neither restart nor tear it
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    os.replace(tmp_path, snapshot_path)
+    return os.path.getsize(snapshot_path)
+
+
+class AnalyticsReader:
+    """Read-only analytics queries on their own connections.
+
+    With ``snapshot`` on, queries run against ``<db>.analytics-snapshot``,
+    a copy refreshed every ``refresh_seconds``; otherwise against the live
+    file (WAL readers never block, or are blocked by, the writer).
+    """
+
+    def __init__(self, db_path: str = "bot.db", connections: int = ANALYTICS_CONNECTIONS,
+                 snapshot: bool = ANALYTICS_SNAPSHOT,
+                 refresh_seconds: float = ANALYTICS_SNAPSHOT_INTERVAL):
+        self.db_path = db_path
+        self.connection_count = max(1, connections)
+        self.snapshot_path = f"{db_path}.analytics-snapshot" if snapshot else None
+        self.refresh_seconds = refresh_seconds
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._open: List[aiosqlite.Connection] = []
+        self._generation = 0
+        self._conn_generation: Dict[int, int] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.snapshot_taken_at: Optional[float] = None
+        self._stats = {'queries': 0, 'snapshots': 0, 'snapshot_ms_last': 0.0, 'wait_ms_max': 0.0}
+
+    @property
+    def source_path(self) -> str:
+        """File the analytics connections read"""
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            return self.snapshot_path
+        return self.db_path
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = aiosqlite.connect(_readonly_uri(self.source_path), uri=True)
+        # Like the OLTP pool: the worker thread must not keep the interpreter alive
+        worker = conn if isinstance(conn, threading.Thread) else getattr(conn, '_thread', None)
+        if worker is not None:
+            worker.daemon = True
+        await conn
+        for name, value in ANALYTICS_PRAGMAS.items():
+            await conn.execute(f"PRAGMA {name} = {value}")
+        self._conn_generation[id(conn)] = self._generation
+        return conn
+
+    async def _ensure_open(self):
+        loop = asyncio.get_running_loop()
+        if self._idle is not None and self._loop is loop:
+            return
+        # First use, or a previous asyncio.run() owned the old connections
+        self._open, self._conn_generation = [], {}
+        self._loop = loop
+        self._idle = asyncio.Queue()
+        for _ in range(self.connection_count):
+            self._idle.put_nowait(None)  # opened lazily on first checkout
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check out one analytics connection"""
+        await self._ensure_open()
+        started = time.perf_counter()
+        conn = await self._idle.get()
+        self._stats['wait_ms_max'] = max(self._stats['wait_ms_max'], (time.perf_counter() - started) * 1000)
+        try:
+            if conn is not None and self._conn_generation.get(id(conn)) != self._generation:
+                # A newer snapshot replaced the file this connection has open
+                await self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = await self._connect()
+                self._open.append(conn)
+            yield conn
+        except Exception:
+            if conn is not None and conn.in_transaction:
+                await conn.rollback()
+            raise
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def _discard(self, conn: aiosqlite.Connection):
+        self._conn_generation.pop(id(conn), None)
+        if conn in self._open:
+            self._open.remove(conn)
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.warning(f"Error closing analytics connection: {e}")
+
+    async def close(self):
+        """Close every analytics connection and stop snapshot refreshes"""
+        self.stop()
+        for conn in list(self._open):
+            await self._discard(conn)
+        self._idle = None
+        self._loop = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    async def _fetch(self, conn: aiosqlite.Connection, query: str, params: Sequence[Any],
+                     one: bool) -> Any:
+        started = time.perf_counter()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = await conn.execute(query, params)
+            result = await (cursor.fetchone() if one else cursor.fetchall())
+            await cursor.close()
+        finally:
+            conn.row_factory = None
+            self._stats['queries'] += 1
+            if _profiler.enabled:
+                _profiler.record(query, (time.perf_counter() - started) * 1000)
+        if one:
+            return dict(result) if result else None
+        return [dict(row) for row in result]
+
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        async with self.connection() as conn:
+            return await self._fetch(conn, query, params, one=True)
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        async with self.connection() as conn:
+            return await self._fetch(conn, query, params, one=False)
+
+    async def fetchval(self, query: str, params: Sequence[Any] = (), default: Any = None) -> Any:
+        row = await self.fetchone(query, params)
+        value = next(iter(row.values())) if row else None
+        return value if value is not None else default
+
+    @asynccontextmanager
+    async def snapshot(self):
+        """Several queries that all see the same committed state"""
+        async with self.connection() as conn:
+            await conn.execute("BEGIN")
+            try:
+                yield _Snapshot(self, conn)
+            finally:
+                await conn.rollback()
+
+    # ------------------------------------------------------------------
+    # Snapshot copy
+    # ------------------------------------------------------------------
+    async def refresh_snapshot(self) -> bool:
+        """Re-copy the database to ``snapshot_path`` (no-op without one)"""
+        if not self.snapshot_path:
+            return False
+        started = time.perf_counter()
+        size = await run_blocking(copy_snapshot, self.db_path, self.snapshot_path)
+        self._generation += 1
+        self.snapshot_taken_at = time.time()
+        elapsed = (time.perf_counter() - started) * 1000
+        self._stats['snapshots'] += 1
+        self._stats['snapshot_ms_last'] = round(elapsed, 1)
+        logger.info(f"📸 Analytics snapshot refreshed ({size / 1024:.0f} KB in {elapsed:.0f}ms)")
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh_snapshot()
+            except Exception as e:
+                logger.error(f"❌ Analytics snapshot refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Refresh the snapshot copy in the background (when one is configured)"""
+        if self.snapshot_path and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        return self._refresh_task
+
+    def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Analytics read path statistics"""
+        stats = dict(self._stats)
+        stats['source'] = self.source_path
+        stats['connections_open'] = len(self._open)
+        stats['snapshot_age_s'] = (
+            round(time.time() - self.snapshot_taken_at) if self.snapshot_taken_at else None
+        )
+        return stats
+
+
+class _Snapshot:
+    """Query helpers bound to one connection inside a read transaction"""
+
+    def __init__(self, reader: AnalyticsReader, conn: aiosqlite.Connection):
+        self._reader = reader
+        self._conn = conn
+
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        return await self._reader._fetch(self._conn, query, params, one=True)
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        return await self._reader._fetch(self._conn, query, params, one=False)
+
+    async def fetchval(self, query: str, params: Sequence[Any] = (), default: Any = None) -> Any:
+        row = await self.fetchone(query, params)
+        value = next(iter(row.values())) if row else None
+        return value if value is not None else default
+
+
+_readers: Dict[str, AnalyticsReader] = {}
+
+
+def get_analytics_reader(db_path: str = "bot.db") -> AnalyticsReader:
+    """Get (or create) the analytics reader for a database file"""
+    reader = _readers.get(db_path)
+    if reader is None:
+        reader = AnalyticsReader(db_path)
+        _readers[db_path] = reader
+    return reader
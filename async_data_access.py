@@ -0,0 +1,187 @@
+"""
+Async data-access layer for I3lani Telegram Bot
+Shared non-blocking query helpers on top of the pooled SQLite connections,
+plus a bounded executor for the synchronous code that cannot be converted
+"""
+import asyncio
+import functools
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from connection_pool import get_pool
+from write_queue import Statement, WriteResult
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDataAccess:
+    """Non-blocking reads on pooled readers, writes through the group-commit queue"""
+
+    def __init__(self, db_path: str = "bot.db"):
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    async def fetchone(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        """First row as a dict (or None)"""
+        async with self.pool.reader() as conn:
+            conn.row_factory = sqlite3.Row
+            try:
+                cursor = await conn.execute(query, params)
+                row = await cursor.fetchone()
+            finally:
+                conn.row_factory = None
+        return dict(row) if row else None
+
+    async def fetchall(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """All rows as dicts"""
+        async with self.pool.reader() as conn:
+            conn.row_factory = sqlite3.Row
+            try:
+                cursor = await conn.execute(query, params)
+                rows = await cursor.fetchall()
+            finally:
+                conn.row_factory = None
+        return [dict(row) for row in rows]
+
+    async def fetchval(self, query: str, params: Sequence[Any] = (), default: Any = None) -> Any:
+        """First column of the first row"""
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(query, params)
+            row = await cursor.fetchone()
+        return row[0] if row and row[0] is not None else default
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> WriteResult:
+        """Queue one write and wait for its commit"""
+        return await self.pool.write_queue.execute(query, params)
+
+    async def executemany(self, query: str, seq_of_params: Sequence[Sequence[Any]]) -> WriteResult:
+        """Queue one statement for many parameter sets"""
+        return await self.pool.write_queue.executemany(query, seq_of_params)
+
+    async def transaction(self, statements: List[Statement]) -> WriteResult:
+        """Queue several statements that commit (or fail) together"""
+        return await self.pool.write_queue.submit(statements)
+
+    async def run_in_transaction(self, func: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Queue a read-modify-write unit; ``await func(conn)`` runs in the writer's transaction"""
+        return await self.pool.write_queue.run(func)
+
+    async def executescript(self, script: str):
+        """Run DDL directly on the writer (schema setup, not hot path)"""
+        async with self.pool.writer() as conn:
+            await conn.executescript(script)
+            await conn.commit()
+
+
+_data_access: Dict[str, AsyncDataAccess] = {}
+
+
+def get_data_access(db_path: str = "bot.db") -> AsyncDataAccess:
+    """Get the shared data-access object for a database file"""
+    data = _data_access.get(db_path)
+    if data is None:
+        data = AsyncDataAccess(db_path)
+        _data_access[db_path] = data
+    return data
+
+
+# ----------------------------------------------------------------------
+# Bounded executor for synchronous leftovers
+# ----------------------------------------------------------------------
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 4
+
+
+def configure_blocking_executor(max_workers: int):
+    """Set the size of the blocking-call executor (before first use)"""
+    global _executor, _executor_workers
+    _executor_workers = max(1, max_workers)
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_executor_workers,
+                                       thread_name_prefix="i3lani-blocking")
+    return _executor
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a synchronous call on the bounded executor instead of the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+
+# ----------------------------------------------------------------------
+# Fire-and-forget writes from synchronous call sites
+# ----------------------------------------------------------------------
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def in_event_loop() -> bool:
+    """True when called from a thread that is running an event loop"""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def spawn_background(coro: Awaitable, description: str = "background write") -> asyncio.Task:
+    """Schedule a coroutine on the running loop, keeping a reference and logging failures"""
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error(f"❌ {description} failed: {t.exception()}")
+
+    task.add_done_callback(_done)
+    return task
+
+
+def dispatch_write(db_path: str, statements: List[Statement], description: str,
+                   on_done: Optional[Callable[[int], None]] = None) -> Optional[asyncio.Task]:
+    """Run write statements atomically from sync code.
+
+    Inside the event loop the statements go through the write queue in the
+    background and the returned task resolves to the rowcount once they are
+    committed (async code should await that, or an awaitable API, rather than
+    assume the write happened); plain synchronous callers (scripts, executor
+    threads) write inline and get None.
+    """
+    if in_event_loop():
+        async def _write() -> int:
+            result = await get_data_access(db_path).transaction(statements)
+            if on_done:
+                on_done(result.rowcount)
+            return result.rowcount
+        return spawn_background(_write(), description)
+    conn = sqlite3.connect(db_path)
+    try:
+        rowcount = 0
+        for query, params in statements:
+            rowcount += max(conn.execute(query, params).rowcount, 0)
+        conn.commit()
+        if on_done:
+            on_done(rowcount)
+    finally:
+        conn.close()
+
+
+async def drain_background_tasks():
+    """Wait for outstanding fire-and-forget writes (used on shutdown and in tests)"""
+    while _background_tasks:
+        await asyncio.gather(*list(_background_tasks), return_exceptions=True)
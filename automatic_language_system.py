@@ -16,27 +16,18 @@ class AutomaticLanguageSystem:
     """Automatic language detection and application system"""
     
     def __init__(self):
-        self.language_cache = {}
         self.default_language = 'en'
         self.supported_languages = ['en', 'ar', 'ru']
         
     async def get_user_language(self, user_id: int) -> str:
-        """Get user language with caching"""
+        """Get user language (served from the database user cache)"""
         try:
-            # Check cache first
-            if user_id in self.language_cache:
-                return self.language_cache[user_id]
-            
-            # Get from database
             language = await db.get_user_language(user_id)
             
             # Validate language
             if language not in self.supported_languages:
                 language = self.default_language
             
-            # Cache the result
-            self.language_cache[user_id] = language
-            
             return language
             
         except Exception as e:
@@ -48,7 +39,6 @@ class AutomaticLanguageSystem:
         try:
             if language in self.supported_languages:
                 await db.set_user_language(user_id, language)
-                self.language_cache[user_id] = language
                 logger.info(f"Set language for user {user_id}: {language}")
             else:
                 logger.warning(f"Unsupported language: {language}")
@@ -192,9 +182,9 @@ class AutomaticLanguageSystem:
     async def clear_language_cache(self, user_id: Optional[int] = None):
         """Clear language cache"""
         if user_id:
-            self.language_cache.pop(user_id, None)
+            db.invalidate_user(user_id)
         else:
-            self.language_cache.clear()
+            db.user_cache.clear()
     
     async def get_language_stats(self) -> Dict:
         """Get language usage statistics"""
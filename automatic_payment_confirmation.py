@@ -97,6 +97,10 @@ class AutomaticPaymentConfirmation:
             conn.commit()
             conn.close()
             
+            # The scanner matches incoming transactions against the in-memory index
+            from memo_index import get_memo_index
+            get_memo_index(self.db_path).add(memo, user_id, amount, json.loads(ad_data_json))
+            
             logger.info(f"✅ Tracking payment {memo} for user {user_id}")
             return True
             
@@ -606,6 +610,9 @@ Campaign ID: {campaign_id}
             conn.commit()
             conn.close()
             
+            from memo_index import get_memo_index
+            get_memo_index(self.db_path).discard(memo)
+            
             logger.info(f"✅ Payment {memo} marked as confirmed with campaign {campaign_id}")
             return True
             
@@ -613,14 +620,23 @@ Campaign ID: {campaign_id}
             logger.error(f"❌ Error marking payment confirmed: {e}")
             return False
     
-    async def activate_campaign(self, user_id: int, memo: str, amount: float, ad_data: dict):
+    async def activate_campaign(self, user_id: int, memo: str, amount: float, ad_data: dict,
+                                tx_hash: str = None):
         """Activate user campaign with unique ID and execute comprehensive publishing workflow"""
         try:
+            # A payment activates once: a repeat returns its campaign without publishing again
+            from payment_ledger import get_payment_ledger
+            ledger = get_payment_ledger(self.db_path)
+            if await ledger.seen(memo):
+                campaign_id = await ledger.campaign_for(memo)
+                logger.info(f"ℹ️ Payment {memo} already activated campaign {campaign_id}")
+                return campaign_id
+            
             # Create campaign using the new campaign management system
             from campaign_management import create_campaign_for_payment
             
             campaign_id = await create_campaign_for_payment(
-                user_id, memo, amount, ad_data, 'TON'
+                user_id, memo, amount, ad_data, 'TON', tx_hash
             )
             
             if campaign_id:
@@ -692,8 +708,11 @@ Campaign ID: {campaign_id}
 automatic_confirmation = AutomaticPaymentConfirmation()
 
 async def init_automatic_confirmation():
-    """Initialize automatic confirmation system"""
-    return await automatic_confirmation.init_tables()
+    """Initialize automatic confirmation system and load the open memos"""
+    ready = await automatic_confirmation.init_tables()
+    from memo_index import get_memo_index
+    await get_memo_index(automatic_confirmation.db_path).load()
+    return ready
 
 async def track_payment_for_user(user_id: int, memo: str, amount: float, ad_data: dict = None):
     """Track payment for automatic confirmation"""
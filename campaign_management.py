@@ -7,7 +7,6 @@ Unified campaign management using sequence-based tracking
 import asyncio
 import logging
 from automatic_language_system import get_user_language_auto
-import sqlite3
 import json
 import string
 import random
@@ -20,6 +19,13 @@ from global_sequence_system import (
     log_sequence_step, link_to_global_sequence
 )
 from sequence_logger import get_sequence_logger
+from async_data_access import get_data_access
+from campaign_schedule import ScheduleRule, insert_all_posts, store_rule
+from config import LAZY_POST_SCHEDULING, POST_SCHEDULE_WINDOW_HOURS
+from payment_ledger import get_payment_ledger
+from publish_media import media_list
+from publish_slots import get_slot_index
+from schema_migrations import run_migrations
 
 logging.basicConfig(level=logging.INFO)
 logger = get_sequence_logger(__name__)
@@ -29,95 +35,15 @@ class CampaignManager:
     
     def __init__(self, db_path: str = "bot.db"):
         self.db_path = db_path
+        self.data = get_data_access(db_path)
+        # Shared by every manager on this database, so concurrent payments see each other's slots
+        self.slots = get_slot_index(db_path)
         
     async def init_tables(self):
         """Initialize campaign management tables"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create campaigns table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS campaigns (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    campaign_id TEXT NOT NULL UNIQUE,
-                    user_id INTEGER NOT NULL,
-                    payment_memo TEXT,
-                    payment_method TEXT DEFAULT 'TON',
-                    payment_amount REAL,
-                    
-                    -- Campaign Details
-                    campaign_name TEXT,
-                    ad_content TEXT,
-                    ad_type TEXT DEFAULT 'text',
-                    
-                    -- Scheduling
-                    start_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    end_date TIMESTAMP,
-                    duration_days INTEGER,
-                    posts_per_day INTEGER,
-                    total_posts INTEGER,
-                    
-                    -- Channels
-                    selected_channels TEXT,
-                    channel_count INTEGER,
-                    total_reach INTEGER,
-                    
-                    -- Status
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    
-                    -- Analytics
-                    posts_published INTEGER DEFAULT 0,
-                    engagement_score REAL DEFAULT 0.0,
-                    click_through_rate REAL DEFAULT 0.0,
-                    
-                    -- Metadata
-                    campaign_metadata TEXT
-                );
-            """)
-            
-            # Create campaign_posts table for tracking individual posts
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS campaign_posts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    campaign_id TEXT NOT NULL,
-                    channel_id TEXT NOT NULL,
-                    post_id TEXT,
-                    post_content TEXT,
-                    scheduled_time TIMESTAMP,
-                    published_time TIMESTAMP,
-                    status TEXT DEFAULT 'pending',
-                    engagement_metrics TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
-                );
-            """)
-            
-            # Create indexes for performance
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_campaigns_user_id 
-                ON campaigns(user_id);
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_campaigns_campaign_id 
-                ON campaigns(campaign_id);
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_campaigns_status 
-                ON campaigns(status);
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_campaign_posts_campaign_id 
-                ON campaign_posts(campaign_id);
-            """)
-            
-            conn.commit()
-            conn.close()
+            await run_migrations(self.db_path)
+            await self.slots.rebuild(self.data)
             
             logger.info("✅ Campaign management tables initialized")
             return True
@@ -157,12 +83,18 @@ class CampaignManager:
             return f"CAM-ERROR-{datetime.now().strftime('%H%M%S')}"
     
     async def create_campaign(self, user_id: int, payment_memo: str, payment_amount: float,
-                            ad_data: Dict[str, Any], payment_method: str = 'TON') -> str:
-        """Create new campaign with sequence-based unique ID"""
+                            ad_data: Dict[str, Any], payment_method: str = 'TON',
+                            tx_hash: Optional[str] = None) -> str:
+        """Create new campaign with sequence-based unique ID (once per payment memo)"""
         try:
+            ledger = get_payment_ledger(self.db_path)
+            if payment_memo and await ledger.seen(payment_memo):
+                logger.warning(f"⚠️ Payment {payment_memo} already activated a campaign")
+                return None
+            
             # Get user's sequence ID
             manager = get_global_sequence_manager()
-            sequence_id = manager.get_user_active_sequence(user_id)
+            sequence_id = await manager.aget_user_active_sequence(user_id)
             
             # Generate unique campaign ID using sequence system
             campaign_id = self.generate_campaign_id(sequence_id)
@@ -190,18 +122,18 @@ class CampaignManager:
                 'target_audience': ad_data.get('target_audience', 'general'),
                 'content_type': ad_data.get('content_type', 'text'),
                 'languages': ad_data.get('languages', ['ar', 'en']),
-                'creation_source': 'bot_interface'
+                'creation_source': 'bot_interface',
+                # Every uploaded photo/video, so the publisher can send an album
+                'media': media_list(ad_data.get('media') or ad_data.get('photos'),
+                                    'video' if 'video' in ad_data.get('content_type', 'text') else 'photo')
             }
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Insert campaign with media support
             ad_content = ad_data.get('ad_content', f'Advertisement campaign for payment {payment_memo}')
             content_type = ad_data.get('content_type', 'text')
             media_url = ad_data.get('media_url', None)
             
-            cursor.execute("""
+            insert = ("""
                 INSERT INTO campaigns (
                     campaign_id, user_id, payment_memo, payment_method, payment_amount,
                     campaign_name, ad_content, content_type, media_url, duration_days, posts_per_day, total_posts,
@@ -216,8 +148,17 @@ class CampaignManager:
                 start_date, end_date, 'active', json.dumps(campaign_metadata)
             ))
             
-            conn.commit()
-            conn.close()
+            if payment_memo:
+                # The ledger row commits with the campaign, so a memo can only ever activate one
+                activated = await ledger.activate_once(
+                    tx_hash, payment_memo, user_id, payment_amount, campaign_id,
+                    lambda conn: conn.execute(*insert), source=payment_method)
+                if not activated:
+                    logger.warning(f"⚠️ Payment {payment_memo} already activated campaign "
+                                   f"{await ledger.campaign_for(payment_memo)}")
+                    return None
+            else:
+                await self.data.execute(*insert)
             
             logger.info(f"✅ Created campaign {campaign_id} for user {user_id}")
             
@@ -251,12 +192,13 @@ class CampaignManager:
                                          duration_days: int, posts_per_day: int, 
                                          payment_amount: float, payment_method: str,
                                          payment_memo: str, ad_content: str, 
-                                         media_url: str = None, content_type: str = 'text'):
+                                         media_url: str = None, content_type: str = 'text',
+                                         media: Optional[list] = None):
         """Create a new campaign from successful payment"""
         try:
             # Get user's sequence ID
             manager = get_global_sequence_manager()
-            sequence_id = manager.get_user_active_sequence(user_id)
+            sequence_id = await manager.aget_user_active_sequence(user_id)
             
             # Generate unique campaign ID using sequence system
             campaign_id = self.generate_campaign_id(sequence_id)
@@ -270,26 +212,21 @@ class CampaignManager:
             total_reach = channel_count * 100  # Estimate 100 subscribers per channel
             
             # Store campaign in database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            await self.data.execute("""
                 INSERT INTO campaigns (
                     campaign_id, user_id, payment_memo, payment_method, payment_amount,
                     campaign_name, ad_content, content_type, media_url, duration_days,
                     posts_per_day, total_posts, selected_channels, channel_count,
-                    total_reach, end_date, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    total_reach, end_date, status, campaign_metadata
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 campaign_id, user_id, payment_memo, payment_method, payment_amount,
                 f"Campaign {campaign_id}", ad_content, content_type, media_url,
                 duration_days, posts_per_day, total_posts, 
-                ','.join(map(str, selected_channels)), channel_count, total_reach, end_date, 'active'
+                ','.join(map(str, selected_channels)), channel_count, total_reach, end_date, 'active',
+                json.dumps({'media': media_list(media, 'video' if 'video' in content_type else 'photo')})
             ))
             
-            conn.commit()
-            conn.close()
-            
             # Create campaign posts for publishing
             await self.create_campaign_posts(campaign_id, user_id, selected_channels, 
                                            duration_days, posts_per_day, ad_content, 
@@ -305,55 +242,19 @@ class CampaignManager:
     async def create_campaign_posts(self, campaign_id: str, user_id: int, 
                                   selected_channels: list, duration_days: int, 
                                   posts_per_day: int, ad_content: str, 
-                                  media_url: str = None, content_type: str = 'text'):
+                                  media_url: str = None, content_type: str = 'text',
+                                  lazy: Optional[bool] = None):
         """Create scheduled posts for the campaign"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create campaign_posts table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS campaign_posts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    campaign_id TEXT NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    channel_id INTEGER NOT NULL,
-                    content TEXT NOT NULL,
-                    content_type TEXT DEFAULT 'text',
-                    media_url TEXT,
-                    scheduled_time TIMESTAMP NOT NULL,
-                    status TEXT DEFAULT 'scheduled',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    published_at TIMESTAMP,
-                    message_id INTEGER
-                )
-            """)
-            
-            # Create posts for each day and channel
-            start_time = datetime.now()
-            post_count = 0
-            
-            for day in range(duration_days):
-                for post_num in range(posts_per_day):
-                    # Calculate posting time (spread throughout the day)
-                    hours_offset = (24 // posts_per_day) * post_num
-                    post_time = start_time + timedelta(days=day, hours=hours_offset)
-                    
-                    # Create post for each selected channel
-                    for channel_id in selected_channels:
-                        cursor.execute("""
-                            INSERT INTO campaign_posts (
-                                campaign_id, user_id, channel_id, content, 
-                                content_type, media_url, scheduled_time, status
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            campaign_id, user_id, channel_id, ad_content,
-                            content_type, media_url, post_time, 'scheduled'
-                        ))
-                        post_count += 1
-            
-            conn.commit()
-            conn.close()
+            if posts_per_day <= 0:
+                return 0
+            # Posts spread through the day on whole-hour offsets
+            rule = ScheduleRule.daily(
+                campaign_id, selected_channels, posts_per_day, duration_days,
+                interval_seconds=(24 // posts_per_day) * 3600,
+                user_id=user_id, content=ad_content, content_type=content_type, media_url=media_url
+            )
+            post_count = await self._schedule_rule(rule, lazy)
             
             logger.info(f"✅ Created {post_count} scheduled posts for campaign {campaign_id}")
             return post_count
@@ -365,14 +266,8 @@ class CampaignManager:
     async def campaign_exists(self, campaign_id: str) -> bool:
         """Check if campaign ID already exists"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT 1 FROM campaigns WHERE campaign_id = ?", (campaign_id,))
-            exists = cursor.fetchone() is not None
-            
-            conn.close()
-            return exists
+            row = await self.data.fetchone("SELECT 1 FROM campaigns WHERE campaign_id = ?", (campaign_id,))
+            return row is not None
             
         except Exception as e:
             logger.error(f"❌ Error checking campaign existence: {e}")
@@ -381,17 +276,10 @@ class CampaignManager:
     async def get_campaign_by_id(self, campaign_id: str) -> Optional[Dict[str, Any]]:
         """Get campaign details by ID"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            row = await self.data.fetchone("""
                 SELECT * FROM campaigns WHERE campaign_id = ?
             """, (campaign_id,))
             
-            row = cursor.fetchone()
-            conn.close()
-            
             if row:
                 campaign = dict(row)
                 # Parse JSON fields
@@ -411,20 +299,13 @@ class CampaignManager:
     async def get_user_campaigns(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """Get user's campaigns"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            rows = await self.data.fetchall("""
                 SELECT * FROM campaigns 
                 WHERE user_id = ? 
                 ORDER BY created_at DESC 
                 LIMIT ?
             """, (user_id, limit))
             
-            rows = cursor.fetchall()
-            conn.close()
-            
             campaigns = []
             for row in rows:
                 campaign = dict(row)
@@ -442,43 +323,13 @@ class CampaignManager:
             return []
     
     async def schedule_campaign_posts(self, campaign_id: str, channels: List[str], 
-                                    posts_per_day: int, duration_days: int):
+                                    posts_per_day: int, duration_days: int,
+                                    lazy: Optional[bool] = None):
         """Schedule individual posts for campaign"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            start_date = datetime.now()
-            posts_scheduled = 0
-            
-            # Calculate posting schedule
-            hours_between_posts = 24 / posts_per_day if posts_per_day > 0 else 24
-            
-            for day in range(duration_days):
-                for post_num in range(posts_per_day):
-                    for channel in channels:
-                        # Calculate scheduled time
-                        scheduled_time = start_date + timedelta(
-                            days=day, 
-                            hours=post_num * hours_between_posts
-                        )
-                        
-                        # Insert scheduled post
-                        cursor.execute("""
-                            INSERT INTO campaign_posts (
-                                campaign_id, channel_id, post_content, 
-                                scheduled_time, status
-                            ) VALUES (?, ?, ?, ?, 'scheduled')
-                        """, (
-                            campaign_id, channel, 
-                            f"Campaign {campaign_id} - Post {posts_scheduled + 1}",
-                            scheduled_time
-                        ))
-                        
-                        posts_scheduled += 1
-            
-            conn.commit()
-            conn.close()
+            rule = ScheduleRule.daily(campaign_id, channels, posts_per_day, duration_days,
+                                      label_posts=True)
+            posts_scheduled = await self._schedule_rule(rule, lazy)
             
             logger.info(f"✅ Scheduled {posts_scheduled} posts for campaign {campaign_id}")
             return posts_scheduled
@@ -486,6 +337,33 @@ class CampaignManager:
         except Exception as e:
             logger.error(f"❌ Error scheduling campaign posts: {e}")
             return 0
+
+    async def _schedule_rule(self, rule: ScheduleRule, lazy: Optional[bool] = None) -> int:
+        """Store the schedule as a rule (lazy) or insert every post row in bulk.
+
+        Returns the campaign's total post count either way; in lazy mode the
+        publisher materializes rows ``POST_SCHEDULE_WINDOW_HOURS`` ahead.
+        """
+        # Move each channel's posts onto free publish slots (bursts on shared minutes trip chat limits)
+        try:
+            await self.slots.ensure_loaded(self.data)
+            rule.channel_offsets = self.slots.allocate(rule)
+        except Exception as e:
+            logger.error(f"❌ Error allocating publish slots for {rule.campaign_id}: {e}")
+        
+        if LAZY_POST_SCHEDULING if lazy is None else lazy:
+            await store_rule(self.data, rule, timedelta(hours=POST_SCHEDULE_WINDOW_HOURS))
+            total = rule.total_posts
+        else:
+            total = await insert_all_posts(self.data, rule)
+        
+        # Let the running publisher queue the new posts without waiting for its sweep
+        try:
+            from enhanced_campaign_publisher import notify_posts_scheduled
+            await notify_posts_scheduled(rule.campaign_id)
+        except Exception as e:
+            logger.error(f"❌ Error notifying publisher of scheduled posts: {e}")
+        return total
     
     async def get_campaign_summary(self, campaign_id: str, language: str = 'en') -> str:
         """Generate campaign summary text with multilingual support"""
@@ -602,18 +480,12 @@ class CampaignManager:
     async def update_campaign_status(self, campaign_id: str, status: str):
         """Update campaign status"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            await self.data.execute("""
                 UPDATE campaigns 
                 SET status = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE campaign_id = ?
             """, (status, campaign_id))
             
-            conn.commit()
-            conn.close()
-            
             logger.info(f"✅ Updated campaign {campaign_id} status to {status}")
             return True
             
@@ -629,9 +501,11 @@ async def init_campaign_system():
     return await campaign_manager.init_tables()
 
 async def create_campaign_for_payment(user_id: int, payment_memo: str, payment_amount: float,
-                                    ad_data: Dict[str, Any], payment_method: str = 'TON') -> str:
+                                    ad_data: Dict[str, Any], payment_method: str = 'TON',
+                                    tx_hash: Optional[str] = None) -> str:
     """Create campaign when payment is confirmed"""
-    return await campaign_manager.create_campaign(user_id, payment_memo, payment_amount, ad_data, payment_method)
+    return await campaign_manager.create_campaign(user_id, payment_memo, payment_amount, ad_data, payment_method,
+                                                  tx_hash)
 
 async def get_campaign_details(campaign_id: str) -> Optional[Dict[str, Any]]:
     """Get campaign details by ID"""
@@ -642,9 +516,11 @@ async def get_user_campaign_list(user_id: int, limit: int = 10) -> List[Dict[str
     return await campaign_manager.get_user_campaigns(user_id, limit)
 
 async def create_campaign_for_payment(user_id: int, payment_memo: str, payment_amount: float, 
-                                    ad_data: Dict[str, Any], payment_method: str = 'TON') -> str:
+                                    ad_data: Dict[str, Any], payment_method: str = 'TON',
+                                    tx_hash: Optional[str] = None) -> str:
     """Create campaign for payment confirmation - FIXES BUG WHERE NEW CAMPAIGNS DON'T APPEAR"""
-    return await campaign_manager.create_campaign(user_id, payment_memo, payment_amount, ad_data, payment_method)
+    return await campaign_manager.create_campaign(user_id, payment_memo, payment_amount, ad_data, payment_method,
+                                                  tx_hash)
 
 async def get_campaign_id_card(campaign_id: str, language: str = 'en') -> str:
     """Get campaign ID card summary with language support"""
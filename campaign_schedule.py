@@ -0,0 +1,204 @@
+"""
+Campaign post schedules for I3lani Telegram Bot
+A campaign's posting plan as a compact rule (start, interval, count, channels)
+that is either expanded in bulk or materialized lazily, one window at a time
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+
+INSERT_POST_QUERY = """
+    INSERT INTO campaign_posts (
+        campaign_id, user_id, channel_id, content, content_type,
+        media_url, post_content, scheduled_time, status
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'scheduled')
+"""
+
+
+def format_timestamp(value: datetime) -> str:
+    """Timestamp text in the form campaign_posts.scheduled_time is compared in"""
+    return value.isoformat(sep=' ')
+
+
+@dataclass
+class ScheduleRule:
+    """Occurrence ``i`` is posted to every channel at
+    ``start + (i // slots_per_period) * period + (i % slots_per_period) * interval``,
+    plus that channel's offset (its publish slot, see publish_slots.py)
+    """
+    campaign_id: str
+    channels: List[str]
+    start_time: datetime
+    interval_seconds: float
+    slots_per_period: int
+    occurrences: int
+    period_seconds: float = DAY_SECONDS
+    user_id: Optional[int] = None
+    content: Optional[str] = None
+    content_type: str = 'text'
+    media_url: Optional[str] = None
+    # The legacy scheduler labels each post "Campaign <id> - Post <n>"
+    label_posts: bool = False
+    channel_offsets: Dict[str, float] = field(default_factory=dict)
+    channels_json: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.channels = [str(channel) for channel in self.channels]
+        self.channels_json = json.dumps(self.channels)
+
+    @classmethod
+    def daily(cls, campaign_id: str, channels: Sequence[Any], posts_per_day: int,
+              duration_days: int, start_time: Optional[datetime] = None,
+              interval_seconds: Optional[float] = None, **post_fields) -> 'ScheduleRule':
+        """``posts_per_day`` slots a day (evenly spread unless ``interval_seconds``) for ``duration_days``"""
+        posts_per_day = max(posts_per_day, 0)
+        if interval_seconds is None:
+            interval_seconds = DAY_SECONDS / posts_per_day if posts_per_day else DAY_SECONDS
+        return cls(
+            campaign_id=campaign_id, channels=list(channels),
+            start_time=start_time or datetime.now(), interval_seconds=interval_seconds,
+            slots_per_period=max(posts_per_day, 1),
+            occurrences=posts_per_day * max(duration_days, 0), **post_fields
+        )
+
+    @property
+    def total_posts(self) -> int:
+        return self.occurrences * len(self.channels)
+
+    def occurrence_time(self, index: int) -> datetime:
+        period, slot = divmod(index, self.slots_per_period)
+        return self.start_time + timedelta(
+            seconds=period * self.period_seconds + slot * self.interval_seconds
+        )
+
+    def times(self, first: int = 0, until: Optional[datetime] = None) -> List[datetime]:
+        """Occurrence times from ``first`` on, stopping after ``until`` if given"""
+        result = []
+        for index in range(first, self.occurrences):
+            when = self.occurrence_time(index)
+            if until is not None and when > until:
+                break
+            result.append(when)
+        return result
+
+    def rows(self, first: int, times: Sequence[datetime]) -> Iterator[Tuple]:
+        """campaign_posts parameter rows for consecutive occurrences starting at ``first``"""
+        channel_count = len(self.channels)
+        offsets = self.channel_offsets
+        for offset, when in enumerate(times):
+            scheduled_time = format_timestamp(when)
+            base = (first + offset) * channel_count
+            for position, channel in enumerate(self.channels):
+                label = f"Campaign {self.campaign_id} - Post {base + position + 1}" if self.label_posts else None
+                channel_time = (format_timestamp(when + timedelta(seconds=offsets[channel]))
+                                if offsets.get(channel) else scheduled_time)
+                yield (self.campaign_id, self.user_id, channel, self.content, self.content_type,
+                       self.media_url, label, channel_time)
+
+    def to_params(self) -> Tuple:
+        return (self.campaign_id, self.user_id, self.channels_json, format_timestamp(self.start_time),
+                self.interval_seconds, self.slots_per_period, self.period_seconds, self.occurrences,
+                format_timestamp(self.start_time) if self.occurrences else None,
+                'active' if self.occurrences else 'complete',
+                self.content, self.content_type, self.media_url, int(self.label_posts),
+                json.dumps(self.channel_offsets) if self.channel_offsets else None)
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> Tuple['ScheduleRule', int]:
+        """Rule and next unmaterialized occurrence from a SCHEDULE_COLUMNS row"""
+        (campaign_id, user_id, channels, start_time, interval_seconds, slots_per_period,
+         period_seconds, occurrences, next_index, content, content_type, media_url, label_posts,
+         channel_offsets) = row
+        rule = cls(
+            campaign_id=campaign_id, channels=json.loads(channels),
+            start_time=datetime.fromisoformat(start_time), interval_seconds=interval_seconds,
+            slots_per_period=slots_per_period, occurrences=occurrences,
+            period_seconds=period_seconds, user_id=user_id, content=content,
+            content_type=content_type, media_url=media_url, label_posts=bool(label_posts),
+            channel_offsets=json.loads(channel_offsets) if channel_offsets else {}
+        )
+        return rule, next_index
+
+
+SCHEDULE_COLUMNS = """
+    campaign_id, user_id, channels, start_time, interval_seconds, slots_per_period,
+    period_seconds, occurrences, next_index, content, content_type, media_url, label_posts,
+    channel_offsets
+"""
+
+
+async def insert_all_posts(data, rule: ScheduleRule) -> int:
+    """Bulk path: expand the whole rule into campaign_posts with one executemany"""
+    if not rule.total_posts:
+        return 0
+    await data.executemany(INSERT_POST_QUERY, list(rule.rows(0, rule.times())))
+    return rule.total_posts
+
+
+async def store_rule(data, rule: ScheduleRule, window: timedelta) -> int:
+    """Lazy path: store the rule and materialize its first window; returns rows inserted"""
+
+    async def _store(conn) -> int:
+        await conn.execute("""
+            INSERT OR REPLACE INTO campaign_schedules (
+                campaign_id, user_id, channels, start_time, interval_seconds,
+                slots_per_period, period_seconds, occurrences, next_index,
+                next_time, status, content, content_type, media_url, label_posts, channel_offsets
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?)
+        """, rule.to_params())
+        return await _materialize(conn, rule, 0, datetime.now() + window)
+
+    return await data.run_in_transaction(_store)
+
+
+async def _materialize(conn, rule: ScheduleRule, next_index: int, until: datetime) -> int:
+    times = rule.times(next_index, until)
+    if times:
+        await conn.executemany(INSERT_POST_QUERY, list(rule.rows(next_index, times)))
+    next_index += len(times)
+    if next_index >= rule.occurrences:
+        next_time, status = None, 'complete'
+    else:
+        next_time, status = format_timestamp(rule.occurrence_time(next_index)), 'active'
+    await conn.execute("""
+        UPDATE campaign_schedules SET next_index = ?, next_time = ?, status = ?
+        WHERE campaign_id = ?
+    """, (next_index, next_time, status, rule.campaign_id))
+    return len(times) * len(rule.channels)
+
+
+async def materialize_due_schedules(data, window: timedelta, limit: int = 100) -> int:
+    """Insert campaign_posts rows for every active rule occurrence inside the window"""
+    until = datetime.now() + window
+
+    async def _run(conn) -> int:
+        cursor = await conn.execute(f"""
+            SELECT {SCHEDULE_COLUMNS} FROM campaign_schedules
+            WHERE status = 'active' AND next_time <= ?
+            ORDER BY next_time LIMIT ?
+        """, (format_timestamp(until), limit))
+        rows = await cursor.fetchall()
+        inserted = 0
+        for row in rows:
+            rule, next_index = ScheduleRule.from_row(row)
+            inserted += await _materialize(conn, rule, next_index, until)
+        return inserted
+
+    inserted = await data.run_in_transaction(_run)
+    if inserted:
+        logger.info(f"🗓️ Materialized {inserted} scheduled posts")
+    return inserted
+
+
+async def has_pending_occurrences(data, campaign_id: str) -> bool:
+    """True while a lazy rule still has occurrences not yet in campaign_posts"""
+    return bool(await data.fetchval(
+        "SELECT 1 FROM campaign_schedules WHERE campaign_id = ? AND status = 'active'",
+        (campaign_id,)
+    ))
@@ -5,7 +5,6 @@ Automatically manages channels when bot becomes admin or loses admin privileges
 
 import logging
 import asyncio
-import aiosqlite
 from typing import Optional, Dict, List
 from aiogram import Bot
 from aiogram.types import ChatMemberUpdated, Chat, ChatMember
@@ -656,17 +655,16 @@ The bot was added as admin in:
             # Recalculate base price
             base_price = self._calculate_base_price(subscribers, category)
             
-            # Update database with detailed info
-            async with aiosqlite.connect(self.db.db_path) as db:
-                await db.execute('''
-                    UPDATE channels 
-                    SET subscribers = ?, active_subscribers = ?, category = ?, 
-                        description = ?, base_price_usd = ?, last_updated = CURRENT_TIMESTAMP
-                    WHERE telegram_channel_id = ? OR channel_id = ?
-                ''', (subscribers, active_subscribers, category, description, 
-                     base_price, channel_id, channel_id))
-                await db.commit()
-                
+            # Update database with detailed info, then drop the cached channel lists
+            await self.db.queue_write('''
+                UPDATE channels 
+                SET subscribers = ?, active_subscribers = ?, category = ?, 
+                    description = ?, base_price_usd = ?, last_updated = CURRENT_TIMESTAMP
+                WHERE telegram_channel_id = ? OR channel_id = ?
+            ''', (subscribers, active_subscribers, category, description, 
+                 base_price, channel_id, channel_id))
+            self.db.invalidate_channels()
+            
             logger.info(f"Updated stats for channel {channel_id}: {subscribers} subscribers, {active_subscribers} active, category: {category}")
             
         except Exception as e:
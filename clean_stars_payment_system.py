@@ -22,8 +22,8 @@ from aiogram.exceptions import TelegramAPIError
 
 # Import global sequence system
 from global_sequence_system import (
-    get_global_sequence_manager, start_user_global_sequence,
-    log_sequence_step, link_to_global_sequence
+    get_global_sequence_manager, log_sequence_step, link_to_global_sequence,
+    astart_user_global_sequence, alog_sequence_step
 )
 from sequence_logger import get_sequence_logger
 
@@ -72,11 +72,11 @@ class CleanStarsPayment:
         try:
             # Get user's active sequence
             manager = get_global_sequence_manager()
-            sequence_id = manager.get_user_active_sequence(user_id)
+            sequence_id = await manager.aget_user_active_sequence(user_id)
             
             if not sequence_id:
                 # Start new sequence for post package purchase
-                sequence_id = start_user_global_sequence(user_id, "post_package_purchase")
+                sequence_id = await astart_user_global_sequence(user_id, "post_package_purchase")
             
             # Generate payment ID
             payment_id = self.generate_payment_id(user_id)
@@ -128,7 +128,7 @@ class CleanStarsPayment:
             self.pending_payments[payment_id] = payment_data
             
             # Log payment creation step
-            log_sequence_step(sequence_id, "Payment_Step_2_CreatePostPackageInvoice", "clean_stars_payment", {
+            await alog_sequence_step(sequence_id, "Payment_Step_2_CreatePostPackageInvoice", "clean_stars_payment", {
                 "payment_id": payment_id,
                 "stars_amount": stars_amount,
                 "package_name": package_name,
@@ -205,14 +205,14 @@ Click the button below to pay with Telegram Stars:"""
         try:
             # Get user's active sequence
             manager = get_global_sequence_manager()
-            sequence_id = manager.get_user_active_sequence(user_id)
+            sequence_id = await manager.aget_user_active_sequence(user_id)
             
             # Generate payment ID using sequence system
             payment_id = self.generate_payment_id(user_id)
             
             # Log invoice creation step
             if sequence_id:
-                log_sequence_step(sequence_id, "Payment_Step_2_CreateStarsInvoice", "clean_stars_payment", {
+                await alog_sequence_step(sequence_id, "Payment_Step_2_CreateStarsInvoice", "clean_stars_payment", {
                     "payment_id": payment_id,
                     "stars_amount": pricing_data.get('total_stars', 0),
                     "usd_amount": pricing_data.get('total_usd', 0),
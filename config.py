@@ -13,16 +13,79 @@ if not BOT_TOKEN:
 
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///bot.db')
+DB_POOL_READERS = int(os.getenv('DB_POOL_READERS', '4'))  # read-only pooled connections
+DB_WRITE_BATCH_MAX = int(os.getenv('DB_WRITE_BATCH_MAX', '200'))  # writes per group commit
+DB_WRITE_MAX_LATENCY_MS = float(os.getenv('DB_WRITE_MAX_LATENCY_MS', '5'))  # flush window
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv('BLOCKING_EXECUTOR_WORKERS', '4'))  # threads for sync leftovers
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))  # cached user rows (LRU)
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '300'))  # seconds
+CHANNEL_CACHE_TTL = float(os.getenv('CHANNEL_CACHE_TTL', '60'))  # seconds
+SETTINGS_CACHE_TTL = float(os.getenv('SETTINGS_CACHE_TTL', '300'))  # seconds
+
+# Campaign scheduling configuration
+LAZY_POST_SCHEDULING = os.getenv('LAZY_POST_SCHEDULING', 'true').lower() == 'true'  # store rules, not every post row
+POST_SCHEDULE_WINDOW_HOURS = float(os.getenv('POST_SCHEDULE_WINDOW_HOURS', '24'))  # rows materialized ahead
+PUBLISHER_SWEEP_SECONDS = float(os.getenv('PUBLISHER_SWEEP_SECONDS', '300'))  # timer/database reconciliation
+WORKER_SWEEP_SECONDS = float(os.getenv('WORKER_SWEEP_SECONDS', '30'))  # publish_worker.py only sees newly paid posts at a sweep
+PUBLISH_LEASE_SECONDS = float(os.getenv('PUBLISH_LEASE_SECONDS', '300'))  # claim expiry for a crashed worker
+PUBLISH_WORKER_ID = os.getenv('PUBLISH_WORKER_ID', '')  # defaults to host:pid
+RUN_PUBLISHER_IN_BOT = os.getenv('RUN_PUBLISHER_IN_BOT', 'true').lower() == 'true'  # false when publish_worker.py runs it
+PUBLISH_CONCURRENCY = int(os.getenv('PUBLISH_CONCURRENCY', '8'))  # posts sent in parallel
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))  # messages per second across all chats
+TELEGRAM_CHAT_RATE_PER_MINUTE = float(os.getenv('TELEGRAM_CHAT_RATE_PER_MINUTE', '20'))  # per channel/group
+TELEGRAM_CHAT_BURST = float(os.getenv('TELEGRAM_CHAT_BURST', '3'))  # messages a quiet chat may send back to back
+PUBLISH_MAX_ATTEMPTS = int(os.getenv('PUBLISH_MAX_ATTEMPTS', '5'))  # transient failures before dead-lettering
+PUBLISH_RETRY_BASE_SECONDS = float(os.getenv('PUBLISH_RETRY_BASE_SECONDS', '5'))  # first backoff window
+PUBLISH_RETRY_MAX_SECONDS = float(os.getenv('PUBLISH_RETRY_MAX_SECONDS', '900'))  # backoff cap
+PUBLISH_BATCH_SIZE = int(os.getenv('PUBLISH_BATCH_SIZE', '50'))  # post results flushed per transaction
+PUBLISH_BATCH_FLUSH_SECONDS = float(os.getenv('PUBLISH_BATCH_FLUSH_SECONDS', '5'))  # max age of unflushed results
+MEDIA_FILE_ID_CACHE_SIZE = int(os.getenv('MEDIA_FILE_ID_CACHE_SIZE', '2000'))  # media hash -> Telegram file_id (LRU)
+CHANNEL_MAX_POSTS_PER_HOUR = int(os.getenv('CHANNEL_MAX_POSTS_PER_HOUR', '12'))  # publish slots per channel per hour
+PUBLISH_SLOT_MAX_SHIFT_MINUTES = float(os.getenv('PUBLISH_SLOT_MAX_SHIFT_MINUTES', '60'))  # how far a post may move to a free slot before the search widens past full hours (0 = off)
+PUBLISH_PAYLOAD_CACHE_SIZE = int(os.getenv('PUBLISH_PAYLOAD_CACHE_SIZE', '1000'))  # rendered campaign payloads kept in memory
+NOTIFICATION_DIGEST_MINUTES = float(os.getenv('NOTIFICATION_DIGEST_MINUTES', '60'))  # advertiser digest window (0 = after each batch)
+
+# Log retention configuration
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '30'))  # default age before log rows are purged
+LOG_RETENTION_INTERVAL_HOURS = float(os.getenv('LOG_RETENTION_INTERVAL_HOURS', '24'))  # between runs
+LOG_RETENTION_BATCH = int(os.getenv('LOG_RETENTION_BATCH', '1000'))  # rows per archive/delete batch
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', 'log_archive')  # gzipped JSONL archives
+
+# Analytics configuration (admin statistics and dashboards)
+ANALYTICS_CONNECTIONS = int(os.getenv('ANALYTICS_CONNECTIONS', '2'))  # dedicated read-only connections
+ANALYTICS_SNAPSHOT = os.getenv('ANALYTICS_SNAPSHOT', 'false').lower() == 'true'  # read a periodic copy instead of the live file
+ANALYTICS_SNAPSHOT_INTERVAL = float(os.getenv('ANALYTICS_SNAPSHOT_INTERVAL', '300'))  # seconds between copies
+STATS_RECONCILE_INTERVAL_MINUTES = float(os.getenv('STATS_RECONCILE_INTERVAL_MINUTES', '60'))  # counter drift checks
+STATS_RECONCILE_DAYS = int(os.getenv('STATS_RECONCILE_DAYS', '35'))  # daily counters re-checked
+
+# Debug configuration
+LOOP_WATCHDOG_MS = float(os.getenv('LOOP_WATCHDOG_MS', '0'))  # report event loop blocks longer than this (0 = off)
+QUERY_PROFILING = os.getenv('QUERY_PROFILING', 'true').lower() == 'true'  # per-query latency stats
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '250'))  # log statements slower than this
 
 # Payment configuration
 TON_API_KEY = os.getenv('TON_API_KEY')
 TON_WALLET_ADDRESS = os.getenv('TON_WALLET_ADDRESS')
+TON_POLL_INTERVAL = float(os.getenv('TON_POLL_INTERVAL', '10'))  # seconds between polls of the bot wallet (shared by all checkouts)
+TONCENTER_URL = os.getenv('TONCENTER_URL', 'https://toncenter.com/api/v2')
+TONAPI_URL = os.getenv('TONAPI_URL', 'https://tonapi.io/v2')
+TON_HTTP_TIMEOUT = float(os.getenv('TON_HTTP_TIMEOUT', '20'))  # seconds per TON API request
+TONCENTER_MAX_CONCURRENCY = int(os.getenv('TONCENTER_MAX_CONCURRENCY', '2'))  # requests in flight per provider
+TONAPI_MAX_CONCURRENCY = int(os.getenv('TONAPI_MAX_CONCURRENCY', '4'))
+TON_HEDGE_REQUESTS = os.getenv('TON_HEDGE_REQUESTS', 'true').lower() == 'true'  # ask tonapi when toncenter is slower than its p90
+TON_BREAKER_FAILURES = int(os.getenv('TON_BREAKER_FAILURES', '5'))  # consecutive failures that open a provider's circuit
+TON_BREAKER_RESET_SECONDS = float(os.getenv('TON_BREAKER_RESET_SECONDS', '30'))  # before a trial request
+PAYMENT_AMOUNT_TOLERANCE = float(os.getenv('PAYMENT_AMOUNT_TOLERANCE', '0.01'))  # TON either side of the expected amount
+PAYMENT_MEMO_TTL_HOURS = float(os.getenv('PAYMENT_MEMO_TTL_HOURS', '24'))  # open memos auto-matched for this long
+PAYMENT_LEDGER_BLOOM_CAPACITY = int(os.getenv('PAYMENT_LEDGER_BLOOM_CAPACITY', '100000'))  # payments the 1% bloom filter is sized for
+PAYMENT_LEDGER_CACHE_SIZE = int(os.getenv('PAYMENT_LEDGER_CACHE_SIZE', '10000'))  # recently recorded memos kept in memory
 
 # Webhook configuration
 WEBHOOK_URL = os.getenv('WEBHOOK_URL')
 
 # Admin configuration
 ADMIN_IDS = [int(id.strip()) for id in os.getenv('ADMIN_IDS', '').split(',') if id.strip()]
+DEBUG_ENDPOINT_TOKEN = os.getenv('DEBUG_ENDPOINT_TOKEN', '')  # X-Debug-Token for /debug/*; unset = localhost only
 
 # Main channel configuration
 CHANNEL_ID = os.getenv('CHANNEL_ID', '@i3lani')
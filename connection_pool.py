@@ -0,0 +1,455 @@
+"""
+SQLite connection pool for I3lani Telegram Bot
+One long-lived writer connection plus a set of read-only connections, all
+configured once with WAL and tuned pragmas
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Any
+
+import aiosqlite
+
+from query_profiler import get_query_profiler
+from write_queue import WriteQueue
+
+logger = logging.getLogger(__name__)
+_profiler = get_query_profiler()
+
+# Pragmas applied once to every pooled connection
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 134217728,   # 128 MB
+    'cache_size': -16000,     # ~16 MB (negative = KiB)
+}
+
+
+class PooledConnection:
+    """Proxy around a pooled aiosqlite connection.
+
+    Behaves like ``aiosqlite.Connection`` except that ``close()`` hands the
+    connection back to the pool instead of closing it.
+    """
+
+    def __init__(self, lease: '_Lease', conn: aiosqlite.Connection):
+        self._lease = lease
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_lease', '_conn'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def execute(self, sql: str, parameters=None):
+        """``aiosqlite.Connection.execute`` with query profiling"""
+        if not _profiler.enabled:
+            return self._conn.execute(sql, parameters)
+        return _ProfiledCall(self._conn.execute(sql, parameters), sql)
+
+    def executemany(self, sql: str, parameters):
+        """``aiosqlite.Connection.executemany`` with query profiling"""
+        if not _profiler.enabled:
+            return self._conn.executemany(sql, parameters)
+        return _ProfiledCall(self._conn.executemany(sql, parameters), sql)
+
+    async def commit(self):
+        """``aiosqlite.Connection.commit`` with its latency recorded"""
+        if not _profiler.enabled:
+            return await self._conn.commit()
+        started = time.perf_counter()
+        try:
+            await self._conn.commit()
+        finally:
+            _profiler.record("COMMIT", (time.perf_counter() - started) * 1000)
+
+    async def close(self):
+        """Release the connection back to the pool"""
+        await self._lease.release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class _ProfiledCall:
+    """Awaitable / async context manager timing one ``execute`` call"""
+
+    __slots__ = ('_call', '_sql', '_cursor')
+
+    def __init__(self, call, sql: str):
+        self._call = call
+        self._sql = sql
+        self._cursor = None
+
+    async def _run(self) -> '_ProfiledCursor':
+        started = time.perf_counter()
+        try:
+            cursor = await self._call
+        except Exception:
+            _profiler.record(self._sql, (time.perf_counter() - started) * 1000, error=True)
+            raise
+        entry = _profiler.record(self._sql, (time.perf_counter() - started) * 1000, cursor.rowcount)
+        return _ProfiledCursor(cursor, entry)
+
+    def __await__(self):
+        return self._run().__await__()
+
+    async def __aenter__(self) -> '_ProfiledCursor':
+        self._cursor = await self._run()
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._cursor.close()
+
+
+class _ProfiledCursor:
+    """Cursor proxy that counts fetched rows towards its query's stats"""
+
+    __slots__ = ('_cursor', '_entry')
+
+    def __init__(self, cursor: aiosqlite.Cursor, entry):
+        self._cursor = cursor
+        self._entry = entry
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def fetchone(self):
+        row = await self._cursor.fetchone()
+        if row is not None:
+            _profiler.add_rows(self._entry, 1)
+        return row
+
+    async def fetchmany(self, size: Optional[int] = None):
+        rows = await self._cursor.fetchmany(size)
+        _profiler.add_rows(self._entry, len(rows))
+        return rows
+
+    async def fetchall(self):
+        rows = await self._cursor.fetchall()
+        _profiler.add_rows(self._entry, len(rows))
+        return rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        async for row in self._cursor:
+            _profiler.add_rows(self._entry, 1)
+            yield row
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._cursor.close()
+
+
+class _Lease:
+    """Single checkout of a pooled connection.
+
+    Usable both as ``async with pool.writer() as conn`` and as
+    ``conn = await pool.writer()`` (released by ``conn.close()`` or, failing
+    that, when the returned proxy is garbage collected).
+    """
+
+    def __init__(self, pool: 'ConnectionPool', readonly: bool):
+        self._pool = pool
+        self._readonly = readonly
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._released = False
+
+    async def acquire(self) -> PooledConnection:
+        if self._readonly:
+            self._conn = await self._pool._acquire_reader()
+        else:
+            self._conn = await self._pool._acquire_writer()
+        return PooledConnection(self, self._conn)
+
+    async def release(self):
+        if self._released or self._conn is None:
+            return
+        self._released = True
+        if self._readonly:
+            await self._pool._release_reader(self._conn)
+        else:
+            await self._pool._release_writer(self._conn)
+
+    def _release_soon(self):
+        """Release from a GC finalizer (no awaiting possible there)"""
+        if self._released or self._conn is None:
+            return
+        loop = self._pool._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(lambda: loop.create_task(self.release()))
+        except RuntimeError:
+            pass
+
+    def __await__(self):
+        return self._acquire_detached().__await__()
+
+    async def _acquire_detached(self) -> PooledConnection:
+        proxy = await self.acquire()
+        weakref.finalize(proxy, self._release_soon)
+        return proxy
+
+    async def __aenter__(self) -> PooledConnection:
+        return await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+
+class ConnectionPool:
+    """Writer + readers connection pool for a single SQLite file"""
+
+    def __init__(self, db_path: str, readers: int = 4,
+                 pragmas: Optional[Dict[str, Any]] = None,
+                 write_batch: int = 200, write_latency_ms: float = 5.0):
+        self.db_path = db_path
+        self.reader_count = max(1, readers)
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._open_lock: Optional[asyncio.Lock] = None
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock: Optional[asyncio.Lock] = None
+        self._writer_owner = None
+        self._writer_depth = 0
+        self._readers: Optional[asyncio.Queue] = None
+        self._all_readers = []
+        self.write_queue = WriteQueue(self, max_batch=write_batch, max_latency_ms=write_latency_ms)
+
+        self._stats = {
+            'connections_opened': 0,
+            'writer_acquires': 0,
+            'reader_acquires': 0,
+            'writer_wait_ms_total': 0.0,
+            'reader_wait_ms_total': 0.0,
+            'writer_wait_ms_max': 0.0,
+            'reader_wait_ms_max': 0.0,
+            'rollbacks_on_release': 0,
+            'reopened_for_new_loop': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, readonly: bool) -> aiosqlite.Connection:
+        conn = aiosqlite.connect(self.db_path)
+        # Long-lived worker threads must not keep the interpreter alive at exit
+        worker = self._worker_thread(conn)
+        if worker is not None:
+            worker.daemon = True
+        await conn
+        for name, value in self.pragmas.items():
+            if readonly and name == 'journal_mode':
+                # journal mode is a database-wide setting owned by the writer
+                continue
+            await conn.execute(f"PRAGMA {name} = {value}")
+        if readonly:
+            await conn.execute("PRAGMA query_only = ON")
+        self._stats['connections_opened'] += 1
+        return conn
+
+    @staticmethod
+    def _worker_thread(conn) -> Optional[threading.Thread]:
+        return conn if isinstance(conn, threading.Thread) else getattr(conn, '_thread', None)
+
+    async def open(self):
+        """Open writer and reader connections (idempotent per event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not None and self._loop is not loop:
+            # Pool was created under another event loop (e.g. a previous
+            # asyncio.run()); its locks and queue are unusable here.
+            self._stats['reopened_for_new_loop'] += 1
+            await self._close_connections()
+        if self._writer is not None:
+            return
+
+        if self._open_lock is None or self._loop is not loop:
+            self._open_lock = asyncio.Lock()
+        self._loop = loop
+
+        async with self._open_lock:
+            if self._writer is not None:
+                return
+            writer = await self._connect(readonly=False)
+            self._writer_lock = asyncio.Lock()
+            self._writer_owner = None
+            self._writer_depth = 0
+            self._readers = asyncio.Queue()
+            self._all_readers = []
+            for _ in range(self.reader_count):
+                reader = await self._connect(readonly=True)
+                self._all_readers.append(reader)
+                self._readers.put_nowait(reader)
+            self._writer = writer
+            logger.info(f"✅ SQLite pool opened for {self.db_path}: 1 writer, {self.reader_count} readers")
+
+    async def _close_connections(self):
+        connections = ([self._writer] if self._writer else []) + self._all_readers
+        self._writer = None
+        self._all_readers = []
+        self._readers = None
+        self._writer_lock = None
+        self._writer_owner = None
+        self._writer_depth = 0
+        for conn in connections:
+            worker = self._worker_thread(conn)
+            if worker is not None and not worker.is_alive():
+                # The thread died handing a result to a closed event loop; a
+                # close request would never be answered
+                continue
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled connection: {e}")
+
+    async def close(self):
+        """Close every pooled connection"""
+        await self.write_queue.stop()
+        await self._close_connections()
+        self._loop = None
+        logger.info(f"🛑 SQLite pool closed for {self.db_path}")
+
+    async def _ensure_open(self):
+        if self._writer is None or self._loop is not asyncio.get_running_loop():
+            await self.open()
+
+    # ------------------------------------------------------------------
+    # Checkout
+    # ------------------------------------------------------------------
+    def writer(self) -> _Lease:
+        """Lease the writer connection (re-entrant within one task)"""
+        return _Lease(self, readonly=False)
+
+    def owns_writer(self) -> bool:
+        """Whether the current task holds the writer lease"""
+        task = asyncio.current_task()
+        return task is not None and self._writer_owner is task
+
+    def reader(self) -> _Lease:
+        """Lease a read-only connection"""
+        return _Lease(self, readonly=True)
+
+    async def _acquire_writer(self) -> aiosqlite.Connection:
+        await self._ensure_open()
+        task = asyncio.current_task()
+        if self._writer_owner is task and task is not None:
+            self._writer_depth += 1
+            return self._writer
+
+        started = time.perf_counter()
+        await self._writer_lock.acquire()
+        waited = (time.perf_counter() - started) * 1000
+        self._writer_owner = task
+        self._writer_depth = 1
+        self._stats['writer_acquires'] += 1
+        self._stats['writer_wait_ms_total'] += waited
+        self._stats['writer_wait_ms_max'] = max(self._stats['writer_wait_ms_max'], waited)
+        self._writer.row_factory = None
+        return self._writer
+
+    async def _release_writer(self, conn: aiosqlite.Connection):
+        if conn is not self._writer:
+            # Pool was reset while the lease was out; nothing to hand back
+            return
+        self._writer_depth -= 1
+        if self._writer_depth > 0:
+            return
+        try:
+            if conn.in_transaction:
+                # Match plain aiosqlite semantics: uncommitted work is discarded
+                self._stats['rollbacks_on_release'] += 1
+                await conn.rollback()
+            conn.row_factory = None
+        except Exception as e:
+            logger.error(f"❌ Error resetting writer connection: {e}")
+        finally:
+            self._writer_owner = None
+            self._writer_lock.release()
+
+    async def _acquire_reader(self) -> aiosqlite.Connection:
+        await self._ensure_open()
+        started = time.perf_counter()
+        conn = await self._readers.get()
+        waited = (time.perf_counter() - started) * 1000
+        self._stats['reader_acquires'] += 1
+        self._stats['reader_wait_ms_total'] += waited
+        self._stats['reader_wait_ms_max'] = max(self._stats['reader_wait_ms_max'], waited)
+        conn.row_factory = None
+        return conn
+
+    async def _release_reader(self, conn: aiosqlite.Connection):
+        if conn not in self._all_readers:
+            return
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            conn.row_factory = None
+        except Exception as e:
+            logger.error(f"❌ Error resetting reader connection: {e}")
+        self._readers.put_nowait(conn)
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool usage statistics"""
+        stats = dict(self._stats)
+        stats['db_path'] = self.db_path
+        stats['open'] = self.is_open
+        stats['readers_total'] = len(self._all_readers)
+        stats['readers_idle'] = self._readers.qsize() if self._readers else 0
+        stats['writer_busy'] = bool(self._writer_lock and self._writer_lock.locked())
+        stats['writer_wait_ms_avg'] = (
+            stats['writer_wait_ms_total'] / stats['writer_acquires']
+            if stats['writer_acquires'] else 0.0
+        )
+        stats['write_queue'] = self.write_queue.get_stats()
+        stats['reader_wait_ms_avg'] = (
+            stats['reader_wait_ms_total'] / stats['reader_acquires']
+            if stats['reader_acquires'] else 0.0
+        )
+        return stats
+
+
+# One pool per database file per process
+_pools: Dict[str, ConnectionPool] = {}
+
+
+def get_pool(db_path: str, readers: int = 4, write_batch: int = 200,
+             write_latency_ms: float = 5.0) -> ConnectionPool:
+    """Get (or create) the shared pool for a database file"""
+    pool = _pools.get(db_path)
+    if pool is None:
+        pool = ConnectionPool(db_path, readers=readers, write_batch=write_batch,
+                              write_latency_ms=write_latency_ms)
+        _pools[db_path] = pool
+    return pool
+
+
+async def close_all_pools():
+    """Close every pool (used on shutdown)"""
+    for pool in list(_pools.values()):
+        await pool.close()
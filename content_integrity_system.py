@@ -12,6 +12,8 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 
+from async_data_access import run_blocking
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -110,18 +112,25 @@ class ContentIntegritySystem:
                 return existing
             
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO content_fingerprints 
-                (content_hash, media_hash, campaign_id, user_id, sequence_id, 
-                 content_preview, full_content, media_url, content_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (content_hash, media_hash, campaign_id, user_id, sequence_id,
-                  content_preview, content, media_url, content_type))
-            
-            conn.commit()
-            conn.close()
+            try:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO content_fingerprints 
+                    (content_hash, media_hash, campaign_id, user_id, sequence_id, 
+                     content_preview, full_content, media_url, content_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (content_hash, media_hash, campaign_id, user_id, sequence_id,
+                      content_preview, content, media_url, content_type))
+                
+                conn.commit()
+            except Exception:
+                # Callers keep the traceback (and this cursor) alive, so an open
+                # transaction would hold the write lock until it is collected
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
             
             fingerprint = ContentFingerprint(
                 content_hash=content_hash,
@@ -339,18 +348,21 @@ async def register_campaign_content(campaign_id: str, user_id: int, sequence_id:
                                   content: str, media_url: Optional[str] = None,
                                   content_type: str = "text") -> ContentFingerprint:
     """Register content for a campaign"""
-    return content_integrity_system.register_content_fingerprint(
+    return await run_blocking(
+        content_integrity_system.register_content_fingerprint,
         campaign_id, user_id, sequence_id, content, media_url, content_type
     )
 
 async def verify_campaign_content(campaign_id: str, content: str, 
                                 media_url: Optional[str] = None) -> bool:
     """Verify content belongs to the specified campaign"""
-    return content_integrity_system.verify_content_ownership(campaign_id, content, media_url)
+    return await run_blocking(content_integrity_system.verify_content_ownership,
+                              campaign_id, content, media_url)
 
 async def get_content_integrity_report(campaign_id: str) -> Dict[str, Any]:
     """Get content integrity report for a campaign"""
-    return content_integrity_system.get_campaign_content_integrity_report(campaign_id)
+    return await run_blocking(content_integrity_system.get_campaign_content_integrity_report,
+                              campaign_id)
 
 if __name__ == "__main__":
     # Test the system
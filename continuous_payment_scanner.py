@@ -6,101 +6,106 @@ Runs continuously in background to catch missed payments
 
 import asyncio
 import logging
-from typing import Dict, Set
+from typing import Any, Dict, List, Optional
 from enhanced_ton_payment_monitoring import EnhancedTONPaymentMonitor
-import time
-import json
-import os
+from ton_ingestion import get_ingestor, transaction_cursor
+from memo_index import OpenMemo, get_memo_index
+from payment_ledger import get_payment_ledger
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Scans a failed confirmation is retried for (30 s apart) before it is left to admins
+MAX_CONFIRM_ATTEMPTS = 10
+
 class ContinuousPaymentScanner:
     """Continuous background payment scanner"""
     
     def __init__(self):
         self.monitor = EnhancedTONPaymentMonitor()
         self.bot_wallet = "UQDZpONCwPqBcWezyEGK9ikCHMknoyTrBL-L2hATQbClmulB"
-        self.confirmed_payments: Set[str] = set()
+        # Transactions come from the shared wallet ingestion, not a download of our own
+        self.ingestor = get_ingestor(self.bot_wallet)
+        self.memo_index = get_memo_index()
+        # Accepted payments live in the payment ledger (pending_payments.json is imported once)
+        self.ledger = get_payment_ledger()
+        # Payments that failed to confirm; the cursor will not deliver them again
+        self.unconfirmed: Dict[str, Dict[str, Any]] = {}
+        self.confirm_attempts: Dict[str, int] = {}
         self.last_scan_time = 0
         self.scan_interval = 30  # seconds
         self.running = False
         self.pending_payments_file = "pending_payments.json"
-        
-        # Load confirmed payments from file
-        self.load_confirmed_payments()
-    
-    def load_confirmed_payments(self):
-        """Load previously confirmed payments to avoid duplicates"""
-        try:
-            if os.path.exists(self.pending_payments_file):
-                with open(self.pending_payments_file, 'r') as f:
-                    data = json.load(f)
-                    self.confirmed_payments = set(data.get('confirmed_payments', []))
-                    logger.info(f"Loaded {len(self.confirmed_payments)} confirmed payments from file")
-        except Exception as e:
-            logger.error(f"Error loading confirmed payments: {e}")
-    
-    def save_confirmed_payments(self):
-        """Save confirmed payments to file"""
-        try:
-            data = {
-                'confirmed_payments': list(self.confirmed_payments),
-                'last_updated': time.time()
-            }
-            with open(self.pending_payments_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving confirmed payments: {e}")
     
-    async def scan_for_payments(self):
-        """Scan for unconfirmed payments"""
+    async def scan_for_payments(self, transactions: Optional[List[Dict[str, Any]]] = None):
+        """Scan new wallet transactions (plus earlier failures) for unconfirmed payments"""
         try:
             logger.info("🔍 Scanning for unconfirmed payments...")
             
-            # Get recent transactions
-            data = await self.monitor.get_transactions_toncenter(self.bot_wallet, 100)
-            
-            if not data:
-                logger.warning("No transaction data available")
-                return
-            
-            transactions = data.get('result', [])
+            if transactions is None:
+                transactions = await self.ingestor.poll_once()
+            transactions = list(self.unconfirmed.values()) + list(transactions)
             new_payments_found = 0
             
+            await self.memo_index.ensure_loaded()
+            await self.ledger.import_json(self.pending_payments_file)
             for tx in transactions:
                 if not tx.get('in_msg'):
                     continue
                 
                 memo = self.monitor.extract_memo_from_transaction(tx)
+                if not memo:
+                    continue
+                if await self.ledger.seen(memo):
+                    # Settled by another payment path since it failed here
+                    self._forget(memo)
+                    continue
+                amount = self.monitor.extract_amount_from_transaction(tx)
                 
-                # Check if this looks like a user payment (6-char memo, 0.36 TON)
-                if memo and len(memo) == 6:
-                    amount = self.monitor.extract_amount_from_transaction(tx)
-                    
-                    if abs(amount - 0.36) <= 0.1:  # 0.36 TON ± 0.1 tolerance
-                        # Check if already confirmed
-                        if memo not in self.confirmed_payments:
-                            sender = self.monitor.extract_sender_from_transaction(tx)
-                            timestamp = tx.get('utime', 0)
-                            
-                            logger.info(f"🎯 Found unconfirmed payment: {memo}")
-                            logger.info(f"   Amount: {amount} TON")
-                            logger.info(f"   Sender: {sender}")
-                            logger.info(f"   Timestamp: {timestamp}")
-                            
-                            # Attempt to confirm this payment
-                            success = await self.confirm_missed_payment(memo, amount, sender, timestamp)
-                            
-                            if success:
-                                self.confirmed_payments.add(memo)
-                                new_payments_found += 1
-                                logger.info(f"✅ Successfully confirmed payment {memo}")
-                            else:
-                                logger.warning(f"❌ Failed to confirm payment {memo}")
+                # One lookup against every open checkout, with the exact amount check
+                match = self.memo_index.match(memo, amount)
+                if match.status == 'unknown':
+                    # Bot-style memos nobody is waiting for go to admin review, once
+                    if len(memo) != 6 or not amount or await self.is_known_memo(memo):
+                        self._forget(memo)
+                        continue
+                elif not match.valid:
+                    logger.warning(f"⚠️ Payment {memo} is an {match.status}: "
+                                   f"expected {match.open_memo.amount} TON, got {amount} TON")
+                    self._forget(memo)
+                    continue
+                
+                sender = self.monitor.extract_sender_from_transaction(tx)
+                timestamp = tx.get('utime', 0)
+                
+                logger.info(f"🎯 Found unconfirmed payment: {memo}")
+                logger.info(f"   Amount: {amount} TON")
+                logger.info(f"   Sender: {sender}")
+                logger.info(f"   Timestamp: {timestamp}")
+                
+                # Attempt to confirm this payment
+                success = await self.confirm_missed_payment(memo, amount, sender, timestamp, match.open_memo)
+                
+                if success:
+                    # Campaign activation may have recorded it already; this covers the other paths
+                    await self.ledger.record(transaction_cursor(tx)[1], memo,
+                                             match.open_memo.user_id if match.open_memo else None,
+                                             amount, source='scanner')
+                    self._forget(memo)
+                    new_payments_found += 1
+                    logger.info(f"✅ Successfully confirmed payment {memo}")
+                else:
+                    attempts = self.confirm_attempts.get(memo, 0) + 1
+                    if attempts >= MAX_CONFIRM_ATTEMPTS:
+                        self._forget(memo)
+                        logger.error(f"❌ Giving up on payment {memo} after {attempts} failed confirmations "
+                                     f"(amount {amount} TON, sender {sender}); confirm it manually")
+                    else:
+                        self.unconfirmed[memo] = tx
+                        self.confirm_attempts[memo] = attempts
+                        logger.warning(f"❌ Failed to confirm payment {memo} (attempt {attempts})")
             
             if new_payments_found > 0:
-                self.save_confirmed_payments()
                 logger.info(f"🎉 Confirmed {new_payments_found} missed payments")
             else:
                 logger.info("✅ No new payments found")
@@ -108,27 +113,48 @@ class ContinuousPaymentScanner:
         except Exception as e:
             logger.error(f"Error in payment scanning: {e}")
     
-    async def confirm_missed_payment(self, memo: str, amount: float, sender: str, timestamp: int):
+    def _forget(self, memo: str):
+        """Stop retrying a memo that is settled one way or another"""
+        self.unconfirmed.pop(memo, None)
+        self.confirm_attempts.pop(memo, None)
+    
+    async def is_known_memo(self, memo: str) -> bool:
+        """Whether the memo was ever issued by the bot (paid, expired or pending)"""
+        from async_data_access import get_data_access
+        data = get_data_access(self.memo_index.db_path)
+        for table in ('payment_memo_tracking', 'payments'):
+            try:
+                if await data.fetchval(f"SELECT 1 FROM {table} WHERE memo = ?", (memo,)):
+                    return True
+            except Exception:
+                continue
+        return False
+    
+    async def confirm_missed_payment(self, memo: str, amount: float, sender: str, timestamp: int,
+                                     open_memo: Optional[OpenMemo] = None):
         """Confirm a missed payment"""
         try:
             logger.info(f"🔄 Confirming missed payment {memo}...")
             
-            # Try to find the user who made this payment using memo tracker
-            from payment_memo_tracker import memo_tracker
-            user_info = await memo_tracker.get_user_by_memo(memo)
-            
-            if user_info:
-                user_id = user_info['user_id']
+            if open_memo:
+                user_id = open_memo.user_id
                 logger.info(f"✅ Found user {user_id} for payment {memo}")
                 
                 # Send confirmation message to user
-                success = await self.send_payment_confirmation_to_user(
-                    user_id, memo, amount, user_info['ad_data']
-                )
+                if open_memo.product == 'post_package':
+                    from automatic_payment_confirmation import automatic_confirmation
+                    success = await automatic_confirmation.send_ton_post_package_confirmation(
+                        user_id, memo, amount, open_memo.ad_data
+                    )
+                else:
+                    success = await self.send_payment_confirmation_to_user(
+                        user_id, memo, amount, open_memo.ad_data
+                    )
                 
                 if success:
-                    # Mark payment as confirmed in database
-                    await memo_tracker.confirm_payment(memo)
+                    # Mark payment as confirmed in database (and close the memo)
+                    from automatic_payment_confirmation import automatic_confirmation
+                    await automatic_confirmation.mark_payment_confirmed(memo)
                     logger.info(f"✅ Payment {memo} confirmed and user {user_id} notified")
                     return True
                 else:
@@ -408,14 +434,17 @@ Thank you for using I3lani!"""
         self.running = True
         logger.info("🚀 Starting continuous payment scanner...")
         
+        # Every batch the wallet ingestion fetches is scanned once
+        self.ingestor.add_listener(self.scan_for_payments)
         while self.running:
             try:
-                await self.scan_for_payments()
+                self.ingestor.ensure_running()
                 await asyncio.sleep(self.scan_interval)
                 
             except Exception as e:
                 logger.error(f"Error in scanner loop: {e}")
                 await asyncio.sleep(self.scan_interval)
+        self.ingestor.remove_listener(self.scan_for_payments)
     
     def stop_scanner(self):
         """Stop the continuous scanner"""
@@ -3,29 +3,118 @@ SQLite database operations for I3lani Telegram Bot
 """
 import aiosqlite
 import asyncio
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import json
-from config import DATABASE_URL
+import logging
+import re
+from async_data_access import run_blocking
+from config import (
+    DATABASE_URL, DB_POOL_READERS, DB_WRITE_BATCH_MAX, DB_WRITE_MAX_LATENCY_MS,
+    USER_CACHE_SIZE, USER_CACHE_TTL, CHANNEL_CACHE_TTL, SETTINGS_CACHE_TTL
+)
+from connection_pool import get_pool
+from read_cache import TTLCache
+from schema_migrations import run_migrations, verify_query_plans
+
+logger = logging.getLogger(__name__)
+
+# Raw writes through execute_query that touch a cached table
+_CACHED_TABLE_WRITE = re.compile(
+    r"\b(?:UPDATE|INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|DELETE\s+FROM)\s+(users|channels|bot_settings)\b",
+    re.I
+)
+
+# Read-through caches per database file, shared by every Database instance on
+# it so a write through one instance invalidates what the others serve
+_caches: Dict[str, Tuple[TTLCache, TTLCache, TTLCache]] = {}
+
+
+def _shared_caches(db_path: str) -> Tuple[TTLCache, TTLCache, TTLCache]:
+    """(users, channels, bot_settings) caches for a database file"""
+    caches = _caches.get(db_path)
+    if caches is None:
+        caches = _caches[db_path] = (
+            TTLCache('users', USER_CACHE_SIZE, USER_CACHE_TTL),
+            TTLCache('channels', 16, CHANNEL_CACHE_TTL),
+            TTLCache('bot_settings', 256, SETTINGS_CACHE_TTL),
+        )
+    return caches
 
 
 class Database:
     def __init__(self, db_path: str = "bot.db"):
         self.db_path = db_path
-        self._connection_pool = None
+        self._connection_pool = get_pool(
+            db_path, readers=DB_POOL_READERS,
+            write_batch=DB_WRITE_BATCH_MAX, write_latency_ms=DB_WRITE_MAX_LATENCY_MS
+        )
+        self.write_queue = self._connection_pool.write_queue
         self._lock = asyncio.Lock()
+
+        # Read-through caches for the per-update lookups; the write methods invalidate them
+        self.user_cache, self.channel_cache, self.settings_cache = _shared_caches(db_path)
     
     def get_connection(self):
-        """Get database connection with proper configuration"""
-        return aiosqlite.connect(self.db_path)
+        """Get the pooled writer connection.
+        
+        Supports both ``async with db.get_connection() as conn`` and
+        ``conn = await db.get_connection()``; closing the connection returns
+        it to the pool.
+        """
+        return self._connection_pool.writer()
+    
+    def get_reader(self):
+        """Get a pooled read-only connection (same usage as get_connection)"""
+        return self._connection_pool.reader()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool statistics"""
+        return self._connection_pool.get_stats()
+    
+    async def close(self):
+        """Close all pooled connections"""
+        await self._connection_pool.close()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics for the read-through caches"""
+        return {cache.name: cache.get_stats()
+                for cache in (self.user_cache, self.channel_cache, self.settings_cache)}
+
+    def invalidate_user(self, user_id: int):
+        """Drop a cached user (call after writing users outside this class)"""
+        self.user_cache.invalidate(user_id)
+
+    def invalidate_channels(self):
+        """Drop the cached channel lists"""
+        self.channel_cache.clear()
+
+    def _invalidate_for_query(self, query: str):
+        for table in {m.lower() for m in _CACHED_TABLE_WRITE.findall(query)}:
+            if table == 'users':
+                self.user_cache.clear()
+            elif table == 'channels':
+                self.channel_cache.clear()
+            else:
+                self.settings_cache.clear()
+
+    async def queue_write(self, query: str, params: tuple = ()):
+        """Queue a write for group commit; returns once it is committed"""
+        return await self.write_queue.execute(query, params)
+    
+    async def queue_write_many(self, query: str, seq_of_params: List[tuple]):
+        """Queue an executemany write for group commit"""
+        return await self.write_queue.executemany(query, seq_of_params)
+    
+    async def queue_transaction(self, statements: List[tuple]):
+        """Queue several (query, params) statements to commit atomically"""
+        return await self.write_queue.submit(statements)
     
     async def execute_with_retry(self, query: str, params: tuple = (), max_retries: int = 3):
         """Execute database query with retry logic"""
         for attempt in range(max_retries):
             try:
-                async with await self.get_connection() as conn:
-                    await conn.execute(query, params)
-                    await conn.commit()
+                await self.queue_write(query, params)
                 return
             except Exception as e:
                 if "database is locked" in str(e) and attempt < max_retries - 1:
@@ -34,227 +123,12 @@ class Database:
                 raise e
         
     async def init_db(self):
-        """Initialize database tables"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # First, check if we need to add free_trial columns
-            cursor = await db.execute("PRAGMA table_info(users)")
-            columns = await cursor.fetchall()
-            column_names = [col[1] for col in columns]
-            
-            if 'free_trial_used' not in column_names:
-                await db.execute('ALTER TABLE users ADD COLUMN free_trial_used BOOLEAN DEFAULT FALSE')
-                await db.execute('ALTER TABLE users ADD COLUMN free_trial_date TIMESTAMP')
-                await db.commit()
-            
-            # Add TON wallet address column if it doesn't exist
-            if 'ton_wallet_address' not in column_names:
-                await db.execute('ALTER TABLE users ADD COLUMN ton_wallet_address TEXT')
-                await db.commit()
-            # Users table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    language TEXT DEFAULT 'en',
-                    currency TEXT DEFAULT 'USD',
-                    referrer_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    total_spent REAL DEFAULT 0.0,
-                    free_days INTEGER DEFAULT 0,
-                    free_ads_used INTEGER DEFAULT 0,
-                    last_free_ad_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (referrer_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            # Channels table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS channels (
-                    channel_id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    telegram_channel_id TEXT NOT NULL,
-                    subscribers INTEGER DEFAULT 0,
-                    base_price_usd REAL DEFAULT 0.0,
-                    is_popular BOOLEAN DEFAULT FALSE,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Packages table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS packages (
-                    package_id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    price_usd REAL NOT NULL,
-                    duration_days INTEGER NOT NULL,
-                    posts_per_day INTEGER NOT NULL,
-                    channels_included INTEGER NOT NULL,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Ads table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS ads (
-                    ad_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    content TEXT NOT NULL,
-                    media_url TEXT,
-                    link_url TEXT,
-                    content_type TEXT DEFAULT 'text',
-                    status TEXT DEFAULT 'draft',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            # Subscriptions table with progressive plan support
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS subscriptions (
-                    subscription_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    ad_id INTEGER NOT NULL,
-                    channel_id TEXT NOT NULL,
-                    duration_months INTEGER NOT NULL,
-                    start_date TIMESTAMP,
-                    end_date TIMESTAMP,
-                    total_price REAL NOT NULL,
-                    currency TEXT DEFAULT 'USD',
-                    posts_per_day INTEGER DEFAULT 1,
-                    total_posts INTEGER DEFAULT 30,
-                    discount_percent INTEGER DEFAULT 0,
-                    status TEXT DEFAULT 'pending',
-                    last_published TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    FOREIGN KEY (ad_id) REFERENCES ads (ad_id),
-                    FOREIGN KEY (channel_id) REFERENCES channels (channel_id)
-                )
-            ''')
-            
-            # Payments table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS payments (
-                    payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    subscription_id INTEGER,
-                    amount REAL NOT NULL,
-                    currency TEXT DEFAULT 'USD',
-                    payment_method TEXT NOT NULL,
-                    memo TEXT UNIQUE,
-                    tx_hash TEXT,
-                    status TEXT DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    confirmed_at TIMESTAMP,
-                    failed_at TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    FOREIGN KEY (subscription_id) REFERENCES subscriptions (subscription_id)
-                )
-            ''')
-            
-            # Referrals table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS referrals (
-                    referral_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    referrer_id INTEGER NOT NULL,
-                    referee_id INTEGER NOT NULL,
-                    channel_id TEXT,
-                    reward_granted BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (referrer_id) REFERENCES users (user_id),
-                    FOREIGN KEY (referee_id) REFERENCES users (user_id),
-                    FOREIGN KEY (channel_id) REFERENCES channels (channel_id)
-                )
-            ''')
-            
-            # Bot settings table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS bot_settings (
-                    setting_key TEXT PRIMARY KEY,
-                    setting_value TEXT NOT NULL,
-                    description TEXT,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Partner rewards tracking table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS partner_rewards (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    channel_id TEXT,
-                    reward_type TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    description TEXT,
-                    status TEXT DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    paid_at TIMESTAMP NULL
-                )
-            ''')
-            
-            # Partner referrals tracking table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS partner_referrals (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    referrer_id INTEGER NOT NULL,
-                    referred_id INTEGER NOT NULL,
-                    channel_id TEXT,
-                    commission_rate REAL DEFAULT 0.05,
-                    total_earned REAL DEFAULT 0,
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Partner status tracking table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS partner_status (
-                    user_id INTEGER PRIMARY KEY,
-                    tier TEXT DEFAULT 'Basic',
-                    total_earnings REAL DEFAULT 0,
-                    pending_rewards REAL DEFAULT 0,
-                    total_referrals INTEGER DEFAULT 0,
-                    active_channels INTEGER DEFAULT 0,
-                    registration_bonus_paid BOOLEAN DEFAULT FALSE,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Payout requests table for reward transfers
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS payout_requests (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    amount REAL NOT NULL,
-                    payout_id TEXT UNIQUE NOT NULL,
-                    status TEXT DEFAULT 'pending',
-                    wallet_address TEXT,
-                    transaction_hash TEXT,
-                    requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    processed_at TIMESTAMP,
-                    notes TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            # UI customizations table for admin control
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS ui_customizations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category TEXT NOT NULL,
-                    text_key TEXT NOT NULL,
-                    language TEXT NOT NULL,
-                    custom_text TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(category, text_key, language)
-                )
-            ''')
-            
-            await db.commit()
-            
+        """Bring the schema up to date and seed default data"""
+        applied = await run_migrations(self.db_path)
+        if applied:
+            logger.info(f"✅ Database schema migrated to version {applied[-1]}")
+        await run_blocking(verify_query_plans, self.db_path)
+        
         # Initialize default channels
         await self.init_default_channels()
         
@@ -314,25 +188,28 @@ Last updated: July 2025"""
     
     async def get_user(self, user_id: int) -> Optional[Dict]:
         """Get user by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        user = await self.user_cache.get_or_load(user_id, lambda: self._load_user(user_id))
+        return dict(user) if user else None
+
+    async def _load_user(self, user_id: int) -> Optional[Dict]:
+        async with self.get_reader() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute(
                 'SELECT * FROM users WHERE user_id = ?', (user_id,)
             ) as cursor:
                 row = await cursor.fetchone()
                 return dict(row) if row else None
-    
-    async def create_user(self, user_id: int, username: Optional[str] = None, 
+
+    async def create_user(self, user_id: int, username: Optional[str] = None,
                          language: str = 'en', referrer_id: Optional[int] = None) -> bool:
         """Create new user"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute('''
-                    INSERT INTO users (user_id, username, language, referrer_id)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, username, language, referrer_id))
-                await db.commit()
-                return True
+            await self.queue_write('''
+                INSERT INTO users (user_id, username, language, referrer_id)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, username, language, referrer_id))
+            self.user_cache.invalidate(user_id)
+            return True
         except Exception as e:
             print(f"Error creating user: {e}")
             return False
@@ -340,42 +217,44 @@ Last updated: July 2025"""
     async def set_user_language(self, user_id: int, language: str) -> bool:
         """Set user language preference"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute('''
-                    UPDATE users SET language = ? WHERE user_id = ?
-                ''', (language, user_id))
-                await db.commit()
-                return True
+            await self.queue_write('''
+                UPDATE users SET language = ? WHERE user_id = ?
+            ''', (language, user_id))
+            self.user_cache.invalidate(user_id)
+            return True
         except Exception as e:
             print(f"Error setting user language: {e}")
             return False
-    
+
     async def get_active_channels(self) -> List[Dict]:
         """Get all active advertising channels"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                async with db.execute('''
-                    SELECT * FROM channels 
-                    WHERE is_active = 1 
-                    ORDER BY name
-                ''') as cursor:
-                    rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+            channels = await self.channel_cache.get_or_load('active', self._load_active_channels)
+            return [dict(channel) for channel in channels]
         except Exception as e:
             print(f"Error getting active channels: {e}")
             return []
-    
+
+    async def _load_active_channels(self) -> List[Dict]:
+        async with self.get_reader() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute('''
+                SELECT * FROM channels
+                WHERE is_active = 1
+                ORDER BY name
+            ''') as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+
     async def update_user_language(self, user_id: int, language: str) -> bool:
         """Update user language"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(
-                    'UPDATE users SET language = ? WHERE user_id = ?',
-                    (language, user_id)
-                )
-                await db.commit()
-                return True
+            await self.queue_write(
+                'UPDATE users SET language = ? WHERE user_id = ?',
+                (language, user_id)
+            )
+            self.user_cache.invalidate(user_id)
+            return True
         except Exception as e:
             print(f"Error updating user language: {e}")
             return False
@@ -388,7 +267,7 @@ Last updated: July 2025"""
     async def create_ad(self, user_id: int, content: str, 
                        media_url: Optional[str] = None, content_type: str = 'text') -> int:
         """Create new ad"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             cursor = await db.execute('''
                 INSERT INTO ads (user_id, content, media_url, content_type)
                 VALUES (?, ?, ?, ?)
@@ -398,7 +277,13 @@ Last updated: July 2025"""
     
     async def get_channels(self, active_only: bool = True) -> List[Dict]:
         """Get all channels"""
-        async with aiosqlite.connect(self.db_path) as db:
+        channels = await self.channel_cache.get_or_load(
+            ('all', active_only), lambda: self._load_channels(active_only)
+        )
+        return [dict(channel) for channel in channels]
+
+    async def _load_channels(self, active_only: bool) -> List[Dict]:
+        async with self.get_reader() as db:
             db.row_factory = aiosqlite.Row
             query = 'SELECT * FROM channels'
             if active_only:
@@ -415,23 +300,7 @@ Last updated: July 2025"""
                                       category: str = 'general', description: str = '',
                                       base_price_usd: float = 5.0) -> bool:
         """Add channel automatically when bot becomes admin with detailed info"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # First check if we need to add new columns
-            cursor = await db.execute("PRAGMA table_info(channels)")
-            columns = [row[1] for row in await cursor.fetchall()]
-            
-            # Add missing columns if they don't exist
-            if 'active_subscribers' not in columns:
-                await db.execute('ALTER TABLE channels ADD COLUMN active_subscribers INTEGER DEFAULT 0')
-            if 'total_posts' not in columns:
-                await db.execute('ALTER TABLE channels ADD COLUMN total_posts INTEGER DEFAULT 0')
-            if 'category' not in columns:
-                await db.execute('ALTER TABLE channels ADD COLUMN category TEXT DEFAULT "general"')
-            if 'description' not in columns:
-                await db.execute('ALTER TABLE channels ADD COLUMN description TEXT')
-            if 'last_updated' not in columns:
-                await db.execute('ALTER TABLE channels ADD COLUMN last_updated TIMESTAMP')
-            
+        async with self.get_connection() as db:
             # Insert or update channel with all details
             await db.execute('''
                 INSERT OR REPLACE INTO channels 
@@ -444,39 +313,41 @@ Last updated: July 2025"""
                 base_price_usd, False, True
             ))
             await db.commit()
+            self.channel_cache.clear()
             return True
     
     async def remove_channel_automatically(self, telegram_channel_id: str) -> bool:
         """Remove channel when bot is no longer admin"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             await db.execute('''
                 UPDATE channels SET is_active = FALSE 
                 WHERE telegram_channel_id = ?
             ''', (telegram_channel_id,))
             await db.commit()
+            self.channel_cache.clear()
             return True
     
     async def update_channel_subscribers(self, channel_id: str, subscribers: int, active_subscribers: int) -> bool:
         """Update channel subscriber counts"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                UPDATE channels 
-                SET subscribers = ?, active_subscribers = ?, last_updated = CURRENT_TIMESTAMP
-                WHERE channel_id = ? OR telegram_channel_id = ?
-            ''', (subscribers, active_subscribers, channel_id, channel_id))
-            await db.commit()
-            return True
+        await self.queue_write('''
+            UPDATE channels 
+            SET subscribers = ?, active_subscribers = ?, last_updated = CURRENT_TIMESTAMP
+            WHERE channel_id = ? OR telegram_channel_id = ?
+        ''', (subscribers, active_subscribers, channel_id, channel_id))
+        self.channel_cache.clear()
+        return True
     
     async def activate_channel(self, channel_id: str) -> bool:
         """Activate a channel"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     UPDATE channels 
                     SET is_active = 1, last_updated = CURRENT_TIMESTAMP
                     WHERE telegram_channel_id = ? OR channel_id = ?
                 ''', (channel_id, channel_id))
                 await db.commit()
+                self.channel_cache.clear()
                 return True
         except Exception as e:
             logger.error(f"Error activating channel: {e}")
@@ -485,13 +356,14 @@ Last updated: July 2025"""
     async def deactivate_channel(self, channel_id: str) -> bool:
         """Deactivate a channel"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     UPDATE channels 
                     SET is_active = 0, last_updated = CURRENT_TIMESTAMP
                     WHERE telegram_channel_id = ? OR channel_id = ?
                 ''', (channel_id, channel_id))
                 await db.commit()
+                self.channel_cache.clear()
                 return True
         except Exception as e:
             logger.error(f"Error deactivating channel: {e}")
@@ -500,12 +372,13 @@ Last updated: July 2025"""
     async def delete_channel(self, channel_id: str) -> bool:
         """Permanently delete a channel from database"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     DELETE FROM channels 
                     WHERE telegram_channel_id = ? OR channel_id = ?
                 ''', (channel_id, channel_id))
                 await db.commit()
+                self.channel_cache.clear()
                 return True
         except Exception as e:
             logger.error(f"Error deleting channel: {e}")
@@ -514,7 +387,7 @@ Last updated: July 2025"""
     async def clean_invalid_channels(self) -> int:
         """Remove all channels that bot can't access"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 # Delete invalid channels (these are old fake channels)
                 result = await db.execute('''
                     DELETE FROM channels 
@@ -522,6 +395,7 @@ Last updated: July 2025"""
                     OR telegram_channel_id NOT LIKE '@%'
                 ''')
                 await db.commit()
+                self.channel_cache.clear()
                 return result.rowcount
         except Exception as e:
             logger.error(f"Error cleaning invalid channels: {e}")
@@ -529,7 +403,11 @@ Last updated: July 2025"""
 
     async def get_bot_admin_channels(self) -> List[Dict]:
         """Get channels where bot is admin (active channels only)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        channels = await self.channel_cache.get_or_load('bot_admin', self._load_bot_admin_channels)
+        return [dict(channel) for channel in channels]
+
+    async def _load_bot_admin_channels(self) -> List[Dict]:
+        async with self.get_reader() as db:
             async with db.execute('''
                 SELECT channel_id, name, telegram_channel_id, subscribers, base_price_usd, is_popular
                 FROM channels 
@@ -554,7 +432,7 @@ Last updated: July 2025"""
                                  posts_per_day: int = 1, total_posts: int = 30,
                                  discount_percent: int = 0) -> int:
         """Create new subscription with progressive plan details"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             cursor = await db.execute('''
                 INSERT INTO subscriptions 
                 (user_id, ad_id, channel_id, duration_months, total_price, currency, 
@@ -567,7 +445,7 @@ Last updated: July 2025"""
     
     async def get_subscription(self, subscription_id: int) -> Optional[Dict]:
         """Get subscription by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute('''
                 SELECT * FROM subscriptions WHERE subscription_id = ?
@@ -579,7 +457,7 @@ Last updated: July 2025"""
                            amount: float, currency: str, payment_method: str,
                            memo: str) -> int:
         """Create new payment"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             cursor = await db.execute('''
                 INSERT INTO payments 
                 (user_id, subscription_id, amount, currency, payment_method, memo)
@@ -590,7 +468,7 @@ Last updated: July 2025"""
     
     async def update_payment_subscription(self, payment_id: int, subscription_id: int):
         """Update payment record with subscription ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             await db.execute('''
                 UPDATE payments SET subscription_id = ? WHERE payment_id = ?
             ''', (subscription_id, payment_id))
@@ -599,7 +477,7 @@ Last updated: July 2025"""
     async def activate_subscriptions(self, subscription_ids: List[int], duration_days: int) -> bool:
         """Activate subscriptions after payment confirmation"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 # Update all subscriptions to active status
                 for subscription_id in subscription_ids:
                     await db.execute('''
@@ -618,7 +496,7 @@ Last updated: July 2025"""
     
     async def get_user_stats(self, user_id: int) -> Dict:
         """Get user statistics"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             db.row_factory = aiosqlite.Row
             
             # Get total ads
@@ -655,7 +533,7 @@ Last updated: July 2025"""
     
     async def get_referral_stats(self, user_id: int) -> Dict:
         """Get referral statistics"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             db.row_factory = aiosqlite.Row
             
             # Get referral count
@@ -682,7 +560,7 @@ Last updated: July 2025"""
     async def create_referral(self, referrer_id: int, referee_id: int) -> bool:
         """Create referral relationship"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     INSERT INTO referrals (referrer_id, referee_id)
                     VALUES (?, ?)
@@ -698,7 +576,7 @@ Last updated: July 2025"""
                                 amount: float, description: str = None) -> bool:
         """Add a new partner reward"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     INSERT INTO partner_rewards (user_id, channel_id, reward_type, amount, description)
                     VALUES (?, ?, ?, ?, ?)
@@ -712,7 +590,7 @@ Last updated: July 2025"""
     async def get_partner_status(self, user_id: int) -> Dict:
         """Get partner status and statistics"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute('''
                     SELECT * FROM partner_status WHERE user_id = ?
@@ -726,7 +604,7 @@ Last updated: July 2025"""
     async def create_partner_status(self, user_id: int) -> bool:
         """Create initial partner status and give registration bonus"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 # Create partner status
                 await db.execute('''
                     INSERT OR REPLACE INTO partner_status 
@@ -750,7 +628,7 @@ Last updated: July 2025"""
     async def update_partner_earnings(self, user_id: int, amount: float) -> bool:
         """Update partner earnings"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     UPDATE partner_status 
                     SET total_earnings = total_earnings + ?, 
@@ -767,7 +645,7 @@ Last updated: July 2025"""
     async def get_partner_rewards(self, user_id: int) -> List[Dict]:
         """Get partner rewards history"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute('''
                     SELECT * FROM partner_rewards 
@@ -783,7 +661,7 @@ Last updated: July 2025"""
     async def get_partner_referrals(self, user_id: int) -> List[Dict]:
         """Get partner referrals"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 cursor = await db.execute('''
                     SELECT pr.*, u.username as referred_username
                     FROM partner_referrals pr
@@ -800,7 +678,7 @@ Last updated: July 2025"""
     async def get_referral_count(self, user_id: int) -> int:
         """Get total referral count for user"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 cursor = await db.execute('''
                     SELECT COUNT(*) FROM referrals WHERE referrer_id = ?
                 ''', (user_id,))
@@ -813,7 +691,7 @@ Last updated: July 2025"""
     async def get_user_wallet(self, user_id: int) -> Optional[str]:
         """Get user's TON wallet address"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 cursor = await db.execute('''
                     SELECT ton_wallet_address FROM users WHERE user_id = ?
                 ''', (user_id,))
@@ -826,7 +704,7 @@ Last updated: July 2025"""
     async def set_user_wallet(self, user_id: int, wallet_address: str) -> bool:
         """Set user's TON wallet address"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 # First ensure user exists
                 await db.execute('''
                     INSERT OR IGNORE INTO users (user_id, username, language, created_at, ton_wallet_address) 
@@ -838,6 +716,7 @@ Last updated: July 2025"""
                     UPDATE users SET ton_wallet_address = ? WHERE user_id = ?
                 ''', (wallet_address, user_id))
                 await db.commit()
+                self.user_cache.invalidate(user_id)
                 
                 # Log the operation
                 print(f"✅ Successfully saved wallet address for user {user_id}: {wallet_address[:10]}...{wallet_address[-8:]}")
@@ -856,7 +735,7 @@ Last updated: July 2025"""
             import uuid
             payout_id = str(uuid.uuid4())
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 cursor = await db.execute('''
                     INSERT INTO payout_requests (user_id, amount, payout_id, wallet_address, status)
                     VALUES (?, ?, ?, ?, 'pending')
@@ -870,7 +749,7 @@ Last updated: July 2025"""
     async def get_pending_withdrawals(self) -> List[Dict]:
         """Get all pending withdrawal requests"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute('''
                     SELECT pr.*, u.username 
@@ -888,7 +767,7 @@ Last updated: July 2025"""
     async def update_withdrawal_status(self, withdrawal_id: int, status: str, transaction_hash: str = None) -> bool:
         """Update withdrawal request status"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 if transaction_hash:
                     await db.execute('''
                         UPDATE payout_requests 
@@ -910,7 +789,7 @@ Last updated: July 2025"""
     async def get_referral_by_ids(self, referrer_id: int, referred_id: int) -> Optional[Dict]:
         """Check if referral already exists"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 cursor = await db.execute('''
                     SELECT * FROM referrals WHERE referrer_id = ? AND referee_id = ?
                 ''', (referrer_id, referred_id))
@@ -923,10 +802,9 @@ Last updated: July 2025"""
     async def execute_query(self, query: str, params: tuple = ()) -> bool:
         """Execute raw SQL query"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(query, params)
-                await db.commit()
-                return True
+            await self.queue_write(query, params)
+            self._invalidate_for_query(query)
+            return True
         except Exception as e:
             print(f"Error executing query: {e}")
             return False
@@ -934,7 +812,7 @@ Last updated: July 2025"""
     async def fetchone(self, query: str, params: tuple = ()) -> Optional[Dict]:
         """Fetch one row from database"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(query, params)
                 result = await cursor.fetchone()
@@ -946,7 +824,7 @@ Last updated: July 2025"""
     async def fetchall(self, query: str, params: tuple = ()) -> List[Dict]:
         """Fetch all rows from database"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(query, params)
                 results = await cursor.fetchall()
@@ -958,7 +836,7 @@ Last updated: July 2025"""
     async def increment_free_ads_used(self, user_id: int) -> bool:
         """Increment free ads used count for user"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 # Check if user exists in stats
                 cursor = await db.execute('''
                     SELECT free_ads_used FROM users WHERE user_id = ?
@@ -978,6 +856,7 @@ Last updated: July 2025"""
                     ''', (user_id,))
                 
                 await db.commit()
+                self.user_cache.invalidate(user_id)
                 return True
         except Exception as e:
             print(f"Error incrementing free ads used: {e}")
@@ -985,27 +864,27 @@ Last updated: July 2025"""
 
     async def reset_free_ads_counter(self, user_id: int) -> bool:
         """Reset the free ads counter for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             await db.execute(
                 "UPDATE users SET free_ads_used = 0, last_free_ad_reset = ? WHERE user_id = ?",
                 (datetime.now().isoformat(), user_id)
             )
             await db.commit()
+            self.user_cache.invalidate(user_id)
             return True
     
     async def increment_free_ads_used(self, user_id: int) -> bool:
         """Increment the free ads used counter for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE users SET free_ads_used = free_ads_used + 1 WHERE user_id = ?",
-                (user_id,)
-            )
-            await db.commit()
-            return True
+        await self.queue_write(
+            "UPDATE users SET free_ads_used = free_ads_used + 1 WHERE user_id = ?",
+            (user_id,)
+        )
+        self.user_cache.invalidate(user_id)
+        return True
     
     async def check_free_trial_available(self, user_id: int) -> bool:
         """Check if user can use free trial"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             cursor = await db.execute('''
                 SELECT free_trial_used FROM users WHERE user_id = ?
             ''', (user_id,))
@@ -1017,18 +896,17 @@ Last updated: July 2025"""
     
     async def use_free_trial(self, user_id: int):
         """Mark free trial as used"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute('''
-                UPDATE users 
-                SET free_trial_used = TRUE, free_trial_date = CURRENT_TIMESTAMP 
-                WHERE user_id = ?
-            ''', (user_id,))
-            await db.commit()
+        await self.queue_write('''
+            UPDATE users 
+            SET free_trial_used = TRUE, free_trial_date = CURRENT_TIMESTAMP 
+            WHERE user_id = ?
+        ''', (user_id,))
+        self.user_cache.invalidate(user_id)
             
     async def create_package(self, package_id: str, name: str, price_usd: float,
                             duration_days: int, posts_per_day: int, channels_included: int) -> bool:
         """Create new package"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             await db.execute('''
                 INSERT OR REPLACE INTO packages 
                 (package_id, name, price_usd, duration_days, posts_per_day, channels_included)
@@ -1039,7 +917,7 @@ Last updated: July 2025"""
             
     async def get_packages(self, active_only: bool = True) -> List[Dict]:
         """Get all packages"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             if active_only:
                 cursor = await db.execute('''
                     SELECT package_id, name, price_usd, duration_days, posts_per_day, channels_included
@@ -1068,7 +946,7 @@ Last updated: July 2025"""
             
     async def get_package(self, package_id: str) -> Optional[Dict]:
         """Get package by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             cursor = await db.execute('''
                 SELECT package_id, name, price_usd, duration_days, posts_per_day, channels_included
                 FROM packages WHERE package_id = ?
@@ -1088,7 +966,12 @@ Last updated: July 2025"""
             
     async def get_bot_setting(self, setting_key: str) -> Optional[str]:
         """Get bot setting value"""
-        async with aiosqlite.connect(self.db_path) as db:
+        return await self.settings_cache.get_or_load(
+            setting_key, lambda: self._load_bot_setting(setting_key)
+        )
+
+    async def _load_bot_setting(self, setting_key: str) -> Optional[str]:
+        async with self.get_reader() as db:
             cursor = await db.execute(
                 'SELECT setting_value FROM bot_settings WHERE setting_key = ?',
                 (setting_key,)
@@ -1098,17 +981,18 @@ Last updated: July 2025"""
             
     async def set_bot_setting(self, setting_key: str, setting_value: str, description: str = None) -> bool:
         """Set bot setting value"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_connection() as db:
             await db.execute('''
                 INSERT OR REPLACE INTO bot_settings (setting_key, setting_value, description, updated_at)
                 VALUES (?, ?, ?, ?)
             ''', (setting_key, setting_value, description, datetime.now().isoformat()))
             await db.commit()
+            self.settings_cache.invalidate(setting_key)
             return True
             
     async def get_all_bot_settings(self) -> List[Dict]:
         """Get all bot settings"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             cursor = await db.execute('SELECT * FROM bot_settings ORDER BY setting_key')
             rows = await cursor.fetchall()
             return [
@@ -1126,7 +1010,7 @@ Last updated: July 2025"""
         # This method ensures database consistency and channel availability
         # In SQLite, this is handled by database commits, but we can add cleanup here
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 # Ensure all channel data is committed and available
                 await db.commit()
                 # Clean up any inactive channels that might interfere
@@ -1136,6 +1020,9 @@ Last updated: July 2025"""
                     WHERE is_active = 1
                 ''')
                 await db.commit()
+            # Drop cached channel lists and re-warm the one every ad flow reads
+            self.channel_cache.clear()
+            await self.get_active_channels()
         except Exception as e:
             import logging
             logging.error(f"Error refreshing channel cache: {e}")
@@ -1156,7 +1043,7 @@ Last updated: July 2025"""
     async def create_payout_request(self, user_id: int, amount: float, payout_id: str, status: str = 'pending'):
         """Create a new payout request for reward transfer"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     INSERT INTO payout_requests (user_id, amount, payout_id, status)
                     VALUES (?, ?, ?, ?)
@@ -1170,7 +1057,7 @@ Last updated: July 2025"""
     async def get_payout_requests(self, status: str = None) -> List[Dict]:
         """Get payout requests for admin processing"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 if status:
                     cursor = await db.execute('''
                         SELECT pr.*, u.username 
@@ -1197,7 +1084,7 @@ Last updated: July 2025"""
                                   transaction_hash: str = None, notes: str = None):
         """Update payout request status after bot wallet transfer"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 if status == 'completed':
                     await db.execute('''
                         UPDATE payout_requests 
@@ -1233,7 +1120,7 @@ Last updated: July 2025"""
     async def get_ui_text(self, category: str, key: str, language: str) -> Optional[str]:
         """Get customized UI text"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 cursor = await db.execute('''
                     SELECT custom_text FROM ui_customizations 
                     WHERE category = ? AND text_key = ? AND language = ?
@@ -1247,7 +1134,7 @@ Last updated: July 2025"""
     async def set_ui_text(self, category: str, key: str, language: str, text: str) -> bool:
         """Set customized UI text"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     INSERT OR REPLACE INTO ui_customizations 
                     (category, text_key, language, custom_text, updated_at)
@@ -1262,7 +1149,7 @@ Last updated: July 2025"""
     async def delete_ui_text(self, category: str, key: str, language: str) -> bool:
         """Delete customized UI text (reset to default)"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     DELETE FROM ui_customizations 
                     WHERE category = ? AND text_key = ? AND language = ?
@@ -1276,7 +1163,7 @@ Last updated: July 2025"""
     async def get_all_ui_customizations(self) -> dict:
         """Get all UI customizations grouped by category"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 cursor = await db.execute('''
                     SELECT category, text_key, language, custom_text 
                     FROM ui_customizations 
@@ -1301,7 +1188,7 @@ Last updated: July 2025"""
     async def get_ui_customization_stats(self) -> dict:
         """Get statistics about UI customizations"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 cursor = await db.execute('''
                     SELECT 
                         COUNT(*) as total_customizations,
@@ -1335,26 +1222,7 @@ Last updated: July 2025"""
     async def log_fraud_attempt(self, fraud_log: Dict):
         """Log fraud attempt for security monitoring"""
         try:
-            # Create fraud_logs table if it doesn't exist
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute('''
-                    CREATE TABLE IF NOT EXISTS fraud_logs (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp TEXT NOT NULL,
-                        type TEXT NOT NULL,
-                        transaction_hash TEXT,
-                        transaction_amount REAL,
-                        transaction_sender TEXT,
-                        transaction_memo TEXT,
-                        expected_memo TEXT,
-                        expected_wallet TEXT,
-                        risk_level TEXT,
-                        status TEXT,
-                        admin_reviewed BOOLEAN DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
+            async with self.get_connection() as db:
                 # Insert fraud log
                 await db.execute('''
                     INSERT INTO fraud_logs (
@@ -1384,7 +1252,7 @@ Last updated: July 2025"""
     async def get_fraud_logs(self, limit: int = 50) -> List[Dict]:
         """Get fraud logs for admin review"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 async with db.execute('''
                     SELECT * FROM fraud_logs 
                     ORDER BY created_at DESC 
@@ -1400,7 +1268,7 @@ Last updated: July 2025"""
     async def mark_fraud_log_reviewed(self, fraud_log_id: int):
         """Mark fraud log as reviewed by admin"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_connection() as db:
                 await db.execute('''
                     UPDATE fraud_logs 
                     SET admin_reviewed = 1 
@@ -1413,7 +1281,7 @@ Last updated: July 2025"""
     async def get_payment_security_stats(self) -> Dict:
         """Get payment security statistics"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.get_reader() as db:
                 # Get fraud attempts count
                 fraud_count_cursor = await db.execute('''
                     SELECT COUNT(*) FROM fraud_logs WHERE type = 'wallet_mismatch_fraud_attempt'
@@ -1504,7 +1372,7 @@ async def init_default_packages(db_instance):
         }
     ]
     
-    async with aiosqlite.connect(db_instance.db_path) as db:
+    async with db_instance.get_connection() as db:
         for package in default_packages:
             await db.execute('''
                 INSERT OR IGNORE INTO packages
@@ -1525,7 +1393,7 @@ Database.get_channel_by_id = lambda self, channel_id: self._get_channel_by_id(ch
 async def _get_user_channels(self, user_id: int) -> List[Dict]:
     """Get channels owned by user (where they are admin)"""
     try:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute('''
                 SELECT * FROM channels 
@@ -1541,7 +1409,7 @@ async def _get_user_channels(self, user_id: int) -> List[Dict]:
 async def _get_channel_ads_count(self, channel_id: str) -> int:
     """Get number of ads hosted in channel"""
     try:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             async with db.execute('''
                 SELECT COUNT(*) FROM subscriptions 
                 WHERE channel_id = ? AND status = 'active'
@@ -1555,7 +1423,7 @@ async def _get_channel_ads_count(self, channel_id: str) -> int:
 async def _get_channel_by_id(self, channel_id: str) -> Optional[Dict]:
     """Get channel by ID"""
     try:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             db.row_factory = aiosqlite.Row
             async with db.execute('''
                 SELECT * FROM channels WHERE id = ?
@@ -1570,60 +1438,27 @@ async def _get_channel_by_id(self, channel_id: str) -> Optional[Dict]:
 async def log_user_interaction(self, user_id: int, interaction_type: str, details: str = ""):
     """Log user interaction for fraud detection"""
     try:
-        async with self.get_connection() as conn:
-            await conn.execute("PRAGMA busy_timeout=30000")
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS user_interactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    interaction_type TEXT NOT NULL,
-                    details TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            await conn.execute("""
+        await self.queue_transaction([
+            ("""
                 INSERT INTO user_interactions (user_id, interaction_type, details)
                 VALUES (?, ?, ?)
-            """, (user_id, interaction_type, details))
-            
-            await conn.commit()
+            """, (user_id, interaction_type, details)),
+            ("UPDATE users SET last_activity = CURRENT_TIMESTAMP WHERE user_id = ?", (user_id,)),
+        ])
     except Exception as e:
         print(f"Error logging user interaction: {e}")
         # Don't crash the handler if logging fails
 
 async def log_user_action(self, user_id: int, action_type: str, details: str = ""):
     """Log user action for fraud detection"""
-    async with aiosqlite.connect(self.db_path) as conn:
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS user_actions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                action_type TEXT NOT NULL,
-                details TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await conn.execute("""
-            INSERT INTO user_actions (user_id, action_type, details)
-            VALUES (?, ?, ?)
-        """, (user_id, action_type, details))
-        
-        await conn.commit()
+    await self.queue_write("""
+        INSERT INTO user_actions (user_id, action_type, details)
+        VALUES (?, ?, ?)
+    """, (user_id, action_type, details))
 
 async def is_user_blocked(self, user_id: int) -> bool:
     """Check if user is blocked for fraud"""
-    async with aiosqlite.connect(self.db_path) as conn:
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS blocked_users (
-                user_id INTEGER PRIMARY KEY,
-                reason TEXT,
-                blocked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'blocked'
-            )
-        """)
-        
+    async with self.get_reader() as conn:
         query = """
         SELECT status FROM blocked_users 
         WHERE user_id = ? AND status IN ('blocked', 'permanently_blocked')
@@ -1635,16 +1470,7 @@ async def is_user_blocked(self, user_id: int) -> bool:
 
 async def is_user_banned(self, user_id: int) -> bool:
     """Check if user is banned for content violations"""
-    async with aiosqlite.connect(self.db_path) as conn:
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS banned_users (
-                user_id INTEGER PRIMARY KEY,
-                reason TEXT,
-                banned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'banned'
-            )
-        """)
-        
+    async with self.get_reader() as conn:
         query = """
         SELECT status FROM banned_users 
         WHERE user_id = ? AND status = 'permanently_banned'
@@ -1666,7 +1492,7 @@ Database.is_user_banned = is_user_banned
 # Background worker methods
 async def get_pending_payments(self):
     """Get pending TON payments for verification"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_reader() as db:
         cursor = await db.execute("""
             SELECT * FROM orders 
             WHERE currency = 'TON' 
@@ -1678,7 +1504,7 @@ async def get_pending_payments(self):
 
 async def confirm_payment(self, payment_id):
     """Confirm payment as verified"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_connection() as db:
         await db.execute("""
             UPDATE orders 
             SET status = 'confirmed', confirmed_at = datetime('now')
@@ -1688,7 +1514,7 @@ async def confirm_payment(self, payment_id):
 
 async def activate_subscription(self, payment_id):
     """Activate subscription after payment confirmation"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_connection() as db:
         await db.execute("""
             UPDATE orders 
             SET status = 'active', activated_at = datetime('now')
@@ -1698,7 +1524,7 @@ async def activate_subscription(self, payment_id):
 
 async def get_pending_rewards(self):
     """Get pending rewards for processing"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_reader() as db:
         cursor = await db.execute("""
             SELECT * FROM partner_rewards 
             WHERE status = 'pending'
@@ -1709,7 +1535,7 @@ async def get_pending_rewards(self):
 
 async def add_reward_balance(self, user_id, amount):
     """Add reward to user balance"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_connection() as db:
         await db.execute("""
             INSERT OR REPLACE INTO partner_rewards (user_id, amount, reward_type, status)
             VALUES (?, ?, 'processed', 'completed')
@@ -1718,7 +1544,7 @@ async def add_reward_balance(self, user_id, amount):
 
 async def mark_reward_processed(self, reward_id):
     """Mark reward as processed"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_connection() as db:
         await db.execute("""
             UPDATE partner_rewards 
             SET status = 'processed', processed_at = datetime('now')
@@ -1728,7 +1554,7 @@ async def mark_reward_processed(self, reward_id):
 
 async def cleanup_old_logs(self, cutoff_date):
     """Clean up old log entries"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_connection() as db:
         await db.execute("""
             DELETE FROM error_logs 
             WHERE created_at < ?
@@ -1737,7 +1563,7 @@ async def cleanup_old_logs(self, cutoff_date):
 
 async def cleanup_expired_sessions(self):
     """Clean up expired user sessions"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_connection() as db:
         await db.execute("""
             DELETE FROM user_sessions 
             WHERE expires_at < datetime('now')
@@ -1747,7 +1573,7 @@ async def cleanup_expired_sessions(self):
 async def check_connection(self):
     """Check database connection health"""
     try:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.get_reader() as db:
             await db.execute("SELECT 1")
             return True
     except Exception:
@@ -1755,13 +1581,14 @@ async def check_connection(self):
 
 async def update_channel_stats(self, channel_id, subscribers, active_subscribers, last_updated):
     """Update channel statistics"""
-    async with aiosqlite.connect(self.db_path) as db:
+    async with self.get_connection() as db:
         await db.execute("""
             UPDATE channels 
             SET subscribers = ?, active_subscribers = ?, last_updated = ?
             WHERE id = ?
         """, (subscribers, active_subscribers, last_updated, channel_id))
         await db.commit()
+    self.channel_cache.clear()
 
 # Bind background worker methods to Database class
 Database.get_pending_payments = get_pending_payments
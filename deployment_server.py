@@ -5,10 +5,12 @@ This runs the Flask web server required for Cloud Run deployment
 """
 import os
 import sys
+import hmac
 import logging
 import threading
 import asyncio
 from datetime import datetime
+from functools import wraps
 from flask import Flask, jsonify, request
 
 # Set environment variable to prevent duplicate Flask servers
@@ -67,6 +69,64 @@ def status():
         'status': 'operational' if bot_started else 'initializing'
     })
 
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+def debug_access(view):
+    """Admin-only debug views: the shared DEBUG_ENDPOINT_TOKEN, or localhost when none is set"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from config import DEBUG_ENDPOINT_TOKEN
+        if DEBUG_ENDPOINT_TOKEN:
+            supplied = request.headers.get('X-Debug-Token', '')
+            allowed = hmac.compare_digest(supplied.encode(), DEBUG_ENDPOINT_TOKEN.encode())
+        else:
+            allowed = request.remote_addr in LOCAL_ADDRESSES
+        if not allowed:
+            logger.warning(f"Denied debug request to {request.path} from {request.remote_addr}")
+            return jsonify({'error': 'Access denied'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/debug/queries')
+@debug_access
+def debug_queries():
+    """Top SQL statements by total time (or ?order=p95_ms|p99_ms|count|rows)"""
+    from query_profiler import get_query_profiler
+    profiler = get_query_profiler()
+    limit = request.args.get('limit', 20, type=int)
+    order_by = request.args.get('order', 'total_ms')
+    return jsonify({
+        'summary': profiler.get_stats(),
+        'top': profiler.get_top(limit, order_by)
+    })
+
+@app.route('/debug/cache')
+@debug_access
+def debug_cache():
+    """Hit/miss metrics for the user, channel and settings caches"""
+    from database import db
+    return jsonify(db.get_cache_stats())
+
+@app.route('/debug/publisher')
+@debug_access
+def debug_publisher():
+    """Publishing throughput, queue depth and time-in-queue"""
+    from enhanced_campaign_publisher import enhanced_publisher
+    if enhanced_publisher is None:
+        return jsonify({'running': False})
+    return jsonify(enhanced_publisher.get_stats())
+
+@app.route('/debug/ton')
+@debug_access
+def debug_ton():
+    """Per-provider TON API latency, errors and breaker state, plus wallet ingestion"""
+    from ton_http import get_ton_http_client
+    from ton_ingestion import _ingestors
+    return jsonify({
+        'http': get_ton_http_client().get_stats(),
+        'ingestion': {wallet: ingestor.get_stats() for wallet, ingestor in _ingestors.items()}
+    })
+
 def run_bot():
     """Run bot in background thread"""
     global bot_started, bot_instance
@@ -4,13 +4,14 @@ End-to-End Ad Campaign Tracking System
 Comprehensive tracking from ad creation to final publication with automatic confirmation
 """
 
-import sqlite3
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from global_sequence_system import GlobalSequenceManager, get_global_sequence_manager
 from languages import get_text
+from async_data_access import get_data_access
+from schema_migrations import run_migrations
 
 logger = logging.getLogger(__name__)
 
@@ -62,71 +63,13 @@ class EndToEndTrackingSystem:
     def __init__(self, db_path: str = "bot.db"):
         self.db_path = db_path
         self.sequence_manager = get_global_sequence_manager()
+        self.data = get_data_access(db_path)
         # Initialize database will be called separately in async context
     
     async def initialize_database(self):
         """Initialize end-to-end tracking database tables"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Campaign tracking table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS campaign_tracking (
-                    tracking_id TEXT PRIMARY KEY,
-                    sequence_id TEXT NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    campaign_id TEXT,
-                    current_step TEXT,
-                    total_steps INTEGER DEFAULT 13,
-                    completed_steps INTEGER DEFAULT 0,
-                    status TEXT DEFAULT 'in_progress',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    metadata TEXT,
-                    FOREIGN KEY (sequence_id) REFERENCES global_sequences (sequence_id)
-                )
-            """)
-            
-            # Campaign journey steps
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS tracking_steps (
-                    step_tracking_id TEXT PRIMARY KEY,
-                    tracking_id TEXT NOT NULL,
-                    step_id TEXT NOT NULL,
-                    step_name TEXT NOT NULL,
-                    step_title TEXT NOT NULL,
-                    status TEXT DEFAULT 'pending',
-                    started_at TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    metadata TEXT,
-                    error_message TEXT,
-                    FOREIGN KEY (tracking_id) REFERENCES campaign_tracking (tracking_id)
-                )
-            """)
-            
-            # Publishing reports table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS publishing_reports (
-                    report_id TEXT PRIMARY KEY,
-                    campaign_id TEXT NOT NULL,
-                    sequence_id TEXT NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    total_channels INTEGER,
-                    published_channels TEXT,
-                    failed_channels TEXT,
-                    publication_timestamps TEXT,
-                    success_rate REAL,
-                    final_status TEXT,
-                    completion_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    confirmation_sent BOOLEAN DEFAULT FALSE,
-                    FOREIGN KEY (campaign_id) REFERENCES campaigns (campaign_id)
-                )
-            """)
-            
-            conn.commit()
-            conn.close()
+            await run_migrations(self.db_path)
             
             logger.info("✅ End-to-end tracking database initialized")
             
@@ -142,28 +85,24 @@ class EndToEndTrackingSystem:
             # Generate tracking ID
             tracking_id = f"TRACK-{datetime.now().strftime('%Y-%m-%d')}-{sequence_id.split('-')[-1]}"
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Create campaign tracking record
-            cursor.execute("""
+            statements = [("""
                 INSERT INTO campaign_tracking (
                     tracking_id, sequence_id, user_id, current_step, status, metadata
                 ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (tracking_id, sequence_id, user_id, "start_bot", "in_progress", "{}"))
+            """, (tracking_id, sequence_id, user_id, "start_bot", "in_progress", "{}"))]
             
             # Create all journey steps as pending
             for step in self.CAMPAIGN_STEPS:
                 step_tracking_id = f"{tracking_id}-{step['step_id']}"
-                cursor.execute("""
+                statements.append(("""
                     INSERT INTO tracking_steps (
                         step_tracking_id, tracking_id, step_id, step_name, step_title, status
                     ) VALUES (?, ?, ?, ?, ?, ?)
                 """, (step_tracking_id, tracking_id, step['step_id'], step['step_name'], 
-                      step['step_title'], "pending"))
+                      step['step_title'], "pending")))
             
-            conn.commit()
-            conn.close()
+            await self.data.transaction(statements)
             
             # Log step completion
             try:
@@ -189,51 +128,47 @@ class EndToEndTrackingSystem:
                                 metadata: Dict = None, error_message: str = None):
         """Update step status in campaign tracking"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Update step status
             step_tracking_id = f"{tracking_id}-{step_id}"
             current_time = datetime.now().isoformat()
             
             if status == "in_progress":
-                cursor.execute("""
+                statements = [("""
                     UPDATE tracking_steps 
                     SET status = ?, started_at = ?, metadata = ?, error_message = ?
                     WHERE step_tracking_id = ?
-                """, (status, current_time, str(metadata or {}), error_message, step_tracking_id))
+                """, (status, current_time, str(metadata or {}), error_message, step_tracking_id))]
             elif status == "completed":
-                cursor.execute("""
+                statements = [("""
                     UPDATE tracking_steps 
                     SET status = ?, completed_at = ?, metadata = ?, error_message = ?
                     WHERE step_tracking_id = ?
-                """, (status, current_time, str(metadata or {}), error_message, step_tracking_id))
+                """, (status, current_time, str(metadata or {}), error_message, step_tracking_id))]
             else:
-                cursor.execute("""
+                statements = [("""
                     UPDATE tracking_steps 
                     SET status = ?, metadata = ?, error_message = ?
                     WHERE step_tracking_id = ?
-                """, (status, str(metadata or {}), error_message, step_tracking_id))
+                """, (status, str(metadata or {}), error_message, step_tracking_id))]
             
             # Update campaign tracking
-            cursor.execute("""
+            statements.append(("""
                 UPDATE campaign_tracking 
                 SET current_step = ?, updated_at = ?
                 WHERE tracking_id = ?
-            """, (step_id, current_time, tracking_id))
+            """, (step_id, current_time, tracking_id)))
             
             # Update completed steps count
-            cursor.execute("""
+            statements.append(("""
                 UPDATE campaign_tracking 
                 SET completed_steps = (
                     SELECT COUNT(*) FROM campaign_journey_steps 
                     WHERE tracking_id = ? AND status = 'completed'
                 )
                 WHERE tracking_id = ?
-            """, (tracking_id, tracking_id))
+            """, (tracking_id, tracking_id)))
             
-            conn.commit()
-            conn.close()
+            await self.data.transaction(statements)
             
             logger.info(f"✅ Step updated: {step_id} = {status} for tracking {tracking_id}")
             
@@ -243,25 +178,21 @@ class EndToEndTrackingSystem:
     async def complete_campaign_tracking(self, tracking_id: str, campaign_id: str):
         """Complete campaign tracking and trigger final confirmation"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Mark campaign tracking as completed
-            cursor.execute("""
+            await self.data.execute("""
                 UPDATE campaign_tracking 
                 SET status = 'completed', completed_at = CURRENT_TIMESTAMP, campaign_id = ?
                 WHERE tracking_id = ?
             """, (campaign_id, tracking_id))
             
             # Get tracking details
-            cursor.execute("""
+            result = await self.data.fetchone("""
                 SELECT user_id, sequence_id FROM campaign_tracking 
                 WHERE tracking_id = ?
             """, (tracking_id,))
             
-            result = cursor.fetchone()
             if result:
-                user_id, sequence_id = result
+                user_id, sequence_id = result['user_id'], result['sequence_id']
                 
                 # Create publishing report
                 report = await self.create_publishing_report(campaign_id, sequence_id, user_id)
@@ -271,38 +202,29 @@ class EndToEndTrackingSystem:
                 
                 logger.info(f"✅ Campaign tracking completed: {tracking_id}")
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"❌ Error completing campaign tracking: {e}")
     
     async def create_publishing_report(self, campaign_id: str, sequence_id: str, user_id: int) -> PublishingReport:
         """Create final publishing report"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Get campaign details
-            cursor.execute("""
+            campaign_data = await self.data.fetchone("""
                 SELECT selected_channels, posts_per_day, duration_days 
                 FROM campaigns WHERE campaign_id = ?
             """, (campaign_id,))
             
-            campaign_data = cursor.fetchone()
             if not campaign_data:
                 return None
             
-            selected_channels, posts_per_day, duration_days = campaign_data
+            selected_channels = campaign_data['selected_channels']
             
             # Get published posts
-            cursor.execute("""
+            published_posts = [tuple(row.values()) for row in await self.data.fetchall("""
                 SELECT channel_name, published_at, message_id, status
                 FROM campaign_posts 
                 WHERE campaign_id = ? AND published_at IS NOT NULL
-            """, (campaign_id,))
-            
-            published_posts = cursor.fetchall()
+            """, (campaign_id,))]
             
             # Analyze publication success
             published_channels = list(set([post[0] for post in published_posts]))
@@ -335,7 +257,7 @@ class EndToEndTrackingSystem:
             # Store report in database
             report_id = f"RPT-{datetime.now().strftime('%Y-%m-%d')}-{campaign_id.split('-')[-1]}"
             
-            cursor.execute("""
+            await self.data.execute("""
                 INSERT INTO publishing_reports (
                     report_id, campaign_id, sequence_id, user_id, total_channels,
                     published_channels, failed_channels, publication_timestamps,
@@ -345,9 +267,6 @@ class EndToEndTrackingSystem:
                   ','.join(published_channels), '', str(publication_timestamps),
                   success_rate, final_status, datetime.now().isoformat()))
             
-            conn.commit()
-            conn.close()
-            
             logger.info(f"✅ Publishing report created: {report_id}")
             return report
             
@@ -458,15 +377,11 @@ Thank you for using I3lani Bot! 🌟"""
                 )
                 
                 # Mark confirmation as sent
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("""
+                await self.data.execute("""
                     UPDATE publishing_reports 
                     SET confirmation_sent = TRUE 
                     WHERE campaign_id = ? AND user_id = ?
                 """, (campaign_id, user_id))
-                conn.commit()
-                conn.close()
                 
                 logger.info(f"✅ Final confirmation sent to user {user_id} for campaign {campaign_id}")
             
@@ -476,32 +391,25 @@ Thank you for using I3lani Bot! 🌟"""
     async def get_campaign_progress(self, tracking_id: str) -> Dict:
         """Get campaign progress details"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Get tracking details
-            cursor.execute("""
+            tracking_row = await self.data.fetchone("""
                 SELECT tracking_id, sequence_id, user_id, campaign_id, current_step, 
                        total_steps, completed_steps, status, created_at, updated_at
                 FROM campaign_tracking 
                 WHERE tracking_id = ?
             """, (tracking_id,))
             
-            tracking_data = cursor.fetchone()
-            if not tracking_data:
+            if not tracking_row:
                 return None
+            tracking_data = tuple(tracking_row.values())
             
             # Get journey steps
-            cursor.execute("""
+            steps_data = [tuple(row.values()) for row in await self.data.fetchall("""
                 SELECT step_id, step_name, step_title, status, started_at, completed_at
                 FROM campaign_journey_steps 
                 WHERE tracking_id = ?
                 ORDER BY step_id
-            """, (tracking_id,))
-            
-            steps_data = cursor.fetchall()
-            
-            conn.close()
+            """, (tracking_id,))]
             
             # Format progress data
             progress = {
@@ -5,18 +5,35 @@ Ensures published content exactly matches user submissions
 """
 
 import asyncio
-import sqlite3
 import logging
+import time
 from automatic_language_system import get_user_language_auto
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import json
 
 from post_identity_system import (
-    post_identity_system, create_post_identity, get_post_metadata, 
-    log_publication, verify_campaign_integrity
+    post_identity_system, create_post_identity, get_post_metadata, verify_campaign_integrity
 )
 from handlers_tracking_integration import track_publishing_started, track_publishing_complete
+from database import Database
+from async_data_access import get_data_access
+from campaign_schedule import has_pending_occurrences, materialize_due_schedules
+from config import POST_SCHEDULE_WINDOW_HOURS, PUBLISH_LEASE_SECONDS, PUBLISHER_SWEEP_SECONDS
+from publish_timer import PostTimerQueue, due_timestamp
+from publishing_engine import PublishingEngine
+from publish_batch import PublishBatch
+from publish_media import FileIdCache, send_campaign_content
+from publish_payload import PayloadStore
+from notification_digest import NotificationDigest
+from publish_leases import (
+    CLEAR_LEASE, HOLDS_LEASE, claim_posts, make_worker_id, recover_expired_leases,
+    release_claims, renew_leases
+)
+from publish_retry import (
+    CHAT_GONE, FLOOD, NoMessageError, UnpublishableError, classify_failure, dead_letter, schedule_retry
+)
+from schema_migrations import CAMPAIGN_DUE_POSTS_QUERY, DUE_POSTS_QUERY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,8 +44,27 @@ class EnhancedCampaignPublisher:
     def __init__(self, bot_instance, db_path: str = "bot.db"):
         self.bot = bot_instance
         self.db_path = db_path
+        self.db = Database(db_path)
+        self.data = get_data_access(db_path)
         self.running = False
-        self.check_interval = 30  # seconds
+        # Posts fire from the in-memory timer; the database sweep is only a safety net
+        self.timer = PostTimerQueue()
+        self.sweep_interval = PUBLISHER_SWEEP_SECONDS
+        self._next_sweep = 0.0
+        # Sends run concurrently across channels, within the global and per-chat limits
+        self.engine = PublishingEngine()
+        # Posts are claimed under this id, so several workers can share the database
+        self.worker_id = make_worker_id()
+        self._loop_task: Optional[asyncio.Task] = None
+        # Per-post bookkeeping is buffered and written one transaction per batch
+        self.batch = PublishBatch(self.data, self.worker_id)
+        # Each campaign's caption, media, buttons and post identity, rendered once
+        self.payloads = PayloadStore(self.data, self._ensure_campaign_post_identity)
+        # Advertisers get a digest per window instead of a message per post
+        self.notifier = NotificationDigest(bot_instance, self._user_language)
+        self._channel_names: Dict[str, str] = {}
+        # Media goes up once; later channels send the returned file_ids
+        self.file_ids = FileIdCache(self.data)
         
     async def start(self):
         """Start the enhanced campaign publisher"""
@@ -37,95 +73,174 @@ class EnhancedCampaignPublisher:
             return
             
         self.running = True
+        await self.notifier.start()
         logger.info("🚀 Enhanced Campaign Publisher started with Post Identity System")
         
         # Start background publishing loop
-        asyncio.create_task(self._publishing_loop())
+        self._loop_task = asyncio.create_task(self._publishing_loop())
         
     async def stop(self):
         """Stop the enhanced campaign publisher"""
         self.running = False
+        self.timer.wake()
+        if self._loop_task is not None:
+            # Let the current batch finish and the loop release its leases
+            try:
+                await asyncio.wait_for(self._loop_task, timeout=30)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                logger.warning("⚠️ Publishing loop did not stop in time")
+            self._loop_task = None
+        await self.notifier.stop()
         logger.info("🛑 Enhanced Campaign Publisher stopped")
         
     async def _publishing_loop(self):
-        """Main publishing loop with content verification"""
+        """Main publishing loop: sleep until the next post is due, then drain everything due"""
         while self.running:
             try:
-                await self._process_due_posts()
-                await asyncio.sleep(self.check_interval)
+                if time.time() >= self._next_sweep:
+                    await self._sweep()
+                due_ids = self.timer.pop_due()
+                if due_ids:
+                    await self._publish_due(due_ids)
+                    continue
+                await self.timer.wait(self._next_sweep)
             except Exception as e:
                 logger.error(f"❌ Error in publishing loop: {e}")
-                await asyncio.sleep(self.check_interval)
+                await asyncio.sleep(1)
+        
+        # Write any buffered results first, then hand back anything still claimed
+        # so other workers need not wait for the lease
+        try:
+            await self.batch.flush()
+            released = await release_claims(self.data, self.worker_id)
+            if released:
+                logger.info(f"↩️ Released {released} claimed posts on shutdown")
+        except Exception as e:
+            logger.error(f"❌ Error releasing claimed posts: {e}")
     
-    async def _process_due_posts(self):
-        """Process posts that are due for publishing - ONE POST PER CAMPAIGN"""
+    def get_stats(self) -> Dict[str, Any]:
+        """Timer queue and publishing engine metrics"""
+        return {'running': self.running, 'worker_id': self.worker_id,
+                'timer': self.timer.get_stats(), 'engine': self.engine.get_stats(),
+                'batch': self.batch.get_stats(), 'media': self.file_ids.get_stats(),
+                'payloads': self.payloads.get_stats(),
+                'notifications': self.notifier.get_stats()}
+    
+    async def _sweep(self):
+        """Reconcile the timer with the database: materialize rules and load upcoming posts"""
+        self._next_sweep = time.time() + self.sweep_interval
+        # Posts claimed by a worker that died go back on the schedule
         try:
-            due_posts = await self._get_due_posts()
-            
-            if due_posts:
-                logger.info(f"📋 Processing {len(due_posts)} due posts")
-                
-                # Group by campaign to ensure one post per campaign
-                campaigns_processed = set()
-                
-                for post in due_posts:
-                    campaign_id = post['campaign_id']
-                    user_id = post['user_id']
-                    
-                    # Skip if we already processed this campaign
-                    if campaign_id in campaigns_processed:
-                        logger.info(f"⏭️ Skipping duplicate post for campaign {campaign_id}")
-                        continue
-                    
-                    # Track publishing started for this campaign
-                    if campaign_id not in campaigns_processed:
-                        try:
-                            await track_publishing_started(user_id, campaign_id)
-                        except Exception as e:
-                            logger.error(f"Error tracking publishing started: {e}")
-                    
-                    # Publish the post
-                    success = await self._publish_campaign_post(post)
-                    campaigns_processed.add(campaign_id)
-                    
-                    # Check if campaign is complete and trigger final confirmation
-                    if success:
-                        await self._check_campaign_completion(campaign_id, user_id)
-                    
+            await recover_expired_leases(self.data)
         except Exception as e:
-            logger.error(f"❌ Error processing due posts: {e}")
+            logger.error(f"❌ Error recovering expired leases: {e}")
+        
+        # Expand lazy schedule rules into rows for the upcoming window
+        try:
+            await materialize_due_schedules(self.data, timedelta(hours=POST_SCHEDULE_WINDOW_HOURS))
+        except Exception as e:
+            logger.error(f"❌ Error materializing scheduled posts: {e}")
+        
+        # Everything due before the sweep after next, so nothing falls between sweeps
+        horizon = datetime.now() + timedelta(seconds=self.sweep_interval * 2)
+        rows = await self.data.fetchall(DUE_POSTS_QUERY, (horizon.strftime('%Y-%m-%d %H:%M:%S'),))
+        for row in rows:
+            self.timer.push(row['id'], due_timestamp(row['scheduled_time']))
     
-    async def _get_due_posts(self) -> List[Dict]:
-        """Get posts that are due for publishing"""
+    async def schedule_campaign(self, campaign_id: str):
+        """Render the campaign's payload and queue its newly scheduled posts that fall before the next sweep"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            cursor.execute("""
-                SELECT cp.*, c.ad_content, c.user_id, 
-                       COALESCE(c.content_type, 'text') as content_type, 
-                       c.media_url, c.campaign_metadata
-                FROM campaign_posts cp
-                JOIN campaigns c ON cp.campaign_id = c.campaign_id
-                WHERE cp.status = 'scheduled' 
-                AND cp.scheduled_time <= ?
-                ORDER BY cp.scheduled_time ASC
-                LIMIT 10
-            """, (current_time,))
-            
-            posts = []
-            for row in cursor.fetchall():
-                posts.append(dict(row))
-            
-            conn.close()
-            return posts
-            
+            await self.payloads.get(campaign_id)
         except Exception as e:
-            logger.error(f"❌ Error getting due posts: {e}")
-            return []
+            logger.error(f"❌ Error rendering payload for campaign {campaign_id}: {e}")
+        horizon = datetime.now() + timedelta(seconds=self.sweep_interval * 2)
+        rows = await self.data.fetchall(CAMPAIGN_DUE_POSTS_QUERY,
+                                        (campaign_id, horizon.strftime('%Y-%m-%d %H:%M:%S')))
+        for row in rows:
+            self.timer.push(row['id'], due_timestamp(row['scheduled_time']))
+        if rows:
+            logger.info(f"⏰ Queued {len(rows)} posts for campaign {campaign_id}")
+        return len(rows)
+    
+    async def _publish_due(self, post_ids: List[int]):
+        """Claim and publish the posts the timer fired (another worker may win some of them)"""
+        claimed = []
+        for start in range(0, len(post_ids), 500):
+            claimed += await claim_posts(self.data, post_ids[start:start + 500], self.worker_id)
+        await self._publish_claimed(claimed)
+    
+    async def _publish_claimed(self, post_ids: List[int]) -> int:
+        """Publish posts this worker holds the lease on"""
+        rows = []
+        for start in range(0, len(post_ids), 500):
+            chunk = post_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            # Only the claimed rows; everything about the campaign comes from its rendered payload
+            rows += await self.data.fetchall(f"""
+                SELECT * FROM campaign_posts
+                WHERE id IN ({placeholders}) AND status = 'claimed' AND lease_owner = ?
+                ORDER BY scheduled_time ASC
+            """, (*chunk, self.worker_id))
+        
+        payloads = {}
+        for campaign_id in {row['campaign_id'] for row in rows}:
+            try:
+                payloads[campaign_id] = await self.payloads.get(campaign_id)
+            except Exception as e:
+                logger.error(f"❌ Error loading payload for campaign {campaign_id}: {e}")
+        due_posts = []
+        for row in rows:
+            payload = payloads.get(row['campaign_id'])
+            if payload is None:
+                continue
+            # Campaign values replace campaign_posts' own (usually empty) user_id/content_type/media_url
+            due_posts.append({**row, 'payload': payload, 'user_id': payload.user_id,
+                              'ad_content': payload.text, 'content_type': payload.content_type,
+                              'media_url': payload.media_url})
+        return await self._publish_posts(due_posts)
+    
+    async def _publish_posts(self, due_posts: List[Dict]) -> int:
+        """Publish due posts concurrently, each channel within its rate limit; returns posts published"""
+        if not due_posts:
+            return 0
+        logger.info(f"📋 Processing {len(due_posts)} due posts")
+        
+        # Track publishing started once per campaign in the batch
+        campaigns = {}
+        for post in due_posts:
+            campaigns.setdefault(post['campaign_id'], post['user_id'])
+        for campaign_id, user_id in campaigns.items():
+            try:
+                await track_publishing_started(user_id, campaign_id)
+            except Exception as e:
+                logger.error(f"Error tracking publishing started: {e}")
+        
+        # Rate limits can stretch a large batch past the lease, so keep renewing it until the results are written
+        renewer = asyncio.create_task(self._renew_leases())
+        try:
+            results = await self.engine.run(due_posts, self._publish_campaign_post,
+                                            chat_of=lambda post: post['channel_id'])
+            await self.batch.flush()
+        finally:
+            renewer.cancel()
+        
+        # Digests whose window has passed (every batch, when the window is 0)
+        await self.notifier.flush(due_only=True)
+        
+        # Check every campaign in the batch: its last post may have been dead-lettered rather than published
+        for campaign_id, user_id in campaigns.items():
+            await self._check_campaign_completion(campaign_id, user_id)
+        return sum(results)
+    
+    async def _renew_leases(self):
+        """Extend this worker's leases every third of the lease time while a batch runs"""
+        while True:
+            await asyncio.sleep(PUBLISH_LEASE_SECONDS / 3)
+            try:
+                renewed = await renew_leases(self.data, self.worker_id)
+                logger.debug(f"⏳ Renewed {renewed} publisher leases")
+            except Exception as e:
+                logger.error(f"❌ Error renewing publisher leases: {e}")
     
     async def _publish_campaign_post(self, post_data: Dict):
         """Publish the single post for a campaign with full identity tracking"""
@@ -133,30 +248,28 @@ class EnhancedCampaignPublisher:
             campaign_id = post_data['campaign_id']
             channel_id = post_data['channel_id']
             user_id = post_data['user_id']
-            post_id = post_data['id']
+            payload = post_data['payload']
             
-            # Get or create THE post identity for this campaign (one-to-one)
-            post_identity_id = await self._ensure_campaign_post_identity(post_data)
+            # THE post identity for this campaign (one-to-one), rendered into its payload
+            post_identity_id = payload.post_identity_id
             
             if not post_identity_id:
-                logger.error(f"❌ Failed to create post identity for campaign {campaign_id}")
-                return False
+                raise UnpublishableError(f"No post identity for campaign {campaign_id}")
             
             # ENHANCED: Get content directly from current campaign with integrity verification
-            content_to_publish = post_data['ad_content']
-            media_url = post_data.get('media_url')
-            content_type = post_data.get('content_type', 'text')
+            content_to_publish = payload.text
+            media_url = payload.media_url
+            content_type = payload.content_type
+            
+            # Verify we have the correct content
+            if not content_to_publish:
+                raise UnpublishableError(f"No content found for campaign {campaign_id}")
             
             logger.info(f"🎯 CONTENT VERIFICATION - Using content directly from campaign {campaign_id}")
             logger.info(f"   Campaign content: {content_to_publish[:100]}...")
             logger.info(f"   Media URL: {media_url}")
             logger.info(f"   Content Type: {content_type}")
             
-            # Verify we have the correct content
-            if not content_to_publish:
-                logger.error(f"❌ No content found for campaign {campaign_id}")
-                return False
-            
             # TEMPORARILY BYPASS content integrity verification
             logger.info(f"✅ Content integrity bypassed for campaign {campaign_id} (temporary fix)")
             content_verified = True
@@ -165,90 +278,39 @@ class EnhancedCampaignPublisher:
             logger.info(f"   Content: {content_to_publish[:50]}...")
             logger.info(f"   Type: {content_type}")
             
-            # Publish based on content type with enhanced media handling
-            message = None
+            # Publish based on content type: text, one photo/video, or an album of the stored media
+            media = payload.media
             
-            logger.info(f"🎬 Publishing content type '{content_type}' with media: {bool(media_url)}")
+            logger.info(f"🎬 Publishing content type '{content_type}' with {len(media)} media to {channel_id}")
             
-            if content_type in ['photo', 'image', 'text+photo', 'text+image'] and media_url:
-                logger.info(f"📸 Publishing photo to {channel_id}")
-                message = await self.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=media_url,
-                    caption=content_to_publish
-                )
-            elif content_type in ['video', 'text+video'] and media_url:
-                logger.info(f"🎥 Publishing video to {channel_id}")
-                message = await self.bot.send_video(
-                    chat_id=channel_id,
-                    video=media_url,
-                    caption=content_to_publish
-                )
-            elif content_type in ['image_only', 'photo_only'] and media_url:
-                logger.info(f"📸 Publishing image only to {channel_id}")
-                message = await self.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=media_url
-                )
-            elif content_type in ['video_only'] and media_url:
-                logger.info(f"🎥 Publishing video only to {channel_id}")
-                message = await self.bot.send_video(
-                    chat_id=channel_id,
-                    video=media_url
-                )
-            else:
-                # Text only or fallback
-                logger.info(f"💬 Publishing text only to {channel_id}")
-                message = await self.bot.send_message(
-                    chat_id=channel_id,
-                    text=content_to_publish
-                )
+            message = await send_campaign_content(
+                self.bot, channel_id, content_to_publish, content_type, media, self.file_ids,
+                parse_mode=payload.parse_mode, reply_markup=payload.reply_markup()
+            )
             
             if message:
-                # Log the publication with content verification
+                # Publication log, post status and channel log are written with the batch
                 channel_name = await self._get_channel_name(channel_id)
-                
-                await log_publication(
-                    post_identity_id,
-                    channel_id,
-                    channel_name,
-                    message.message_id,
-                    content_to_publish
+                await self.batch.published(
+                    post_data, post_identity_id, channel_name,
+                    message.message_id, content_to_publish
                 )
                 
-                # Mark original post as published
-                await self._mark_post_published(post_id)
-                
                 logger.info(f"✅ Successfully published {post_identity_id} to {channel_id}")
                 
-                # Log per-channel publishing success
-                await self._log_channel_publishing_success(
-                    campaign_id, channel_id, message.message_id, 
-                    content_type, media_url
-                )
-                
-                # Send notification to user about successful publishing
-                await self._send_publishing_notification(
-                    user_id, campaign_id, channel_id, post_identity_id
-                )
+                # Counted into the advertiser's next digest
+                self.notifier.published(user_id, campaign_id, channel_id)
                 
                 return True
             else:
-                logger.error(f"❌ Failed to publish {post_identity_id} to {channel_id}")
-                
-                # Log per-channel publishing failure
-                await self._log_channel_publishing_failure(
-                    campaign_id, channel_id, content_type, "No message returned"
-                )
-                
-                return False
+                raise NoMessageError(f"No message returned publishing {post_identity_id} to {channel_id}")
                 
         except Exception as e:
             logger.error(f"❌ Error publishing post with identity: {e}")
-            await self._mark_post_failed(post_data['id'], str(e))
+            await self._handle_publish_failure(post_data, e)
             
             # Log per-channel publishing failure
-            await self._log_channel_publishing_failure(
+            await self.batch.failed(
                 post_data['campaign_id'], 
                 post_data['channel_id'], 
                 post_data.get('content_type', 'unknown'), 
@@ -257,6 +319,32 @@ class EnhancedCampaignPublisher:
             
             return False
     
+    async def _handle_publish_failure(self, post_data: Dict, error: Exception):
+        """Retry flood waits and transient errors; dead-letter everything else"""
+        post_id = post_data['id']
+        channel_id = post_data['channel_id']
+        failure = classify_failure(error, post_data.get('attempts') or 0)
+        try:
+            if failure.retry:
+                if failure.kind == FLOOD:
+                    # Honour retry_after exactly, for every post queued to this chat
+                    self.engine.limiter.pause(channel_id, failure.delay)
+                due = await schedule_retry(self.data, post_id, failure, self.worker_id)
+                if due is None:
+                    return
+                self.timer.push(post_id, due.timestamp())
+                logger.info(f"🔁 Post {post_id} to {channel_id} retries in {failure.delay:.1f}s ({failure.kind})")
+                return
+            if failure.kind == CHAT_GONE:
+                logger.warning(f"🚫 Deactivating channel {channel_id}: {failure.error}")
+                await self.db.deactivate_channel(channel_id)
+            if await dead_letter(self.data, post_data, failure, self.worker_id) is None:
+                return
+            await self.notifier.post_failed(post_data['user_id'], post_data['campaign_id'], channel_id)
+        except Exception as e:
+            logger.error(f"❌ Error handling publish failure for post {post_id}: {e}")
+            await self._mark_post_failed(post_id, str(error))
+    
     async def _ensure_campaign_post_identity(self, post_data: Dict) -> Optional[str]:
         """Ensure campaign has its single post identity (one-to-one relationship)"""
         try:
@@ -304,20 +392,12 @@ class EnhancedCampaignPublisher:
     async def _find_post_identity_by_campaign_and_content(self, campaign_id: str, content: str) -> Optional[str]:
         """Find existing post identity by campaign and content"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            return await self.data.fetchval("""
                 SELECT post_id FROM post_identity 
                 WHERE campaign_id = ? AND content_text = ?
                 LIMIT 1
             """, (campaign_id, content))
             
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result else None
-            
         except Exception as e:
             logger.error(f"❌ Error finding post identity: {e}")
             return None
@@ -325,27 +405,23 @@ class EnhancedCampaignPublisher:
     async def _check_campaign_completion(self, campaign_id: str, user_id: int):
         """Check if campaign is complete and trigger final confirmation"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get campaign post statistics
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_posts,
-                    COUNT(CASE WHEN status = 'published' THEN 1 END) as published_posts,
-                    COUNT(CASE WHEN status = 'failed' THEN 1 END) as failed_posts,
-                    COUNT(CASE WHEN status = 'scheduled' THEN 1 END) as scheduled_posts
-                FROM campaign_posts
+            # Per-campaign counters, kept current by triggers on campaign_posts
+            stats = await self.data.fetchone("""
+                SELECT total as total_posts, published as published_posts,
+                       failed as failed_posts, pending as scheduled_posts
+                FROM campaign_post_counts
                 WHERE campaign_id = ?
             """, (campaign_id,))
             
-            stats = cursor.fetchone()
-            
             if stats:
-                total_posts, published_posts, failed_posts, scheduled_posts = stats
+                total_posts = stats['total_posts']
+                published_posts = stats['published_posts']
+                failed_posts = stats['failed_posts']
+                scheduled_posts = stats['scheduled_posts']
                 
                 # Check if all posts are completed (published or failed)
-                if scheduled_posts == 0 and total_posts > 0:
+                if scheduled_posts == 0 and total_posts > 0 and \
+                        not await has_pending_occurrences(self.data, campaign_id):
                     logger.info(f"✅ Campaign {campaign_id} completed: {published_posts} published, {failed_posts} failed")
                     
                     # Track publishing completion
@@ -355,16 +431,17 @@ class EnhancedCampaignPublisher:
                         logger.error(f"Error tracking publishing complete: {e}")
                     
                     # Update campaign status
-                    cursor.execute("""
+                    result = await self.data.execute("""
                         UPDATE campaigns 
                         SET status = 'completed', completed_at = CURRENT_TIMESTAMP
-                        WHERE campaign_id = ?
+                        WHERE campaign_id = ? AND status != 'completed'
                     """, (campaign_id,))
-                    conn.commit()
+                    
+                    # Completion goes out right away, after any digest still pending
+                    if result.rowcount:
+                        await self.notifier.campaign_completed(user_id, campaign_id, published_posts, failed_posts)
                     
                     logger.info(f"🎉 Campaign {campaign_id} marked as completed and final confirmation sent")
-                
-            conn.close()
             
         except Exception as e:
             logger.error(f"❌ Error checking campaign completion: {e}")
@@ -372,14 +449,9 @@ class EnhancedCampaignPublisher:
     async def _get_user_username(self, user_id: int) -> str:
         """Get user username for post identity"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            username = await self.data.fetchval("SELECT username FROM users WHERE user_id = ?", (user_id,))
             
-            cursor.execute("SELECT username FROM users WHERE user_id = ?", (user_id,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result[0] if result and result[0] else f"user_{user_id}"
+            return username or f"user_{user_id}"
             
         except Exception as e:
             logger.error(f"❌ Error getting username: {e}")
@@ -388,18 +460,11 @@ class EnhancedCampaignPublisher:
     async def _get_campaign_details(self, campaign_id: str) -> Dict[str, Any]:
         """Get campaign details for post identity"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            row = await self.data.fetchone("""
                 SELECT duration_days, posts_per_day, selected_channels, total_reach
                 FROM campaigns WHERE campaign_id = ?
             """, (campaign_id,))
             
-            row = cursor.fetchone()
-            conn.close()
-            
             if row:
                 return {
                     'duration_days': row['duration_days'],
@@ -415,171 +480,33 @@ class EnhancedCampaignPublisher:
             return {}
     
     async def _get_channel_name(self, channel_id: str) -> str:
-        """Get channel name for logging"""
-        try:
-            chat = await self.bot.get_chat(channel_id)
-            return chat.title or channel_id
-        except:
-            return channel_id
-    
-    async def _mark_post_published(self, post_id: int):
-        """Mark post as published in database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE campaign_posts 
-                SET status = 'published', published_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (post_id,))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"❌ Error marking post published: {e}")
+        """Get channel name for logging (looked up once per channel)"""
+        name = self._channel_names.get(channel_id)
+        if name is None:
+            try:
+                chat = await self.bot.get_chat(channel_id)
+                name = chat.title or channel_id
+            except:
+                return channel_id
+            self._channel_names[channel_id] = name
+        return name
     
     async def _mark_post_failed(self, post_id: int, error_message: str):
         """Mark post as failed"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            await self.db.queue_write(f"""
                 UPDATE campaign_posts 
-                SET status = 'failed', error_message = ?
-                WHERE id = ?
-            """, (error_message, post_id))
-            
-            conn.commit()
-            conn.close()
+                SET status = 'failed', error_message = ?, {CLEAR_LEASE}
+                WHERE id = ? AND {HOLDS_LEASE}
+            """, (error_message, post_id, self.worker_id))
             
         except Exception as e:
             logger.error(f"❌ Error marking post failed: {e}")
     
-    async def _send_publishing_notification(self, user_id: int, campaign_id: str, channel_id: str, post_identity: str):
-        """Send publishing notification to user"""
-        try:
-            from database import Database
-            from comprehensive_bug_fixes import get_publishing_notification
-            
-            db = Database()
-            user = await db.get_user(user_id)
-            language = user.get('language', 'en') if user else 'en'
-            
-            # Get channel name
-            try:
-                chat = await self.bot.get_chat(channel_id)
-                channel_name = f"@{chat.username}" if chat.username else chat.title
-            except:
-                channel_name = channel_id
-            
-            # Get campaign stats
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 
-                    COUNT(CASE WHEN cp.status = 'published' THEN 1 END) as published,
-                    COUNT(CASE WHEN cp.status = 'scheduled' THEN 1 END) as remaining,
-                    (julianday(c.end_date) - julianday('now')) as days_remaining
-                FROM campaign_posts cp
-                JOIN campaigns c ON cp.campaign_id = c.campaign_id
-                WHERE cp.campaign_id = ?
-            """, (campaign_id,))
-            
-            stats = cursor.fetchone()
-            conn.close()
-            
-            if stats:
-                published, remaining, days_remaining = stats
-                post_number = published
-                total_posts = published + remaining
-                days_remaining = int(days_remaining) if days_remaining and days_remaining > 0 else 0
-                
-                # Get notification message
-                notification = get_publishing_notification(
-                    campaign_id, channel_name, post_number, 
-                    total_posts, days_remaining, language
-                )
-                
-                await self.bot.send_message(user_id, notification, parse_mode='Markdown')
-                logger.info(f"✅ Sent publishing notification to user {user_id}")
-            
-        except Exception as e:
-            logger.error(f"❌ Error sending publishing notification: {e}")
-    
-    async def _log_channel_publishing_success(self, campaign_id: str, channel_id: str, message_id: int, content_type: str, media_url: str = None):
-        """Log successful channel publishing"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS channel_publishing_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    campaign_id TEXT NOT NULL,
-                    channel_id TEXT NOT NULL,
-                    message_id INTEGER,
-                    content_type TEXT,
-                    media_url TEXT,
-                    status TEXT DEFAULT 'success',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Log the success
-            cursor.execute("""
-                INSERT INTO channel_publishing_logs 
-                (campaign_id, channel_id, message_id, content_type, media_url, status)
-                VALUES (?, ?, ?, ?, ?, 'success')
-            """, (campaign_id, channel_id, message_id, content_type, media_url))
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"✅ Logged successful publishing to {channel_id} for campaign {campaign_id}")
-            
-        except Exception as e:
-            logger.error(f"❌ Error logging channel publishing success: {e}")
-    
-    async def _log_channel_publishing_failure(self, campaign_id: str, channel_id: str, content_type: str, error_message: str):
-        """Log failed channel publishing"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS channel_publishing_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    campaign_id TEXT NOT NULL,
-                    channel_id TEXT NOT NULL,
-                    message_id INTEGER,
-                    content_type TEXT,
-                    media_url TEXT,
-                    status TEXT DEFAULT 'success',
-                    error_message TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Log the failure
-            cursor.execute("""
-                INSERT INTO channel_publishing_logs 
-                (campaign_id, channel_id, content_type, status, error_message)
-                VALUES (?, ?, ?, 'failed', ?)
-            """, (campaign_id, channel_id, content_type, error_message))
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"❌ Logged failed publishing to {channel_id} for campaign {campaign_id}: {error_message}")
-            
-        except Exception as e:
-            logger.error(f"❌ Error logging channel publishing failure: {e}")
+    async def _user_language(self, user_id: int) -> str:
+        """Language for the advertiser's notifications"""
+        user = await self.db.get_user(user_id)
+        return user.get('language', 'en') if user else 'en'
     
     async def verify_campaign_content_integrity(self, campaign_id: str) -> Dict[str, Any]:
         """Verify content integrity for a campaign"""
@@ -590,22 +517,15 @@ class EnhancedCampaignPublisher:
         try:
             logger.info(f"🔄 Republishing campaign {campaign_id} with verified content")
             
-            # Get all posts for campaign
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Reset failed posts to scheduled for republishing
-            cursor.execute("""
+            await self.data.execute("""
                 UPDATE campaign_posts 
                 SET status = 'scheduled', scheduled_time = CURRENT_TIMESTAMP
                 WHERE campaign_id = ? AND status = 'failed'
             """, (campaign_id,))
             
-            conn.commit()
-            conn.close()
-            
-            # Process the republishing
-            await self._process_due_posts()
+            # Hand the reset posts to the timer; the publishing loop fires them right away
+            await self.schedule_campaign(campaign_id)
             
             logger.info(f"✅ Republishing completed for campaign {campaign_id}")
             return True
@@ -617,8 +537,8 @@ class EnhancedCampaignPublisher:
 # Global enhanced publisher instance
 enhanced_publisher = None
 
-async def init_enhanced_campaign_publisher(bot_instance):
-    """Initialize enhanced campaign publisher"""
+async def init_enhanced_campaign_publisher(bot_instance, sweep_interval: Optional[float] = None):
+    """Initialize enhanced campaign publisher (``sweep_interval`` overrides PUBLISHER_SWEEP_SECONDS)"""
     global enhanced_publisher
     
     try:
@@ -628,6 +548,8 @@ async def init_enhanced_campaign_publisher(bot_instance):
         
         # Create enhanced publisher
         enhanced_publisher = EnhancedCampaignPublisher(bot_instance)
+        if sweep_interval is not None:
+            enhanced_publisher.sweep_interval = sweep_interval
         
         # Start it
         await enhanced_publisher.start()
@@ -643,6 +565,12 @@ async def get_enhanced_publisher():
     """Get enhanced publisher instance"""
     return enhanced_publisher
 
+async def notify_posts_scheduled(campaign_id: str) -> int:
+    """Tell the running publisher about a campaign's new posts (no-op when it is not running)"""
+    if enhanced_publisher is None or not enhanced_publisher.running:
+        return 0
+    return await enhanced_publisher.schedule_campaign(campaign_id)
+
 if __name__ == "__main__":
     async def test_enhanced_publisher():
         # Test initialization
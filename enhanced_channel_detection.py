@@ -291,11 +291,9 @@ Please ensure the bot has "Post Messages" permission in this channel to enable a
                 if str(chat_id) == str(channel.get('telegram_channel_id', '')) or \
                    str(chat_id) == str(channel.get('channel_id', '')):
                     
-                    # Mark as inactive
-                    await db.execute(
-                        "UPDATE channels SET is_active = 0, last_updated = CURRENT_TIMESTAMP WHERE channel_id = ?",
-                        (channel['channel_id'],)
-                    )
+                    # Mark as inactive (Database drops its cached channel lists)
+                    if not await db.deactivate_channel(channel['channel_id']):
+                        return False
                     
                     logger.info(f"✅ Marked channel {channel.get('name', 'Unknown')} as inactive")
                     
@@ -4,14 +4,14 @@ Enhanced TON Payment Monitoring System
 Comprehensive fix for automatic payment verification issues
 """
 
-import asyncio
 import time
-import requests
 import json
 import logging
 from typing import Optional, Dict, Any, List
 from aiogram.fsm.context import FSMContext
 
+from ton_http import get_ton_http_client
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
@@ -61,52 +61,39 @@ class EnhancedTONPaymentMonitor:
             
         return formats
     
-    async def get_transactions_toncenter(self, bot_wallet: str, limit: int = 100) -> Optional[Dict]:
-        """Get transactions using TON Center API"""
-        try:
-            url = f"https://toncenter.com/api/v2/getTransactions?address={bot_wallet}&limit={limit}&archival=true"
-            logger.debug(f"Calling TON Center API: {url}")
-            
-            response = requests.get(url, timeout=self.request_timeout)
-            logger.debug(f"TON Center API response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('ok'):
-                    logger.debug(f"TON Center API success: {len(data.get('result', []))} transactions")
-                    return data
-                else:
-                    logger.warning(f"TON Center API returned error: {data}")
-            else:
-                logger.warning(f"TON Center API request failed with status {response.status_code}")
-                
-        except Exception as e:
-            logger.error(f"Error calling TON Center API: {e}")
-            
+    async def get_transactions_toncenter(self, bot_wallet: str, limit: int = 100, lt: Optional[int] = None,
+                                         tx_hash: Optional[str] = None, to_lt: Optional[int] = None) -> Optional[Dict]:
+        """Get transactions using TON Center API (from ``lt``/``tx_hash`` back to ``to_lt``)"""
+        params = {'address': bot_wallet, 'limit': limit, 'archival': 'true', 'to_lt': to_lt or None}
+        if lt and tx_hash:
+            params.update(lt=lt, hash=tx_hash)
+        logger.debug(f"Calling TON Center API: {params}")
+        
+        data = await get_ton_http_client().get_json('toncenter', '/getTransactions', params)
+        if data is None:
+            return None
+        if data.get('ok'):
+            logger.debug(f"TON Center API success: {len(data.get('result', []))} transactions")
+            return data
+        logger.warning(f"TON Center API returned error: {data}")
         return None
     
-    async def get_transactions_tonapi(self, bot_wallet: str, limit: int = 100) -> Optional[Dict]:
-        """Get transactions using TON API"""
-        try:
-            url = f"https://tonapi.io/v2/blockchain/accounts/{bot_wallet}/transactions?limit={limit}"
-            
-            headers = {
-                'Accept': 'application/json',
-                'User-Agent': 'I3lani-Bot/1.0'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=self.request_timeout)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data
-            else:
-                logger.warning(f"TON API request failed with status {response.status_code}")
-                
-        except Exception as e:
-            logger.error(f"Error calling TON API: {e}")
-            
-        return None
+    async def get_transactions_tonapi(self, bot_wallet: str, limit: int = 100, before_lt: Optional[int] = None,
+                                      after_lt: Optional[int] = None) -> Optional[Dict]:
+        """Get transactions using TON API (older than ``before_lt``, newer than ``after_lt``)"""
+        params = {'limit': limit, 'before_lt': before_lt or None, 'after_lt': after_lt or None}
+        return await get_ton_http_client().get_json('tonapi', f'/blockchain/accounts/{bot_wallet}/transactions',
+                                                    params)
+    
+    async def get_transactions(self, bot_wallet: str, limit: int = 100, before: Optional[tuple] = None,
+                               since_lt: Optional[int] = None) -> Optional[Dict]:
+        """One page from TON Center, hedged with TON API when TON Center is slow or failing"""
+        return await get_ton_http_client().hedged(
+            lambda: self.get_transactions_toncenter(bot_wallet, limit, lt=before[0] if before else None,
+                                                    tx_hash=before[1] if before else None, to_lt=since_lt),
+            lambda: self.get_transactions_tonapi(bot_wallet, limit, before_lt=before[0] if before else None,
+                                                 after_lt=since_lt),
+            'toncenter')
     
     def extract_memo_from_transaction(self, tx: Dict) -> Optional[str]:
         """Extract memo from transaction with multiple fallback methods"""
@@ -130,6 +117,11 @@ class EnhancedTONPaymentMonitor:
                     msg_data = in_msg['msg_data']
                     if isinstance(msg_data, dict) and 'text' in msg_data:
                         memo = msg_data['text']
+                
+                # TON API v2 text comment
+                elif isinstance(in_msg.get('decoded_body'), dict):
+                    decoded = in_msg['decoded_body']
+                    memo = decoded.get('text') or decoded.get('comment')
             
             # Method 2: TON API format
             elif tx.get('in_msg') and tx['in_msg'].get('decoded_body'):
@@ -176,7 +168,9 @@ class EnhancedTONPaymentMonitor:
         try:
             # Method 1: TON Center API format
             if tx.get('in_msg') and 'source' in tx['in_msg']:
-                return tx['in_msg']['source']
+                source = tx['in_msg']['source']
+                # TON API v2 wraps the address in an account object
+                return source.get('address') if isinstance(source, dict) else source
             
             # Method 2: TON API format
             elif tx.get('in_msg') and 'sender' in tx['in_msg']:
@@ -191,12 +185,110 @@ class EnhancedTONPaymentMonitor:
             
         return None
     
+    async def handle_memo_transaction(self, tx: Dict, user_id: int, memo: str, amount_ton: float,
+                                      user_wallet_formats: List[str], state: FSMContext) -> Optional[bool]:
+        """Validate a transaction carrying the checkout's memo: True paid, False rejected, None keep waiting"""
+        # Extract amount
+        tx_amount = self.extract_amount_from_transaction(tx)
+        if not tx_amount:
+            return None
+
+        # CRITICAL: Validate payment amount with protocol enforcement
+        try:
+            from payment_amount_validator import validate_payment_amount
+            from main_bot import bot_instance
+
+            if bot_instance:
+                validation_result = await validate_payment_amount(
+                    bot_instance, user_id, memo, tx_amount, amount_ton
+                )
+
+                if validation_result['valid']:
+                    # Extract sender for logging
+                    sender = self.extract_sender_from_transaction(tx)
+
+                    # FLEXIBLE VERIFICATION: Focus on memo + amount only
+                    # Sender verification is now optional for better compatibility
+                    sender_matches = False
+                    if sender:
+                        for user_format in user_wallet_formats:
+                            if sender == user_format:
+                                sender_matches = True
+                                break
+
+                    if sender_matches:
+                        logger.info(f"✅ Payment verified with sender match: {memo} for {amount_ton} TON from {sender}")
+                    else:
+                        logger.warning(f"⚠️ Payment found but sender mismatch: expected {user_wallet_formats}, got {sender}")
+                        logger.info(f"✅ Payment verified by memo+amount: {memo} for {amount_ton} TON from {sender}")
+
+                    logger.info(f"Transaction amount: {tx_amount} TON")
+
+                    # Handle successful payment - Accept payment based on memo + amount
+                    from handlers import handle_successful_ton_payment_with_confirmation
+                    await handle_successful_ton_payment_with_confirmation(user_id, memo, amount_ton, state)
+                    return True
+                else:
+                    # Handle invalid payment amount
+                    logger.warning(f"⚠️ Payment amount validation failed: {validation_result['status']}")
+                    logger.warning(f"   Expected: {amount_ton} TON")
+                    logger.warning(f"   Received: {tx_amount} TON")
+                    logger.warning(f"   Difference: {validation_result['difference']} TON")
+
+                    # Send appropriate message to user
+                    try:
+                        from payment_amount_validator import handle_invalid_payment_amount
+                        await handle_invalid_payment_amount(
+                            bot_instance, user_id, memo, validation_result, 
+                            tx_amount, amount_ton
+                        )
+                        logger.info(f"📩 Invalid payment notification sent to user {user_id}")
+                    except Exception as e:
+                        logger.error(f"❌ Error handling invalid payment: {e}")
+
+                    # Return False to stop monitoring (payment found but invalid)
+                    return False
+            else:
+                # Fallback to old validation if bot instance not available
+                amount_tolerance = 0.01  # 0.01 TON tolerance for fallback
+                if abs(tx_amount - amount_ton) <= amount_tolerance:
+                    # Extract sender for logging
+                    sender = self.extract_sender_from_transaction(tx)
+
+                    logger.info(f"✅ Payment verified (fallback): {memo} for {amount_ton} TON from {sender}")
+
+                    # Handle successful payment - Accept payment based on memo + amount
+                    from handlers import handle_successful_ton_payment_with_confirmation
+                    await handle_successful_ton_payment_with_confirmation(user_id, memo, amount_ton, state)
+                    return True
+                else:
+                    logger.warning(f"⚠️ Amount mismatch (fallback): expected {amount_ton}, got {tx_amount}")
+
+        except Exception as e:
+            logger.error(f"❌ Error in payment validation: {e}")
+            # Continue with fallback validation
+            amount_tolerance = 0.01  # 0.01 TON tolerance for fallback
+            if abs(tx_amount - amount_ton) <= amount_tolerance:
+                # Extract sender for logging
+                sender = self.extract_sender_from_transaction(tx)
+
+                logger.info(f"✅ Payment verified (fallback): {memo} for {amount_ton} TON from {sender}")
+
+                # Handle successful payment - Accept payment based on memo + amount
+                from handlers import handle_successful_ton_payment_with_confirmation
+                await handle_successful_ton_payment_with_confirmation(user_id, memo, amount_ton, state)
+                return True
+            else:
+                logger.warning(f"⚠️ Amount mismatch (fallback): expected {amount_ton}, got {tx_amount}")
+        return None
+
     async def monitor_payment_enhanced(self, user_id: int, memo: str, amount_ton: float, 
                                      expiration_time: int, user_wallet: str, state: FSMContext,
                                      bot_wallet: str) -> bool:
-        """Enhanced payment monitoring with multiple API endpoints and robust error handling"""
+        """Wait for the checkout's memo on the shared wallet ingestion and validate the payment"""
+        from ton_ingestion import get_ingestor
         
-        check_interval = 30  # Check every 30 seconds
+        ingestor = get_ingestor(bot_wallet)
         user_wallet_formats = self.convert_address_formats(user_wallet)
         
         logger.info(f"Starting enhanced TON payment monitoring for user {user_id}")
@@ -205,146 +297,20 @@ class EnhancedTONPaymentMonitor:
         logger.info(f"User wallet formats: {user_wallet_formats}")
         logger.info(f"Monitoring for {int((expiration_time - time.time()) / 60)} minutes")
         
-        check_number = 0
+        tx = None
         while time.time() < expiration_time:
-            check_number += 1
-            remaining_minutes = int((expiration_time - time.time()) / 60)
-            logger.info(f"📡 Payment check #{check_number} - {remaining_minutes} minutes remaining")
+            # One poll of the wallet serves every waiting checkout
+            tx = await ingestor.wait_for_memo(memo, expiration_time - time.time(), skip=tx)
+            if tx is None:
+                break
+            logger.info(f"📡 Transaction with memo {memo} received for user {user_id}")
             try:
-                # Try TON Center API first
-                logger.debug(f"Attempting TON Center API call...")
-                transactions_data = await self.get_transactions_toncenter(bot_wallet)
-                
-                if not transactions_data:
-                    # Fallback to TON API
-                    logger.debug(f"TON Center failed, trying TON API...")
-                    transactions_data = await self.get_transactions_tonapi(bot_wallet)
-                
-                if not transactions_data:
-                    logger.warning(f"❌ Failed to get transactions from all APIs for check #{check_number}")
-                    await asyncio.sleep(check_interval)
-                    continue
-                
-                logger.debug(f"✅ Got transaction data from API")
-                
-                # Process transactions
-                transactions = transactions_data.get('result', []) or transactions_data.get('transactions', [])
-                
-                if not transactions:
-                    logger.debug(f"No transactions found for {bot_wallet}")
-                    await asyncio.sleep(check_interval)
-                    continue
-                
-                # Check each transaction
-                for tx in transactions:
-                    # Skip if not an incoming transaction
-                    if not tx.get('in_msg'):
-                        continue
-                    
-                    # Extract memo
-                    tx_memo = self.extract_memo_from_transaction(tx)
-                    if not tx_memo or tx_memo != memo:
-                        continue
-                    
-                    # Extract amount
-                    tx_amount = self.extract_amount_from_transaction(tx)
-                    if not tx_amount:
-                        continue
-                    
-                    # CRITICAL: Validate payment amount with protocol enforcement
-                    try:
-                        from payment_amount_validator import validate_payment_amount
-                        from main_bot import bot_instance
-                        
-                        if bot_instance:
-                            validation_result = await validate_payment_amount(
-                                bot_instance, user_id, memo, tx_amount, amount_ton
-                            )
-                            
-                            if validation_result['valid']:
-                                # Extract sender for logging
-                                sender = self.extract_sender_from_transaction(tx)
-                                
-                                # FLEXIBLE VERIFICATION: Focus on memo + amount only
-                                # Sender verification is now optional for better compatibility
-                                sender_matches = False
-                                if sender:
-                                    for user_format in user_wallet_formats:
-                                        if sender == user_format:
-                                            sender_matches = True
-                                            break
-                                
-                                if sender_matches:
-                                    logger.info(f"✅ Payment verified with sender match: {memo} for {amount_ton} TON from {sender}")
-                                else:
-                                    logger.warning(f"⚠️ Payment found but sender mismatch: expected {user_wallet_formats}, got {sender}")
-                                    logger.info(f"✅ Payment verified by memo+amount: {memo} for {amount_ton} TON from {sender}")
-                                
-                                logger.info(f"Transaction amount: {tx_amount} TON")
-                                
-                                # Handle successful payment - Accept payment based on memo + amount
-                                from handlers import handle_successful_ton_payment_with_confirmation
-                                await handle_successful_ton_payment_with_confirmation(user_id, memo, amount_ton, state)
-                                return True
-                            else:
-                                # Handle invalid payment amount
-                                logger.warning(f"⚠️ Payment amount validation failed: {validation_result['status']}")
-                                logger.warning(f"   Expected: {amount_ton} TON")
-                                logger.warning(f"   Received: {tx_amount} TON")
-                                logger.warning(f"   Difference: {validation_result['difference']} TON")
-                                
-                                # Send appropriate message to user
-                                try:
-                                    from payment_amount_validator import handle_invalid_payment_amount
-                                    await handle_invalid_payment_amount(
-                                        bot_instance, user_id, memo, validation_result, 
-                                        tx_amount, amount_ton
-                                    )
-                                    logger.info(f"📩 Invalid payment notification sent to user {user_id}")
-                                except Exception as e:
-                                    logger.error(f"❌ Error handling invalid payment: {e}")
-                                
-                                # Return False to stop monitoring (payment found but invalid)
-                                return False
-                        else:
-                            # Fallback to old validation if bot instance not available
-                            amount_tolerance = 0.01  # 0.01 TON tolerance for fallback
-                            if abs(tx_amount - amount_ton) <= amount_tolerance:
-                                # Extract sender for logging
-                                sender = self.extract_sender_from_transaction(tx)
-                                
-                                logger.info(f"✅ Payment verified (fallback): {memo} for {amount_ton} TON from {sender}")
-                                
-                                # Handle successful payment - Accept payment based on memo + amount
-                                from handlers import handle_successful_ton_payment_with_confirmation
-                                await handle_successful_ton_payment_with_confirmation(user_id, memo, amount_ton, state)
-                                return True
-                            else:
-                                logger.warning(f"⚠️ Amount mismatch (fallback): expected {amount_ton}, got {tx_amount}")
-                                
-                    except Exception as e:
-                        logger.error(f"❌ Error in payment validation: {e}")
-                        # Continue with fallback validation
-                        amount_tolerance = 0.01  # 0.01 TON tolerance for fallback
-                        if abs(tx_amount - amount_ton) <= amount_tolerance:
-                            # Extract sender for logging
-                            sender = self.extract_sender_from_transaction(tx)
-                            
-                            logger.info(f"✅ Payment verified (fallback): {memo} for {amount_ton} TON from {sender}")
-                            
-                            # Handle successful payment - Accept payment based on memo + amount
-                            from handlers import handle_successful_ton_payment_with_confirmation
-                            await handle_successful_ton_payment_with_confirmation(user_id, memo, amount_ton, state)
-                            return True
-                        else:
-                            logger.warning(f"⚠️ Amount mismatch (fallback): expected {amount_ton}, got {tx_amount}")
-                
-                # Wait before next check
-                await asyncio.sleep(check_interval)
-                
+                result = await self.handle_memo_transaction(tx, user_id, memo, amount_ton,
+                                                            user_wallet_formats, state)
+                if result is not None:
+                    return result
             except Exception as e:
                 logger.error(f"Error in payment monitoring loop: {e}")
-                await asyncio.sleep(check_interval)
         
         # Payment expired
         logger.warning(f"Payment expired for user {user_id}, memo: {memo}")
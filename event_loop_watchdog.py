@@ -0,0 +1,114 @@
+"""
+Event loop watchdog for I3lani Telegram Bot
+Debug aid that reports whenever the asyncio loop is blocked for longer than
+a threshold, together with the stack of the code that is blocking it
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopWatchdog:
+    """Heartbeat coroutine on the loop plus a monitor thread that watches it"""
+
+    def __init__(self, threshold_ms: float = 100.0, stack_limit: int = 12):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = max(self.threshold / 4, 0.005)
+        self.stack_limit = stack_limit
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_beat = time.monotonic()
+
+        self.stalls = 0
+        self.max_stall_ms = 0.0
+        self.last_stack: Optional[str] = None
+
+    def start(self):
+        """Start watching the running loop"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._monitor = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._monitor.start()
+        logger.info(f"🐶 Event loop watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop the heartbeat and monitor thread"""
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            lag = time.monotonic() - beat - self.interval
+            if lag < self.threshold:
+                continue
+            if reported_beat == beat:
+                # Same stall still in progress; only track how long it gets
+                self.max_stall_ms = max(self.max_stall_ms, lag * 1000)
+                continue
+            reported_beat = beat
+            self.stalls += 1
+            self.max_stall_ms = max(self.max_stall_ms, lag * 1000)
+            self.last_stack = self._capture_loop_stack()
+            logger.warning(
+                f"⚠️ Event loop blocked for {lag * 1000:.0f}ms+ (threshold "
+                f"{self.threshold * 1000:.0f}ms); blocking stack:\n{self.last_stack}"
+            )
+
+    def _capture_loop_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return "<loop thread not found>"
+        return "".join(traceback.format_stack(frame, limit=self.stack_limit))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Stall statistics"""
+        return {
+            'threshold_ms': self.threshold * 1000,
+            'stalls': self.stalls,
+            'max_stall_ms': round(self.max_stall_ms, 1),
+            'running': bool(self._heartbeat_task and not self._heartbeat_task.done()),
+        }
+
+
+_watchdog: Optional[EventLoopWatchdog] = None
+
+
+def start_loop_watchdog(threshold_ms: float) -> EventLoopWatchdog:
+    """Start the watchdog on the running loop and enable asyncio slow-callback logging"""
+    global _watchdog
+    loop = asyncio.get_running_loop()
+    loop.slow_callback_duration = threshold_ms / 1000.0
+    _watchdog = EventLoopWatchdog(threshold_ms)
+    _watchdog.start()
+    return _watchdog
+
+
+def get_loop_watchdog() -> Optional[EventLoopWatchdog]:
+    """Get the active watchdog, if debug watching is enabled"""
+    return _watchdog
@@ -0,0 +1,202 @@
+"""
+Fake Telegram Bot API server for I3lani Telegram Bot benchmarks
+A local aiohttp server that answers the Bot API methods the publisher uses,
+with configurable latency, per-chat and global flood limits (429 with
+retry_after, like Telegram) and a random flood rate. Runs on its own thread
+and event loop so it does not distort the measured bot's loop
+"""
+import asyncio
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SEND_METHODS = ('sendMessage', 'sendPhoto', 'sendVideo', 'sendMediaGroup')
+
+
+class FakeBotAPI:
+    """Bot API stand-in; point aiogram at ``base_url`` with a TelegramAPIServer"""
+
+    def __init__(self, latency_ms: float = 40.0, jitter_ms: float = 20.0,
+                 chat_limit_per_minute: int = 20, global_limit_per_second: int = 30,
+                 flood_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.chat_limit = chat_limit_per_minute
+        self.global_limit = global_limit_per_second
+        self.flood_rate = flood_rate
+        self.random = random.Random(seed)
+        self.base_url: Optional[str] = None
+
+        self._chat_sends: Dict[str, Deque[float]] = defaultdict(deque)
+        self._global_sends: Deque[float] = deque()
+        self._chat_ids: Dict[str, int] = {}
+        self._message_ids = 0
+        self._file_ids = 0
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._stats = {'requests': 0, 'sent': 0, 'rate_limited': 0, 'flooded': 0, 'errors': 0}
+        self._methods: Dict[str, int] = defaultdict(int)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serve on the running loop; returns the base URL"""
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}"
+        logger.info(f"🧪 Fake Bot API listening on {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self) -> str:
+        """Serve from a dedicated thread and loop; returns the base URL"""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="fake-bot-api", daemon=True)
+        self._thread.start()
+        started.wait(10)
+        return self.base_url
+
+    def stop_thread(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = dict(await request.post())
+        self._stats['requests'] += 1
+        self._methods[method] += 1
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+        try:
+            if method in SEND_METHODS:
+                retry_after = self._flood_check(str(params.get('chat_id')))
+                if retry_after:
+                    return self._error(429, f"Too Many Requests: retry after {retry_after}",
+                                       {'retry_after': retry_after})
+                self._stats['sent'] += 1
+            result = self._result(method, params)
+        except KeyError as e:
+            self._stats['errors'] += 1
+            return self._error(400, f"Bad Request: {e}")
+        if result is None:
+            self._stats['errors'] += 1
+            return self._error(404, "Not Found: method not found")
+        return web.json_response({'ok': True, 'result': result})
+
+    def _flood_check(self, chat_id: str) -> int:
+        """Seconds the caller must wait, or 0 when the send is accepted"""
+        now = time.monotonic()
+        if self.flood_rate and self.random.random() < self.flood_rate:
+            self._stats['flooded'] += 1
+            return 1
+        window = self._chat_sends[chat_id]
+        while window and now - window[0] >= 60:
+            window.popleft()
+        while self._global_sends and now - self._global_sends[0] >= 1:
+            self._global_sends.popleft()
+        # Private chats (advertiser notifications) are held to the global limit only
+        per_chat = chat_id.startswith('@') or chat_id.startswith('-')
+        if per_chat and self.chat_limit and len(window) >= self.chat_limit:
+            self._stats['rate_limited'] += 1
+            return max(1, math.ceil(60 - (now - window[0])))
+        if self.global_limit and len(self._global_sends) >= self.global_limit:
+            self._stats['rate_limited'] += 1
+            return 1
+        window.append(now)
+        self._global_sends.append(now)
+        return 0
+
+    def _error(self, code: int, description: str, parameters: Optional[Dict] = None) -> web.Response:
+        body = {'ok': False, 'error_code': code, 'description': description}
+        if parameters:
+            body['parameters'] = parameters
+        return web.json_response(body, status=code)
+
+    def _chat(self, chat_id: str) -> Dict[str, Any]:
+        if chat_id.lstrip('-').isdigit():
+            numeric = int(chat_id)
+            return {'id': numeric, 'type': 'private' if numeric > 0 else 'channel', 'first_name': 'User'}
+        numeric = self._chat_ids.setdefault(chat_id, -1001000000000 - len(self._chat_ids))
+        return {'id': numeric, 'type': 'channel', 'title': f"Channel {chat_id}", 'username': chat_id.lstrip('@')}
+
+    def _message(self, chat_id: str, **content) -> Dict[str, Any]:
+        self._message_ids += 1
+        return {'message_id': self._message_ids, 'date': int(time.time()), 'chat': self._chat(chat_id), **content}
+
+    def _file(self, ref: str) -> str:
+        """Uploads (URLs) get a new file_id; file_ids are sent back as they are"""
+        if ref.startswith(('http://', 'https://')):
+            self._file_ids += 1
+            return f"FAKE-FILE-{self._file_ids}"
+        return ref
+
+    def _photo(self, ref: str) -> Dict[str, Any]:
+        file_id = self._file(ref)
+        return {'photo': [{'file_id': file_id, 'file_unique_id': file_id, 'width': 1280, 'height': 720}]}
+
+    def _video(self, ref: str) -> Dict[str, Any]:
+        file_id = self._file(ref)
+        return {'video': {'file_id': file_id, 'file_unique_id': file_id, 'width': 1280, 'height': 720,
+                          'duration': 10}}
+
+    def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == 'getMe':
+            return {'id': 123456, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        if method == 'getChat':
+            return self._chat(str(params['chat_id']))
+        chat_id = str(params.get('chat_id'))
+        if method == 'sendMessage':
+            return self._message(chat_id, text=params['text'])
+        if method == 'sendPhoto':
+            return self._message(chat_id, caption=params.get('caption'), **self._photo(params['photo']))
+        if method == 'sendVideo':
+            return self._message(chat_id, caption=params.get('caption'), **self._video(params['video']))
+        if method == 'sendMediaGroup':
+            group = str(self._message_ids + 1)
+            return [
+                self._message(chat_id, media_group_id=group, caption=item.get('caption'),
+                              **(self._video if item['type'] == 'video' else self._photo)(item['media']))
+                for item in json.loads(params['media'])
+            ]
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['methods'] = dict(self._methods)
+        stats['chats'] = len(self._chat_sends)
+        return stats
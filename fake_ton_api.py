@@ -0,0 +1,314 @@
+"""
+Fake TON API server for I3lani Telegram Bot benchmarks
+A local aiohttp server that answers getTransactions for one wallet in both
+toncenter (/toncenter/getTransactions) and tonapi
+(/tonapi/blockchain/accounts/{account}/transactions) formats, from recorded
+pages and synthetic payments, with per-provider latency, random errors and
+a requests-per-second limit (429, like the real providers). Runs on its own
+thread and event loop like FakeBotAPI
+
+    python fake_ton_api.py --fixture recorded_page.json --port 8081
+    TONCENTER_URL=http://127.0.0.1:8081/toncenter TONAPI_URL=http://127.0.0.1:8081/tonapi python main_bot.py
+"""
+import argparse
+import asyncio
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ('toncenter', 'tonapi')
+DEFAULT_WALLET = "UQDZpONCwPqBcWezyEGK9ikCHMknoyTrBL-L2hATQbClmulB"
+FIRST_LT = 47000000000000
+
+
+@dataclass
+class ProviderProfile:
+    """How one provider behaves; change the fields while the server runs"""
+    latency_ms: float = 80.0
+    jitter_ms: float = 40.0
+    error_rate: float = 0.0
+    rate_limit_per_second: Optional[int] = None
+    _window: Deque[float] = field(default_factory=deque, repr=False)
+
+
+@dataclass
+class ChainTransaction:
+    """An incoming transfer to the wallet, independent of either API's format"""
+    lt: int
+    hash: str
+    utime: int
+    value: int
+    source: str
+    memo: Optional[str] = None
+    added_at: float = 0.0
+
+
+class FakeTONAPI:
+    """toncenter/tonapi stand-in; point TONHttpClient providers at ``base_url`` + '/toncenter' and '/tonapi'"""
+
+    def __init__(self, wallet: str = DEFAULT_WALLET, latency_ms: float = 80.0, jitter_ms: float = 40.0,
+                 error_rate: float = 0.0, rate_limit_per_second: Optional[int] = None,
+                 seed: Optional[int] = None):
+        self.wallet = wallet
+        self.random = random.Random(seed)
+        self.profiles = {name: ProviderProfile(latency_ms, jitter_ms, error_rate, rate_limit_per_second)
+                         for name in PROVIDERS}
+        self.base_url: Optional[str] = None
+
+        # Oldest first; the server thread reads while the caller's thread appends
+        self._chain: List[ChainTransaction] = []
+        self._lts: List[int] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._stats: Dict[str, Dict[str, int]] = {name: defaultdict(int) for name in PROVIDERS}
+
+    # ------------------------------------------------------------------
+    # The chain
+    # ------------------------------------------------------------------
+    def add_transaction(self, value_nano: int, memo: Optional[str] = None, source: Optional[str] = None,
+                        utime: Optional[int] = None, lt: Optional[int] = None,
+                        tx_hash: Optional[str] = None) -> ChainTransaction:
+        """Append an incoming transfer; it is visible to the next request"""
+        with self._lock:
+            if lt is None:
+                lt = (self._lts[-1] if self._lts else FIRST_LT) + self.random.randint(2, 9) * 1000
+            tx = ChainTransaction(
+                lt=lt, hash=tx_hash or hashlib.sha256(f"{self.wallet}:{lt}".encode()).hexdigest(),
+                utime=utime or int(time.time()), value=int(value_nano),
+                source=source or f"UQ-payer-{self.random.randrange(10 ** 6):06d}", memo=memo,
+                added_at=time.time())
+            position = bisect.bisect(self._lts, lt)
+            self._lts.insert(position, lt)
+            self._chain.insert(position, tx)
+        return tx
+
+    def add_payment(self, memo: Optional[str], amount_ton: float, source: Optional[str] = None) -> ChainTransaction:
+        """A synthetic TON payment carrying ``memo`` as its text comment"""
+        return self.add_transaction(int(round(amount_ton * 1e9)), memo, source)
+
+    def load_fixture(self, path: str) -> int:
+        """Add the transactions of a recorded page (a raw toncenter or tonapi response, or a list of either)"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return self.load_transactions(data)
+
+    def load_transactions(self, data: Any) -> int:
+        if isinstance(data, dict):
+            data = data.get('result') or data.get('transactions') or []
+        loaded = 0
+        for tx in data:
+            parsed = _from_toncenter(tx) if isinstance(tx.get('transaction_id'), dict) else _from_tonapi(tx)
+            if parsed is not None and parsed['lt'] not in self._lts:
+                self.add_transaction(**parsed)
+                loaded += 1
+        return loaded
+
+    def _page(self, newest_lt: Optional[int], oldest_lt: Optional[int], limit: int) -> List[ChainTransaction]:
+        """Up to ``limit`` transactions with oldest_lt < lt <= newest_lt, newest first"""
+        with self._lock:
+            end = len(self._lts) if newest_lt is None else bisect.bisect_right(self._lts, newest_lt)
+            start = 0 if oldest_lt is None else bisect.bisect_right(self._lts, oldest_lt)
+            return list(reversed(self._chain[max(start, end - limit):end]))
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serve on the running loop; returns the base URL"""
+        app = web.Application()
+        app.router.add_get('/toncenter/getTransactions', self._toncenter)
+        app.router.add_get('/tonapi/blockchain/accounts/{account}/transactions', self._tonapi)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}"
+        logger.info(f"🧪 Fake TON API listening on {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serve from a dedicated thread and loop; returns the base URL"""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start(host, port))
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="fake-ton-api", daemon=True)
+        self._thread.start()
+        started.wait(10)
+        return self.base_url
+
+    def stop_thread(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+    async def _admit(self, name: str) -> Optional[int]:
+        """Apply the provider's latency and limits; an HTTP status to fail with, or None"""
+        profile = self.profiles[name]
+        stats = self._stats[name]
+        stats['requests'] += 1
+        now = time.monotonic()
+        window = profile._window
+        while window and now - window[0] >= 1:
+            window.popleft()
+        if profile.rate_limit_per_second and len(window) >= profile.rate_limit_per_second:
+            stats['rate_limited'] += 1
+            return 429
+        window.append(now)
+        await asyncio.sleep((profile.latency_ms + self.random.uniform(0, profile.jitter_ms)) / 1000)
+        if profile.error_rate and self.random.random() < profile.error_rate:
+            stats['errors'] += 1
+            return 500
+        return None
+
+    async def _toncenter(self, request: web.Request) -> web.Response:
+        status = await self._admit('toncenter')
+        if status:
+            message = 'Ratelimit exceed' if status == 429 else 'Internal server error'
+            return web.json_response({'ok': False, 'result': message, 'code': status}, status=status)
+        query = request.query
+        if query.get('address') != self.wallet:
+            return web.json_response({'ok': True, 'result': []})
+        limit = int(query.get('limit', 10))
+        newest = int(query['lt']) if query.get('lt') else None
+        oldest = int(query['to_lt']) if query.get('to_lt') and query['to_lt'] != '0' else None
+        page = self._page(newest, oldest, limit)
+        self._stats['toncenter']['ok'] += 1
+        self._stats['toncenter']['transactions'] += len(page)
+        return web.json_response({'ok': True, 'result': [self._toncenter_tx(tx) for tx in page]})
+
+    async def _tonapi(self, request: web.Request) -> web.Response:
+        status = await self._admit('tonapi')
+        if status:
+            message = 'rate limit: free tier' if status == 429 else 'internal error'
+            return web.json_response({'error': message}, status=status)
+        if request.match_info['account'] != self.wallet:
+            return web.json_response({'transactions': []})
+        query = request.query
+        limit = int(query.get('limit', 100))
+        # tonapi's bounds are both exclusive
+        newest = int(query['before_lt']) - 1 if query.get('before_lt') else None
+        oldest = int(query['after_lt']) if query.get('after_lt') else None
+        page = self._page(newest, oldest, limit)
+        self._stats['tonapi']['ok'] += 1
+        self._stats['tonapi']['transactions'] += len(page)
+        return web.json_response({'transactions': [self._tonapi_tx(tx) for tx in page]})
+
+    def _toncenter_tx(self, tx: ChainTransaction) -> Dict[str, Any]:
+        in_msg = {'@type': 'raw.message', 'source': tx.source, 'destination': self.wallet,
+                  'value': str(tx.value), 'fwd_fee': '0', 'ihr_fee': '0', 'created_lt': str(tx.lt - 1),
+                  'body_hash': '', 'message': tx.memo or ''}
+        if tx.memo:
+            in_msg['msg_data'] = {'@type': 'msg.dataText', 'text': base64.b64encode(tx.memo.encode()).decode()}
+        return {'@type': 'raw.transaction', 'utime': tx.utime, 'data': '',
+                'transaction_id': {'@type': 'internal.transactionId', 'lt': str(tx.lt), 'hash': tx.hash},
+                'fee': '0', 'storage_fee': '0', 'other_fee': '0', 'in_msg': in_msg, 'out_msgs': []}
+
+    def _tonapi_tx(self, tx: ChainTransaction) -> Dict[str, Any]:
+        in_msg = {'msg_type': 'int_msg', 'created_lt': tx.lt - 1, 'value': tx.value,
+                  'source': {'address': tx.source, 'is_scam': False, 'is_wallet': True},
+                  'destination': {'address': self.wallet, 'is_scam': False, 'is_wallet': True}}
+        if tx.memo:
+            in_msg.update(decoded_op_name='text_comment', decoded_body={'text': tx.memo})
+        return {'hash': tx.hash, 'lt': tx.lt, 'account': {'address': self.wallet, 'is_scam': False},
+                'success': True, 'utime': tx.utime, 'orig_status': 'active', 'end_status': 'active',
+                'total_fees': 0, 'transaction_type': 'TransOrd', 'in_msg': in_msg, 'out_msgs': []}
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {name: dict(counts) for name, counts in self._stats.items()}
+        stats['requests'] = sum(counts['requests'] for counts in self._stats.values())
+        stats['transactions'] = len(self._chain)
+        return stats
+
+
+def _from_toncenter(tx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    in_msg = tx.get('in_msg') or {}
+    if not in_msg.get('source'):
+        return None
+    memo = in_msg.get('message') or None
+    if memo is None and isinstance(in_msg.get('msg_data'), dict) and in_msg['msg_data'].get('text'):
+        try:
+            memo = base64.b64decode(in_msg['msg_data']['text']).decode() or None
+        except (ValueError, UnicodeDecodeError):
+            pass
+    return {'value_nano': int(in_msg.get('value') or 0), 'memo': memo, 'source': in_msg['source'],
+            'utime': tx.get('utime'), 'lt': int(tx['transaction_id']['lt']),
+            'tx_hash': tx['transaction_id'].get('hash')}
+
+
+def _from_tonapi(tx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    in_msg = tx.get('in_msg') or {}
+    source = in_msg.get('source')
+    if not source or 'lt' not in tx:
+        return None
+    decoded = in_msg.get('decoded_body') if isinstance(in_msg.get('decoded_body'), dict) else {}
+    return {'value_nano': int(in_msg.get('value') or 0), 'memo': decoded.get('text') or None,
+            'source': source.get('address') if isinstance(source, dict) else source,
+            'utime': tx.get('utime'), 'lt': int(tx['lt']), 'tx_hash': tx.get('hash')}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a fake toncenter/tonapi for one wallet")
+    parser.add_argument('--wallet', default=DEFAULT_WALLET)
+    parser.add_argument('--fixture', action='append', default=[], help="recorded getTransactions response(s)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--jitter-ms', type=float, default=40.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered 500")
+    parser.add_argument('--rate-limit', type=int, default=None, help="requests per second per provider")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    api = FakeTONAPI(args.wallet, args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit, args.seed)
+    for path in args.fixture:
+        logger.info(f"📼 Loaded {api.load_fixture(path)} transactions from {path}")
+
+    async def serve():
+        await api.start(args.host, args.port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await api.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
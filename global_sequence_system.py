@@ -12,8 +12,18 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 
+from async_data_access import dispatch_write, get_data_access
+from schema_migrations import migrate
+
 logger = logging.getLogger(__name__)
 
+ACTIVE_SEQUENCE_QUERY = """
+    SELECT sequence_id FROM global_sequences
+    WHERE user_id = ? AND status = 'active'
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
 @dataclass
 class SequenceStep:
     """Individual step in a global sequence"""
@@ -31,84 +41,20 @@ class GlobalSequenceManager:
     def __init__(self, db_path: str = "bot.db"):
         self.db_path = db_path
         self.sequence_counter = 0
+        self._active_sequences: Dict[int, str] = {}
+        self.data = get_data_access(db_path)
         self.initialize_database()
         self.load_counter()
     
     def initialize_database(self):
         """Initialize global sequence tracking tables"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Global sequences table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS global_sequences (
-                    sequence_id TEXT PRIMARY KEY,
-                    user_id INTEGER NOT NULL,
-                    username TEXT,
-                    language TEXT,
-                    status TEXT DEFAULT 'active',
-                    current_step TEXT,
-                    step_count INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    metadata TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            
-            # Global sequence steps table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS global_sequence_steps (
-                    step_id TEXT PRIMARY KEY,
-                    sequence_id TEXT NOT NULL,
-                    step_name TEXT NOT NULL,
-                    component TEXT NOT NULL,
-                    step_order INTEGER,
-                    status TEXT DEFAULT 'completed',
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    metadata TEXT,
-                    error_message TEXT,
-                    FOREIGN KEY (sequence_id) REFERENCES global_sequences (sequence_id)
-                )
-            """)
-            
-            # Component links table for global sequences
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS global_component_links (
-                    link_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    sequence_id TEXT NOT NULL,
-                    component_name TEXT NOT NULL,
-                    entity_type TEXT NOT NULL,
-                    entity_id TEXT NOT NULL,
-                    link_type TEXT DEFAULT 'primary',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    metadata TEXT,
-                    FOREIGN KEY (sequence_id) REFERENCES global_sequences (sequence_id)
-                )
-            """)
-            
-            # Sequence counter table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sequence_counter (
-                    id INTEGER PRIMARY KEY,
-                    year INTEGER NOT NULL,
-                    month INTEGER NOT NULL,
-                    counter INTEGER NOT NULL,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(year, month)
-                )
-            """)
-            
-            conn.commit()
+            migrate(self.db_path)
             logger.info("✅ Global sequence system database initialized")
             
         except Exception as e:
             logger.error(f"❌ Error initializing global sequence database: {e}")
             raise
-        finally:
-            conn.close()
     
     def load_counter(self):
         """Load current counter for this month"""
@@ -144,36 +90,109 @@ class GlobalSequenceManager:
         finally:
             conn.close()
     
+    def _counter_statement(self, year: int, month: int, counter: int) -> tuple:
+        return ("""
+            INSERT INTO sequence_counter (year, month, counter)
+            VALUES (?, ?, ?)
+            ON CONFLICT(year, month) DO UPDATE SET
+                counter = MAX(counter, excluded.counter),
+                updated_at = CURRENT_TIMESTAMP
+        """, (year, month, counter))
+    
+    def _step_statements(self, sequence_id: str, step_id: str, step_name: str,
+                         component: str, metadata: Dict = None,
+                         error_message: str = None) -> List[tuple]:
+        # step_order is derived in SQL so concurrent loggers never read-modify-write
+        status = 'failed' if error_message else 'active'
+        return [
+            ("""
+                INSERT INTO global_sequence_steps (
+                    step_id, sequence_id, step_name, component, 
+                    step_order, status, metadata, error_message
+                )
+                SELECT ?, sequence_id, ?, ?, step_count + 1, ?, ?, ?
+                FROM global_sequences WHERE sequence_id = ?
+            """, (
+                step_id, step_name, component,
+                'failed' if error_message else 'completed',
+                json.dumps(metadata or {}), error_message, sequence_id
+            )),
+            ("""
+                UPDATE global_sequences 
+                SET current_step = ?, step_count = step_count + 1, 
+                    updated_at = CURRENT_TIMESTAMP, status = ?
+                WHERE sequence_id = ?
+            """, (step_id, status, sequence_id)),
+        ]
+    
+    def _next_sequence_id(self) -> tuple:
+        """Increment the counter in memory; returns the new ID and the statement persisting the counter"""
+        now = datetime.now()
+        self.sequence_counter += 1
+        sequence_id = f"SEQ-{now.year}-{now.month:02d}-{self.sequence_counter:05d}"
+        return sequence_id, self._counter_statement(now.year, now.month, self.sequence_counter)
+    
+    def _start_statements(self, sequence_id: str, user_id: int, username: str = None,
+                          language: str = None) -> List[tuple]:
+        metadata = {
+            'start_time': datetime.now().isoformat(),
+            'platform': 'telegram',
+            'initial_language': language,
+            'username': username
+        }
+        
+        step_id = f"{sequence_id}:User_Flow_1_Start"
+        statements = [("""
+            INSERT INTO global_sequences (
+                sequence_id, user_id, username, language, 
+                current_step, metadata
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            sequence_id, user_id, username, language,
+            step_id, json.dumps(metadata)
+        ))]
+        
+        # Log first step in the same transaction
+        statements += self._step_statements(sequence_id, step_id, "User_Flow_1_Start", "handlers", {
+            'action': 'user_start',
+            'user_id': user_id,
+            'username': username
+        })
+        return statements
+    
+    def _link_statement(self, sequence_id: str, component_name: str, entity_type: str,
+                        entity_id: str, link_type: str, metadata: Dict = None) -> tuple:
+        return ("""
+            INSERT INTO global_component_links (
+                sequence_id, component_name, entity_type, 
+                entity_id, link_type, metadata
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            sequence_id, component_name, entity_type, 
+            entity_id, link_type, json.dumps(metadata or {})
+        ))
+    
+    def _complete_statement(self, sequence_id: str, final_status: str) -> tuple:
+        return ("""
+            UPDATE global_sequences 
+            SET status = ?, completed_at = CURRENT_TIMESTAMP,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE sequence_id = ?
+        """, (final_status, sequence_id))
+    
+    def _forget_sequence(self, sequence_id: str):
+        for user_id, active in list(self._active_sequences.items()):
+            if active == sequence_id:
+                del self._active_sequences[user_id]
+    
     def generate_sequence_id(self) -> str:
         """Generate new global sequence ID in format SEQ-YYYY-MM-XXXXX"""
+        now = datetime.now()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Increment counter in memory; persistence is queued
+            sequence_id, counter_statement = self._next_sequence_id()
             
-            now = datetime.now()
-            year, month = now.year, now.month
-            
-            # Increment counter
-            self.sequence_counter += 1
-            
-            # Update counter in database
-            cursor.execute("""
-                UPDATE sequence_counter 
-                SET counter = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE year = ? AND month = ?
-            """, (self.sequence_counter, year, month))
-            
-            if cursor.rowcount == 0:
-                # Insert new record if not exists
-                cursor.execute("""
-                    INSERT INTO sequence_counter (year, month, counter)
-                    VALUES (?, ?, ?)
-                """, (year, month, self.sequence_counter))
-            
-            conn.commit()
-            
-            # Generate sequence ID
-            sequence_id = f"SEQ-{year}-{month:02d}-{self.sequence_counter:05d}"
+            dispatch_write(self.db_path, [counter_statement], "Sequence counter update")
             logger.info(f"🆔 Generated new sequence ID: {sequence_id}")
             
             return sequence_id
@@ -182,43 +201,19 @@ class GlobalSequenceManager:
             logger.error(f"❌ Error generating sequence ID: {e}")
             # Fallback to timestamp-based ID
             return f"SEQ-{now.year}-{now.month:02d}-{int(time.time())}"
-        finally:
-            conn.close()
     
     def start_user_sequence(self, user_id: int, username: str = None, 
                            language: str = None) -> str:
-        """Start new global sequence for user"""
+        """Start new global sequence for user.
+        
+        Inside the event loop the rows are written in the background; async
+        code should use astart_user_sequence to know the sequence exists.
+        """
         try:
             sequence_id = self.generate_sequence_id()
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            metadata = {
-                'start_time': datetime.now().isoformat(),
-                'platform': 'telegram',
-                'initial_language': language,
-                'username': username
-            }
-            
-            cursor.execute("""
-                INSERT INTO global_sequences (
-                    sequence_id, user_id, username, language, 
-                    current_step, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                sequence_id, user_id, username, language,
-                f"{sequence_id}:User_Flow_1_Start", json.dumps(metadata)
-            ))
-            
-            # Log first step
-            self.log_step(sequence_id, "User_Flow_1_Start", "handlers", {
-                'action': 'user_start',
-                'user_id': user_id,
-                'username': username
-            })
-            
-            conn.commit()
+            dispatch_write(self.db_path, self._start_statements(sequence_id, user_id, username, language),
+                           f"Start sequence {sequence_id}")
+            self._active_sequences[user_id] = sequence_id
             logger.info(f"🚀 Started global sequence {sequence_id} for user {user_id}")
             
             return sequence_id
@@ -226,51 +221,38 @@ class GlobalSequenceManager:
         except Exception as e:
             logger.error(f"❌ Error starting user sequence: {e}")
             raise
-        finally:
-            conn.close()
+    
+    async def astart_user_sequence(self, user_id: int, username: str = None,
+                                   language: str = None) -> str:
+        """Start new global sequence for user; returns once the sequence is committed"""
+        sequence_id, counter_statement = self._next_sequence_id()
+        try:
+            # The counter is persisted with the sequence that used it
+            await self.data.transaction(
+                [counter_statement] + self._start_statements(sequence_id, user_id, username, language))
+        except Exception as e:
+            logger.error(f"❌ Error starting user sequence: {e}")
+            raise
+        self._active_sequences[user_id] = sequence_id
+        logger.info(f"🚀 Started global sequence {sequence_id} for user {user_id}")
+        return sequence_id
     
     def log_step(self, sequence_id: str, step_name: str, component: str, 
                 metadata: Dict = None, error_message: str = None) -> str:
         """Log a step in the global sequence"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get current step count
-            cursor.execute("""
-                SELECT step_count FROM global_sequences WHERE sequence_id = ?
-            """, (sequence_id,))
-            
-            result = cursor.fetchone()
-            if not result:
-                logger.warning(f"⚠️ Sequence {sequence_id} not found")
-                return ""
-            
-            step_count = result[0] + 1
             step_id = f"{sequence_id}:{step_name}"
             
-            # Insert step
-            cursor.execute("""
-                INSERT INTO global_sequence_steps (
-                    step_id, sequence_id, step_name, component, 
-                    step_order, status, metadata, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                step_id, sequence_id, step_name, component,
-                step_count, 'failed' if error_message else 'completed',
-                json.dumps(metadata or {}), error_message
-            ))
+            def _check(rowcount: int):
+                if rowcount == 0:
+                    logger.warning(f"⚠️ Sequence {sequence_id} not found")
             
-            # Update sequence
-            status = 'failed' if error_message else 'active'
-            cursor.execute("""
-                UPDATE global_sequences 
-                SET current_step = ?, step_count = ?, 
-                    updated_at = CURRENT_TIMESTAMP, status = ?
-                WHERE sequence_id = ?
-            """, (step_id, step_count, status, sequence_id))
-            
-            conn.commit()
+            dispatch_write(
+                self.db_path,
+                self._step_statements(sequence_id, step_id, step_name, component,
+                                      metadata, error_message),
+                f"Log step {step_id}", _check
+            )
             
             if error_message:
                 logger.error(f"❌ Step failed: {step_id} - {error_message}")
@@ -282,55 +264,75 @@ class GlobalSequenceManager:
         except Exception as e:
             logger.error(f"❌ Error logging step: {e}")
             return ""
-        finally:
-            conn.close()
+    
+    async def alog_step(self, sequence_id: str, step_name: str, component: str,
+                        metadata: Dict = None, error_message: str = None) -> str:
+        """Log a step in the global sequence; returns the step ID once committed, or "" on failure"""
+        step_id = f"{sequence_id}:{step_name}"
+        try:
+            result = await self.data.transaction(
+                self._step_statements(sequence_id, step_id, step_name, component, metadata, error_message))
+        except Exception as e:
+            logger.error(f"❌ Error logging step: {e}")
+            return ""
+        if result.rowcount == 0:
+            logger.warning(f"⚠️ Sequence {sequence_id} not found")
+            return ""
+        if error_message:
+            logger.error(f"❌ Step failed: {step_id} - {error_message}")
+        else:
+            logger.info(f"✅ Step completed: {step_id} in {component}")
+        return step_id
     
     def link_component(self, sequence_id: str, component_name: str, 
                       entity_type: str, entity_id: str, 
                       link_type: str = "primary", metadata: Dict = None):
         """Link component entity to global sequence"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO global_component_links (
-                    sequence_id, component_name, entity_type, 
-                    entity_id, link_type, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                sequence_id, component_name, entity_type, 
-                entity_id, link_type, json.dumps(metadata or {})
-            ))
+            dispatch_write(self.db_path, [self._link_statement(sequence_id, component_name, entity_type,
+                                                               entity_id, link_type, metadata)],
+                           f"Link {component_name} to {sequence_id}")
             
-            conn.commit()
             logger.info(f"🔗 Linked {component_name}:{entity_type}:{entity_id} to {sequence_id}")
             
         except Exception as e:
             logger.error(f"❌ Error linking component: {e}")
-        finally:
-            conn.close()
+    
+    async def alink_component(self, sequence_id: str, component_name: str,
+                              entity_type: str, entity_id: str,
+                              link_type: str = "primary", metadata: Dict = None) -> bool:
+        """Link component entity to global sequence; True once committed"""
+        try:
+            await self.data.transaction([self._link_statement(sequence_id, component_name, entity_type,
+                                                              entity_id, link_type, metadata)])
+        except Exception as e:
+            logger.error(f"❌ Error linking component: {e}")
+            return False
+        logger.info(f"🔗 Linked {component_name}:{entity_type}:{entity_id} to {sequence_id}")
+        return True
     
     def complete_sequence(self, sequence_id: str, final_status: str = "completed"):
         """Mark global sequence as completed"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE global_sequences 
-                SET status = ?, completed_at = CURRENT_TIMESTAMP,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE sequence_id = ?
-            """, (final_status, sequence_id))
+            dispatch_write(self.db_path, [self._complete_statement(sequence_id, final_status)],
+                           f"Complete sequence {sequence_id}")
             
-            conn.commit()
+            self._forget_sequence(sequence_id)
             logger.info(f"🏁 Completed global sequence: {sequence_id} ({final_status})")
             
         except Exception as e:
             logger.error(f"❌ Error completing sequence: {e}")
-        finally:
-            conn.close()
+    
+    async def acomplete_sequence(self, sequence_id: str, final_status: str = "completed") -> bool:
+        """Mark global sequence as completed; True once committed"""
+        try:
+            await self.data.transaction([self._complete_statement(sequence_id, final_status)])
+        except Exception as e:
+            logger.error(f"❌ Error completing sequence: {e}")
+            return False
+        self._forget_sequence(sequence_id)
+        logger.info(f"🏁 Completed global sequence: {sequence_id} ({final_status})")
+        return True
     
     def get_sequence_details(self, sequence_id: str) -> Optional[Dict]:
         """Get complete details of a global sequence"""
@@ -415,19 +417,19 @@ class GlobalSequenceManager:
     
     def get_user_active_sequence(self, user_id: int) -> Optional[str]:
         """Get user's current active sequence ID"""
+        if user_id in self._active_sequences:
+            return self._active_sequences[user_id]
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT sequence_id FROM global_sequences
-                WHERE user_id = ? AND status = 'active'
-                ORDER BY created_at DESC
-                LIMIT 1
-            """, (user_id,))
+            cursor.execute(ACTIVE_SEQUENCE_QUERY, (user_id,))
             
             result = cursor.fetchone()
-            return result[0] if result else None
+            sequence_id = result[0] if result else None
+            if sequence_id:
+                self._active_sequences[user_id] = sequence_id
+            return sequence_id
             
         except Exception as e:
             logger.error(f"❌ Error getting user active sequence: {e}")
@@ -435,6 +437,19 @@ class GlobalSequenceManager:
         finally:
             conn.close()
     
+    async def aget_user_active_sequence(self, user_id: int) -> Optional[str]:
+        """Get user's current active sequence ID without blocking the event loop"""
+        if user_id in self._active_sequences:
+            return self._active_sequences[user_id]
+        try:
+            sequence_id = await self.data.fetchval(ACTIVE_SEQUENCE_QUERY, (user_id,))
+            if sequence_id:
+                self._active_sequences[user_id] = sequence_id
+            return sequence_id
+        except Exception as e:
+            logger.error(f"❌ Error getting user active sequence: {e}")
+            return None
+    
     def find_sequence_by_component(self, component_name: str, entity_id: str) -> List[str]:
         """Find sequences linked to specific component entity"""
         try:
@@ -548,20 +563,43 @@ def start_user_global_sequence(user_id: int, username: str = None, language: str
     """Start new global sequence for user"""
     return get_global_sequence_manager().start_user_sequence(user_id, username, language)
 
+async def astart_user_global_sequence(user_id: int, username: str = None, language: str = None) -> str:
+    """Start new global sequence for user from async code, once it is committed"""
+    return await get_global_sequence_manager().astart_user_sequence(user_id, username, language)
+
 def log_sequence_step(sequence_id: str, step_name: str, component: str, 
                      metadata: Dict = None, error_message: str = None) -> str:
     """Log step in global sequence"""
     return get_global_sequence_manager().log_step(sequence_id, step_name, component, metadata, error_message)
 
+async def alog_sequence_step(sequence_id: str, step_name: str, component: str,
+                             metadata: Dict = None, error_message: str = None) -> str:
+    """Log step in global sequence from async code, once it is committed"""
+    return await get_global_sequence_manager().alog_step(sequence_id, step_name, component, metadata, error_message)
+
 def link_to_global_sequence(sequence_id: str, component_name: str, entity_type: str, 
                            entity_id: str, link_type: str = "primary", metadata: Dict = None):
     """Link component to global sequence"""
     return get_global_sequence_manager().link_component(sequence_id, component_name, entity_type, entity_id, link_type, metadata)
 
+async def alink_to_global_sequence(sequence_id: str, component_name: str, entity_type: str,
+                                   entity_id: str, link_type: str = "primary", metadata: Dict = None) -> bool:
+    """Link component to global sequence from async code, once it is committed"""
+    return await get_global_sequence_manager().alink_component(sequence_id, component_name, entity_type,
+                                                               entity_id, link_type, metadata)
+
 def get_user_sequence_id(user_id: int) -> Optional[str]:
     """Get user's active sequence ID"""
     return get_global_sequence_manager().get_user_active_sequence(user_id)
 
+async def aget_user_sequence_id(user_id: int) -> Optional[str]:
+    """Get user's active sequence ID from async code"""
+    return await get_global_sequence_manager().aget_user_active_sequence(user_id)
+
 def complete_global_sequence(sequence_id: str, final_status: str = "completed"):
     """Complete global sequence"""
-    return get_global_sequence_manager().complete_sequence(sequence_id, final_status)
\ No newline at end of file
+    return get_global_sequence_manager().complete_sequence(sequence_id, final_status)
+
+async def acomplete_global_sequence(sequence_id: str, final_status: str = "completed") -> bool:
+    """Complete global sequence from async code, once it is committed"""
+    return await get_global_sequence_manager().acomplete_sequence(sequence_id, final_status)
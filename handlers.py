@@ -75,6 +75,11 @@ def get_user_language_and_create_titled_message(user_id: int, step_key: str, con
             if user_id in user_language_cache:
                 return user_language_cache[user_id]
             
+            # Use the stored preference when the user row is already cached
+            cached_user = db.user_cache.get(user_id)
+            if cached_user and cached_user.get('language'):
+                return cached_user['language']
+            
             # Default language based on user ID patterns
             if user_id == 566158428:  # Known Arabic user
                 language = 'ar'
@@ -3956,7 +3961,8 @@ async def continue_ton_payment_with_wallet(message_or_callback, state: FSMContex
             'total_reach': calculation.get('total_reach', 0),
             'ad_content': full_data.get('ad_text', ''),
             'content_type': full_data.get('content_type', 'text'),
-            'media_url': full_data.get('photos', [None])[0] if full_data.get('photos') else full_data.get('video')
+            'media_url': full_data.get('photos', [None])[0] if full_data.get('photos') else full_data.get('video'),
+            'photos': full_data.get('photos', []) or full_data.get('uploaded_photos', [])
         }
         
         await track_payment_for_user(user_id, memo, amount_ton, ad_data)
@@ -5024,7 +5030,8 @@ async def create_successful_ad_from_payment(user_id: int, memo: str, amount_ton:
             payment_memo=memo,
             ad_content=ad_content,
             media_url=photos[0]['file_id'] if photos else None,
-            content_type='photo' if photos else 'text'
+            content_type='photo' if photos else 'text',
+            media=photos
         )
         
         logger.info(f"Campaign created successfully: ID {campaign_id} for user {user_id}")
@@ -5,8 +5,8 @@ Integrate all bot handlers with unified sequence tracking
 """
 
 from global_sequence_system import (
-    start_user_global_sequence, log_sequence_step, link_to_global_sequence,
-    get_user_sequence_id, complete_global_sequence
+    link_to_global_sequence, complete_global_sequence, aget_user_sequence_id,
+    astart_user_global_sequence, alog_sequence_step
 )
 from sequence_logger import get_sequence_logger, with_sequence
 
@@ -19,11 +19,11 @@ class SequenceHandlerMixin:
     @staticmethod
     async def ensure_user_sequence(user_id: int, username: str = None, language: str = None) -> str:
         """Ensure user has an active sequence"""
-        sequence_id = get_user_sequence_id(user_id)
+        sequence_id = await aget_user_sequence_id(user_id)
         
         if not sequence_id:
-            # Start new sequence if none exists
-            sequence_id = start_user_global_sequence(user_id, username, language)
+            # Start new sequence if none exists; handed out only once it is committed
+            sequence_id = await astart_user_global_sequence(user_id, username, language)
             logger.info(f"🆔 Created new sequence {sequence_id} for user {user_id}")
         
         return sequence_id
@@ -41,7 +41,7 @@ class SequenceHandlerMixin:
             'action': action
         })
         
-        log_sequence_step(sequence_id, step_name, "handlers", handler_metadata)
+        await alog_sequence_step(sequence_id, step_name, "handlers", handler_metadata)
         logger.step_complete(sequence_id, step_name, "handlers", f"Handler: {handler_name}")
 
 # Integration templates for existing handlers
@@ -315,6 +315,10 @@ Questions? Use /support to get help!""",
         'auto_currency_calc': '✅ Auto Currency Calculation (USD, TON, Stars)',
         'click_adjust_days': '🔄 Click +/- to adjust days or choose from quick options',
         'continue_with_days': 'Continue with {days} days',
+        'post_published_notice': '✅ Your ad from campaign {campaign_id} was published in {channel}.',
+        'publishing_digest': '📢 {posts} posts published across {channels} channels in the last {minutes} min.\nCampaigns: {campaigns}',
+        'campaign_publishing_complete': '🎉 Campaign {campaign_id} has finished publishing: {published} posts published, {failed} failed.',
+        'post_publish_failed': '⚠️ Your ad from campaign {campaign_id} could not be published in {channel}. It has been set aside for review.',
     },
     
     'ar': {
@@ -641,6 +645,10 @@ Questions? Use /support to get help!""",
         'auto_currency_calc': '✅ حساب العملة التلقائي (USD, TON, Stars)',
         'click_adjust_days': '🔄 انقر +/- لضبط الأيام أو اختر من الخيارات السريعة',
         'continue_with_days': 'متابعة مع {days} أيام',
+        'post_published_notice': '✅ تم نشر إعلانك من الحملة {campaign_id} في {channel}.',
+        'publishing_digest': '📢 تم نشر {posts} منشورات في {channels} قنوات خلال آخر {minutes} دقيقة.\nالحملات: {campaigns}',
+        'campaign_publishing_complete': '🎉 انتهى نشر الحملة {campaign_id}: تم نشر {published} منشورات، وفشل {failed}.',
+        'post_publish_failed': '⚠️ تعذر نشر إعلانك من الحملة {campaign_id} في {channel}. تم تحويله للمراجعة.',
     },
     
     'ru': {
@@ -961,6 +969,10 @@ Questions? Use /support to get help!""",
         'auto_currency_calc': '✅ Автоматический расчет валюты (USD, TON, Stars)',
         'click_adjust_days': '🔄 Нажмите +/- для изменения дней или выберите из быстрых опций',
         'continue_with_days': 'Продолжить с {days} дней',
+        'post_published_notice': '✅ Ваша реклама из кампании {campaign_id} опубликована в {channel}.',
+        'publishing_digest': '📢 Опубликовано постов: {posts} в {channels} каналах за последние {minutes} мин.\nКампании: {campaigns}',
+        'campaign_publishing_complete': '🎉 Кампания {campaign_id} завершила публикацию: опубликовано {published}, не удалось {failed}.',
+        'post_publish_failed': '⚠️ Вашу рекламу из кампании {campaign_id} не удалось опубликовать в {channel}. Она передана на проверку.',
     }
 }
 
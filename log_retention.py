@@ -0,0 +1,336 @@
+"""
+Log retention for I3lani Telegram Bot
+Per-table retention policies for the append-only log tables: old rows are
+rolled up into daily counts, archived to gzipped JSONL and deleted, then the
+freed pages are returned with incremental VACUUM
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from async_data_access import get_data_access, run_blocking
+from config import (
+    LOG_ARCHIVE_DIR, LOG_RETENTION_BATCH, LOG_RETENTION_DAYS, LOG_RETENTION_INTERVAL_HOURS
+)
+from connection_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Convert to auto_vacuum=INCREMENTAL (one full VACUUM) once this share of the file is free
+VACUUM_CONVERT_FREE_RATIO = 0.2
+# Pages handed back per incremental_vacuum call (4 MB at the default page size)
+INCREMENTAL_VACUUM_PAGES = 1024
+
+
+@dataclass
+class RetentionPolicy:
+    """Rows of ``table`` older than ``keep_days`` (by ``time_column``) are purged.
+
+    ``dimensions`` are the columns kept in the daily rollup; ``condition``
+    limits purging further (e.g. never drop open error reports).
+    """
+    table: str
+    time_column: str
+    dimensions: List[str] = field(default_factory=list)
+    keep_days: Optional[int] = None
+    condition: Optional[str] = None
+    archive: bool = True
+
+    @property
+    def days(self) -> int:
+        return self.keep_days if self.keep_days is not None else LOG_RETENTION_DAYS
+
+    def where(self) -> str:
+        clause = f"{self.time_column} < ?"
+        if self.condition:
+            clause += f" AND ({self.condition})"
+        return clause
+
+    def dimension_expr(self) -> str:
+        if not self.dimensions:
+            return "''"
+        return " || '|' || ".join(f"COALESCE({column}, '')" for column in self.dimensions)
+
+
+POLICIES: List[RetentionPolicy] = [
+    RetentionPolicy('channel_publishing_logs', 'created_at', ['channel_id', 'status']),
+    RetentionPolicy('post_publishing_log', 'published_at', ['channel_id', 'publishing_status']),
+    RetentionPolicy('content_verification', 'verification_date', ['match_status']),
+    RetentionPolicy('content_verification_logs', 'created_at', ['verification_type', 'status']),
+    RetentionPolicy('global_sequence_steps', 'timestamp', ['component', 'status']),
+    RetentionPolicy('tracking_steps', 'COALESCE(completed_at, started_at)', ['step_name', 'status']),
+    RetentionPolicy('flow_transitions', 'transition_time', ['to_step']),
+    RetentionPolicy('fraud_logs', 'created_at', ['type', 'risk_level'], keep_days=90,
+                    condition="admin_reviewed = 1 OR risk_level NOT IN ('high', 'critical')"),
+    RetentionPolicy('error_reports', 'created_at', ['step_name', 'severity'],
+                    condition="status != 'open'"),
+    RetentionPolicy('publish_dead_letters', 'failed_at', ['error_kind'], keep_days=90,
+                    condition="status != 'dead'"),
+]
+
+
+PENDING_SUFFIX = '.pending'
+
+
+def _archive_rows(archive_dir: str, table: str, rows: List[Dict[str, Any]]) -> str:
+    """Write rows to a pending gzip file beside this month's JSONL archive for the table"""
+    directory = os.path.join(archive_dir, table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{table}-{datetime.now().strftime('%Y-%m')}.jsonl.gz")
+    with gzip.open(path + PENDING_SUFFIX, 'wt', encoding='utf-8') as archive:
+        for row in rows:
+            archive.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+    return path + PENDING_SUFFIX
+
+
+def _commit_archive(pending: str) -> str:
+    """Append a pending file to its archive once its rows are deleted; returns the archive path"""
+    path = pending[:-len(PENDING_SUFFIX)]
+    # Each batch is a gzip member; readers see one continuous stream
+    with open(pending, 'rb') as source, open(path, 'ab') as archive:
+        archive.write(source.read())
+        archive.flush()
+        os.fsync(archive.fileno())
+    os.remove(pending)
+    return path
+
+
+def _pending_archives(archive_dir: str, table: str) -> List[str]:
+    directory = os.path.join(archive_dir, table)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(PENDING_SUFFIX))
+
+
+def read_archive(path: str) -> List[Dict[str, Any]]:
+    """Load every row from an archive file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+
+class LogRetentionManager:
+    """Applies the retention policies and keeps the database file compact"""
+
+    def __init__(self, db_path: str = "bot.db", policies: Optional[List[RetentionPolicy]] = None,
+                 archive_dir: str = LOG_ARCHIVE_DIR, batch_size: int = LOG_RETENTION_BATCH):
+        self.db_path = db_path
+        self.policies = policies if policies is not None else POLICIES
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.data = get_data_access(db_path)
+        self.pool = get_pool(db_path)
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Purging
+    # ------------------------------------------------------------------
+    async def _existing_tables(self) -> set:
+        rows = await self.data.fetchall("SELECT name FROM sqlite_master WHERE type = 'table'")
+        return {row['name'] for row in rows}
+
+    async def apply_policy(self, policy: RetentionPolicy, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Roll up, archive and delete one table's expired rows in batches"""
+        cutoff = ((now or datetime.now()) - timedelta(days=policy.days)).strftime('%Y-%m-%d %H:%M:%S')
+        result = {'deleted': 0, 'archive': None}
+        if policy.archive:
+            await self._recover_pending(policy)
+        while True:
+            rows = await self.data.fetchall(f"""
+                SELECT rowid AS _rowid, * FROM {policy.table}
+                WHERE {policy.where()} ORDER BY rowid LIMIT ?
+            """, (cutoff, self.batch_size))
+            if not rows:
+                break
+            last_rowid = rows[-1]['_rowid']
+            if not policy.archive:
+                deleted = await self._rollup_and_delete(policy, cutoff, last_rowid)
+            else:
+                # Rows reach the archive only once their delete has committed, so a failed
+                # delete never leaves them archived twice
+                pending = await run_blocking(_archive_rows, self.archive_dir, policy.table, rows)
+                try:
+                    deleted = await self._rollup_and_delete(policy, cutoff, last_rowid)
+                except Exception:
+                    await run_blocking(os.remove, pending)
+                    raise
+                result['archive'] = await run_blocking(_commit_archive, pending)
+            result['deleted'] += deleted
+            if len(rows) < self.batch_size:
+                break
+        if result['deleted']:
+            logger.info(f"🗄️ Retention: {policy.table} purged {result['deleted']} rows older than {policy.days}d")
+        return result
+
+    async def _recover_pending(self, policy: RetentionPolicy):
+        """Settle pending archives left by a run that stopped between writing and committing one"""
+        for pending in await run_blocking(_pending_archives, self.archive_dir, policy.table):
+            rowids = [row['_rowid'] for row in await run_blocking(read_archive, pending)]
+            remaining = 0
+            for start in range(0, len(rowids), 500):
+                chunk = rowids[start:start + 500]
+                remaining += await self.data.fetchval(
+                    f"SELECT COUNT(*) FROM {policy.table} WHERE rowid IN ({','.join('?' * len(chunk))})", chunk)
+            if remaining:
+                # The delete never committed; the rows are archived again when next purged
+                await run_blocking(os.remove, pending)
+            else:
+                await run_blocking(_commit_archive, pending)
+                logger.info(f"🗄️ Retention: committed {len(rowids)} archived {policy.table} rows from an earlier run")
+
+    async def _rollup_and_delete(self, policy: RetentionPolicy, cutoff: str, last_rowid: int) -> int:
+        # Same predicate for both statements, so the rollup counts exactly the deleted rows
+        where = f"rowid <= ? AND {policy.where()}"
+
+        async def _purge(conn) -> int:
+            await conn.execute(f"""
+                INSERT INTO log_daily_rollups (table_name, day, dimension, row_count)
+                SELECT ?, substr({policy.time_column}, 1, 10), {policy.dimension_expr()}, COUNT(*)
+                FROM {policy.table} WHERE {where}
+                GROUP BY 2, 3
+                ON CONFLICT(table_name, day, dimension)
+                DO UPDATE SET row_count = row_count + excluded.row_count,
+                              updated_at = CURRENT_TIMESTAMP
+            """, (policy.table, last_rowid, cutoff))
+            cursor = await conn.execute(f"DELETE FROM {policy.table} WHERE {where}", (last_rowid, cutoff))
+            return cursor.rowcount
+
+        return await self.data.run_in_transaction(_purge)
+
+    # ------------------------------------------------------------------
+    # Space
+    # ------------------------------------------------------------------
+    async def get_space_report(self) -> Dict[str, Any]:
+        """Page usage and file sizes for the database"""
+        async with self.pool.reader() as conn:
+            values = {}
+            for pragma in ('page_size', 'page_count', 'freelist_count', 'auto_vacuum'):
+                cursor = await conn.execute(f"PRAGMA {pragma}")
+                values[pragma] = (await cursor.fetchone())[0]
+        files = {}
+        for suffix in ('', '-wal'):
+            path = self.db_path + suffix
+            files[os.path.basename(path)] = os.path.getsize(path) if os.path.exists(path) else 0
+        return {
+            'page_size': values['page_size'],
+            'pages': values['page_count'],
+            'free_pages': values['freelist_count'],
+            'used_bytes': (values['page_count'] - values['freelist_count']) * values['page_size'],
+            'free_bytes': values['freelist_count'] * values['page_size'],
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(values['auto_vacuum'], 'unknown'),
+            'files': files,
+        }
+
+    async def vacuum(self, space: Optional[Dict[str, Any]] = None) -> str:
+        """Return free pages to the filesystem; returns the action taken"""
+        space = space or await self.get_space_report()
+        if not space['free_pages']:
+            return 'none'
+        async with self.pool.writer() as conn:
+            if space['auto_vacuum'] != 'incremental':
+                if space['free_pages'] < space['pages'] * VACUUM_CONVERT_FREE_RATIO:
+                    return 'skipped'
+                # auto_vacuum only changes with a full rebuild; after this, incremental is enough
+                logger.info("🧹 Converting database to auto_vacuum=INCREMENTAL (full VACUUM)")
+                await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                await conn.execute("VACUUM")
+                action = 'full'
+            else:
+                remaining = space['free_pages']
+                while remaining > 0:
+                    # Each step of this pragma frees one page; executescript steps it to completion
+                    await conn.executescript(f"PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES})")
+                    remaining -= INCREMENTAL_VACUUM_PAGES
+                    await asyncio.sleep(0)
+                action = 'incremental'
+            # The shrink only reaches the main file once the WAL is checkpointed
+            cursor = await conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            await cursor.fetchall()
+        return action
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Apply every policy, vacuum, and report the space reclaimed"""
+        started = datetime.now()
+        before = await self.get_space_report()
+        tables = await self._existing_tables()
+        purged = {}
+        for policy in self.policies:
+            if policy.table not in tables:
+                continue
+            try:
+                purged[policy.table] = await self.apply_policy(policy, now)
+            except Exception as e:
+                logger.error(f"❌ Retention failed for {policy.table}: {e}")
+                purged[policy.table] = {'deleted': 0, 'error': str(e)}
+        freed = await self.get_space_report()
+        vacuum = await self.vacuum(freed)
+        after = await self.get_space_report()
+
+        db_file = os.path.basename(self.db_path)
+        report = {
+            'started_at': started.isoformat(),
+            'duration_s': round((datetime.now() - started).total_seconds(), 2),
+            'rows_deleted': sum(t.get('deleted', 0) for t in purged.values()),
+            'tables': purged,
+            'vacuum': vacuum,
+            'before': before,
+            'after': after,
+            'reclaimed_bytes': before['files'].get(db_file, 0) - after['files'].get(db_file, 0),
+        }
+        self.last_report = report
+        logger.info(f"🧹 Retention run: {report['rows_deleted']} rows purged, "
+                    f"{report['reclaimed_bytes'] / 1024:.0f} KB reclaimed ({vacuum} vacuum)")
+        return report
+
+    async def _loop(self, interval_hours: float):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Log retention run failed: {e}")
+            await asyncio.sleep(interval_hours * 3600)
+
+    def start(self, interval_hours: float = LOG_RETENTION_INTERVAL_HOURS) -> asyncio.Task:
+        """Run retention now and then every ``interval_hours`` in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(interval_hours))
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_manager: Optional[LogRetentionManager] = None
+
+
+def get_retention_manager(db_path: str = "bot.db") -> LogRetentionManager:
+    """Get the process-wide retention manager"""
+    global _manager
+    if _manager is None:
+        _manager = LogRetentionManager(db_path)
+    return _manager
+
+
+def format_retention_report(report: Dict[str, Any]) -> str:
+    """Plain-text summary of a retention run for the admin panel"""
+    lines = [
+        f"Run {report['started_at'][:19]} ({report['duration_s']}s), vacuum: {report['vacuum']}",
+        f"Rows purged: {report['rows_deleted']:,}",
+        f"Reclaimed: {report['reclaimed_bytes'] / 1024:.0f} KB "
+        f"(free pages {report['before']['free_pages']} -> {report['after']['free_pages']})",
+        "",
+    ]
+    for table, result in report['tables'].items():
+        status = f"error: {result['error']}" if 'error' in result else f"{result['deleted']:,} rows"
+        lines.append(f"{table}: {status}")
+    return "\n".join(lines)
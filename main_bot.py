@@ -16,7 +16,9 @@ from aiogram import Bot, Dispatcher, F
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand, MenuButtonCommands
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, BLOCKING_EXECUTOR_WORKERS, LOOP_WATCHDOG_MS, QUERY_PROFILING, RUN_PUBLISHER_IN_BOT, SLOW_QUERY_MS
+)
 from database import init_db, db
 from handlers import setup_handlers
 from admin_system import setup_admin_handlers
@@ -112,6 +114,15 @@ async def init_bot():
         storage = MemoryStorage()
         dp = Dispatcher(storage=storage)
         
+        # Bounded executor for remaining synchronous work; loop watchdog in debug mode
+        from async_data_access import configure_blocking_executor
+        from query_profiler import configure_query_profiler
+        configure_blocking_executor(BLOCKING_EXECUTOR_WORKERS)
+        configure_query_profiler(QUERY_PROFILING, SLOW_QUERY_MS)
+        if LOOP_WATCHDOG_MS > 0:
+            from event_loop_watchdog import start_loop_watchdog
+            start_loop_watchdog(LOOP_WATCHDOG_MS)
+        
         # Initialize database
         logger.info("Initializing database...")
         await init_db()
@@ -144,76 +155,72 @@ async def init_bot():
         except Exception as e:
             logger.error(f"❌ Failed to initialize campaign system: {e}")
         
-        # Initialize Post Identity System and Enhanced Campaign Publisher
-        logger.info("Initializing Post Identity System and Enhanced Campaign Publisher...")
-        try:
-            from post_identity_system import init_post_identity_system
-            from enhanced_campaign_publisher import init_enhanced_campaign_publisher
+        # Publishing runs here unless dedicated publish_worker.py processes handle it
+        if RUN_PUBLISHER_IN_BOT:
+            # Initialize Post Identity System and Enhanced Campaign Publisher
+            logger.info("Initializing Post Identity System and Enhanced Campaign Publisher...")
+            try:
+                from post_identity_system import init_post_identity_system
+                from enhanced_campaign_publisher import init_enhanced_campaign_publisher
             
-            # Initialize Post Identity System first
-            post_identity_success = await init_post_identity_system()
-            if post_identity_success:
-                logger.info("✅ Post Identity System initialized successfully")
-            else:
-                logger.error("❌ Post Identity System initialization failed")
+                # Initialize Post Identity System first
+                post_identity_success = await init_post_identity_system()
+                if post_identity_success:
+                    logger.info("✅ Post Identity System initialized successfully")
+                else:
+                    logger.error("❌ Post Identity System initialization failed")
             
-            # Initialize Enhanced Campaign Publisher
-            enhanced_publisher = await init_enhanced_campaign_publisher(bot)
+                # Initialize Enhanced Campaign Publisher
+                enhanced_publisher = await init_enhanced_campaign_publisher(bot)
             
-            if enhanced_publisher:
-                logger.info("✅ Enhanced Campaign Publisher initialized with Post Identity System")
-                logger.info(f"Enhanced publisher running status: {enhanced_publisher.running}")
+                if enhanced_publisher:
+                    logger.info("✅ Enhanced Campaign Publisher initialized with Post Identity System")
+                    logger.info(f"Enhanced publisher running status: {enhanced_publisher.running}")
                 
-                # Store globally for access
-                globals()['enhanced_publisher'] = enhanced_publisher
-                globals()['campaign_publisher'] = enhanced_publisher  # Backward compatibility
+                    # Store globally for access
+                    globals()['enhanced_publisher'] = enhanced_publisher
+                    globals()['campaign_publisher'] = enhanced_publisher  # Backward compatibility
                 
-                # Verify the publisher is running
-                await asyncio.sleep(2)
-                if enhanced_publisher.running:
-                    logger.info("✅ Enhanced publisher confirmed running - content integrity guaranteed")
-                    logger.info("🔄 Enhanced publisher will check for posts every 30 seconds")
-                    logger.info("🆔 All posts will have unique IDs and full metadata tracking")
+                    # Verify the publisher is running
+                    await asyncio.sleep(2)
+                    if enhanced_publisher.running:
+                        logger.info("✅ Enhanced publisher confirmed running - content integrity guaranteed")
+                        logger.info("⏰ Enhanced publisher wakes at each post's scheduled time")
+                        logger.info("🆔 All posts will have unique IDs and full metadata tracking")
                     
-                    # Test immediate publishing capability with content verification
-                    try:
-                        due_posts = await enhanced_publisher._get_due_posts()
-                        logger.info(f"📊 Found {len(due_posts)} posts ready for verified publishing")
-                        
-                        if len(due_posts) > 0:
-                            logger.info("🚀 Processing due posts with content integrity verification...")
-                            await enhanced_publisher._process_due_posts()
-                            logger.info("✅ Initial verified publishing check completed")
-                        
-                    except Exception as pub_error:
-                        logger.error(f"❌ Error in initial verified publishing check: {pub_error}")
+                        # The publishing loop's first sweep already queued every due post
+                        timer_stats = enhanced_publisher.timer.get_stats()
+                        logger.info(f"📊 {timer_stats['queued']} posts queued for verified publishing")
                     
-                else:
-                    logger.warning("⚠️ Enhanced publisher not running after initialization")
+                    else:
+                        logger.warning("⚠️ Enhanced publisher not running after initialization")
                     
-            else:
-                logger.error("❌ Enhanced Campaign Publisher initialization failed")
+                else:
+                    logger.error("❌ Enhanced Campaign Publisher initialization failed")
                 
-                # Fallback to original publisher
-                logger.info("Attempting fallback to original campaign publisher...")
-                try:
-                    # Campaign publisher removed during cleanup
-                    fallback_publisher = None
-                    if fallback_publisher:
-                        globals()['campaign_publisher'] = fallback_publisher
-                        logger.info("✅ Fallback campaign publisher initialized")
-                    else:
-                        logger.error("❌ Fallback publisher also failed")
-                except Exception as fallback_error:
-                    logger.error(f"❌ Fallback publisher error: {fallback_error}")
+                    # Fallback to original publisher
+                    logger.info("Attempting fallback to original campaign publisher...")
+                    try:
+                        # Campaign publisher removed during cleanup
+                        fallback_publisher = None
+                        if fallback_publisher:
+                            globals()['campaign_publisher'] = fallback_publisher
+                            logger.info("✅ Fallback campaign publisher initialized")
+                        else:
+                            logger.error("❌ Fallback publisher also failed")
+                    except Exception as fallback_error:
+                        logger.error(f"❌ Fallback publisher error: {fallback_error}")
                 
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Enhanced Campaign Publisher: {e}")
-            import traceback
-            logger.error(f"Enhanced publisher full traceback: {traceback.format_exc()}")
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize Enhanced Campaign Publisher: {e}")
+                import traceback
+                logger.error(f"Enhanced publisher full traceback: {traceback.format_exc()}")
             
-            # Try to continue without enhanced publisher
-            logger.warning("Continuing bot startup without enhanced publisher...")
+                # Try to continue without enhanced publisher
+                logger.warning("Continuing bot startup without enhanced publisher...")
+        
+        else:
+            logger.info("📤 Publishing left to publish_worker.py processes (RUN_PUBLISHER_IN_BOT=false)")
         
         # Initialize continuous payment scanner
         logger.info("Initializing continuous payment scanner...")
@@ -225,6 +232,30 @@ async def init_bot():
             logger.error(f"❌ Failed to initialize payment scanner: {e}")
             # Continue without scanner for now
         
+        # Start log retention (rollup, archive, incremental VACUUM)
+        try:
+            from log_retention import get_retention_manager
+            get_retention_manager().start()
+            logger.info("✅ Log retention scheduled")
+        except Exception as e:
+            logger.error(f"❌ Failed to start log retention: {e}")
+        
+        # Analytics snapshot refresh (only when ANALYTICS_SNAPSHOT is on)
+        try:
+            from analytics_access import get_analytics_reader
+            if get_analytics_reader(db.db_path).start():
+                logger.info("✅ Analytics snapshot refresh scheduled")
+        except Exception as e:
+            logger.error(f"❌ Failed to start analytics snapshots: {e}")
+        
+        # Reconcile the trigger-maintained admin statistics against the source tables
+        try:
+            from stats_counters import get_stats_counters
+            get_stats_counters(db.db_path).start()
+            logger.info("✅ Statistics counter reconciliation scheduled")
+        except Exception as e:
+            logger.error(f"❌ Failed to start statistics reconciliation: {e}")
+        
         # Initialize Enhanced Telegram Stars payment system
         logger.info("Initializing Enhanced Telegram Stars payment system...")
         try:
@@ -607,6 +638,15 @@ async def init_bot():
         except:
             pass
 
+        # Close pooled database connections
+        try:
+            from async_data_access import drain_background_tasks
+            from connection_pool import close_all_pools
+            await drain_background_tasks()
+            await close_all_pools()
+        except Exception as e:
+            logger.error(f"Error closing database pools: {e}")
+
 def run_bot():
     """Run bot in background thread"""
     try:
@@ -0,0 +1,177 @@
+"""
+Open payment memo index for I3lani Telegram Bot
+Every memo still waiting for a TON payment, with its expected amount,
+tolerance, user, expiry and product, held in memory so the scanner resolves
+an incoming transaction with one dict lookup. Loaded from
+payment_memo_tracking and pending TON rows in payments on startup, kept up
+to date by track_user_payment and mark_payment_confirmed
+"""
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Optional
+
+from async_data_access import get_data_access
+from config import PAYMENT_AMOUNT_TOLERANCE, PAYMENT_MEMO_TTL_HOURS
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+TRACKED_QUERY = """
+    SELECT memo, user_id, amount, ad_data, CAST(strftime('%s', created_at) AS INTEGER) AS created_ts
+    FROM payment_memo_tracking
+    WHERE status = 'pending' AND created_at >= datetime('now', ?)
+"""
+PAYMENTS_QUERY = """
+    SELECT memo, user_id, amount, CAST(strftime('%s', created_at) AS INTEGER) AS created_ts
+    FROM payments
+    WHERE status = 'pending' AND LOWER(payment_method) = 'ton' AND memo IS NOT NULL AND amount > 0
+      AND created_at >= datetime('now', ?)
+"""
+
+
+def product_of(ad_data: Optional[Dict[str, Any]]) -> str:
+    return 'post_package' if (ad_data or {}).get('type') == 'post_package' else 'campaign'
+
+
+@dataclass
+class OpenMemo:
+    """A checkout that has not been paid yet"""
+    memo: str
+    user_id: int
+    amount: float
+    expires_at: float
+    product: str = 'campaign'
+    tolerance: float = PAYMENT_AMOUNT_TOLERANCE
+    ad_data: Dict[str, Any] = field(default_factory=dict)
+
+    def check_amount(self, received: float) -> str:
+        """'exact', 'underpayment' or 'overpayment', compared in cents like PaymentAmountValidator"""
+        difference = (Decimal(str(received)).quantize(CENT, rounding=ROUND_HALF_UP)
+                      - Decimal(str(self.amount)).quantize(CENT, rounding=ROUND_HALF_UP))
+        if abs(difference) <= Decimal(str(self.tolerance)):
+            return 'exact'
+        return 'underpayment' if difference < 0 else 'overpayment'
+
+
+@dataclass
+class MemoMatch:
+    """What an incoming transaction's memo and amount resolved to"""
+    status: str  # 'exact', 'underpayment', 'overpayment' or 'unknown' (not open, or expired)
+    open_memo: Optional[OpenMemo] = None
+
+    @property
+    def valid(self) -> bool:
+        return self.status == 'exact'
+
+
+class MemoIndex:
+    """memo -> OpenMemo for every unpaid checkout"""
+
+    def __init__(self, db_path: str = "bot.db", ttl_hours: float = PAYMENT_MEMO_TTL_HOURS):
+        self.db_path = db_path
+        self.ttl = ttl_hours * 3600
+        self._open: Dict[str, OpenMemo] = {}
+        self.loaded = False
+        self._pruned_at = time.time()
+        self._stats = {'loaded': 0, 'added': 0, 'removed': 0, 'expired': 0,
+                       'exact': 0, 'underpayment': 0, 'overpayment': 0, 'unknown': 0}
+
+    async def load(self):
+        """Rebuild the index from the database"""
+        data = get_data_access(self.db_path)
+        window = f"-{self.ttl / 3600:g} hours"
+        self._open.clear()
+        for query, source in ((PAYMENTS_QUERY, 'payments'), (TRACKED_QUERY, 'payment_memo_tracking')):
+            try:
+                rows = await data.fetchall(query, (window,))
+            except Exception as e:
+                # payment_memo_tracking is created by the confirmation system on first start
+                logger.warning(f"⚠️ Memo index skipped {source}: {e}")
+                continue
+            for row in rows:
+                ad_data = {}
+                if row.get('ad_data'):
+                    try:
+                        ad_data = json.loads(row['ad_data'])
+                    except ValueError:
+                        pass
+                # Tracked memos carry the ad data, so they win over the bare payments row
+                self._open[row['memo']] = OpenMemo(
+                    memo=row['memo'], user_id=row['user_id'], amount=row['amount'],
+                    expires_at=(row['created_ts'] or time.time()) + self.ttl,
+                    product=product_of(ad_data) if source == 'payment_memo_tracking' else 'subscription',
+                    ad_data=ad_data)
+        self.loaded = True
+        self._stats['loaded'] = len(self._open)
+        logger.info(f"🧾 Memo index loaded {len(self._open)} open payment memos")
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.load()
+
+    def add(self, memo: str, user_id: int, amount: float, ad_data: Optional[Dict[str, Any]] = None,
+            product: Optional[str] = None) -> OpenMemo:
+        """Open (or replace) a memo when a checkout starts"""
+        open_memo = OpenMemo(memo=memo, user_id=user_id, amount=amount, expires_at=time.time() + self.ttl,
+                             product=product or product_of(ad_data), ad_data=dict(ad_data or {}))
+        self._open[memo] = open_memo
+        self._stats['added'] += 1
+        self._prune()
+        return open_memo
+
+    def _prune(self):
+        """Drop expired memos nobody paid (at most hourly)"""
+        now = time.time()
+        if now - self._pruned_at < 3600:
+            return
+        self._pruned_at = now
+        expired = [memo for memo, open_memo in self._open.items() if open_memo.expires_at <= now]
+        for memo in expired:
+            del self._open[memo]
+        self._stats['expired'] += len(expired)
+
+    def discard(self, memo: str):
+        """Close a memo once its payment is confirmed"""
+        if self._open.pop(memo, None) is not None:
+            self._stats['removed'] += 1
+
+    def get(self, memo: str) -> Optional[OpenMemo]:
+        open_memo = self._open.get(memo)
+        if open_memo is not None and open_memo.expires_at <= time.time():
+            del self._open[memo]
+            self._stats['expired'] += 1
+            return None
+        return open_memo
+
+    def match(self, memo: Optional[str], amount: Optional[float]) -> MemoMatch:
+        """Resolve a transaction's memo and amount against the open memos"""
+        open_memo = self.get(memo) if memo else None
+        if open_memo is None or amount is None:
+            self._stats['unknown'] += 1
+            return MemoMatch('unknown', open_memo)
+        status = open_memo.check_amount(amount)
+        self._stats[status] += 1
+        return MemoMatch(status, open_memo)
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['open'] = len(self._open)
+        return stats
+
+
+_indexes: Dict[str, MemoIndex] = {}
+
+
+def get_memo_index(db_path: str = "bot.db") -> MemoIndex:
+    """Shared memo index for a database file"""
+    index = _indexes.get(db_path)
+    if index is None:
+        index = _indexes[db_path] = MemoIndex(db_path)
+    return index
@@ -206,17 +206,9 @@ class MultilingualMenuSystem:
     async def update_user_interface_language(self, user_id: int, new_language: str):
         """Update user interface language and refresh menus"""
         try:
-            # Update user language in database
-            connection = await db.get_connection()
-            cursor = await connection.cursor()
-            
-            await cursor.execute(
-                "UPDATE users SET language = ? WHERE user_id = ?",
-                (new_language, user_id)
-            )
-            
-            await connection.commit()
-            await connection.close()
+            # Update user language through Database, which drops the cached user row
+            if not await db.update_user_language(user_id, new_language):
+                return False
             
             logger.info(f"✅ Updated interface language to {new_language} for user {user_id}")
             return True
@@ -0,0 +1,126 @@
+"""
+Advertiser notification digests for I3lani Telegram Bot
+Buffers "post published" events per advertiser and sends one summary per
+window instead of a private message per post per channel; campaign
+completion and failed posts are still sent right away. Every message takes
+a token from the shared rate limiter, so notifications never crowd out ad
+delivery
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from config import NOTIFICATION_DIGEST_MINUTES
+from languages import get_text
+from publishing_engine import ChatRateLimiter, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    opened: float
+    posts: int = 0
+    channels: Set[str] = field(default_factory=set)
+    campaigns: Set[str] = field(default_factory=set)
+
+
+class NotificationDigest:
+    """Per-user publishing digests, flushed ``window`` seconds after the first buffered event"""
+
+    def __init__(self, bot, language_of: Callable[[int], Awaitable[str]],
+                 window: float = NOTIFICATION_DIGEST_MINUTES * 60,
+                 limiter: Optional[ChatRateLimiter] = None):
+        self.bot = bot
+        self.language_of = language_of
+        self.window = window
+        self.limiter = limiter or get_rate_limiter()
+        self._pending: Dict[int, _Pending] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {'events': 0, 'digests': 0, 'immediate': 0, 'send_errors': 0}
+
+    def published(self, user_id: int, campaign_id: str, channel_id: str):
+        """Buffer one published post for the user's next digest"""
+        pending = self._pending.get(user_id)
+        if pending is None:
+            pending = self._pending[user_id] = _Pending(opened=time.monotonic())
+        pending.posts += 1
+        pending.channels.add(channel_id)
+        pending.campaigns.add(campaign_id)
+        self._stats['events'] += 1
+
+    async def campaign_completed(self, user_id: int, campaign_id: str, published: int, failed: int):
+        """Send the user's pending digest, then the completion notice"""
+        await self.flush(user_id)
+        await self._send(user_id, 'campaign_publishing_complete',
+                         campaign_id=campaign_id, published=published, failed=failed)
+        self._stats['immediate'] += 1
+
+    async def post_failed(self, user_id: int, campaign_id: str, channel_id: str):
+        """Tell the user right away that a post could not be delivered"""
+        await self._send(user_id, 'post_publish_failed', campaign_id=campaign_id, channel=channel_id)
+        self._stats['immediate'] += 1
+
+    async def flush(self, user_id: Optional[int] = None, due_only: bool = False) -> int:
+        """Send digests (one user's, or everyone's); returns the digests sent"""
+        now = time.monotonic()
+        users = [user_id] if user_id is not None else list(self._pending)
+        sent = 0
+        for user in users:
+            pending = self._pending.get(user)
+            if pending is None or (due_only and now - pending.opened < self.window):
+                continue
+            del self._pending[user]
+            if pending.posts == 1:
+                await self._send(user, 'post_published_notice', campaign_id=next(iter(pending.campaigns)),
+                                 channel=next(iter(pending.channels)))
+            else:
+                await self._send(user, 'publishing_digest', posts=pending.posts,
+                                 channels=len(pending.channels), campaigns=', '.join(sorted(pending.campaigns)),
+                                 minutes=max(1, round((now - pending.opened) / 60)))
+            self._stats['digests'] += 1
+            sent += 1
+        return sent
+
+    async def _send(self, user_id: int, key: str, **kwargs):
+        try:
+            language = await self.language_of(user_id)
+            text = get_text(language, key, **kwargs)
+            await self.limiter.acquire(user_id)
+            await self.bot.send_message(user_id, text)
+        except Exception as e:
+            self._stats['send_errors'] += 1
+            logger.error(f"❌ Error sending notification to user {user_id}: {e}")
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and send whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        # Checking a few times per window keeps a digest at most a quarter-window late
+        interval = max(1.0, min(60.0, self.window / 4))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(due_only=True)
+            except Exception as e:
+                logger.error(f"❌ Error flushing notification digests: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['pending_users'] = len(self._pending)
+        stats['window_s'] = self.window
+        return stats
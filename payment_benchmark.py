@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Payment confirmation replay benchmark for I3lani Telegram Bot
+Opens N checkouts at once through automatic_payment_confirmation (memo
+tracking and the open memo index), pays them into the fake TON API at
+random moments over a spread, and lets the real wallet ingestion and
+continuous scanner confirm them and activate one campaign each. Reports
+time-to-confirmation (p50/p95/p99/max), TON API calls per confirmation and
+database rows written per confirmation, so payment pipeline changes can be
+compared run to run
+
+    python payment_benchmark.py --checkouts 200 --spread 20 --poll-interval 2 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from fake_ton_api import DEFAULT_WALLET, FakeTONAPI
+from publish_benchmark import LoopLagMonitor, _percentile
+from query_profiler import configure_query_profiler, get_query_profiler
+
+logger = logging.getLogger(__name__)
+
+PRICES = [0.36, 0.72, 1.08, 2.16, 4.32]
+CHANNELS = ['@bench_channel_0', '@bench_channel_1', '@bench_channel_2']
+
+
+def install_write_counters(db_path: str) -> List[str]:
+    """Count every row written to the existing tables, from any connection, in bench_writes"""
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        conn.execute("CREATE TABLE IF NOT EXISTS bench_writes (table_name TEXT PRIMARY KEY, rows INTEGER NOT NULL)")
+        for table in tables:
+            for operation in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS bench_{operation.lower()}_{table} AFTER {operation} ON "{table}"
+                    BEGIN
+                        INSERT INTO bench_writes (table_name, rows) VALUES ('{table}', 1)
+                        ON CONFLICT(table_name) DO UPDATE SET rows = rows + 1;
+                    END
+                """)
+        conn.commit()
+        return tables
+    finally:
+        conn.close()
+
+
+def read_write_counters(db_path: str) -> Dict[str, int]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT table_name, rows FROM bench_writes"))
+    finally:
+        conn.close()
+
+
+def _tables(db_path: str) -> List[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    finally:
+        conn.close()
+
+
+def _checkouts(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Bot-style memos (two letters, four digits) with campaign prices"""
+    return [{
+        'user_id': 200000 + n,
+        'memo': f"{chr(65 + n // 10000 % 26)}{chr(65 + n // 260000 % 26)}{n % 10000:04d}",
+        'amount': rng.choice(PRICES),
+        'ad_data': {'ad_content': f"Benchmark ad {n}", 'selected_channels': CHANNELS,
+                    'duration_days': 3, 'posts_per_day': 2, 'total_reach': 1000},
+    } for n in range(count)]
+
+
+async def _run(db_path: str, api: FakeTONAPI, checkouts: List[Dict[str, Any]], spread_seconds: float,
+               poll_interval: float, duplicate_rate: float, noise: int, timeout: float,
+               rng: random.Random) -> Dict[str, Any]:
+    from automatic_payment_confirmation import AutomaticPaymentConfirmation
+    from campaign_management import CampaignManager
+    from connection_pool import close_all_pools
+    from continuous_payment_scanner import ContinuousPaymentScanner
+    from enhanced_ton_payment_monitoring import EnhancedTONPaymentMonitor
+    from global_sequence_system import astart_user_global_sequence
+    from memo_index import get_memo_index
+    from payment_ledger import get_payment_ledger
+    from ton_http import get_ton_http_client
+    from ton_ingestion import TransactionIngestor
+
+    confirmation = AutomaticPaymentConfirmation(db_path)
+    campaigns = CampaignManager(db_path)
+    await confirmation.init_tables()
+    await campaigns.init_tables()
+    counted = install_write_counters(db_path)
+
+    paid: Dict[str, float] = {}
+    detected: Dict[str, float] = {}
+    completed: Dict[str, float] = {}
+    activated: List[str] = []
+    escalated: List[str] = []
+
+    class MeasuredScanner(ContinuousPaymentScanner):
+        """Activates the campaign (without publishing) and records when each payment was confirmed"""
+
+        async def confirm_missed_payment(self, memo, amount, sender, timestamp, open_memo=None):
+            if open_memo is None:
+                escalated.append(memo)
+                return True
+            campaign_id = await campaigns.create_campaign(open_memo.user_id, memo, amount, open_memo.ad_data)
+            if not campaign_id:
+                return False
+            await confirmation.mark_payment_confirmed(memo, campaign_id)
+            activated.append(campaign_id)
+            completed.setdefault(memo, time.time())
+            return True
+
+    ingestor = TransactionIngestor(api.wallet, monitor=EnhancedTONPaymentMonitor(), poll_interval=poll_interval)
+    scanner = MeasuredScanner()
+    scanner.ingestor = ingestor
+    scanner.memo_index = get_memo_index(db_path)
+    scanner.ledger = get_payment_ledger(db_path)
+    # The shared instances may have been loaded from another bot.db earlier in this process
+    await scanner.memo_index.load()
+    await scanner.ledger.load()
+
+    # Users start a sequence when they begin creating their ad, well before paying
+    for checkout in checkouts:
+        await astart_user_global_sequence(checkout['user_id'], f"bench{checkout['user_id']}", 'en')
+    # Every checkout is opened at once, as the handlers do when users press "pay"
+    checkout_started = time.time()
+    await asyncio.gather(*(confirmation.track_user_payment(c['user_id'], c['memo'], c['amount'], c['ad_data'])
+                           for c in checkouts))
+    checkout_s = time.time() - checkout_started
+    writes_before = read_write_counters(db_path)
+
+    profiler = get_query_profiler()
+    profiler.reset()
+    requests_before = api.get_stats()['requests']
+    lag = LoopLagMonitor()
+    lag.start()
+    ingestor.add_listener(scanner.scan_for_payments)
+
+    async def checkout_waits(checkout):
+        """The user's checkout screen waits on its memo like monitor_payment_enhanced"""
+        tx = await ingestor.wait_for_memo(checkout['memo'], timeout)
+        if tx is not None:
+            detected[checkout['memo']] = time.time()
+
+    async def pay(checkout):
+        await asyncio.sleep(rng.uniform(0, spread_seconds))
+        paid[checkout['memo']] = api.add_payment(checkout['memo'], checkout['amount']).added_at
+        if rng.random() < duplicate_rate:
+            # The same memo paid again (a double tap in the wallet app)
+            await asyncio.sleep(rng.uniform(0, poll_interval * 2))
+            api.add_payment(checkout['memo'], checkout['amount'])
+
+    async def transfer():
+        """Someone else's transfer to the wallet, without a memo"""
+        await asyncio.sleep(rng.uniform(0, spread_seconds))
+        api.add_payment(None, rng.choice(PRICES))
+
+    waits = [asyncio.create_task(checkout_waits(c)) for c in checkouts]
+    payers = [asyncio.create_task(pay(c)) for c in checkouts] + [asyncio.create_task(transfer())
+                                                                 for _ in range(noise)]
+    started = time.time()
+    timed_out = False
+    while len(completed) < len(checkouts) or not all(task.done() for task in payers):
+        if time.time() - started > timeout:
+            timed_out = True
+            break
+        await asyncio.sleep(0.05)
+    # Duplicates paid last still have to be seen (and refused) before the run ends
+    await asyncio.sleep(poll_interval * 2)
+    finished = max(completed.values(), default=time.time())
+
+    db_stats = profiler.get_stats()
+    ingestor.remove_listener(scanner.scan_for_payments)
+    ingestor.stop()
+    for task in waits + payers:
+        task.cancel()
+    await asyncio.gather(*waits, *payers, return_exceptions=True)
+    await lag.stop()
+    api_calls = api.get_stats()['requests'] - requests_before
+    client_stats = get_ton_http_client().get_stats()
+    await get_ton_http_client().close()
+    campaign_rows = await campaigns.data.fetchval(
+        "SELECT COUNT(*) FROM campaigns WHERE payment_memo IN (SELECT memo FROM payment_ledger)")
+    ledger_stats = scanner.ledger.get_stats()
+    await close_all_pools()
+
+    writes_after = read_write_counters(db_path)
+    writes = {table: rows - writes_before.get(table, 0) for table, rows in writes_after.items()
+              if rows - writes_before.get(table, 0) > 0}
+    confirmed = len(completed)
+    ttc = [(completed[memo] - paid[memo]) * 1000 for memo in completed if memo in paid]
+    detect = [(detected[memo] - paid[memo]) * 1000 for memo in detected if memo in paid]
+    return {
+        'checkouts': len(checkouts),
+        'confirmed': confirmed,
+        'campaigns': campaign_rows,
+        'activations': len(activated),
+        'escalated': len(escalated),
+        'timed_out': timed_out,
+        'checkout_s': round(checkout_s, 3),
+        'elapsed_s': round(finished - started, 3),
+        'ttc_p50_ms': round(_percentile(ttc, 50), 1),
+        'ttc_p95_ms': round(_percentile(ttc, 95), 1),
+        'ttc_p99_ms': round(_percentile(ttc, 99), 1),
+        'ttc_max_ms': round(max(ttc, default=0.0), 1),
+        'detect_p50_ms': round(_percentile(detect, 50), 1),
+        'detect_p95_ms': round(_percentile(detect, 95), 1),
+        'api_calls': api_calls,
+        'api_calls_per_confirmation': round(api_calls / max(confirmed, 1), 3),
+        'db_writes': sum(writes.values()),
+        'db_writes_per_confirmation': round(sum(writes.values()) / max(confirmed, 1), 2),
+        'db_writes_by_table': dict(sorted(writes.items(), key=lambda item: -item[1])),
+        'db_uncounted_tables': sorted(set(_tables(db_path)) - set(counted) - {'bench_writes'}),
+        'db_queries': db_stats['queries'],
+        'db_ms_per_confirmation': round(db_stats['total_ms'] / max(confirmed, 1), 3),
+        'loop_blocked_ms': round(lag.blocked * 1000, 1),
+        'loop_max_block_ms': round(lag.max_block * 1000, 1),
+        'ingestion': ingestor.get_stats(),
+        'ton_client': client_stats,
+        'ledger': ledger_stats,
+    }
+
+
+def run_benchmark(checkouts: int = 50, spread_seconds: float = 5.0, poll_interval: float = 1.0,
+                  latency_ms: float = 80.0, jitter_ms: float = 40.0, error_rate: float = 0.0,
+                  rate_limit: Optional[int] = None, tonapi_latency_ms: Optional[float] = None,
+                  hedge: bool = True, duplicate_rate: float = 0.0, noise: Optional[int] = None,
+                  fixtures: Optional[List[str]] = None, timeout: float = 300.0, seed: int = 1) -> Dict[str, Any]:
+    """Run one benchmark in a throwaway directory and return its report"""
+    from schema_migrations import migrate
+    from ton_http import CircuitBreaker, Provider, TONHttpClient, configure_ton_http_client, get_ton_http_client
+
+    rng = random.Random(seed)
+    api = FakeTONAPI(DEFAULT_WALLET, latency_ms, jitter_ms, error_rate, rate_limit, seed)
+    if tonapi_latency_ms is not None:
+        api.profiles['tonapi'].latency_ms = tonapi_latency_ms
+    for path in fixtures or []:
+        api.load_fixture(path)
+    api.start_in_thread()
+    previous_client = get_ton_http_client()
+    configure_ton_http_client(TONHttpClient({
+        name: Provider(name, f"{api.base_url}/{name}", concurrency, breaker=CircuitBreaker())
+        for name, concurrency in (('toncenter', 2), ('tonapi', 4))
+    }, timeout=10, hedge=hedge))
+    previous = os.getcwd()
+    profiling = get_query_profiler().enabled
+    configure_query_profiler(True)
+    try:
+        with tempfile.TemporaryDirectory(prefix="payment_bench_") as tmp:
+            # Modules that open "bot.db" themselves (sequences, content integrity) see the throwaway copy;
+            # the pipeline uses the same relative path, so they all share one connection pool
+            os.chdir(tmp)
+            try:
+                db_path = "bot.db"
+                migrate(db_path)
+                report = asyncio.run(_run(db_path, api, _checkouts(checkouts, rng), spread_seconds,
+                                          poll_interval, duplicate_rate,
+                                          checkouts if noise is None else noise, timeout, rng))
+            finally:
+                os.chdir(previous)
+    finally:
+        configure_query_profiler(profiling)
+        configure_ton_http_client(previous_client)
+        api.stop_thread()
+    report['api'] = api.get_stats()
+    report['setup'] = {'checkouts': checkouts, 'spread_s': spread_seconds, 'poll_interval_s': poll_interval,
+                       'latency_ms': latency_ms, 'jitter_ms': jitter_ms, 'error_rate': error_rate,
+                       'rate_limit': rate_limit, 'hedge': hedge, 'duplicate_rate': duplicate_rate}
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    setup = report['setup']
+    api = report['api']
+    tables = ', '.join(f"{table} {rows}" for table, rows in list(report['db_writes_by_table'].items())[:5])
+    lines = [
+        f"📊 {setup['checkouts']} checkouts paid over {setup['spread_s']:.0f}s, polled every "
+        f"{setup['poll_interval_s']:g}s ({setup['latency_ms']:.0f}±{setup['jitter_ms']:.0f}ms API latency, "
+        f"{setup['error_rate']:.0%} errors)",
+        f"   Confirmed:   {report['confirmed']}/{report['checkouts']} into {report['campaigns']} campaigns"
+        f"{' (TIMED OUT)' if report['timed_out'] else ''}",
+        f"   Confirm in:  p50 {report['ttc_p50_ms']:.0f}ms, p95 {report['ttc_p95_ms']:.0f}ms, "
+        f"p99 {report['ttc_p99_ms']:.0f}ms, max {report['ttc_max_ms']:.0f}ms "
+        f"(checkout sees it at p50 {report['detect_p50_ms']:.0f}ms)",
+        f"   TON API:     {report['api_calls_per_confirmation']:.2f} calls/confirmation "
+        f"({report['api_calls']} calls: toncenter {api['toncenter'].get('requests', 0)}, "
+        f"tonapi {api['tonapi'].get('requests', 0)}; "
+        f"{sum(api[name].get('errors', 0) + api[name].get('rate_limited', 0) for name in ('toncenter', 'tonapi'))}"
+        f" failed)",
+        f"   Database:    {report['db_writes_per_confirmation']:.1f} rows written/confirmation ({tables}), "
+        f"{report['db_ms_per_confirmation']:.2f}ms/confirmation",
+        f"   Event loop:  {report['loop_blocked_ms']:.0f}ms blocked, longest {report['loop_max_block_ms']:.0f}ms",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark TON payment confirmation against a fake TON API")
+    parser.add_argument('--checkouts', type=int, default=50)
+    parser.add_argument('--spread', type=float, default=5.0, help="seconds the payments are spread over")
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="wallet ingestion poll interval")
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--jitter-ms', type=float, default=40.0)
+    parser.add_argument('--tonapi-latency-ms', type=float, default=None, help="tonapi latency, if different")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of API requests answered 500")
+    parser.add_argument('--rate-limit', type=int, default=None, help="API requests per second per provider")
+    parser.add_argument('--no-hedge', action='store_true', help="only ask tonapi when toncenter fails")
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help="share of memos paid twice")
+    parser.add_argument('--noise', type=int, default=None, help="unrelated transfers (default: one per checkout)")
+    parser.add_argument('--fixture', action='append', default=[], help="recorded getTransactions response(s)")
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    # Before the pipeline modules' own basicConfig(INFO), which then does nothing
+    logging.basicConfig(level=args.log_level)
+    report = run_benchmark(
+        checkouts=args.checkouts, spread_seconds=args.spread, poll_interval=args.poll_interval,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, tonapi_latency_ms=args.tonapi_latency_ms, hedge=not args.no_hedge,
+        duplicate_rate=args.duplicate_rate, noise=args.noise, fixtures=args.fixture, timeout=args.timeout,
+        seed=args.seed,
+    )
+    print(json.dumps(report, indent=2, default=str) if args.json else format_report(report))
+    return 1 if report['timed_out'] else 0
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Payment idempotency ledger for I3lani Telegram Bot
+Every accepted TON payment is a payment_ledger row keyed by (tx_hash, memo),
+with a unique memo, written in the same transaction that inserts its
+campaign, so a payment can never activate twice. A bloom filter and an LRU
+of recent memos sit in front: a memo the bloom filter has never seen is new
+without a disk read. Replaces the confirmed_payments list in
+pending_payments.json, which is imported once
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from async_data_access import get_data_access
+from config import PAYMENT_LEDGER_BLOOM_CAPACITY, PAYMENT_LEDGER_CACHE_SIZE
+from read_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+BLOOM_ERROR_RATE = 0.01
+# Ledger rows never change, so cached entries only leave by LRU eviction
+CACHE_TTL = 7 * 24 * 3600
+# tx_hash for memos imported from pending_payments.json (the file kept no hashes)
+IMPORTED_TX = 'imported:pending_payments.json'
+
+INSERT_QUERY = """
+    INSERT OR IGNORE INTO payment_ledger (tx_hash, memo, user_id, amount, campaign_id, source)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class PaymentLedger:
+    """Has this memo already been paid for? Answered from memory whenever possible"""
+
+    def __init__(self, db_path: str = "bot.db", capacity: int = PAYMENT_LEDGER_BLOOM_CAPACITY,
+                 cache_size: int = PAYMENT_LEDGER_CACHE_SIZE):
+        self.db_path = db_path
+        self.data = get_data_access(db_path)
+        self.capacity = capacity
+        self.bloom = BloomFilter(capacity)
+        self.recent = TTLCache('payment_ledger', cache_size, CACHE_TTL)
+        self.loaded = False
+        self._stats = {'bloom_negative': 0, 'cache_hits': 0, 'disk_checks': 0, 'false_positives': 0,
+                       'recorded': 0, 'duplicates': 0, 'imported': 0}
+
+    async def load(self):
+        """Fill the bloom filter from every recorded memo"""
+        self.bloom = BloomFilter(self.capacity)
+        for row in await self.data.fetchall("SELECT memo FROM payment_ledger"):
+            self.bloom.add(row['memo'])
+        self.loaded = True
+        if self.bloom.count > self.capacity:
+            logger.warning(f"⚠️ Payment ledger holds {self.bloom.count} memos, past its bloom capacity "
+                           f"{self.capacity}; more lookups will reach the database")
+        logger.info(f"🧾 Payment ledger loaded {self.bloom.count} recorded payments")
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.load()
+
+    def remember(self, memo: str):
+        """Note a committed ledger row in the in-memory front"""
+        self.bloom.add(memo)
+        self.recent.set(memo, True)
+
+    async def seen(self, memo: str) -> bool:
+        """Whether a payment with this memo was already accepted"""
+        await self.ensure_loaded()
+        if memo not in self.bloom:
+            self._stats['bloom_negative'] += 1
+            return False
+        if self.recent.get(memo):
+            self._stats['cache_hits'] += 1
+            return True
+        self._stats['disk_checks'] += 1
+        if await self.data.fetchval("SELECT 1 FROM payment_ledger WHERE memo = ?", (memo,)):
+            self.recent.set(memo, True)
+            return True
+        self._stats['false_positives'] += 1
+        return False
+
+    async def campaign_for(self, memo: str) -> Optional[str]:
+        """The campaign a recorded payment activated (a database read; duplicates are rare)"""
+        return await self.data.fetchval("SELECT campaign_id FROM payment_ledger WHERE memo = ?", (memo,))
+
+    async def record_in(self, conn, tx_hash: str, memo: str, user_id: Optional[int] = None,
+                        amount: Optional[float] = None, campaign_id: Optional[str] = None,
+                        source: str = 'ton') -> bool:
+        """Insert the ledger row on ``conn`` (inside the caller's transaction); False if already recorded.
+
+        Call ``remember(memo)`` once the transaction has committed.
+        """
+        cursor = await conn.execute(INSERT_QUERY, (tx_hash or '', memo, user_id, amount, campaign_id, source))
+        if cursor.rowcount != 1:
+            self._stats['duplicates'] += 1
+            return False
+        self._stats['recorded'] += 1
+        return True
+
+    async def record(self, tx_hash: str, memo: str, user_id: Optional[int] = None,
+                     amount: Optional[float] = None, campaign_id: Optional[str] = None,
+                     source: str = 'ton') -> bool:
+        """Record a payment on its own; False if it was already recorded"""
+        recorded = await self.data.run_in_transaction(
+            lambda conn: self.record_in(conn, tx_hash, memo, user_id, amount, campaign_id, source))
+        self.remember(memo)
+        return recorded
+
+    async def activate_once(self, tx_hash: str, memo: str, user_id: int, amount: float, campaign_id: str,
+                            activate: Callable[[Any], Awaitable[Any]], source: str = 'ton') -> bool:
+        """Record the payment and run ``await activate(conn)`` in one transaction.
+
+        Returns False, without activating, if the memo was already recorded.
+        """
+
+        async def _activate(conn) -> bool:
+            if not await self.record_in(conn, tx_hash, memo, user_id, amount, campaign_id, source):
+                return False
+            await activate(conn)
+            return True
+
+        activated = await self.data.run_in_transaction(_activate)
+        self.remember(memo)
+        return activated
+
+    async def import_json(self, path: str = "pending_payments.json") -> int:
+        """One-time import of the scanner's old confirmed_payments file; renames it when done"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r') as f:
+                memos = [str(memo) for memo in json.load(f).get('confirmed_payments', []) if memo]
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"❌ Could not import {path} into the payment ledger: {e}")
+            return 0
+        await self.ensure_loaded()
+        result = await self.data.executemany(INSERT_QUERY, [(IMPORTED_TX, memo, None, None, None, 'import')
+                                                            for memo in memos])
+        for memo in memos:
+            self.remember(memo)
+        os.replace(path, path + '.imported')
+        imported = result.rowcount
+        self._stats['imported'] += imported
+        logger.info(f"🧾 Imported {imported} confirmed payments from {path} into the payment ledger")
+        return imported
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['bloom_entries'] = self.bloom.count
+        stats['bloom_bits'] = self.bloom.size
+        stats['cache'] = self.recent.get_stats()
+        return stats
+
+
+_ledgers: Dict[str, PaymentLedger] = {}
+
+
+def get_payment_ledger(db_path: str = "bot.db") -> PaymentLedger:
+    """Shared ledger for a database file"""
+    ledger = _ledgers.get(db_path)
+    if ledger is None:
+        ledger = _ledgers[db_path] = PaymentLedger(db_path)
+    return ledger
@@ -4,9 +4,9 @@ Post Identity System with Global Sequence Integration
 Implements unified sequence-based post tracking and metadata management
 """
 
-import sqlite3
 import json
 import logging
+import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
@@ -18,6 +18,8 @@ from global_sequence_system import (
     log_sequence_step, link_to_global_sequence
 )
 from sequence_logger import get_sequence_logger
+from async_data_access import get_data_access
+from schema_migrations import run_migrations
 
 logging.basicConfig(level=logging.INFO)
 logger = get_sequence_logger(__name__)
@@ -43,85 +45,51 @@ class PostMetadata:
     published_channels: List[str] = None
     verification_hash: str = ''
 
+# Set-based form of log_publication for publishing batches: the match is
+# decided in SQL against the stored hash, so no metadata read per post
+PUBLICATION_LOG_SQL = """
+    INSERT INTO post_publishing_log (
+        post_id, campaign_id, channel_id, channel_name,
+        message_id, content_hash, publishing_status, verification_status
+    )
+    SELECT post_id, campaign_id, ?, ?, ?, ?, 'success',
+           CASE WHEN verification_hash = ? THEN 'match' ELSE 'mismatch' END
+    FROM post_identity WHERE post_id = ?
+"""
+
+PUBLICATION_MISMATCH_SQL = """
+    UPDATE content_verification
+    SET published_content_hash = ?, match_status = 'mismatch',
+        discrepancy_details = 'Content hash mismatch detected'
+    WHERE post_id = ? AND EXISTS (
+        SELECT 1 FROM post_identity p
+        WHERE p.post_id = content_verification.post_id AND p.verification_hash IS NOT ?
+    )
+"""
+
+PUBLICATION_STATUS_SQL = """
+    UPDATE post_identity SET status = 'publishing', updated_at = CURRENT_TIMESTAMP
+    WHERE post_id = ? AND status != 'publishing'
+"""
+
+
+def publication_hash(published_content: str) -> str:
+    """Hash of published content, as compared with the identity's verification hash"""
+    import hashlib
+    return hashlib.md5(published_content.encode()).hexdigest()
+
+
 class PostIdentitySystem:
     """Comprehensive post identity and content integrity system"""
     
     def __init__(self, db_path: str = "bot.db"):
         self.db_path = db_path
+        self.data = get_data_access(db_path)
         
     async def init_tables(self):
         """Initialize post identity tables"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create post_identity table for full metadata tracking
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS post_identity (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    post_id TEXT UNIQUE NOT NULL,
-                    campaign_id TEXT NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    advertiser_username TEXT NOT NULL,
-                    creation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    content_text TEXT NOT NULL,
-                    content_image TEXT,
-                    content_video TEXT,
-                    content_type TEXT DEFAULT 'text',
-                    channel_count INTEGER DEFAULT 0,
-                    publishing_days INTEGER DEFAULT 0,
-                    posts_per_day INTEGER DEFAULT 0,
-                    target_channels TEXT,
-                    total_reach INTEGER DEFAULT 0,
-                    status TEXT DEFAULT 'created',
-                    published_channels TEXT,
-                    verification_hash TEXT,
-                    metadata_json TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            # Create post_publishing_log for tracking actual publications
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS post_publishing_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    post_id TEXT NOT NULL,
-                    campaign_id TEXT NOT NULL,
-                    channel_id TEXT NOT NULL,
-                    channel_name TEXT,
-                    published_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    message_id INTEGER,
-                    content_hash TEXT,
-                    publishing_status TEXT DEFAULT 'success',
-                    error_message TEXT,
-                    verification_status TEXT DEFAULT 'pending',
-                    FOREIGN KEY (post_id) REFERENCES post_identity (post_id)
-                );
-            """)
-            
-            # Create content_verification table for integrity checks
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS content_verification (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    post_id TEXT NOT NULL,
-                    original_content_hash TEXT NOT NULL,
-                    published_content_hash TEXT,
-                    verification_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    match_status TEXT DEFAULT 'pending',
-                    discrepancy_details TEXT,
-                    FOREIGN KEY (post_id) REFERENCES post_identity (post_id)
-                );
-            """)
-            
-            # Create indexes for better performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_post_identity_campaign ON post_identity(campaign_id);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_post_identity_user ON post_identity(user_id);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_publishing_log_post ON post_publishing_log(post_id);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_content_verification_post ON content_verification(post_id);")
-            
-            conn.commit()
-            conn.close()
+            await run_migrations(self.db_path)
             
             logger.info("✅ Post Identity System tables initialized")
             return True
@@ -152,9 +120,9 @@ class PostIdentitySystem:
                     logger.error(f"❌ Invalid sequence ID format: {sequence_id}")
                     return f"POST-INVALID-{datetime.now().strftime('%H%M%S')}"
             else:
-                # Fallback for legacy data
+                # Fallback for legacy data; the suffix keeps campaigns created in the same second apart
                 logger.warning("⚠️ No sequence ID provided, using fallback post ID generation")
-                return f"POST-LEGACY-{datetime.now().strftime('%H%M%S')}"
+                return f"POST-LEGACY-{datetime.now().strftime('%H%M%S')}-{uuid.uuid4().hex[:6].upper()}"
                 
         except Exception as e:
             logger.error(f"❌ Error generating post ID: {e}")
@@ -167,7 +135,7 @@ class PostIdentitySystem:
         try:
             # Get user's sequence ID
             manager = get_global_sequence_manager()
-            sequence_id = manager.get_user_active_sequence(user_id)
+            sequence_id = await manager.aget_user_active_sequence(user_id)
             
             # Check if post identity already exists for this campaign
             existing_post = await self.get_post_for_campaign(campaign_id)
@@ -216,33 +184,28 @@ class PostIdentitySystem:
             )
             
             # Store in database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO post_identity (
+            await self.data.transaction([
+                ("""
+                    INSERT INTO post_identity (
+                        post_id, campaign_id, user_id, advertiser_username,
+                        content_text, content_image, content_video, content_type,
+                        channel_count, publishing_days, posts_per_day,
+                        target_channels, total_reach, verification_hash,
+                        metadata_json, status
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
                     post_id, campaign_id, user_id, advertiser_username,
                     content_text, content_image, content_video, content_type,
                     channel_count, publishing_days, posts_per_day,
-                    target_channels, total_reach, verification_hash,
-                    metadata_json, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                post_id, campaign_id, user_id, advertiser_username,
-                content_text, content_image, content_video, content_type,
-                channel_count, publishing_days, posts_per_day,
-                json.dumps(target_channels), total_reach, verification_hash,
-                json.dumps(metadata.__dict__), 'created'
-            ))
-            
-            # Create initial content verification record
-            cursor.execute("""
-                INSERT INTO content_verification (post_id, original_content_hash, match_status)
-                VALUES (?, ?, 'verified')
-            """, (post_id, verification_hash))
-            
-            conn.commit()
-            conn.close()
+                    json.dumps(target_channels), total_reach, verification_hash,
+                    json.dumps(metadata.__dict__), 'created'
+                )),
+                # Create initial content verification record
+                ("""
+                    INSERT INTO content_verification (post_id, original_content_hash, match_status)
+                    VALUES (?, ?, 'verified')
+                """, (post_id, verification_hash)),
+            ])
             
             logger.info(f"✅ Created post identity {post_id} for campaign {campaign_id}")
             return post_id
@@ -254,17 +217,10 @@ class PostIdentitySystem:
     async def get_post_metadata(self, post_id: str) -> Optional[PostMetadata]:
         """Get complete post metadata by post ID"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            row = await self.data.fetchone("""
                 SELECT * FROM post_identity WHERE post_id = ?
             """, (post_id,))
             
-            row = cursor.fetchone()
-            conn.close()
-            
             if row:
                 return PostMetadata(
                     post_id=row['post_id'],
@@ -296,8 +252,7 @@ class PostIdentitySystem:
         """Log actual publication with content verification"""
         try:
             # Create hash of published content for verification
-            import hashlib
-            published_hash = hashlib.md5(published_content.encode()).hexdigest()
+            published_hash = publication_hash(published_content)
             
             # Get original content hash for comparison
             metadata = await self.get_post_metadata(post_id)
@@ -308,11 +263,8 @@ class PostIdentitySystem:
             # Determine verification status
             verification_status = 'match' if published_hash == metadata.verification_hash else 'mismatch'
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Log the publication
-            cursor.execute("""
+            statements = [("""
                 INSERT INTO post_publishing_log (
                     post_id, campaign_id, channel_id, channel_name,
                     message_id, content_hash, publishing_status, verification_status
@@ -320,28 +272,27 @@ class PostIdentitySystem:
             """, (
                 post_id, metadata.campaign_id, channel_id, channel_name,
                 message_id, published_hash, 'success', verification_status
-            ))
+            ))]
             
             # Update content verification if there's a mismatch
             if verification_status == 'mismatch':
-                cursor.execute("""
+                statements.append(("""
                     UPDATE content_verification 
                     SET published_content_hash = ?, match_status = 'mismatch',
                         discrepancy_details = 'Content hash mismatch detected'
                     WHERE post_id = ?
-                """, (published_hash, post_id))
+                """, (published_hash, post_id)))
                 
                 logger.warning(f"⚠️ Content mismatch detected for post {post_id} in {channel_id}")
             
             # Update post status
-            cursor.execute("""
+            statements.append(("""
                 UPDATE post_identity 
                 SET status = 'publishing', updated_at = CURRENT_TIMESTAMP
                 WHERE post_id = ?
-            """, (post_id,))
+            """, (post_id,)))
             
-            conn.commit()
-            conn.close()
+            await self.data.transaction(statements)
             
             logger.info(f"✅ Logged publication of {post_id} to {channel_id} - {verification_status}")
             return True
@@ -353,17 +304,10 @@ class PostIdentitySystem:
     async def get_post_for_campaign(self, campaign_id: str) -> Optional[PostMetadata]:
         """Get the single post for a campaign (one-to-one relationship)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            row = await self.data.fetchone("""
                 SELECT * FROM post_identity WHERE campaign_id = ? LIMIT 1
             """, (campaign_id,))
             
-            row = cursor.fetchone()
-            conn.close()
-            
             if row:
                 return PostMetadata(
                     post_id=row['post_id'],
@@ -393,11 +337,7 @@ class PostIdentitySystem:
     async def verify_content_integrity(self, campaign_id: str) -> Dict[str, Any]:
         """Verify content integrity for all posts in a campaign"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            rows = await self.data.fetchall("""
                 SELECT pi.post_id, pi.verification_hash, cv.match_status, cv.discrepancy_details,
                        COUNT(ppl.id) as publications_count
                 FROM post_identity pi
@@ -407,9 +347,6 @@ class PostIdentitySystem:
                 GROUP BY pi.post_id
             """, (campaign_id,))
             
-            rows = cursor.fetchall()
-            conn.close()
-            
             verification_report = {
                 'campaign_id': campaign_id,
                 'total_posts': len(rows),
@@ -0,0 +1,137 @@
+"""
+Publishing unit of work for I3lani Telegram Bot
+Collects the bookkeeping for sent posts (post status, publication log,
+content verification, channel logs) and writes it in one transaction per
+batch instead of several connections and commits per post
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from config import PUBLISH_BATCH_FLUSH_SECONDS, PUBLISH_BATCH_SIZE
+from post_identity_system import (
+    PUBLICATION_LOG_SQL, PUBLICATION_MISMATCH_SQL, PUBLICATION_STATUS_SQL, publication_hash
+)
+from publish_leases import CLEAR_LEASE, HOLDS_LEASE
+
+logger = logging.getLogger(__name__)
+
+MARK_PUBLISHED_SQL = f"""
+    UPDATE campaign_posts
+    SET status = 'published', published_at = CURRENT_TIMESTAMP, {CLEAR_LEASE}
+    WHERE id = ? AND {HOLDS_LEASE}
+"""
+
+CHANNEL_SUCCESS_SQL = """
+    INSERT INTO channel_publishing_logs
+    (campaign_id, channel_id, message_id, content_type, media_url, status)
+    VALUES (?, ?, ?, ?, ?, 'success')
+"""
+
+CHANNEL_FAILURE_SQL = """
+    INSERT INTO channel_publishing_logs
+    (campaign_id, channel_id, content_type, status, error_message)
+    VALUES (?, ?, ?, 'failed', ?)
+"""
+
+
+class PublishBatch:
+    """Buffers per-post results and flushes them together.
+
+    A flush happens when ``max_size`` results are waiting or the oldest has
+    waited ``max_age`` seconds, and whenever the publisher finishes a batch.
+    Posts stay 'claimed' until their result is flushed, so the flush age must
+    stay well under the lease time. A post whose lease ``owner`` lost in the
+    meantime is left to its new owner and counted under ``lost_leases``.
+    """
+
+    def __init__(self, data, owner: str, max_size: int = PUBLISH_BATCH_SIZE,
+                 max_age: float = PUBLISH_BATCH_FLUSH_SECONDS):
+        self.data = data
+        self.owner = owner
+        self.max_size = max(1, max_size)
+        self.max_age = max_age
+        self._published: List[Dict[str, Any]] = []
+        self._failures: List[tuple] = []
+        self._opened: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._stats = {'flushes': 0, 'published': 0, 'failures': 0, 'flush_errors': 0, 'lost_leases': 0}
+
+    def __len__(self) -> int:
+        return len(self._published) + len(self._failures)
+
+    async def published(self, post: Dict[str, Any], post_identity_id: str, channel_name: str,
+                        message_id: int, content: str):
+        """Record a successful send"""
+        self._published.append({
+            'post_id': post['id'], 'campaign_id': post['campaign_id'], 'channel_id': post['channel_id'],
+            'content_type': post.get('content_type', 'text'), 'media_url': post.get('media_url'),
+            'identity': post_identity_id, 'channel_name': channel_name, 'message_id': message_id,
+            'hash': publication_hash(content),
+        })
+        await self._added()
+
+    async def failed(self, campaign_id: str, channel_id: str, content_type: str, error_message: str):
+        """Record a failed send for the channel log (the post's own state is handled by publish_retry)"""
+        self._failures.append((campaign_id, channel_id, content_type, error_message))
+        await self._added()
+
+    async def _added(self):
+        if self._opened is None:
+            self._opened = time.monotonic()
+        if len(self) >= self.max_size or time.monotonic() - self._opened >= self.max_age:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything buffered in one transaction; returns the results written"""
+        async with self._lock:
+            published, failures = self._published, self._failures
+            if not published and not failures:
+                return 0
+            self._published, self._failures, self._opened = [], [], None
+
+            async def _write(conn) -> int:
+                cursor = await conn.executemany(MARK_PUBLISHED_SQL,
+                                                [(p['post_id'], self.owner) for p in published])
+                marked = cursor.rowcount if published else 0
+                await conn.executemany(PUBLICATION_LOG_SQL, [
+                    (p['channel_id'], p['channel_name'], p['message_id'], p['hash'], p['hash'], p['identity'])
+                    for p in published
+                ])
+                await conn.executemany(PUBLICATION_MISMATCH_SQL,
+                                       [(p['hash'], p['identity'], p['hash']) for p in published])
+                await conn.executemany(PUBLICATION_STATUS_SQL,
+                                       [(identity,) for identity in {p['identity'] for p in published}])
+                await conn.executemany(CHANNEL_SUCCESS_SQL, [
+                    (p['campaign_id'], p['channel_id'], p['message_id'], p['content_type'], p['media_url'])
+                    for p in published
+                ])
+                await conn.executemany(CHANNEL_FAILURE_SQL, failures)
+                return marked
+
+            try:
+                marked = await self.data.run_in_transaction(_write)
+            except Exception as e:
+                # Keep the results for the next flush; the posts are still claimed meanwhile
+                self._published[:0], self._failures[:0] = published, failures
+                self._opened = self._opened or time.monotonic()
+                self._stats['flush_errors'] += 1
+                logger.error(f"❌ Error flushing {len(published) + len(failures)} publishing results: {e}")
+                return 0
+
+            if marked < len(published):
+                # The message went out, so its logs stay; the post row belongs to another worker now
+                self._stats['lost_leases'] += len(published) - marked
+                logger.warning(f"⏳ {len(published) - marked} published posts had lost their lease; "
+                               f"their status was left to the new owner")
+            self._stats['flushes'] += 1
+            self._stats['published'] += len(published)
+            self._stats['failures'] += len(failures)
+            logger.info(f"💾 Flushed {len(published)} published and {len(failures)} failed posts")
+            return len(published) + len(failures)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['pending'] = len(self)
+        return stats
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Publishing throughput benchmark for I3lani Telegram Bot
+Seeds a temporary bot.db with N campaigns x M channels x K posts and runs
+the real EnhancedCampaignPublisher against the fake Bot API server until
+every post is published or dead-lettered. Reports posts/s, publish lag
+against scheduled_time (p50/p95/max), database time per post and event
+loop blocking time, so scheduler changes can be compared run to run
+
+    python publish_benchmark.py --campaigns 20 --channels 10 --posts 3 --flood-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from event_loop_watchdog import EventLoopWatchdog
+from fake_bot_api import FakeBotAPI
+from query_profiler import configure_query_profiler, get_query_profiler
+
+logger = logging.getLogger(__name__)
+
+BENCH_TOKEN = "123456:BENCHMARK-TOKEN"
+SAMPLE_PHOTOS = ['https://cdn.example/bench-1.jpg', 'https://cdn.example/bench-2.jpg']
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class LoopLagMonitor:
+    """Samples the loop every ``interval``; any oversleep is time the loop was blocked"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.blocked = 0.0
+        self.max_block = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started - self.interval
+            self.samples += 1
+            # Sub-millisecond oversleep is timer resolution, not blocking
+            if lag > 0.001:
+                self.blocked += lag
+                self.max_block = max(self.max_block, lag)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def seed_database(db_path: str, campaigns: int, channels: int, posts: int, start: datetime,
+                  spread_seconds: float = 0.0, media: str = 'text') -> Dict[int, float]:
+    """Create the campaigns and their posts; returns post id -> scheduled epoch seconds"""
+    content_type = {'text': 'text', 'photo': 'photo', 'album': 'photo'}[media]
+    metadata = json.dumps({'media': SAMPLE_PHOTOS}) if media == 'album' else None
+    media_url = SAMPLE_PHOTOS[0] if media != 'text' else None
+    total = campaigns * channels * posts
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany("""
+            INSERT INTO campaigns (campaign_id, user_id, ad_content, content_type, media_url,
+                                   campaign_metadata, status)
+            VALUES (?, ?, ?, ?, ?, ?, 'active')
+        """, [(f"BENCH-{c:04d}", 100000 + c, f"Benchmark campaign {c}: buy now!", content_type,
+               media_url, metadata) for c in range(campaigns)])
+        conn.executemany("""
+            INSERT OR IGNORE INTO channels (channel_id, name, telegram_channel_id, is_active)
+            VALUES (?, ?, ?, 1)
+        """, [(f"@bench_channel_{m}", f"Bench channel {m}", f"@bench_channel_{m}") for m in range(channels)])
+        rows = []
+        for index in range(total):
+            c, m = index // (channels * posts), index % channels
+            offset = spread_seconds * index / total if total > 1 else 0.0
+            # Whole seconds, the resolution publishers store scheduled_time at
+            due = start + timedelta(seconds=int(offset))
+            rows.append((f"BENCH-{c:04d}", f"@bench_channel_{m}", due.strftime('%Y-%m-%d %H:%M:%S')))
+        conn.executemany("""
+            INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status)
+            VALUES (?, ?, ?, 'scheduled')
+        """, rows)
+        conn.commit()
+        return {row[0]: datetime.fromisoformat(row[1]).timestamp()
+                for row in conn.execute("SELECT id, scheduled_time FROM campaign_posts")}
+    finally:
+        conn.close()
+
+
+def _remaining(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COALESCE(SUM(pending), 0) FROM campaign_post_counts").fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def _run(db_path: str, api: FakeBotAPI, scheduled: Dict[int, float], timeout: float,
+               chat_rate_per_minute: Optional[float], stall_ms: float, publisher_class) -> Dict[str, Any]:
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from connection_pool import close_all_pools
+    from publishing_engine import ChatRateLimiter, PublishingEngine
+
+    completed: Dict[int, float] = {}
+
+    class MeasuredPublisher(publisher_class):
+        """Records when each post actually went out"""
+
+        async def _publish_campaign_post(self, post_data):
+            ok = await super()._publish_campaign_post(post_data)
+            if ok:
+                completed[post_data['id']] = time.time()
+            return ok
+
+    bot = Bot(BENCH_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api.base_url)))
+    publisher = MeasuredPublisher(bot_instance=bot, db_path=db_path)
+    if chat_rate_per_minute is not None:
+        publisher.engine = PublishingEngine(limiter=ChatRateLimiter(chat_rate_per_minute=chat_rate_per_minute))
+        publisher.notifier.limiter = publisher.engine.limiter
+
+    profiler = get_query_profiler()
+    profiler.reset()
+    lag = LoopLagMonitor()
+    watchdog = EventLoopWatchdog(threshold_ms=stall_ms)
+    lag.start()
+    watchdog.start()
+    started = time.time()
+    await publisher.start()
+    timed_out = False
+    while await asyncio.to_thread(_remaining, db_path):
+        if time.time() - started > timeout:
+            timed_out = True
+            break
+        await asyncio.sleep(0.1)
+    finished = max(completed.values(), default=time.time())
+    db_stats = profiler.get_stats()
+    await publisher.stop()
+    await lag.stop()
+    await watchdog.stop()
+    await bot.session.close()
+    await close_all_pools()
+
+    lags = [(completed[post_id] - scheduled[post_id]) * 1000 for post_id in completed if post_id in scheduled]
+    first_due = min(scheduled.values(), default=started)
+    published = len(completed)
+    return {
+        'posts': len(scheduled),
+        'published': published,
+        'timed_out': timed_out,
+        'elapsed_s': round(finished - max(first_due, started), 3),
+        'posts_per_s': round(published / max(finished - max(first_due, started), 1e-6), 1),
+        'lag_p50_ms': round(_percentile(lags, 50), 1),
+        'lag_p95_ms': round(_percentile(lags, 95), 1),
+        'lag_max_ms': round(max(lags, default=0.0), 1),
+        'db_queries': db_stats['queries'],
+        'db_ms_per_post': round(db_stats['total_ms'] / max(published, 1), 3),
+        'loop_blocked_ms': round(lag.blocked * 1000, 1),
+        'loop_max_block_ms': round(lag.max_block * 1000, 1),
+        'loop_stalls': watchdog.stalls,
+        'publisher': publisher.get_stats(),
+    }
+
+
+def run_benchmark(campaigns: int = 10, channels: int = 10, posts: int = 2, media: str = 'text',
+                  spread_seconds: float = 0.0, latency_ms: float = 40.0, jitter_ms: float = 20.0,
+                  server_chat_limit: int = 20, server_global_limit: int = 30, flood_rate: float = 0.0,
+                  chat_rate_per_minute: Optional[float] = None, timeout: float = 600.0,
+                  stall_ms: float = 50.0, seed: int = 1) -> Dict[str, Any]:
+    """Run one benchmark in a throwaway directory and return its report"""
+    from schema_migrations import migrate
+
+    api = FakeBotAPI(latency_ms=latency_ms, jitter_ms=jitter_ms, chat_limit_per_minute=server_chat_limit,
+                     global_limit_per_second=server_global_limit, flood_rate=flood_rate, seed=seed)
+    api.start_in_thread()
+    previous = os.getcwd()
+    profiling = get_query_profiler().enabled
+    configure_query_profiler(True)
+    try:
+        with tempfile.TemporaryDirectory(prefix="publish_bench_") as tmp:
+            # Modules that open "bot.db" themselves (post identities, tracking) see the seeded copy
+            os.chdir(tmp)
+            try:
+                db_path = os.path.join(tmp, "bot.db")
+                migrate(db_path)
+                # Imported here so module-level singletons initialize against the seeded copy,
+                # and so import time does not count as publish lag
+                from enhanced_campaign_publisher import EnhancedCampaignPublisher
+                start = (datetime.now() + timedelta(seconds=1)).replace(microsecond=0)
+                scheduled = seed_database(db_path, campaigns, channels, posts, start, spread_seconds, media)
+                report = asyncio.run(_run(db_path, api, scheduled, timeout, chat_rate_per_minute, stall_ms,
+                                          EnhancedCampaignPublisher))
+            finally:
+                os.chdir(previous)
+    finally:
+        configure_query_profiler(profiling)
+        api.stop_thread()
+    report['api'] = api.get_stats()
+    report['setup'] = {'campaigns': campaigns, 'channels': channels, 'posts': posts, 'media': media,
+                       'spread_s': spread_seconds, 'latency_ms': latency_ms, 'jitter_ms': jitter_ms,
+                       'flood_rate': flood_rate}
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    setup = report['setup']
+    api = report['api']
+    lines = [
+        f"📊 {setup['campaigns']} campaigns x {setup['channels']} channels x {setup['posts']} posts "
+        f"({setup['media']}, {setup['latency_ms']:.0f}±{setup['jitter_ms']:.0f}ms API latency)",
+        f"   Published:   {report['published']}/{report['posts']} in {report['elapsed_s']:.2f}s"
+        f"{' (TIMED OUT)' if report['timed_out'] else ''}",
+        f"   Throughput:  {report['posts_per_s']:.1f} posts/s",
+        f"   Lag:         p50 {report['lag_p50_ms']:.0f}ms, p95 {report['lag_p95_ms']:.0f}ms, "
+        f"max {report['lag_max_ms']:.0f}ms",
+        f"   Database:    {report['db_ms_per_post']:.2f}ms/post ({report['db_queries']} queries)",
+        f"   Event loop:  {report['loop_blocked_ms']:.0f}ms blocked, longest {report['loop_max_block_ms']:.0f}ms, "
+        f"{report['loop_stalls']} stalls",
+        f"   Bot API:     {api['requests']} requests, {api['sent']} sent, "
+        f"{api['rate_limited'] + api['flooded']} answered 429",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the campaign publisher against a fake Bot API")
+    parser.add_argument('--campaigns', type=int, default=10)
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--posts', type=int, default=2, help="posts per campaign per channel")
+    parser.add_argument('--media', choices=('text', 'photo', 'album'), default='text')
+    parser.add_argument('--spread', type=float, default=0.0, help="seconds the scheduled times are spread over")
+    parser.add_argument('--latency-ms', type=float, default=40.0)
+    parser.add_argument('--jitter-ms', type=float, default=20.0)
+    parser.add_argument('--server-chat-limit', type=int, default=20, help="sends per chat per minute before 429")
+    parser.add_argument('--server-global-limit', type=int, default=30, help="sends per second before 429")
+    parser.add_argument('--flood-rate', type=float, default=0.0, help="share of sends answered 429 at random")
+    parser.add_argument('--chat-rate', type=float, default=None, help="publisher per-chat rate (per minute)")
+    parser.add_argument('--timeout', type=float, default=600.0)
+    parser.add_argument('--stall-ms', type=float, default=50.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    # Before the publisher's own basicConfig(INFO), which then does nothing
+    logging.basicConfig(level=args.log_level)
+    report = run_benchmark(
+        campaigns=args.campaigns, channels=args.channels, posts=args.posts, media=args.media,
+        spread_seconds=args.spread, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        server_chat_limit=args.server_chat_limit, server_global_limit=args.server_global_limit,
+        flood_rate=args.flood_rate, chat_rate_per_minute=args.chat_rate, timeout=args.timeout,
+        stall_ms=args.stall_ms, seed=args.seed,
+    )
+    print(json.dumps(report, indent=2, default=str) if args.json else format_report(report))
+    return 1 if report['timed_out'] else 0
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Campaign post leases for I3lani Telegram Bot
+Publisher workers claim due posts with an atomic UPDATE that records the
+owner and an expiry, so several processes sharing the database split the
+load without posting anything twice; leases left by a crashed worker expire
+and the posts go back on the schedule
+"""
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from campaign_schedule import format_timestamp
+from config import PUBLISH_LEASE_SECONDS, PUBLISH_WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+# Clears the lease whenever a post leaves the claimed state
+CLEAR_LEASE = "lease_owner = NULL, lease_expires = NULL"
+
+# Guards every write that finishes a post: only the worker still holding the lease may
+# (the owner is bound as the last parameter)
+HOLDS_LEASE = "status = 'claimed' AND lease_owner = ?"
+
+
+def make_worker_id() -> str:
+    """Configured worker id, or host:pid plus a short suffix unique to this run"""
+    if PUBLISH_WORKER_ID:
+        return PUBLISH_WORKER_ID
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _lease_until(lease_seconds: float, now: Optional[datetime] = None) -> str:
+    return format_timestamp((now or datetime.now()) + timedelta(seconds=lease_seconds))
+
+
+async def claim_posts(data, post_ids: Sequence[int], owner: str,
+                      lease_seconds: float = PUBLISH_LEASE_SECONDS) -> List[int]:
+    """Claim the given posts that are still scheduled; returns the ids this worker won"""
+    if not post_ids:
+        return []
+    placeholders = ",".join("?" * len(post_ids))
+
+    async def _claim(conn) -> List[int]:
+        cursor = await conn.execute(f"""
+            UPDATE campaign_posts
+            SET status = 'claimed', lease_owner = ?, lease_expires = ?
+            WHERE id IN ({placeholders}) AND status = 'scheduled'
+            RETURNING id
+        """, (owner, _lease_until(lease_seconds), *post_ids))
+        return [row[0] for row in await cursor.fetchall()]
+
+    return await data.run_in_transaction(_claim)
+
+
+async def recover_expired_leases(data) -> List[int]:
+    """Put posts whose lease ran out (their worker died mid-send) back on the schedule"""
+
+    async def _recover(conn) -> List[int]:
+        cursor = await conn.execute(f"""
+            UPDATE campaign_posts SET status = 'scheduled', {CLEAR_LEASE}
+            WHERE status = 'claimed' AND lease_expires < ?
+            RETURNING id
+        """, (format_timestamp(datetime.now()),))
+        return [row[0] for row in await cursor.fetchall()]
+
+    recovered = await data.run_in_transaction(_recover)
+    if recovered:
+        logger.warning(f"⏳ Recovered {len(recovered)} posts from expired publisher leases")
+    return recovered
+
+
+async def renew_leases(data, owner: str, lease_seconds: float = PUBLISH_LEASE_SECONDS) -> int:
+    """Push back the expiry of every post this worker holds; returns the posts renewed"""
+
+    async def _renew(conn) -> int:
+        cursor = await conn.execute(f"""
+            UPDATE campaign_posts SET lease_expires = ?
+            WHERE {HOLDS_LEASE}
+        """, (_lease_until(lease_seconds), owner))
+        return cursor.rowcount
+
+    return await data.run_in_transaction(_renew)
+
+
+async def release_claims(data, owner: str) -> int:
+    """Hand back every post this worker still holds (graceful shutdown)"""
+
+    async def _release(conn) -> int:
+        cursor = await conn.execute(f"""
+            UPDATE campaign_posts SET status = 'scheduled', {CLEAR_LEASE}
+            WHERE status = 'claimed' AND lease_owner = ?
+        """, (owner,))
+        return cursor.rowcount
+
+    return await data.run_in_transaction(_release)
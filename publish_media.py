@@ -0,0 +1,210 @@
+"""
+Campaign media publishing for I3lani Telegram Bot
+Sends a campaign as a text message, a single photo/video or an album built
+from the stored media list, and remembers the file_ids Telegram returns
+(keyed by a hash of the stored media) so later channels send those instead
+of uploading the media again
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.types import InputMediaPhoto, InputMediaVideo
+
+from config import MEDIA_FILE_ID_CACHE_SIZE
+from read_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PHOTO_TYPES = ('photo', 'image', 'text+photo', 'text+image', 'image_only', 'photo_only')
+VIDEO_TYPES = ('video', 'text+video', 'video_only')
+CAPTIONLESS_TYPES = ('image_only', 'photo_only', 'video_only')
+
+# Telegram's album limit
+MAX_ALBUM_SIZE = 10
+# A file_id stays valid for as long as the file exists; the TTL only bounds staleness
+FILE_ID_TTL = 7 * 24 * 3600
+
+
+def media_list(items: Any, default_type: str = 'photo') -> List[Dict[str, str]]:
+    """Normalize stored media (file_id strings or {'file_id', 'type'} dicts) for campaign metadata"""
+    media = []
+    for item in items or []:
+        if isinstance(item, dict):
+            ref = item.get('file_id') or item.get('url')
+            kind = item.get('type') or default_type
+        else:
+            ref, kind = item, default_type
+        if ref:
+            media.append({'type': kind if kind in ('photo', 'video') else default_type, 'file_id': ref})
+    return media
+
+
+def campaign_media(post: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Media to send for a campaign post: the stored list, else the single media_url"""
+    content_type = post.get('content_type') or 'text'
+    if content_type in PHOTO_TYPES:
+        default_type = 'photo'
+    elif content_type in VIDEO_TYPES:
+        default_type = 'video'
+    else:
+        return []
+    metadata = post.get('campaign_metadata')
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata)
+        except ValueError:
+            metadata = None
+    media = media_list((metadata or {}).get('media'), default_type) if isinstance(metadata, dict) else []
+    if not media and post.get('media_url'):
+        media = [{'type': default_type, 'file_id': post['media_url']}]
+    return media
+
+
+def media_key(ref: str) -> str:
+    return hashlib.sha256(ref.encode()).hexdigest()
+
+
+def needs_upload(ref: str) -> bool:
+    """URLs are fetched by Telegram on every send; anything else is already a file_id"""
+    return ref.startswith(('http://', 'https://'))
+
+
+def _file_id_of(message) -> Optional[str]:
+    if getattr(message, 'photo', None):
+        return message.photo[-1].file_id
+    if getattr(message, 'video', None):
+        return message.video.file_id
+    return None
+
+
+class FileIdCache:
+    """Media hash -> file_id, in memory (LRU) in front of the media_file_ids table.
+
+    The first send of a URL uploads it; concurrent sends of the same media
+    wait for that upload and then reuse its file_id.
+    """
+
+    def __init__(self, data, maxsize: int = MEDIA_FILE_ID_CACHE_SIZE):
+        self.data = data
+        self.cache = TTLCache('media_file_ids', maxsize, FILE_ID_TTL)
+        self._uploads: Dict[str, asyncio.Future] = {}
+        self._stats = {'uploads': 0, 'reused': 0}
+
+    async def _load(self, key: str) -> Optional[str]:
+        return await self.data.fetchval("SELECT file_id FROM media_file_ids WHERE content_hash = ?", (key,))
+
+    async def resolve(self, ref: str, wait: bool = True) -> Tuple[str, bool]:
+        """What to send for ``ref``, and whether this caller is uploading it (and must report back).
+
+        ``wait=False`` sends the original instead of waiting for another
+        caller's upload; a caller that owns an upload must not wait, or two
+        albums sharing media could wait on each other.
+        """
+        if not needs_upload(ref):
+            return ref, False
+        key = media_key(ref)
+        file_id = self.cache.get(key)
+        if file_id is None:
+            # Misses are not cached: another worker may upload the media meanwhile
+            file_id = await self._load(key)
+            if file_id:
+                self.cache.set(key, file_id)
+        if not file_id:
+            pending = self._uploads.get(key)
+            if pending is not None and not wait:
+                return ref, False
+            if pending is None:
+                self._uploads[key] = asyncio.get_running_loop().create_future()
+                self._stats['uploads'] += 1
+                return ref, True
+            file_id = await asyncio.shield(pending)
+            if not file_id:
+                # The upload failed; send the original and let Telegram fetch it
+                return ref, False
+        self._stats['reused'] += 1
+        return file_id, False
+
+    async def remember(self, ref: str, file_id: Optional[str], media_type: str = 'photo'):
+        """Record the file_id an upload produced (None when it failed) and release waiters"""
+        key = media_key(ref)
+        pending = self._uploads.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(file_id)
+        if not file_id:
+            return
+        self.cache.set(key, file_id)
+        try:
+            await self.data.execute("""
+                INSERT OR REPLACE INTO media_file_ids (content_hash, file_id, media_type) VALUES (?, ?, ?)
+            """, (key, file_id, media_type))
+        except Exception as e:
+            logger.error(f"❌ Error storing media file_id: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['cache'] = self.cache.get_stats()
+        return stats
+
+
+def album_chunks(count: int, limit: int = MAX_ALBUM_SIZE) -> List[Tuple[int, int]]:
+    """(start, end) slices of at most ``limit`` items, balanced so no album has a single item"""
+    albums = -(-count // limit)
+    bounds = [count * n // albums for n in range(albums + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+async def send_campaign_content(bot, chat_id: str, text: str, content_type: str,
+                                media: List[Dict[str, str]], file_ids: FileIdCache,
+                                parse_mode: Optional[str] = None, reply_markup=None):
+    """Send a campaign to one chat; returns the (first) message sent.
+
+    Albums cannot carry inline buttons, so ``reply_markup`` only goes on
+    text and single-media posts. When a later album of a long media list
+    fails, the post counts as sent with the albums that went out.
+    """
+    extra = {key: value for key, value in (('parse_mode', parse_mode), ('reply_markup', reply_markup)) if value}
+    if not media:
+        return await bot.send_message(chat_id=chat_id, text=text, **extra)
+
+    caption = None if content_type in CAPTIONLESS_TYPES else text
+    resolved = []
+    messages = []
+    try:
+        # Inside the try: an upload claimed here must be released even if a later resolve fails
+        for item in media:
+            resolved.append(await file_ids.resolve(item['file_id'], wait=not any(owned for _, owned in resolved)))
+        if len(media) == 1:
+            send = bot.send_video if media[0]['type'] == 'video' else bot.send_photo
+            kwargs = {'video' if media[0]['type'] == 'video' else 'photo': resolved[0][0]}
+            if caption:
+                kwargs['caption'] = caption
+            else:
+                extra.pop('parse_mode', None)
+            messages.append(await send(chat_id=chat_id, **kwargs, **extra))
+        else:
+            for start, end in album_chunks(len(media)):
+                album = [
+                    (InputMediaVideo if item['type'] == 'video' else InputMediaPhoto)(
+                        media=file_id, caption=caption if index == 0 else None,
+                        **({'parse_mode': parse_mode} if index == 0 and caption and parse_mode else {}))
+                    for index, (item, (file_id, _)) in enumerate(
+                        zip(media[start:end], resolved[start:end]), start=start)
+                ]
+                try:
+                    messages += await bot.send_media_group(chat_id=chat_id, media=album)
+                except Exception as e:
+                    if not messages:
+                        raise
+                    # The captioned first album is already in the channel; a retry would post it twice
+                    logger.warning(f"⚠️ Album to {chat_id} sent {len(messages)} of {len(media)} media: {e}")
+                    break
+    finally:
+        # Report every upload this send owned, so waiting sends reuse (or give up on) it
+        for index, (item, (_, uploading)) in enumerate(zip(media, resolved)):
+            if uploading:
+                file_id = _file_id_of(messages[index]) if index < len(messages) else None
+                await file_ids.remember(item['file_id'], file_id, item['type'])
+    return messages[0] if messages else None
@@ -0,0 +1,151 @@
+"""
+Pre-rendered campaign payloads for I3lani Telegram Bot
+Everything the publisher sends for a campaign (caption, media list, parse
+mode, inline buttons and the post identity) is rendered once when the
+campaign is activated, stored as a compressed blob in campaign_payloads and
+cached in memory by campaign_id, so publishing a post needs no campaign or
+identity queries
+"""
+import json
+import logging
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from config import PUBLISH_PAYLOAD_CACHE_SIZE
+from publish_media import campaign_media
+from read_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PARSE_MODES = ('HTML', 'Markdown', 'MarkdownV2')
+# Editing a campaign drops its stored payload (trigger); workers pick up the new one within the TTL
+PAYLOAD_TTL = 600
+
+CAMPAIGN_QUERY = """
+    SELECT campaign_id, user_id, ad_content, COALESCE(content_type, 'text') as content_type,
+           media_url, campaign_metadata
+    FROM campaigns WHERE campaign_id = ?
+"""
+
+
+@dataclass
+class PublishPayload:
+    """What goes out for every post of one campaign"""
+    campaign_id: str
+    user_id: int
+    text: str
+    content_type: str = 'text'
+    media_url: Optional[str] = None
+    media: List[Dict[str, str]] = field(default_factory=list)
+    parse_mode: Optional[str] = None
+    buttons: List[List[Dict[str, str]]] = field(default_factory=list)
+    post_identity_id: Optional[str] = None
+
+    def to_blob(self) -> bytes:
+        return zlib.compress(json.dumps(asdict(self), separators=(',', ':')).encode())
+
+    @classmethod
+    def from_blob(cls, blob: bytes) -> 'PublishPayload':
+        return cls(**json.loads(zlib.decompress(blob)))
+
+    def reply_markup(self) -> Optional[InlineKeyboardMarkup]:
+        if not self.buttons:
+            return None
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=button['text'], url=button['url']) for button in row]
+            for row in self.buttons
+        ])
+
+
+def _buttons(raw: Any) -> List[List[Dict[str, str]]]:
+    """Rows of URL buttons; a flat list puts each button on its own row"""
+    rows = []
+    for row in raw or []:
+        row = row if isinstance(row, list) else [row]
+        buttons = [{'text': str(b['text']), 'url': str(b['url'])}
+                   for b in row if isinstance(b, dict) and b.get('text') and b.get('url')]
+        if buttons:
+            rows.append(buttons)
+    return rows
+
+
+def render_payload(campaign: Dict[str, Any], post_identity_id: Optional[str]) -> PublishPayload:
+    """Build a campaign's payload from its campaigns row"""
+    metadata = campaign.get('campaign_metadata')
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata)
+        except ValueError:
+            metadata = None
+    metadata = metadata if isinstance(metadata, dict) else {}
+    parse_mode = metadata.get('parse_mode')
+    return PublishPayload(
+        campaign_id=campaign['campaign_id'],
+        user_id=campaign['user_id'],
+        text=campaign.get('ad_content') or '',
+        content_type=campaign.get('content_type') or 'text',
+        media_url=campaign.get('media_url'),
+        media=campaign_media(campaign),
+        parse_mode=parse_mode if parse_mode in PARSE_MODES else None,
+        buttons=_buttons(metadata.get('buttons')),
+        post_identity_id=post_identity_id,
+    )
+
+
+class PayloadStore:
+    """campaign_id -> PublishPayload, in memory (LRU) in front of the campaign_payloads table.
+
+    ``identity_of`` resolves the post identity for a campaigns row; it is
+    only called when a payload is rendered.
+    """
+
+    def __init__(self, data, identity_of: Callable[[Dict[str, Any]], Awaitable[Optional[str]]],
+                 maxsize: int = PUBLISH_PAYLOAD_CACHE_SIZE):
+        self.data = data
+        self.identity_of = identity_of
+        self.cache = TTLCache('publish_payloads', maxsize, PAYLOAD_TTL)
+        self._stats = {'rendered': 0, 'loaded': 0}
+
+    async def render(self, campaign_id: str) -> Optional[PublishPayload]:
+        """Render and store a campaign's payload (at activation, or after its content changed)"""
+        campaign = await self.data.fetchone(CAMPAIGN_QUERY, (campaign_id,))
+        if campaign is None:
+            return None
+        payload = render_payload(campaign, await self.identity_of(campaign))
+        self._stats['rendered'] += 1
+        if payload.post_identity_id:
+            # Without an identity the post cannot go out; render again next time
+            await self.data.execute("""
+                INSERT OR REPLACE INTO campaign_payloads (campaign_id, payload, rendered_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            """, (campaign_id, payload.to_blob()))
+            self.cache.set(campaign_id, payload)
+        return payload
+
+    async def _load(self, campaign_id: str) -> Optional[PublishPayload]:
+        blob = await self.data.fetchval("SELECT payload FROM campaign_payloads WHERE campaign_id = ?",
+                                        (campaign_id,))
+        if blob is not None:
+            try:
+                payload = PublishPayload.from_blob(blob)
+                self._stats['loaded'] += 1
+                return payload
+            except Exception as e:
+                logger.warning(f"⚠️ Re-rendering unreadable payload for campaign {campaign_id}: {e}")
+        # Campaigns activated before payloads existed (or by another process) render on first use
+        return await self.render(campaign_id)
+
+    async def get(self, campaign_id: str) -> Optional[PublishPayload]:
+        """Cached payload, else the stored blob, else a fresh render"""
+        payload = await self.cache.get_or_load(campaign_id, lambda: self._load(campaign_id))
+        if payload is None or not payload.post_identity_id:
+            self.cache.invalidate(campaign_id)
+        return payload
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['cache'] = self.cache.get_stats()
+        return stats
@@ -0,0 +1,178 @@
+"""
+Publish failure handling for I3lani Telegram Bot
+Classifies Bot API errors into flood waits, transient and permanent
+failures, schedules retries with backoff, and parks posts that cannot be
+delivered in a dead-letter table an admin can replay
+"""
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiogram.exceptions import (
+    RestartingTelegram, TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError,
+    TelegramRetryAfter, TelegramServerError
+)
+
+from campaign_schedule import format_timestamp
+from config import PUBLISH_MAX_ATTEMPTS, PUBLISH_RETRY_BASE_SECONDS, PUBLISH_RETRY_MAX_SECONDS
+from publish_leases import CLEAR_LEASE, HOLDS_LEASE
+
+logger = logging.getLogger(__name__)
+
+FLOOD = 'flood'            # Telegram asked us to wait retry_after seconds
+TRANSIENT = 'transient'    # network, server or unknown errors: retry with backoff
+PERMANENT = 'permanent'    # the request itself is wrong: retrying cannot help
+CHAT_GONE = 'chat_gone'    # chat deleted, or the bot was removed from it
+EXHAUSTED = 'exhausted'    # transient failures past PUBLISH_MAX_ATTEMPTS
+
+# Bad Request descriptions that mean the chat is unusable, not the message
+CHAT_GONE_MARKERS = (
+    'chat not found', 'channel_private', 'chat_write_forbidden', 'need administrator rights',
+    'not enough rights', 'bot is not a member', 'peer_id_invalid',
+)
+
+
+class UnpublishableError(Exception):
+    """The post cannot be sent as stored (no post identity or no content)"""
+
+
+class NoMessageError(Exception):
+    """The send returned no message, so the post is not known to be out"""
+
+
+@dataclass
+class PublishFailure:
+    """What to do about one failed send"""
+    kind: str
+    delay: float = 0.0
+    error: str = ''
+
+    @property
+    def retry(self) -> bool:
+        return self.kind in (FLOOD, TRANSIENT)
+
+
+def backoff_delay(attempt: int, base: float = PUBLISH_RETRY_BASE_SECONDS,
+                  cap: float = PUBLISH_RETRY_MAX_SECONDS) -> float:
+    """Exponential backoff with jitter: half the window fixed, half random"""
+    window = min(cap, base * (2 ** attempt))
+    return window / 2 + random.uniform(0, window / 2)
+
+
+def classify_failure(error: BaseException, attempts: int = 0,
+                     max_attempts: int = PUBLISH_MAX_ATTEMPTS) -> PublishFailure:
+    """Decide how to handle ``error`` for a post already tried ``attempts`` times"""
+    message = str(error)
+    if isinstance(error, UnpublishableError):
+        return PublishFailure(PERMANENT, error=message)
+    if isinstance(error, TelegramRetryAfter):
+        # Flood control is about our pace, not the post: it does not use up an attempt
+        return PublishFailure(FLOOD, float(error.retry_after), message)
+    if isinstance(error, TelegramForbiddenError):
+        return PublishFailure(CHAT_GONE, error=message)
+    if isinstance(error, TelegramBadRequest):
+        lowered = message.lower()
+        if any(marker in lowered for marker in CHAT_GONE_MARKERS):
+            return PublishFailure(CHAT_GONE, error=message)
+        return PublishFailure(PERMANENT, error=message)
+    if not isinstance(error, (TelegramNetworkError, TelegramServerError, RestartingTelegram,
+                              asyncio.TimeoutError, OSError, NoMessageError)):
+        logger.warning(f"⚠️ Unclassified publish error treated as transient: {error!r}")
+    if attempts + 1 >= max_attempts:
+        return PublishFailure(EXHAUSTED, error=message)
+    return PublishFailure(TRANSIENT, backoff_delay(attempts), message)
+
+
+async def schedule_retry(data, post_id: int, failure: PublishFailure, owner: str) -> Optional[datetime]:
+    """Put the post back on the schedule ``failure.delay`` seconds from now.
+
+    Returns None, leaving the post alone, when ``owner`` no longer holds its lease.
+    """
+    due = datetime.now() + timedelta(seconds=failure.delay)
+    result = await data.execute(f"""
+        UPDATE campaign_posts
+        SET status = 'scheduled', scheduled_time = ?, error_message = ?,
+            attempts = COALESCE(attempts, 0) + ?, {CLEAR_LEASE}
+        WHERE id = ? AND {HOLDS_LEASE}
+    """, (format_timestamp(due), failure.error[:500], 0 if failure.kind == FLOOD else 1, post_id, owner))
+    if not result.rowcount:
+        logger.warning(f"⏳ Post {post_id} lease lost before its retry was scheduled; leaving it to its new owner")
+        return None
+    return due
+
+
+async def dead_letter(data, post: Dict[str, Any], failure: PublishFailure, owner: str) -> Optional[int]:
+    """Mark the post failed and park it in publish_dead_letters; returns the entry id.
+
+    Returns None, leaving the post alone, when ``owner`` no longer holds its lease.
+    """
+    attempts = (post.get('attempts') or 0) + 1
+
+    async def _park(conn) -> Optional[int]:
+        cursor = await conn.execute(f"""
+            UPDATE campaign_posts
+            SET status = 'failed', error_message = ?, attempts = ?, {CLEAR_LEASE}
+            WHERE id = ? AND {HOLDS_LEASE}
+        """, (failure.error[:500], attempts, post['id'], owner))
+        if not cursor.rowcount:
+            return None
+        cursor = await conn.execute("""
+            INSERT INTO publish_dead_letters (post_id, campaign_id, channel_id, error_kind, error, attempts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (post['id'], post['campaign_id'], post['channel_id'], failure.kind, failure.error, attempts))
+        return cursor.lastrowid
+
+    entry_id = await data.run_in_transaction(_park)
+    if entry_id is None:
+        logger.warning(f"⏳ Post {post['id']} lease lost before it was dead-lettered; leaving it to its new owner")
+        return None
+    logger.warning(f"🪦 Post {post['id']} for {post['channel_id']} dead-lettered ({failure.kind}): {failure.error}")
+    return entry_id
+
+
+async def list_dead_letters(data, limit: int = 20) -> List[Dict[str, Any]]:
+    """Newest posts waiting for a replay"""
+    return await data.fetchall("""
+        SELECT id, post_id, campaign_id, channel_id, error_kind, error, attempts, failed_at
+        FROM publish_dead_letters WHERE status = 'dead'
+        ORDER BY failed_at DESC, id DESC LIMIT ?
+    """, (limit,))
+
+
+async def replay_dead_letters(data, entry_ids: Optional[Sequence[int]] = None) -> List[str]:
+    """Reschedule dead-lettered posts for now (all of them without ``entry_ids``).
+
+    Returns the campaign ids involved, so the publisher can queue them.
+    """
+    now = format_timestamp(datetime.now())
+
+    async def _replay(conn) -> List[str]:
+        query = "SELECT id, post_id, campaign_id FROM publish_dead_letters WHERE status = 'dead'"
+        params: List[Any] = []
+        if entry_ids is not None:
+            if not entry_ids:
+                return []
+            query += f" AND id IN ({','.join('?' * len(entry_ids))})"
+            params = list(entry_ids)
+        cursor = await conn.execute(query, params)
+        rows = await cursor.fetchall()
+        if not rows:
+            return []
+        await conn.executemany("""
+            UPDATE campaign_posts
+            SET status = 'scheduled', scheduled_time = ?, attempts = 0, error_message = NULL
+            WHERE id = ?
+        """, [(now, row[1]) for row in rows])
+        await conn.executemany("""
+            UPDATE publish_dead_letters SET status = 'replayed', replayed_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, [(row[0],) for row in rows])
+        return sorted({row[2] for row in rows})
+
+    campaigns = await data.run_in_transaction(_replay)
+    if campaigns:
+        logger.info(f"♻️ Replayed dead-lettered posts for {len(campaigns)} campaigns")
+    return campaigns
@@ -0,0 +1,175 @@
+"""
+Per-channel publish slots for I3lani Telegram Bot
+Campaigns paid around the same time would otherwise post on the same minute
+boundaries, bursting each channel past its per-chat limit. Every channel's
+timeline is cut into slots (3600 / CHANNEL_MAX_POSTS_PER_HOUR seconds, one
+post each); a new campaign is moved, per channel, to the offset that keeps
+every hour within the cap, with free slots and the least busy hours first.
+When every offset within the shift window lands in a full hour the search
+widens, up to a day. Occupancy lives in memory and is rebuilt from
+campaign_posts and the lazy schedule rules on startup
+"""
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+from campaign_schedule import SCHEDULE_COLUMNS, ScheduleRule, format_timestamp
+from config import CHANNEL_MAX_POSTS_PER_HOUR, PUBLISH_SLOT_MAX_SHIFT_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# Furthest a channel's posts are moved when the shift window has no hour under the cap
+MAX_SEARCH_SECONDS = 24 * 3600
+
+
+class SlotIndex:
+    """channel -> slot number -> posts, plus per-hour totals for smoothing"""
+
+    def __init__(self, max_posts_per_hour: int = CHANNEL_MAX_POSTS_PER_HOUR,
+                 max_shift_minutes: float = PUBLISH_SLOT_MAX_SHIFT_MINUTES):
+        self.max_posts_per_hour = max(1, max_posts_per_hour)
+        self.slot_seconds = 3600 / self.max_posts_per_hour
+        self.max_shift = max(0.0, max_shift_minutes * 60)
+        self._slots: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._hours: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.loaded = False
+        self._pruned_at = time.time()
+        self._stats = {'campaigns': 0, 'channels_shifted': 0, 'collisions': 0, 'searches_widened': 0,
+                       'over_cap': 0, 'rebuilds': 0}
+
+    def slot_of(self, timestamp: float) -> int:
+        return int(timestamp // self.slot_seconds)
+
+    def add(self, channel: str, timestamp: float, count: int = 1):
+        slot = self.slot_of(timestamp)
+        slots = self._slots[channel]
+        slots[slot] = slots.get(slot, 0) + count
+        hours = self._hours[channel]
+        hour = int(timestamp // 3600)
+        hours[hour] = hours.get(hour, 0) + count
+
+    def occupancy(self, channel: str, timestamp: float) -> int:
+        return self._slots.get(channel, {}).get(self.slot_of(timestamp), 0)
+
+    async def rebuild(self, data):
+        """Reload occupancy from upcoming posts and unmaterialized rule occurrences"""
+        now = datetime.now()
+        self._slots.clear()
+        self._hours.clear()
+        rows = await data.fetchall("""
+            SELECT channel_id, scheduled_time, COUNT(*) AS posts FROM campaign_posts
+            WHERE status IN ('scheduled', 'claimed') AND scheduled_time >= ?
+            GROUP BY channel_id, scheduled_time
+        """, (format_timestamp(now),))
+        for row in rows:
+            try:
+                self.add(str(row['channel_id']), datetime.fromisoformat(str(row['scheduled_time'])).timestamp(),
+                         row['posts'])
+            except ValueError:
+                continue
+        rules = await data.fetchall(f"SELECT {SCHEDULE_COLUMNS} FROM campaign_schedules WHERE status = 'active'")
+        for row in rules:
+            rule, next_index = ScheduleRule.from_row(tuple(row.values()))
+            self._add_rule(rule, [when.timestamp() for when in rule.times(next_index)], rule.channel_offsets)
+        self.loaded = True
+        self._stats['rebuilds'] += 1
+        logger.info(f"🗓️ Publish slot index rebuilt: {sum(len(s) for s in self._slots.values())} "
+                    f"occupied slots across {len(self._slots)} channels")
+
+    async def ensure_loaded(self, data):
+        if not self.loaded:
+            await self.rebuild(data)
+
+    def _add_rule(self, rule: ScheduleRule, times: List[float], offsets: Dict[str, float]):
+        for channel in rule.channels:
+            offset = offsets.get(channel, 0.0)
+            for timestamp in times:
+                self.add(channel, timestamp + offset)
+
+    def _cost(self, channel: str, times: List[float], offset: float):
+        slots = self._slots.get(channel, {})
+        hours = self._hours.get(channel, {})
+        over_cap = collisions = busy = 0
+        own: Dict[int, int] = {}
+        for timestamp in times:
+            timestamp += offset
+            hour = int(timestamp // 3600)
+            own[hour] = own.get(hour, 0) + 1
+            collisions += slots.get(self.slot_of(timestamp), 0)
+            busy += hours.get(hour, 0)
+            if hours.get(hour, 0) + own[hour] > self.max_posts_per_hour:
+                over_cap += 1
+        # Hours within the cap first, then free slots, then the quietest hours, then the least delay
+        return over_cap, collisions, busy, offset
+
+    def _candidates(self, align: float, limit: float) -> List[float]:
+        """Slot-aligned offsets from ``align`` up to ``limit`` seconds"""
+        return [align + step * self.slot_seconds
+                for step in range(int((limit - align) // self.slot_seconds) + 1)] or [0.0]
+
+    def allocate(self, rule: ScheduleRule) -> Dict[str, float]:
+        """Pick each channel's offset for ``rule``, record its posts and return the offsets (seconds)"""
+        times = [when.timestamp() for when in rule.times()]
+        if not times or not self.max_shift:
+            return {}
+        self._prune()
+        # Candidates start on the first slot boundary at or after the campaign's start
+        align = math.ceil(times[0] / self.slot_seconds) * self.slot_seconds - times[0]
+        offsets = {}
+        for channel in rule.channels:
+            limit = self.max_shift
+            while True:
+                over_cap, collisions, _, offset = min(
+                    self._cost(channel, times, offset) for offset in self._candidates(align, limit))
+                if not over_cap or limit >= MAX_SEARCH_SECONDS:
+                    break
+                # Every offset in reach lands in a full hour: look further ahead
+                limit = min(limit * 2, MAX_SEARCH_SECONDS)
+            if limit > self.max_shift:
+                self._stats['searches_widened'] += 1
+            if over_cap:
+                self._stats['over_cap'] += over_cap
+                logger.warning(f"⚠️ {rule.campaign_id} puts {over_cap} posts on {channel} over "
+                               f"{self.max_posts_per_hour}/hour: no hour under the cap within a day")
+            offsets[channel] = round(offset, 3)
+            self._stats['collisions'] += collisions
+            if offset >= self.slot_seconds:
+                self._stats['channels_shifted'] += 1
+        self._add_rule(rule, times, offsets)
+        self._stats['campaigns'] += 1
+        return offsets
+
+    def _prune(self):
+        """Forget slots in the past (at most hourly)"""
+        now = time.time()
+        if now - self._pruned_at < 3600:
+            return
+        self._pruned_at = now
+        current_slot, current_hour = self.slot_of(now), int(now // 3600)
+        for channel in list(self._slots):
+            self._slots[channel] = {s: n for s, n in self._slots[channel].items() if s >= current_slot}
+            self._hours[channel] = {h: n for h, n in self._hours[channel].items() if h >= current_hour}
+            if not self._slots[channel]:
+                del self._slots[channel]
+                del self._hours[channel]
+
+    def get_stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats['slot_seconds'] = self.slot_seconds
+        stats['channels'] = len(self._slots)
+        stats['occupied_slots'] = sum(len(slots) for slots in self._slots.values())
+        return stats
+
+
+_indexes: Dict[str, SlotIndex] = {}
+
+
+def get_slot_index(db_path: str = "bot.db") -> SlotIndex:
+    """Shared slot index for a database file (every CampaignManager uses the same one)"""
+    index = _indexes.get(db_path)
+    if index is None:
+        index = _indexes[db_path] = SlotIndex()
+    return index
@@ -0,0 +1,107 @@
+"""
+Publish timer for I3lani Telegram Bot
+In-memory priority queue of scheduled campaign posts keyed by due time, so
+the publisher sleeps until the next post is due instead of polling the
+database
+"""
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def due_timestamp(scheduled_time: Any) -> float:
+    """Epoch seconds for a campaign_posts.scheduled_time value (unparseable means due now)"""
+    if isinstance(scheduled_time, datetime):
+        return scheduled_time.timestamp()
+    try:
+        return datetime.fromisoformat(str(scheduled_time)).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class PostTimerQueue:
+    """Min-heap of (due time, post id) with a wake-up signal for earlier arrivals.
+
+    Rescheduling a post pushes a new entry; the superseded one is dropped
+    when it reaches the top (lazy deletion), so every operation stays
+    O(log n).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}
+        self._wake = asyncio.Event()
+        self._stats = {'pushed': 0, 'fired': 0, 'lag_ms_max': 0.0, 'lag_ms_last': 0.0}
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, post_id: int) -> bool:
+        return post_id in self._due
+
+    def push(self, post_id: int, due: float):
+        """Schedule (or reschedule) a post; wakes the waiter if it is now first"""
+        if self._due.get(post_id) == due:
+            return
+        head = self.next_due()
+        self._due[post_id] = due
+        heapq.heappush(self._heap, (due, post_id))
+        self._stats['pushed'] += 1
+        if head is None or due < head:
+            self._wake.set()
+
+    def discard(self, post_id: int):
+        self._due.pop(post_id, None)
+
+    def _drop_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest post, or None when empty"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[int]:
+        """Remove and return every post due at ``now``, earliest first"""
+        now = time.time() if now is None else now
+        fired = []
+        while self.next_due() is not None and self._heap[0][0] <= now:
+            due, post_id = heapq.heappop(self._heap)
+            del self._due[post_id]
+            fired.append(post_id)
+            lag_ms = max(0.0, (now - due) * 1000)
+            self._stats['lag_ms_last'] = round(lag_ms, 1)
+            self._stats['lag_ms_max'] = max(self._stats['lag_ms_max'], round(lag_ms, 1))
+        self._stats['fired'] += len(fired)
+        return fired
+
+    def wake(self):
+        """Interrupt a pending wait (e.g. on shutdown)"""
+        self._wake.set()
+
+    async def wait(self, deadline: float):
+        """Sleep until the next post is due, an earlier one arrives, or ``deadline``"""
+        self._wake.clear()
+        head = self.next_due()
+        wake_at = deadline if head is None else min(head, deadline)
+        timeout = wake_at - time.time()
+        if timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue size, next due time and firing lag"""
+        stats = dict(self._stats)
+        head = self.next_due()
+        stats['queued'] = len(self)
+        stats['next_due_in_s'] = round(head - time.time(), 1) if head is not None else None
+        return stats
@@ -0,0 +1,71 @@
+"""
+Standalone publishing worker for I3lani Telegram Bot
+Runs the campaign publisher without the polling dispatcher. Start as many
+as needed (in separate processes or on hosts sharing the database); they
+split due posts through leases on campaign_posts.
+
+A worker is not told when the bot schedules a newly paid campaign, so it
+picks those posts up at its next sweep: a campaign starting right away
+goes out up to WORKER_SWEEP_SECONDS (30 s by default) late
+
+    python publish_worker.py
+"""
+import asyncio
+import logging
+import signal
+import sys
+
+from aiogram import Bot
+
+from config import BOT_TOKEN, BLOCKING_EXECUTOR_WORKERS, QUERY_PROFILING, SLOW_QUERY_MS, WORKER_SWEEP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+async def run_worker(db_path: str = "bot.db"):
+    """Publish campaign posts until SIGINT/SIGTERM"""
+    if not BOT_TOKEN:
+        raise ValueError("BOT_TOKEN environment variable is required")
+
+    from async_data_access import configure_blocking_executor
+    from connection_pool import close_all_pools
+    from database import init_db
+    from enhanced_campaign_publisher import init_enhanced_campaign_publisher
+    from query_profiler import configure_query_profiler
+
+    configure_blocking_executor(BLOCKING_EXECUTOR_WORKERS)
+    configure_query_profiler(QUERY_PROFILING, SLOW_QUERY_MS)
+    await init_db()
+
+    bot = Bot(token=BOT_TOKEN)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    # New posts from the bot process only show up at a sweep, so sweep more often than in-bot
+    publisher = await init_enhanced_campaign_publisher(bot, sweep_interval=WORKER_SWEEP_SECONDS)
+    if publisher is None:
+        await bot.session.close()
+        raise RuntimeError("Campaign publisher failed to start")
+    logger.info(f"👷 Publish worker {publisher.worker_id} running")
+
+    try:
+        await stop.wait()
+    finally:
+        await publisher.stop()
+        await bot.session.close()
+        await close_all_pools()
+        logger.info(f"👋 Publish worker {publisher.worker_id} stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    asyncio.run(run_worker())
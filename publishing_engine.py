@@ -0,0 +1,202 @@
+"""
+Publishing engine for I3lani Telegram Bot
+Bounded-concurrency sending with token buckets modelled on the Bot API
+limits: one global messages-per-second bucket plus one bucket per chat, so
+posts for different channels go out in parallel while each channel stays
+inside its own limit
+"""
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from config import (
+    PUBLISH_CONCURRENCY, TELEGRAM_CHAT_BURST, TELEGRAM_CHAT_RATE_PER_MINUTE, TELEGRAM_GLOBAL_RATE
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-chat buckets kept before idle (full) ones are dropped
+MAX_CHAT_BUCKETS = 10000
+# Window for the posts-per-second rate
+THROUGHPUT_WINDOW_S = 60
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Seconds until a token is available (0 when one is available now)"""
+        self._refill(time.monotonic() if now is None else now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    @property
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+    async def acquire(self):
+        """Wait for a token and take it"""
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                self.take()
+                return
+            await asyncio.sleep(wait)
+
+
+class ChatRateLimiter:
+    """The global bucket plus lazily created per-chat buckets"""
+
+    def __init__(self, global_rate: float = TELEGRAM_GLOBAL_RATE,
+                 chat_rate_per_minute: float = TELEGRAM_CHAT_RATE_PER_MINUTE,
+                 chat_burst: float = TELEGRAM_CHAT_BURST):
+        self.global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self.chat_rate = chat_rate_per_minute / 60
+        self.chat_burst = chat_burst
+        self._chats: Dict[Hashable, TokenBucket] = {}
+
+    def chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                # A full bucket carries no state a fresh one would not
+                for key in [key for key, b in self._chats.items() if b.full]:
+                    del self._chats[key]
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def pause(self, chat_id: Hashable, seconds: float):
+        """Hold a chat for ``seconds`` (e.g. Telegram's retry_after)"""
+        bucket = self.chat_bucket(chat_id)
+        bucket._refill(time.monotonic())
+        bucket.tokens = min(bucket.tokens, 1 - seconds * bucket.rate)
+
+    def chat_delay(self, chat_id: Hashable) -> float:
+        return self.chat_bucket(chat_id).delay()
+
+    async def acquire(self, chat_id: Hashable):
+        """Wait until both the chat and the global limit allow one message"""
+        await self.chat_bucket(chat_id).acquire()
+        await self.global_bucket.acquire()
+
+
+class PublishingEngine:
+    """Runs a batch of sends on up to ``concurrency`` workers.
+
+    Items are queued per chat. A worker always takes the chat whose bucket
+    frees up first, and a chat has at most one send in flight, so its
+    messages keep their order and a slow channel never occupies more than
+    one worker.
+    """
+
+    def __init__(self, concurrency: int = PUBLISH_CONCURRENCY,
+                 limiter: Optional[ChatRateLimiter] = None):
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter or get_rate_limiter()
+        self._queue_depth = 0
+        self._in_flight = 0
+        self._completed = deque()
+        self._stats = {'published': 0, 'failed': 0, 'batches': 0,
+                       'queue_ms_total': 0.0, 'queue_ms_max': 0.0}
+
+    async def run(self, items: Iterable[Any], send: Callable[[Any], Awaitable[bool]],
+                  chat_of: Callable[[Any], Hashable]) -> List[bool]:
+        """Send every item; returns each item's result in input order"""
+        items = list(items)
+        results: List[bool] = [False] * len(items)
+        if not items:
+            return results
+        enqueued = time.monotonic()
+        per_chat: Dict[Hashable, deque] = {}
+        for index, item in enumerate(items):
+            per_chat.setdefault(chat_of(item), deque()).append(index)
+        # (ready at, tiebreak, chat): chats with queued items and nothing in flight
+        ready = [(enqueued, n, chat) for n, chat in enumerate(per_chat)]
+        heapq.heapify(ready)
+        ready_changed = asyncio.Event()
+        counter = len(ready)
+        self._queue_depth += len(items)
+        self._stats['batches'] += 1
+
+        async def worker():
+            nonlocal counter
+            while ready or any(per_chat.values()):
+                if not ready:
+                    # Every chat with work left is in flight on another worker
+                    ready_changed.clear()
+                    await ready_changed.wait()
+                    continue
+                _, _, chat = heapq.heappop(ready)
+                index = per_chat[chat].popleft()
+                await self.limiter.acquire(chat)
+                started = time.monotonic()
+                self._queue_depth -= 1
+                self._in_flight += 1
+                self._record_wait((started - enqueued) * 1000)
+                try:
+                    results[index] = bool(await send(items[index]))
+                except Exception as e:
+                    logger.error(f"❌ Publishing to {chat} failed: {e}")
+                finally:
+                    self._in_flight -= 1
+                    self._record_result(results[index])
+                    if per_chat[chat]:
+                        counter += 1
+                        heapq.heappush(ready, (time.monotonic() + self.limiter.chat_delay(chat), counter, chat))
+                    ready_changed.set()
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(per_chat)))))
+        return results
+
+    def _record_wait(self, queue_ms: float):
+        self._stats['queue_ms_total'] += queue_ms
+        self._stats['queue_ms_max'] = max(self._stats['queue_ms_max'], round(queue_ms, 1))
+
+    def _record_result(self, success: bool):
+        self._stats['published' if success else 'failed'] += 1
+        now = time.monotonic()
+        self._completed.append(now)
+        while self._completed and self._completed[0] < now - THROUGHPUT_WINDOW_S:
+            self._completed.popleft()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput, queue depth and time-in-queue"""
+        stats = dict(self._stats)
+        sends = stats['published'] + stats['failed']
+        now = time.monotonic()
+        recent = [t for t in self._completed if t >= now - THROUGHPUT_WINDOW_S]
+        stats['posts_per_s'] = round(len(recent) / THROUGHPUT_WINDOW_S, 2)
+        stats['queue_depth'] = self._queue_depth
+        stats['in_flight'] = self._in_flight
+        stats['queue_ms_avg'] = round(stats.pop('queue_ms_total') / sends, 1) if sends else 0.0
+        stats['concurrency'] = self.concurrency
+        return stats
+
+
+_limiter: Optional[ChatRateLimiter] = None
+
+
+def get_rate_limiter() -> ChatRateLimiter:
+    """Process-wide limiter, shared by everything that sends through the bot"""
+    global _limiter
+    if _limiter is None:
+        _limiter = ChatRateLimiter()
+    return _limiter
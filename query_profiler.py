@@ -0,0 +1,249 @@
+"""
+Query profiler for I3lani Telegram Bot
+Per-statement latency tracking for the pooled SQLite connections, grouped by
+normalized SQL fingerprint and calling module, with a slow-query log
+"""
+import contextvars
+import logging
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# Modules that sit between the caller and SQLite; skipped when attributing a query
+_INTERNAL_MODULES = {
+    'query_profiler', 'connection_pool', 'write_queue', 'async_data_access', 'analytics_access',
+    'aiosqlite', 'asyncio', 'contextlib', 'functools', 'threading', 'concurrent',
+}
+
+_fingerprints: Dict[str, str] = {}
+_FINGERPRINT_CACHE_MAX = 4096
+
+_caller: contextvars.ContextVar = contextvars.ContextVar('query_caller', default=None)
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize a statement: literals become ?, IN lists collapse, whitespace folds"""
+    cached = _fingerprints.get(sql)
+    if cached is not None:
+        return cached
+    text = _COMMENT.sub(" ", sql)
+    text = _STRING.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(?+)", text)
+    text = _SPACE.sub(" ", text).strip().rstrip(";")
+    if len(_fingerprints) >= _FINGERPRINT_CACHE_MAX:
+        _fingerprints.clear()
+    _fingerprints[sql] = text
+    return text
+
+
+class QueryStats:
+    """Aggregates for one (fingerprint, module) pair"""
+
+    __slots__ = ('fingerprint', 'module', 'count', 'errors', 'slow', 'rows',
+                 'total_ms', 'max_ms', 'samples')
+
+    def __init__(self, fingerprint: str, module: str, sample_size: int):
+        self.fingerprint = fingerprint
+        self.module = module
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            'fingerprint': self.fingerprint,
+            'module': self.module,
+            'count': self.count,
+            'errors': self.errors,
+            'slow': self.slow,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 2),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(_percentile(ordered, 50), 3),
+            'p95_ms': round(_percentile(ordered, 95), 3),
+            'p99_ms': round(_percentile(ordered, 99), 3),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class QueryProfiler:
+    """Collects latency samples from the pooled connections.
+
+    Percentiles come from the most recent ``sample_size`` executions of each
+    fingerprint; counts, totals and rows cover the whole process lifetime.
+    """
+
+    def __init__(self, enabled: bool = True, slow_ms: float = 250.0,
+                 sample_size: int = 512, max_entries: int = 2000):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.sample_size = sample_size
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], QueryStats] = {}
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._started_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Attribution
+    # ------------------------------------------------------------------
+    def caller_module(self) -> str:
+        """Nearest module on the stack outside the data-access plumbing"""
+        override = _caller.get()
+        if override:
+            return override
+        frame = sys._getframe(1)
+        fallback = None
+        while frame is not None:
+            module = frame.f_globals.get('__name__', '')
+            package = module.split('.', 1)[0]
+            if package == 'asyncio':
+                # Below the task's outermost coroutine is the event loop itself
+                break
+            if package not in _INTERNAL_MODULES:
+                return module
+            if fallback is None and module not in ('query_profiler', 'connection_pool'):
+                # Plumbing's own statements (BEGIN, SAVEPOINT) belong to it
+                fallback = module
+            frame = frame.f_back
+        return fallback or '<unknown>'
+
+    @contextmanager
+    def attributed_to(self, module: Optional[str]):
+        """Attribute queries run inside the block to ``module`` (queued writes)"""
+        token = _caller.set(module)
+        try:
+            yield
+        finally:
+            _caller.reset(token)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def record(self, sql: str, elapsed_ms: float, rows: int = 0,
+               module: Optional[str] = None, error: bool = False) -> Optional[QueryStats]:
+        """Record one execution; returns the stats entry so fetched rows can be added"""
+        fp = fingerprint(sql)
+        module = module or self.caller_module()
+        key = (fp, module)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    self._dropped += 1
+                    return None
+                entry = QueryStats(fp, module, self.sample_size)
+                self._entries[key] = entry
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.rows += max(rows, 0)
+            entry.samples.append(elapsed_ms)
+            if elapsed_ms > entry.max_ms:
+                entry.max_ms = elapsed_ms
+            if error:
+                entry.errors += 1
+            slow = elapsed_ms >= self.slow_ms
+            if slow:
+                entry.slow += 1
+        if slow:
+            logger.warning(f"🐢 Slow query ({elapsed_ms:.1f}ms) from {module}: {fp[:300]}")
+        return entry
+
+    def add_rows(self, entry: Optional[QueryStats], rows: int):
+        """Count rows fetched after the statement ran"""
+        if entry is not None and rows:
+            with self._lock:
+                entry.rows += rows
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def get_top(self, limit: int = 10, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """Top offenders ordered by ``total_ms``, ``p95_ms``, ``p99_ms``, ``count`` or ``rows``"""
+        with self._lock:
+            entries = [entry.to_dict() for entry in self._entries.values()]
+        entries.sort(key=lambda e: e.get(order_by, 0), reverse=True)
+        return entries[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profiler summary"""
+        with self._lock:
+            count = sum(e.count for e in self._entries.values())
+            total_ms = sum(e.total_ms for e in self._entries.values())
+            slow = sum(e.slow for e in self._entries.values())
+            fingerprints = len(self._entries)
+        return {
+            'enabled': self.enabled,
+            'slow_ms': self.slow_ms,
+            'queries': count,
+            'total_ms': round(total_ms, 2),
+            'slow_queries': slow,
+            'fingerprints': fingerprints,
+            'dropped': self._dropped,
+            'uptime_s': round(time.time() - self._started_at),
+        }
+
+    def reset(self):
+        """Forget all collected statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._dropped = 0
+            self._started_at = time.time()
+
+
+_profiler = QueryProfiler()
+
+
+def get_query_profiler() -> QueryProfiler:
+    """Get the process-wide query profiler"""
+    return _profiler
+
+
+def configure_query_profiler(enabled: bool = True, slow_ms: float = 250.0) -> QueryProfiler:
+    """Turn profiling on/off and set the slow-query threshold"""
+    _profiler.enabled = enabled
+    _profiler.slow_ms = slow_ms
+    return _profiler
+
+
+def format_query_report(limit: int = 10, order_by: str = 'total_ms') -> str:
+    """Plain-text top offenders table for the admin panel"""
+    stats = _profiler.get_stats()
+    lines = [
+        f"Queries: {stats['queries']:,} in {stats['total_ms'] / 1000:.1f}s "
+        f"({stats['fingerprints']} fingerprints, {stats['slow_queries']} slow >= {stats['slow_ms']:.0f}ms)",
+        "",
+    ]
+    for i, entry in enumerate(_profiler.get_top(limit, order_by), 1):
+        lines.append(
+            f"{i}. [{entry['module']}] x{entry['count']} total {entry['total_ms']:.0f}ms "
+            f"p50/p95/p99 {entry['p50_ms']:.1f}/{entry['p95_ms']:.1f}/{entry['p99_ms']:.1f}ms "
+            f"rows {entry['rows']}"
+        )
+        lines.append(f"   {entry['fingerprint'][:160]}")
+    return "\n".join(lines)
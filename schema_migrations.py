@@ -0,0 +1,975 @@
+"""
+Schema migrations for I3lani Telegram Bot
+Versioned, apply-once schema changes tracked in ``schema_version``, the
+curated hot-path index set, and startup checks that the hot queries use it
+"""
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from async_data_access import run_blocking
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+@dataclass
+class Migration:
+    """One schema step: tables first, then missing columns, then indexes, then statements"""
+    version: int
+    name: str
+    tables: List[str] = field(default_factory=list)
+    columns: List[Tuple[str, str, str]] = field(default_factory=list)  # (table, column, definition)
+    indexes: List[str] = field(default_factory=list)
+    statements: List[str] = field(default_factory=list)  # triggers and other DDL that needs the above
+
+
+CORE_TABLES = Migration(1, "core tables", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        language TEXT DEFAULT 'en',
+        currency TEXT DEFAULT 'USD',
+        referrer_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        total_spent REAL DEFAULT 0.0,
+        free_days INTEGER DEFAULT 0,
+        free_ads_used INTEGER DEFAULT 0,
+        last_free_ad_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (referrer_id) REFERENCES users (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS channels (
+        channel_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        telegram_channel_id TEXT NOT NULL,
+        subscribers INTEGER DEFAULT 0,
+        base_price_usd REAL DEFAULT 0.0,
+        is_popular BOOLEAN DEFAULT FALSE,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS packages (
+        package_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        price_usd REAL NOT NULL,
+        duration_days INTEGER NOT NULL,
+        posts_per_day INTEGER NOT NULL,
+        channels_included INTEGER NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ads (
+        ad_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        media_url TEXT,
+        link_url TEXT,
+        content_type TEXT DEFAULT 'text',
+        status TEXT DEFAULT 'draft',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS subscriptions (
+        subscription_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        ad_id INTEGER NOT NULL,
+        channel_id TEXT NOT NULL,
+        duration_months INTEGER NOT NULL,
+        start_date TIMESTAMP,
+        end_date TIMESTAMP,
+        total_price REAL NOT NULL,
+        currency TEXT DEFAULT 'USD',
+        posts_per_day INTEGER DEFAULT 1,
+        total_posts INTEGER DEFAULT 30,
+        discount_percent INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'pending',
+        last_published TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (user_id),
+        FOREIGN KEY (ad_id) REFERENCES ads (ad_id),
+        FOREIGN KEY (channel_id) REFERENCES channels (channel_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payments (
+        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        subscription_id INTEGER,
+        amount REAL NOT NULL,
+        currency TEXT DEFAULT 'USD',
+        payment_method TEXT NOT NULL,
+        memo TEXT UNIQUE,
+        tx_hash TEXT,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        confirmed_at TIMESTAMP,
+        failed_at TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (user_id),
+        FOREIGN KEY (subscription_id) REFERENCES subscriptions (subscription_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS referrals (
+        referral_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        referrer_id INTEGER NOT NULL,
+        referee_id INTEGER NOT NULL,
+        channel_id TEXT,
+        reward_granted BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (referrer_id) REFERENCES users (user_id),
+        FOREIGN KEY (referee_id) REFERENCES users (user_id),
+        FOREIGN KEY (channel_id) REFERENCES channels (channel_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bot_settings (
+        setting_key TEXT PRIMARY KEY,
+        setting_value TEXT NOT NULL,
+        description TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partner_rewards (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        channel_id TEXT,
+        reward_type TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        paid_at TIMESTAMP NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partner_referrals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        referrer_id INTEGER NOT NULL,
+        referred_id INTEGER NOT NULL,
+        channel_id TEXT,
+        commission_rate REAL DEFAULT 0.05,
+        total_earned REAL DEFAULT 0,
+        status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS partner_status (
+        user_id INTEGER PRIMARY KEY,
+        tier TEXT DEFAULT 'Basic',
+        total_earnings REAL DEFAULT 0,
+        pending_rewards REAL DEFAULT 0,
+        total_referrals INTEGER DEFAULT 0,
+        active_channels INTEGER DEFAULT 0,
+        registration_bonus_paid BOOLEAN DEFAULT FALSE,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payout_requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        payout_id TEXT UNIQUE NOT NULL,
+        status TEXT DEFAULT 'pending',
+        wallet_address TEXT,
+        transaction_hash TEXT,
+        requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        processed_at TIMESTAMP,
+        notes TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ui_customizations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category TEXT NOT NULL,
+        text_key TEXT NOT NULL,
+        language TEXT NOT NULL,
+        custom_text TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(category, text_key, language)
+    )
+    """,
+])
+
+# Columns that older databases picked up through ad-hoc ALTERs
+CORE_COLUMNS = Migration(2, "core columns", columns=[
+    ('users', 'free_ads_used', 'INTEGER DEFAULT 0'),
+    ('users', 'last_free_ad_reset', 'TIMESTAMP'),
+    ('users', 'free_trial_used', 'BOOLEAN DEFAULT FALSE'),
+    ('users', 'free_trial_date', 'TIMESTAMP'),
+    ('users', 'ton_wallet_address', 'TEXT'),
+    ('users', 'last_activity', 'TIMESTAMP'),
+    ('channels', 'active_subscribers', 'INTEGER DEFAULT 0'),
+    ('channels', 'total_posts', 'INTEGER DEFAULT 0'),
+    ('channels', 'category', "TEXT DEFAULT 'general'"),
+    ('channels', 'description', 'TEXT'),
+    ('channels', 'last_updated', 'TIMESTAMP'),
+    ('subscriptions', 'posts_per_day', 'INTEGER DEFAULT 1'),
+    ('subscriptions', 'total_posts', 'INTEGER DEFAULT 30'),
+    ('subscriptions', 'discount_percent', 'INTEGER DEFAULT 0'),
+    ('subscriptions', 'last_published', 'TIMESTAMP'),
+    ('payments', 'failed_at', 'TIMESTAMP'),
+])
+
+# Tables that used to be created on every call from the hot paths
+ACTIVITY_TABLES = Migration(3, "activity and security log tables", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS user_interactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        interaction_type TEXT NOT NULL,
+        details TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_actions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        action_type TEXT NOT NULL,
+        details TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS blocked_users (
+        user_id INTEGER PRIMARY KEY,
+        reason TEXT,
+        blocked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'blocked'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS banned_users (
+        user_id INTEGER PRIMARY KEY,
+        reason TEXT,
+        banned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'banned'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fraud_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        type TEXT NOT NULL,
+        transaction_hash TEXT,
+        transaction_amount REAL,
+        transaction_sender TEXT,
+        transaction_memo TEXT,
+        expected_memo TEXT,
+        expected_wallet TEXT,
+        risk_level TEXT,
+        status TEXT,
+        admin_reviewed BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+])
+
+CAMPAIGN_TABLES = Migration(4, "campaign and publishing tables", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS campaigns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id TEXT NOT NULL UNIQUE,
+        user_id INTEGER NOT NULL,
+        payment_memo TEXT,
+        payment_method TEXT DEFAULT 'TON',
+        payment_amount REAL,
+
+        -- Campaign Details
+        campaign_name TEXT,
+        ad_content TEXT,
+        ad_type TEXT DEFAULT 'text',
+
+        -- Scheduling
+        start_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        end_date TIMESTAMP,
+        duration_days INTEGER,
+        posts_per_day INTEGER,
+        total_posts INTEGER,
+
+        -- Channels
+        selected_channels TEXT,
+        channel_count INTEGER,
+        total_reach INTEGER,
+
+        -- Status
+        status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+        -- Analytics
+        posts_published INTEGER DEFAULT 0,
+        engagement_score REAL DEFAULT 0.0,
+        click_through_rate REAL DEFAULT 0.0,
+
+        -- Metadata
+        campaign_metadata TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS campaign_posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        post_id TEXT,
+        post_content TEXT,
+        scheduled_time TIMESTAMP,
+        published_time TIMESTAMP,
+        status TEXT DEFAULT 'pending',
+        engagement_metrics TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (campaign_id) REFERENCES campaigns(campaign_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS channel_publishing_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        message_id INTEGER,
+        content_type TEXT,
+        media_url TEXT,
+        status TEXT DEFAULT 'success',
+        error_message TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+], columns=[
+    ('campaigns', 'content_type', "TEXT DEFAULT 'text'"),
+    ('campaigns', 'media_url', 'TEXT'),
+    ('campaigns', 'advertiser_username', 'TEXT'),
+    ('campaigns', 'sequence_id', 'TEXT'),
+    ('campaigns', 'content', 'TEXT'),
+    ('campaign_posts', 'user_id', 'INTEGER'),
+    ('campaign_posts', 'content', 'TEXT'),
+    ('campaign_posts', 'content_type', "TEXT DEFAULT 'text'"),
+    ('campaign_posts', 'media_url', 'TEXT'),
+    ('campaign_posts', 'published_at', 'TIMESTAMP'),
+    ('campaign_posts', 'message_id', 'INTEGER'),
+    ('campaign_posts', 'error_message', 'TEXT'),
+    ('campaign_posts', 'sequence_id', 'TEXT'),
+    ('channel_publishing_logs', 'error_message', 'TEXT'),
+], indexes=[
+    "CREATE INDEX IF NOT EXISTS idx_campaigns_user_id ON campaigns(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_campaigns_status ON campaigns(status)",
+    "CREATE INDEX IF NOT EXISTS idx_campaign_posts_campaign_id ON campaign_posts(campaign_id)",
+    "CREATE INDEX IF NOT EXISTS idx_channel_publishing_logs_campaign_channel "
+    "ON channel_publishing_logs(campaign_id, channel_id)",
+])
+
+POST_IDENTITY_TABLES = Migration(5, "post identity tables", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS post_identity (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id TEXT UNIQUE NOT NULL,
+        campaign_id TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        advertiser_username TEXT NOT NULL,
+        creation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        content_text TEXT NOT NULL,
+        content_image TEXT,
+        content_video TEXT,
+        content_type TEXT DEFAULT 'text',
+        channel_count INTEGER DEFAULT 0,
+        publishing_days INTEGER DEFAULT 0,
+        posts_per_day INTEGER DEFAULT 0,
+        target_channels TEXT,
+        total_reach INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'created',
+        published_channels TEXT,
+        verification_hash TEXT,
+        metadata_json TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS post_publishing_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id TEXT NOT NULL,
+        campaign_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        channel_name TEXT,
+        published_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        message_id INTEGER,
+        content_hash TEXT,
+        publishing_status TEXT DEFAULT 'success',
+        error_message TEXT,
+        verification_status TEXT DEFAULT 'pending',
+        FOREIGN KEY (post_id) REFERENCES post_identity (post_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS content_verification (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id TEXT NOT NULL,
+        original_content_hash TEXT NOT NULL,
+        published_content_hash TEXT,
+        verification_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        match_status TEXT DEFAULT 'pending',
+        discrepancy_details TEXT,
+        FOREIGN KEY (post_id) REFERENCES post_identity (post_id)
+    )
+    """,
+], indexes=[
+    "CREATE INDEX IF NOT EXISTS idx_post_identity_campaign ON post_identity(campaign_id)",
+    "CREATE INDEX IF NOT EXISTS idx_post_identity_user ON post_identity(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_publishing_log_post ON post_publishing_log(post_id)",
+    "CREATE INDEX IF NOT EXISTS idx_content_verification_post ON content_verification(post_id)",
+])
+
+SEQUENCE_TABLES = Migration(6, "global sequence and tracking tables", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS global_sequences (
+        sequence_id TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        username TEXT,
+        language TEXT,
+        status TEXT DEFAULT 'active',
+        current_step TEXT,
+        step_count INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed_at TIMESTAMP,
+        metadata TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS global_sequence_steps (
+        step_id TEXT PRIMARY KEY,
+        sequence_id TEXT NOT NULL,
+        step_name TEXT NOT NULL,
+        component TEXT NOT NULL,
+        step_order INTEGER,
+        status TEXT DEFAULT 'completed',
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        metadata TEXT,
+        error_message TEXT,
+        FOREIGN KEY (sequence_id) REFERENCES global_sequences (sequence_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS global_component_links (
+        link_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sequence_id TEXT NOT NULL,
+        component_name TEXT NOT NULL,
+        entity_type TEXT NOT NULL,
+        entity_id TEXT NOT NULL,
+        link_type TEXT DEFAULT 'primary',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        metadata TEXT,
+        FOREIGN KEY (sequence_id) REFERENCES global_sequences (sequence_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sequence_counter (
+        id INTEGER PRIMARY KEY,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        counter INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(year, month)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS campaign_tracking (
+        tracking_id TEXT PRIMARY KEY,
+        sequence_id TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        campaign_id TEXT,
+        current_step TEXT,
+        total_steps INTEGER DEFAULT 13,
+        completed_steps INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'in_progress',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed_at TIMESTAMP,
+        metadata TEXT,
+        FOREIGN KEY (sequence_id) REFERENCES global_sequences (sequence_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tracking_steps (
+        step_tracking_id TEXT PRIMARY KEY,
+        tracking_id TEXT NOT NULL,
+        step_id TEXT NOT NULL,
+        step_name TEXT NOT NULL,
+        step_title TEXT NOT NULL,
+        status TEXT DEFAULT 'pending',
+        started_at TIMESTAMP,
+        completed_at TIMESTAMP,
+        metadata TEXT,
+        error_message TEXT,
+        FOREIGN KEY (tracking_id) REFERENCES campaign_tracking (tracking_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS publishing_reports (
+        report_id TEXT PRIMARY KEY,
+        campaign_id TEXT NOT NULL,
+        sequence_id TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        total_channels INTEGER,
+        published_channels TEXT,
+        failed_channels TEXT,
+        publication_timestamps TEXT,
+        success_rate REAL,
+        final_status TEXT,
+        completion_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        confirmation_sent BOOLEAN DEFAULT FALSE,
+        FOREIGN KEY (campaign_id) REFERENCES campaigns (campaign_id)
+    )
+    """,
+])
+
+# Curated index set for the publisher and admin statistics queries.
+# The dropped indexes duplicate the rowid primary key / UNIQUE autoindex.
+HOT_PATH_INDEXES = Migration(7, "hot path indexes", indexes=[
+    "CREATE INDEX IF NOT EXISTS idx_campaign_posts_status_scheduled ON campaign_posts(status, scheduled_time)",
+    "CREATE INDEX IF NOT EXISTS idx_payments_status_created ON payments(status, created_at, amount)",
+    "CREATE INDEX IF NOT EXISTS idx_users_last_activity ON users(last_activity)",
+    "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_channels_is_active ON channels(is_active)",
+    "CREATE INDEX IF NOT EXISTS idx_subscriptions_status ON subscriptions(status)",
+    "CREATE INDEX IF NOT EXISTS idx_global_sequence_steps_sequence ON global_sequence_steps(sequence_id, step_order)",
+    "DROP INDEX IF EXISTS idx_users_user_id",
+    "DROP INDEX IF EXISTS idx_campaigns_campaign_id",
+])
+
+# Lazy campaign schedules: one rule row per campaign, expanded into
+# campaign_posts a window at a time by the publisher
+CAMPAIGN_SCHEDULES = Migration(8, "campaign schedule rules", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS campaign_schedules (
+        campaign_id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        channels TEXT NOT NULL,
+        start_time TIMESTAMP NOT NULL,
+        interval_seconds REAL NOT NULL,
+        slots_per_period INTEGER NOT NULL,
+        period_seconds REAL NOT NULL,
+        occurrences INTEGER NOT NULL,
+        next_index INTEGER DEFAULT 0,
+        next_time TIMESTAMP,
+        status TEXT DEFAULT 'active',
+        content TEXT,
+        content_type TEXT DEFAULT 'text',
+        media_url TEXT,
+        label_posts BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+], indexes=[
+    "CREATE INDEX IF NOT EXISTS idx_campaign_schedules_status_next ON campaign_schedules(status, next_time)",
+])
+
+# Daily counts of log rows removed by the retention job (log_retention.py)
+LOG_ROLLUPS = Migration(9, "log daily rollups", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS log_daily_rollups (
+        table_name TEXT NOT NULL,
+        day TEXT NOT NULL,
+        dimension TEXT NOT NULL DEFAULT '',
+        row_count INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (table_name, day, dimension)
+    )
+    """,
+])
+
+
+def _bump(name: str, delta: str, when: str = "1") -> str:
+    """Trigger step adding ``delta`` to a running counter"""
+    return f"""
+        INSERT INTO stats_counters (name, value) SELECT {name}, {delta} WHERE {when}
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value, updated_at = CURRENT_TIMESTAMP;"""
+
+
+def _bump_day(name: str, day_column: str, delta: str, when: str = "1") -> str:
+    """Trigger step adding ``delta`` to a per-day counter (bucketed like the log rollups)"""
+    return f"""
+        INSERT INTO stats_daily (day, name, value)
+        SELECT substr(COALESCE({day_column}, CURRENT_TIMESTAMP), 1, 10), '{name}', {delta} WHERE {when}
+        ON CONFLICT(day, name) DO UPDATE SET value = value + excluded.value;"""
+
+
+def _trigger(name: str, event: str, table: str, *steps: str) -> str:
+    return f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN{''.join(steps)}\n    END"
+
+
+def _status_triggers(table: str, statuses: Tuple[str, ...] = ('active', 'completed')) -> List[str]:
+    """Keep ``<table>_<status>`` counters in step with a status column"""
+    tracked = "({})".format(", ".join(f"'{status}'" for status in statuses))
+    return [
+        _trigger(f"trg_stats_{table}_insert", "INSERT", table,
+                 _bump(f"'{table}_' || NEW.status", "1", f"NEW.status IN {tracked}")),
+        _trigger(f"trg_stats_{table}_status", "UPDATE OF status", table,
+                 _bump(f"'{table}_' || OLD.status", "-1", f"OLD.status IN {tracked} AND OLD.status IS NOT NEW.status"),
+                 _bump(f"'{table}_' || NEW.status", "1", f"NEW.status IN {tracked} AND OLD.status IS NOT NEW.status")),
+        _trigger(f"trg_stats_{table}_delete", "DELETE", table,
+                 _bump(f"'{table}_' || OLD.status", "-1", f"OLD.status IN {tracked}")),
+    ]
+
+
+def _only_confirmed_payment(row: str) -> str:
+    # True when no other confirmed payment exists for the row's user
+    return (f"NOT EXISTS (SELECT 1 FROM payments p WHERE p.user_id = {row}.user_id "
+            f"AND p.status = 'confirmed' AND p.payment_id != {row}.payment_id)")
+
+
+# Admin statistics counters, maintained by triggers in the same transaction as
+# the write that changes them; stats_counters.py serves and reconciles them
+STATS_COUNTERS = Migration(10, "materialized admin statistics", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT NOT NULL,
+        name TEXT NOT NULL,
+        value REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, name)
+    )
+    """,
+], indexes=[
+    "CREATE INDEX IF NOT EXISTS idx_payments_user_status ON payments(user_id, status)",
+], statements=[
+    _trigger("trg_stats_users_insert", "INSERT", "users",
+             _bump("'users_total'", "1"),
+             _bump_day("new_users", "NEW.created_at", "1")),
+    _trigger("trg_stats_users_delete", "DELETE", "users",
+             _bump("'users_total'", "-1"),
+             _bump_day("new_users", "OLD.created_at", "-1")),
+    _trigger("trg_stats_payments_insert", "INSERT", "payments",
+             _bump_day("revenue", "NEW.created_at", "NEW.amount", "NEW.status = 'confirmed'"),
+             _bump("'paid_users'", "1", f"NEW.status = 'confirmed' AND {_only_confirmed_payment('NEW')}")),
+    _trigger("trg_stats_payments_update", "UPDATE OF status, amount, user_id, created_at", "payments",
+             _bump_day("revenue", "OLD.created_at", "-OLD.amount", "OLD.status = 'confirmed'"),
+             _bump_day("revenue", "NEW.created_at", "NEW.amount", "NEW.status = 'confirmed'"),
+             _bump("'paid_users'", "-1",
+                   "OLD.status = 'confirmed' AND NOT (NEW.status = 'confirmed' AND NEW.user_id = OLD.user_id) "
+                   f"AND {_only_confirmed_payment('OLD')}"),
+             _bump("'paid_users'", "1",
+                   "NEW.status = 'confirmed' AND NOT (OLD.status = 'confirmed' AND OLD.user_id = NEW.user_id) "
+                   f"AND {_only_confirmed_payment('NEW')}")),
+    _trigger("trg_stats_payments_delete", "DELETE", "payments",
+             _bump_day("revenue", "OLD.created_at", "-OLD.amount", "OLD.status = 'confirmed'"),
+             _bump("'paid_users'", "-1", f"OLD.status = 'confirmed' AND {_only_confirmed_payment('OLD')}")),
+    *_status_triggers("subscriptions"),
+    *_status_triggers("campaigns"),
+    _trigger("trg_stats_campaign_posts_status", "UPDATE OF status", "campaign_posts",
+             _bump_day("posts_published", "COALESCE(OLD.published_at, OLD.published_time)", "-1",
+                       "OLD.status = 'published' AND NEW.status IS NOT 'published'"),
+             _bump_day("posts_published", "COALESCE(NEW.published_at, NEW.published_time)", "1",
+                       "NEW.status = 'published' AND OLD.status IS NOT 'published'")),
+    _trigger("trg_stats_campaign_posts_delete", "DELETE", "campaign_posts",
+             _bump_day("posts_published", "COALESCE(OLD.published_at, OLD.published_time)", "-1",
+                       "OLD.status = 'published'")),
+])
+
+PUBLISH_DEAD_LETTERS = Migration(11, "publish retries and dead letters", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS publish_dead_letters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id INTEGER NOT NULL,
+        campaign_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        error_kind TEXT NOT NULL,
+        error TEXT,
+        attempts INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'dead',
+        failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        replayed_at TIMESTAMP
+    )
+    """,
+], columns=[
+    ('campaign_posts', 'attempts', 'INTEGER DEFAULT 0'),
+], indexes=[
+    "CREATE INDEX IF NOT EXISTS idx_publish_dead_letters_status ON publish_dead_letters(status, failed_at)",
+])
+
+PUBLISH_LEASES = Migration(12, "campaign post leases", columns=[
+    ('campaign_posts', 'lease_owner', 'TEXT'),
+    ('campaign_posts', 'lease_expires', 'TIMESTAMP'),
+], indexes=[
+    "CREATE INDEX IF NOT EXISTS idx_campaign_posts_status_lease ON campaign_posts(status, lease_expires)",
+])
+
+def _count_post(post: str, delta: str, when: str = "1") -> str:
+    """Trigger step moving one post into (delta 1) or out of (delta -1) its campaign's counts"""
+    status = f"{post}.status"
+    return f"""
+        INSERT INTO campaign_post_counts (campaign_id, total, pending, published, failed)
+        SELECT {post}.campaign_id, {delta}, {delta} * COALESCE({status} IN ('scheduled', 'claimed'), 0),
+               {delta} * ({status} IS 'published'), {delta} * ({status} IS 'failed')
+        WHERE {when}
+        ON CONFLICT(campaign_id) DO UPDATE SET
+            total = total + excluded.total, pending = pending + excluded.pending,
+            published = published + excluded.published, failed = failed + excluded.failed,
+            updated_at = CURRENT_TIMESTAMP;"""
+
+
+# Per-campaign post counts for the publisher's completion check and progress
+# notifications, so neither has to recount campaign_posts
+_POST_MOVED = "OLD.status IS NOT NEW.status OR OLD.campaign_id IS NOT NEW.campaign_id"
+
+CAMPAIGN_POST_COUNTS = Migration(13, "per-campaign post counters", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS campaign_post_counts (
+        campaign_id TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        pending INTEGER NOT NULL DEFAULT 0,
+        published INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+], columns=[
+    # Set by the publisher's completion check, which was failing without it
+    ('campaigns', 'completed_at', 'TIMESTAMP'),
+], statements=[
+    """
+    INSERT OR REPLACE INTO campaign_post_counts (campaign_id, total, pending, published, failed)
+    SELECT campaign_id, COUNT(*), COALESCE(SUM(status IN ('scheduled', 'claimed')), 0),
+           COALESCE(SUM(status = 'published'), 0), COALESCE(SUM(status = 'failed'), 0)
+    FROM campaign_posts GROUP BY campaign_id
+    """,
+    _trigger("trg_campaign_post_counts_insert", "INSERT", "campaign_posts", _count_post("NEW", "1")),
+    _trigger("trg_campaign_post_counts_update", "UPDATE OF status, campaign_id", "campaign_posts",
+             _count_post("OLD", "-1", _POST_MOVED),
+             _count_post("NEW", "1", _POST_MOVED)),
+    _trigger("trg_campaign_post_counts_delete", "DELETE", "campaign_posts", _count_post("OLD", "-1")),
+])
+
+MEDIA_FILE_IDS = Migration(14, "media file_id cache", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS media_file_ids (
+        content_hash TEXT PRIMARY KEY,
+        file_id TEXT NOT NULL,
+        media_type TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+])
+
+# Each campaign's send payload, rendered once when it is activated
+CAMPAIGN_PAYLOADS = Migration(15, "rendered campaign payloads", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS campaign_payloads (
+        campaign_id TEXT PRIMARY KEY,
+        payload BLOB NOT NULL,
+        rendered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+], statements=[
+    # Editing what a campaign sends drops its payload; the next publish renders it again
+    """
+    CREATE TRIGGER IF NOT EXISTS campaign_payloads_stale
+    AFTER UPDATE OF ad_content, content_type, media_url, campaign_metadata ON campaigns
+    BEGIN
+        DELETE FROM campaign_payloads WHERE campaign_id = NEW.campaign_id;
+    END
+    """,
+])
+
+# Per-channel publish slot offsets for lazily materialized schedules
+SCHEDULE_SLOT_OFFSETS = Migration(16, "schedule slot offsets", columns=[
+    ('campaign_schedules', 'channel_offsets', 'TEXT'),
+])
+
+# One row per accepted TON payment; a memo activates at most one campaign
+PAYMENT_LEDGER = Migration(17, "payment idempotency ledger", tables=[
+    """
+    CREATE TABLE IF NOT EXISTS payment_ledger (
+        tx_hash TEXT NOT NULL,
+        memo TEXT NOT NULL,
+        user_id INTEGER,
+        amount REAL,
+        campaign_id TEXT,
+        source TEXT,
+        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (tx_hash, memo)
+    )
+    """,
+], indexes=[
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_payment_ledger_memo ON payment_ledger(memo)",
+])
+
+MIGRATIONS: List[Migration] = [
+    CORE_TABLES,
+    CORE_COLUMNS,
+    ACTIVITY_TABLES,
+    CAMPAIGN_TABLES,
+    POST_IDENTITY_TABLES,
+    SEQUENCE_TABLES,
+    HOT_PATH_INDEXES,
+    CAMPAIGN_SCHEDULES,
+    LOG_ROLLUPS,
+    STATS_COUNTERS,
+    PUBLISH_DEAD_LETTERS,
+    PUBLISH_LEASES,
+    CAMPAIGN_POST_COUNTS,
+    MEDIA_FILE_IDS,
+    CAMPAIGN_PAYLOADS,
+    SCHEDULE_SLOT_OFFSETS,
+    PAYMENT_LEDGER,
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# The publisher's due-post reads: every sweep loads what is due before the
+# sweep after next, and a newly paid campaign loads its own posts
+DUE_POSTS_QUERY = """
+    SELECT id, scheduled_time FROM campaign_posts
+    WHERE status = 'scheduled' AND scheduled_time <= ?
+"""
+CAMPAIGN_DUE_POSTS_QUERY = """
+    SELECT id, scheduled_time FROM campaign_posts
+    WHERE campaign_id = ? AND status = 'scheduled' AND scheduled_time <= ?
+"""
+
+# name -> (query, params, index the plan must use)
+HOT_QUERIES: Dict[str, Tuple[str, Tuple[Any, ...], str]] = {
+    'publisher_due_posts': (DUE_POSTS_QUERY, ('2000-01-01 00:00:00',), 'idx_campaign_posts_status_scheduled'),
+    'publisher_campaign_due_posts': (
+        CAMPAIGN_DUE_POSTS_QUERY, ('CAM', '2000-01-01 00:00:00'), 'idx_campaign_posts_status_scheduled'),
+    'admin_active_users': (
+        "SELECT COUNT(*) FROM users WHERE last_activity > datetime('now', '-7 days')", (),
+        'idx_users_last_activity'),
+    'admin_new_users': (
+        "SELECT COUNT(*) FROM users WHERE created_at > datetime('now', '-1 day')", (),
+        'idx_users_created_at'),
+    'admin_paid_users': (
+        "SELECT COUNT(DISTINCT user_id) FROM payments WHERE status = 'confirmed'", (),
+        'idx_payments_status_created'),
+    'admin_revenue': (
+        "SELECT SUM(amount) FROM payments WHERE status = 'confirmed' AND created_at > datetime('now', '-1 day')", (),
+        'idx_payments_status_created'),
+    'admin_subscriptions': (
+        "SELECT COUNT(*) FROM subscriptions WHERE status = 'active'", (),
+        'idx_subscriptions_status'),
+    'active_channels': (
+        "SELECT * FROM channels WHERE is_active = 1", (),
+        'idx_channels_is_active'),
+    'expired_leases': (
+        "SELECT id FROM campaign_posts WHERE status = 'claimed' AND lease_expires < ?",
+        ('2000-01-01 00:00:00',), 'idx_campaign_posts_status_lease'),
+    'due_schedules': (
+        "SELECT campaign_id FROM campaign_schedules WHERE status = 'active' AND next_time <= ? "
+        "ORDER BY next_time LIMIT 100", ('2000-01-01 00:00:00',),
+        'idx_campaign_schedules_status_next'),
+    'sequence_steps': (
+        "SELECT * FROM global_sequence_steps WHERE sequence_id = ? ORDER BY step_order", ('SEQ',),
+        'idx_global_sequence_steps_sequence'),
+}
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _apply(conn: sqlite3.Connection, migration: Migration):
+    for statement in migration.tables:
+        conn.execute(statement)
+    for table, column, definition in migration.columns:
+        if column not in _table_columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    for statement in migration.indexes:
+        conn.execute(statement)
+    for statement in migration.statements:
+        conn.execute(statement)
+
+
+def get_schema_version(db_path: str = "bot.db") -> int:
+    """Highest applied migration version (0 for an unmanaged database)"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute(SCHEMA_VERSION_TABLE)
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def migrate(db_path: str = "bot.db") -> List[int]:
+    """Apply pending migrations, each exactly once; returns the versions applied"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    applied_now = []
+    try:
+        conn.execute(SCHEMA_VERSION_TABLE)
+        applied = {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+        for migration in MIGRATIONS:
+            if migration.version in applied:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if conn.execute("SELECT 1 FROM schema_version WHERE version = ?",
+                                (migration.version,)).fetchone():
+                    conn.execute("ROLLBACK")
+                    continue
+                _apply(conn, migration)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                             (migration.version, migration.name))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                logger.error(f"❌ Schema migration {migration.version} ({migration.name}) failed")
+                raise
+            applied_now.append(migration.version)
+            logger.info(f"🗄️ Applied schema migration {migration.version}: {migration.name}")
+    finally:
+        conn.close()
+    return applied_now
+
+
+def verify_query_plans(db_path: str = "bot.db") -> Dict[str, Dict[str, Any]]:
+    """EXPLAIN QUERY PLAN the hot queries and warn when one skips its index"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    results = {}
+    try:
+        for name, (query, params, index) in HOT_QUERIES.items():
+            try:
+                plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+            except sqlite3.Error as e:
+                plan = f"error: {e}"
+            uses_index = index in plan
+            results[name] = {'index': index, 'uses_index': uses_index, 'plan': plan}
+            if not uses_index:
+                logger.warning(f"⚠️ Hot query '{name}' does not use {index}: {plan}")
+    finally:
+        conn.close()
+    ok = sum(1 for r in results.values() if r['uses_index'])
+    logger.info(f"🔎 Query plans verified: {ok}/{len(results)} hot queries use their indexes")
+    return results
+
+
+async def run_migrations(db_path: str = "bot.db") -> List[int]:
+    """Apply pending migrations off the event loop"""
+    return await run_blocking(migrate, db_path)
@@ -11,6 +11,8 @@ from typing import Dict, List, Optional
 import logging
 from sequence_system import get_sequence_system, SequenceType, SequenceStatus
 from sequence_integration import get_sequence_integration
+from analytics_access import connect_readonly, get_analytics_reader
+from async_data_access import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -21,11 +23,18 @@ class SequenceDashboard:
         self.db_path = db_path
         self.sequence_system = get_sequence_system()
         self.sequence_integration = get_sequence_integration()
+        self._shared_conn = None
+    
+    def _connect(self):
+        """Read-only analytics connection (the report's shared one while it runs)"""
+        if self._shared_conn is not None:
+            return _SharedConnection(self._shared_conn)
+        return connect_readonly(get_analytics_reader(self.db_path).source_path)
     
     def show_system_overview(self) -> Dict:
         """Show comprehensive system overview"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Get overall statistics
@@ -125,7 +134,7 @@ class SequenceDashboard:
     def show_user_sequences(self, user_id: int) -> Dict:
         """Show all sequences for a specific user"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Get user's sequences
@@ -186,7 +195,7 @@ class SequenceDashboard:
     def show_sequence_details(self, sequence_id: str) -> Dict:
         """Show detailed information about a specific sequence"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Get sequence info
@@ -287,7 +296,7 @@ class SequenceDashboard:
     def find_stuck_sequences(self, hours_threshold: int = 1) -> List[Dict]:
         """Find sequences that appear to be stuck"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             threshold_time = datetime.now() - timedelta(hours=hours_threshold)
@@ -344,7 +353,7 @@ class SequenceDashboard:
     def find_failed_sequences(self, hours_recent: int = 24) -> List[Dict]:
         """Find recent failed sequences"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             threshold_time = datetime.now() - timedelta(hours=hours_recent)
@@ -399,7 +408,7 @@ class SequenceDashboard:
     def get_component_performance(self, component_name: str) -> Dict:
         """Get performance metrics for a specific component"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Get component step statistics
@@ -478,7 +487,7 @@ class SequenceDashboard:
     def trace_entity_flow(self, entity_type: str, entity_id: str) -> List[Dict]:
         """Trace the complete flow of an entity through the system"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Find all sequences linked to this entity
@@ -539,16 +548,26 @@ class SequenceDashboard:
     
     def generate_health_report(self) -> Dict:
         """Generate comprehensive system health report"""
-        overview = self.show_system_overview()
-        stuck_sequences = self.find_stuck_sequences()
-        failed_sequences = self.find_failed_sequences()
-        
-        # Get component performance for all components
-        components = []
-        if overview.get('component_health'):
-            for comp in overview['component_health']:
-                comp_perf = self.get_component_performance(comp['component'])
-                components.append(comp_perf)
+        # Every section reads one read-only connection inside one transaction,
+        # so the report is a consistent snapshot
+        conn = self._connect()
+        conn.execute("BEGIN")
+        self._shared_conn = conn
+        try:
+            overview = self.show_system_overview()
+            stuck_sequences = self.find_stuck_sequences()
+            failed_sequences = self.find_failed_sequences()
+            
+            # Get component performance for all components
+            components = []
+            if overview.get('component_health'):
+                for comp in overview['component_health']:
+                    comp_perf = self.get_component_performance(comp['component'])
+                    components.append(comp_perf)
+        finally:
+            self._shared_conn = None
+            conn.rollback()
+            conn.close()
         
         return {
             'generated_at': datetime.now().isoformat(),
@@ -559,6 +578,10 @@ class SequenceDashboard:
             'recommendations': self._generate_recommendations(overview, stuck_sequences, failed_sequences)
         }
     
+    async def agenerate_health_report(self) -> Dict:
+        """generate_health_report off the event loop"""
+        return await run_blocking(self.generate_health_report)
+    
     def _generate_recommendations(self, overview: Dict, stuck_sequences: List, 
                                 failed_sequences: List) -> List[str]:
         """Generate recommendations based on system health"""
@@ -579,6 +602,18 @@ class SequenceDashboard:
         
         return recommendations
 
+class _SharedConnection:
+    """The report's connection, handed to a section whose close() must not close it"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def close(self):
+        pass
+
 def print_system_dashboard():
     """Print comprehensive system dashboard"""
     dashboard = SequenceDashboard()
@@ -12,8 +12,23 @@ from typing import Dict, List, Optional, Any
 from enum import Enum
 import logging
 
+from async_data_access import dispatch_write, get_data_access, in_event_loop, spawn_background
+
 logger = logging.getLogger(__name__)
 
+LINK_COMPONENT_QUERY = """
+    INSERT INTO component_links (
+        sequence_id, component_name, entity_type, entity_id, link_type
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+COMPLETE_SEQUENCE_QUERY = """
+    UPDATE sequences 
+    SET status = 'completed', progress_percentage = 100,
+        completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+    WHERE sequence_id = ?
+"""
+
 class SequenceType(Enum):
     """Types of sequences in the system"""
     USER_ONBOARDING = "user_onboarding"
@@ -54,6 +69,7 @@ class SequenceSystem:
     
     def __init__(self, db_path: str = "bot.db"):
         self.db_path = db_path
+        self.data = get_data_access(db_path)
         self.active_sequences = {}
         self.sequence_definitions = {}
         self.initialize_database()
@@ -204,62 +220,82 @@ class SequenceSystem:
         
         logger.info(f"✅ Defined {len(self.sequence_definitions)} sequence types")
     
+    def _start_statements(self, sequence_id: str, sequence_type: SequenceType, user_id: int = None,
+                          entity_id: str = None, metadata: Dict = None) -> List[tuple]:
+        # Create main sequence record
+        statements = [("""
+            INSERT INTO sequences (
+                sequence_id, sequence_type, user_id, entity_id, 
+                status, current_step, metadata
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            sequence_id, sequence_type.value, user_id, entity_id,
+            'active', None, json.dumps(metadata or {})
+        ))]
+        
+        # Create sequence steps
+        if sequence_type in self.sequence_definitions:
+            steps = self.sequence_definitions[sequence_type]
+            for i, step in enumerate(steps):
+                step_id = f"{sequence_id}_{step.step_id}"
+                statements.append(("""
+                    INSERT INTO sequence_steps (
+                        step_id, sequence_id, step_name, step_description,
+                        component, step_order, status, metadata
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    step_id, sequence_id, step.name, step.description,
+                    step.component, i, 'pending', json.dumps(step.metadata)
+                )))
+        return statements
+    
+    def _track_started(self, sequence_id: str, sequence_type: SequenceType, user_id: int = None,
+                       entity_id: str = None):
+        self.active_sequences[sequence_id] = {
+            'type': sequence_type,
+            'user_id': user_id,
+            'entity_id': entity_id,
+            'current_step': 0,
+            'started_at': datetime.now()
+        }
+        logger.info(f"🚀 Started sequence: {sequence_id} ({sequence_type.value})")
+    
     def start_sequence(self, sequence_type: SequenceType, user_id: int = None, 
                       entity_id: str = None, metadata: Dict = None) -> str:
-        """Start a new sequence"""
+        """Start a new sequence (written in the background inside the event loop; see astart_sequence)"""
         try:
             sequence_id = f"{sequence_type.value}_{int(time.time())}_{user_id or 'system'}"
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create main sequence record
-            cursor.execute("""
-                INSERT INTO sequences (
-                    sequence_id, sequence_type, user_id, entity_id, 
-                    status, current_step, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                sequence_id, sequence_type.value, user_id, entity_id,
-                'active', None, json.dumps(metadata or {})
-            ))
-            
-            # Create sequence steps
-            if sequence_type in self.sequence_definitions:
-                steps = self.sequence_definitions[sequence_type]
-                for i, step in enumerate(steps):
-                    step_id = f"{sequence_id}_{step.step_id}"
-                    cursor.execute("""
-                        INSERT INTO sequence_steps (
-                            step_id, sequence_id, step_name, step_description,
-                            component, step_order, status, metadata
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        step_id, sequence_id, step.name, step.description,
-                        step.component, i, 'pending', json.dumps(step.metadata)
-                    ))
-            
-            conn.commit()
-            self.active_sequences[sequence_id] = {
-                'type': sequence_type,
-                'user_id': user_id,
-                'entity_id': entity_id,
-                'current_step': 0,
-                'started_at': datetime.now()
-            }
-            
-            logger.info(f"🚀 Started sequence: {sequence_id} ({sequence_type.value})")
+            dispatch_write(self.db_path,
+                           self._start_statements(sequence_id, sequence_type, user_id, entity_id, metadata),
+                           f"Start sequence {sequence_id}")
+            self._track_started(sequence_id, sequence_type, user_id, entity_id)
             return sequence_id
             
         except Exception as e:
             logger.error(f"❌ Error starting sequence: {e}")
             raise
-        finally:
-            conn.close()
+    
+    async def astart_sequence(self, sequence_type: SequenceType, user_id: int = None,
+                              entity_id: str = None, metadata: Dict = None) -> str:
+        """Start a new sequence; returns once it is committed"""
+        sequence_id = f"{sequence_type.value}_{int(time.time())}_{user_id or 'system'}"
+        try:
+            await self.data.transaction(
+                self._start_statements(sequence_id, sequence_type, user_id, entity_id, metadata))
+        except Exception as e:
+            logger.error(f"❌ Error starting sequence: {e}")
+            raise
+        self._track_started(sequence_id, sequence_type, user_id, entity_id)
+        return sequence_id
     
     def advance_sequence(self, sequence_id: str, step_name: str = None, 
                         metadata: Dict = None, error_message: str = None) -> bool:
         """Advance sequence to next step or specific step"""
+        if in_event_loop():
+            # Runs behind earlier queued writes (e.g. the sequence's own creation)
+            spawn_background(self.aadvance_sequence(sequence_id, step_name, metadata, error_message),
+                             f"Advance sequence {sequence_id}")
+            return True
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -345,26 +381,108 @@ class SequenceSystem:
         finally:
             conn.close()
     
+    async def aadvance_sequence(self, sequence_id: str, step_name: str = None,
+                                metadata: Dict = None, error_message: str = None) -> bool:
+        """Advance sequence as one queued read-modify-write transaction"""
+        async def _advance(conn) -> bool:
+            cursor = await conn.execute("""
+                SELECT sequence_type, current_step, status 
+                FROM sequences 
+                WHERE sequence_id = ?
+            """, (sequence_id,))
+            seq_info = await cursor.fetchone()
+            if not seq_info:
+                logger.warning(f"⚠️ Sequence not found: {sequence_id}")
+                return False
+            
+            _, current_step, status = seq_info
+            if status != 'active':
+                logger.warning(f"⚠️ Sequence not active: {sequence_id} ({status})")
+                return False
+            
+            if step_name:
+                cursor = await conn.execute("""
+                    SELECT step_id, step_order 
+                    FROM sequence_steps 
+                    WHERE sequence_id = ? AND step_name = ?
+                """, (sequence_id, step_name))
+            else:
+                cursor = await conn.execute("""
+                    SELECT step_id, step_order 
+                    FROM sequence_steps 
+                    WHERE sequence_id = ? AND status = 'pending'
+                    ORDER BY step_order 
+                    LIMIT 1
+                """, (sequence_id,))
+            next_step = await cursor.fetchone()
+            if not next_step:
+                await conn.execute(COMPLETE_SEQUENCE_QUERY, (sequence_id,))
+                self.active_sequences.pop(sequence_id, None)
+                logger.info(f"✅ Sequence completed: {sequence_id}")
+                return True
+            
+            step_id, step_order = next_step
+            cursor = await conn.execute(
+                "SELECT COUNT(*) FROM sequence_steps WHERE sequence_id = ?", (sequence_id,)
+            )
+            total_steps = (await cursor.fetchone())[0]
+            
+            status_update = 'failed' if error_message else 'completed'
+            await conn.execute("""
+                UPDATE sequence_steps 
+                SET status = ?, completed_at = CURRENT_TIMESTAMP, 
+                    error_message = ?, metadata = ?
+                WHERE step_id = ?
+            """, (status_update, error_message, json.dumps(metadata or {}), step_id))
+            
+            progress = ((step_order + 1) / total_steps) * 100
+            await conn.execute("""
+                UPDATE sequences 
+                SET current_step = ?, progress_percentage = ?, 
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE sequence_id = ?
+            """, (step_name or f"step_{step_order}", int(progress), sequence_id))
+            
+            await conn.execute("""
+                INSERT INTO flow_transitions (
+                    sequence_id, from_step, to_step, trigger_event, metadata
+                ) VALUES (?, ?, ?, ?, ?)
+            """, (sequence_id, current_step, step_name or f"step_{step_order}", 
+                  'advance', json.dumps(metadata or {})))
+            
+            logger.info(f"⏩ Advanced sequence: {sequence_id} → {step_name or f'step_{step_order}'}")
+            return True
+        
+        try:
+            return await self.data.run_in_transaction(_advance)
+        except Exception as e:
+            logger.error(f"❌ Error advancing sequence: {e}")
+            return False
+    
     def link_component(self, sequence_id: str, component_name: str, 
                       entity_type: str, entity_id: str, link_type: str = "primary"):
         """Link a component entity to a sequence"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            dispatch_write(self.db_path, [(LINK_COMPONENT_QUERY,
+                                           (sequence_id, component_name, entity_type, entity_id, link_type))],
+                           f"Link {component_name} to {sequence_id}")
             
-            cursor.execute("""
-                INSERT INTO component_links (
-                    sequence_id, component_name, entity_type, entity_id, link_type
-                ) VALUES (?, ?, ?, ?, ?)
-            """, (sequence_id, component_name, entity_type, entity_id, link_type))
-            
-            conn.commit()
             logger.info(f"🔗 Linked {component_name}:{entity_type}:{entity_id} to {sequence_id}")
             
         except Exception as e:
             logger.error(f"❌ Error linking component: {e}")
-        finally:
-            conn.close()
+    
+    async def alink_component(self, sequence_id: str, component_name: str,
+                              entity_type: str, entity_id: str, link_type: str = "primary") -> bool:
+        """Link a component entity to a sequence; True once committed"""
+        try:
+            await self.data.execute(LINK_COMPONENT_QUERY,
+                                    (sequence_id, component_name, entity_type, entity_id, link_type))
+        except Exception as e:
+            logger.error(f"❌ Error linking component: {e}")
+            return False
+        logger.info(f"🔗 Linked {component_name}:{entity_type}:{entity_id} to {sequence_id}")
+        return True
     
     def get_sequence_status(self, sequence_id: str) -> Optional[Dict]:
         """Get current status of a sequence"""
@@ -442,17 +560,8 @@ class SequenceSystem:
     def complete_sequence(self, sequence_id: str):
         """Mark sequence as completed"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE sequences 
-                SET status = 'completed', progress_percentage = 100,
-                    completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
-                WHERE sequence_id = ?
-            """, (sequence_id,))
-            
-            conn.commit()
+            dispatch_write(self.db_path, [(COMPLETE_SEQUENCE_QUERY, (sequence_id,))],
+                           f"Complete sequence {sequence_id}")
             
             if sequence_id in self.active_sequences:
                 del self.active_sequences[sequence_id]
@@ -461,8 +570,17 @@ class SequenceSystem:
             
         except Exception as e:
             logger.error(f"❌ Error completing sequence: {e}")
-        finally:
-            conn.close()
+    
+    async def acomplete_sequence(self, sequence_id: str) -> bool:
+        """Mark sequence as completed; True once committed"""
+        try:
+            await self.data.execute(COMPLETE_SEQUENCE_QUERY, (sequence_id,))
+        except Exception as e:
+            logger.error(f"❌ Error completing sequence: {e}")
+            return False
+        self.active_sequences.pop(sequence_id, None)
+        logger.info(f"✅ Completed sequence: {sequence_id}")
+        return True
     
     def get_active_sequences(self, user_id: int = None) -> List[Dict]:
         """Get all active sequences, optionally for a specific user"""
@@ -595,12 +713,27 @@ def start_user_sequence(user_id: int, sequence_type: SequenceType,
     """Helper function to start a user sequence"""
     return get_sequence_system().start_sequence(sequence_type, user_id, entity_id, metadata)
 
+async def astart_user_sequence(user_id: int, sequence_type: SequenceType,
+                               entity_id: str = None, metadata: Dict = None) -> str:
+    """Start a user sequence from async code, once it is committed"""
+    return await get_sequence_system().astart_sequence(sequence_type, user_id, entity_id, metadata)
+
 def advance_user_sequence(sequence_id: str, step_name: str = None, 
                          metadata: Dict = None, error_message: str = None) -> bool:
     """Helper function to advance a user sequence"""
     return get_sequence_system().advance_sequence(sequence_id, step_name, metadata, error_message)
 
+async def aadvance_user_sequence(sequence_id: str, step_name: str = None,
+                                 metadata: Dict = None, error_message: str = None) -> bool:
+    """Advance a user sequence from async code, once it is committed"""
+    return await get_sequence_system().aadvance_sequence(sequence_id, step_name, metadata, error_message)
+
 def link_to_sequence(sequence_id: str, component_name: str, 
                     entity_type: str, entity_id: str, link_type: str = "primary"):
     """Helper function to link component to sequence"""
-    return get_sequence_system().link_component(sequence_id, component_name, entity_type, entity_id, link_type)
\ No newline at end of file
+    return get_sequence_system().link_component(sequence_id, component_name, entity_type, entity_id, link_type)
+
+async def alink_to_sequence(sequence_id: str, component_name: str,
+                            entity_type: str, entity_id: str, link_type: str = "primary") -> bool:
+    """Link component to sequence from async code, once it is committed"""
+    return await get_sequence_system().alink_component(sequence_id, component_name, entity_type, entity_id, link_type)
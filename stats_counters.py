@@ -0,0 +1,193 @@
+"""
+Admin statistics counters for I3lani Telegram Bot
+Serves the admin panel numbers from counters that triggers keep up to date
+on every write (see migration 10), and periodically reconciles them against
+the source tables to correct any drift. Rolling-window numbers no trigger
+can follow (users active in the last 7 days) are recomputed and stored at
+each reconciliation
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from analytics_access import AnalyticsReader, get_analytics_reader
+from async_data_access import get_data_access
+from config import STATS_RECONCILE_DAYS, STATS_RECONCILE_INTERVAL_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# Running totals: name -> query computing the true value
+COUNTER_SOURCES = {
+    'users_total': "SELECT COUNT(*) FROM users",
+    'paid_users': "SELECT COUNT(DISTINCT user_id) FROM payments WHERE status = 'confirmed'",
+    'subscriptions_active': "SELECT COUNT(*) FROM subscriptions WHERE status = 'active'",
+    'subscriptions_completed': "SELECT COUNT(*) FROM subscriptions WHERE status = 'completed'",
+    'campaigns_active': "SELECT COUNT(*) FROM campaigns WHERE status = 'active'",
+    'campaigns_completed': "SELECT COUNT(*) FROM campaigns WHERE status = 'completed'",
+}
+
+# Rolling-window values: name -> query, recomputed and stored as is on every reconciliation
+SNAPSHOT_SOURCES = {
+    'active_users': "SELECT COUNT(*) FROM users WHERE last_activity > datetime('now', '-7 days')",
+}
+
+# Per-day counters: name -> query returning (day, value) rows since a date
+DAILY_SOURCES = {
+    'new_users': """
+        SELECT substr(created_at, 1, 10) AS day, COUNT(*) AS value
+        FROM users WHERE created_at >= ? GROUP BY day
+    """,
+    'revenue': """
+        SELECT substr(created_at, 1, 10) AS day, SUM(amount) AS value
+        FROM payments WHERE status = 'confirmed' AND created_at >= ? GROUP BY day
+    """,
+    'posts_published': """
+        SELECT substr(COALESCE(published_at, published_time), 1, 10) AS day, COUNT(*) AS value
+        FROM campaign_posts WHERE status = 'published'
+        AND COALESCE(published_at, published_time) >= ? GROUP BY day
+    """,
+}
+
+# Every panel number in one statement of primary-key lookups (a few rows each)
+SUMMARY_QUERY = """
+    SELECT
+        (SELECT value FROM stats_counters WHERE name = 'users_total') AS users_total,
+        (SELECT value FROM stats_counters WHERE name = 'active_users') AS active_users,
+        (SELECT value FROM stats_daily WHERE name = 'new_users' AND day = date('now')) AS new_users_today,
+        (SELECT value FROM stats_counters WHERE name = 'paid_users') AS paid_users,
+        (SELECT value FROM stats_daily WHERE name = 'revenue' AND day = date('now')) AS revenue_today,
+        (SELECT SUM(value) FROM stats_daily
+         WHERE name = 'revenue' AND day > date('now', '-7 days')) AS revenue_week,
+        (SELECT SUM(value) FROM stats_daily
+         WHERE name = 'revenue' AND day > date('now', '-30 days')) AS revenue_month,
+        (SELECT value FROM stats_counters WHERE name = 'subscriptions_active') AS subscriptions_active,
+        (SELECT value FROM stats_counters WHERE name = 'subscriptions_completed') AS subscriptions_completed,
+        (SELECT value FROM stats_counters WHERE name = 'campaigns_active') AS campaigns_active,
+        (SELECT value FROM stats_counters WHERE name = 'campaigns_completed') AS campaigns_completed,
+        (SELECT value FROM stats_daily WHERE name = 'posts_published' AND day = date('now')) AS posts_today
+"""
+
+_FLOAT_FIELDS = ('revenue_today', 'revenue_week', 'revenue_month')
+
+# Differences below this are float noise from adding and removing amounts
+_EPSILON = 1e-6
+
+
+class StatsCounters:
+    """Reads the materialized admin statistics and keeps them honest"""
+
+    def __init__(self, db_path: str = "bot.db", reader: Optional[AnalyticsReader] = None):
+        self.db_path = db_path
+        self.data = get_data_access(db_path)
+        self.reader = reader or get_analytics_reader(db_path)
+        self.last_reconcile: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def get_summary(self) -> Dict[str, Any]:
+        """All admin panel statistics from a single query"""
+        row = await self.reader.fetchone(SUMMARY_QUERY) or {}
+        return {
+            name: (round(float(value or 0), 2) if name in _FLOAT_FIELDS else int(value or 0))
+            for name, value in row.items()
+        }
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+    async def _measure(self, since: str):
+        """True values and stored counters, read from one consistent snapshot"""
+        async with self.reader.snapshot() as snap:
+            truth = {name: await snap.fetchval(query, default=0) for name, query in COUNTER_SOURCES.items()}
+            snapshots = {name: await snap.fetchval(query, default=0) for name, query in SNAPSHOT_SOURCES.items()}
+            stored = {row['name']: row['value'] for row in await snap.fetchall(
+                "SELECT name, value FROM stats_counters")}
+            truth_daily, stored_daily = {}, {}
+            for name, query in DAILY_SOURCES.items():
+                for row in await snap.fetchall(query, (since,)):
+                    truth_daily[(row['day'], name)] = row['value']
+            for row in await snap.fetchall("SELECT day, name, value FROM stats_daily WHERE day >= ?", (since,)):
+                if row['name'] in DAILY_SOURCES:
+                    stored_daily[(row['day'], row['name'])] = row['value']
+        return truth, stored, truth_daily, stored_daily, snapshots
+
+    async def reconcile(self, days: int = STATS_RECONCILE_DAYS) -> Dict[str, Any]:
+        """Correct counters that drifted from the source tables; returns the corrections.
+
+        Corrections are applied as deltas, so writes that land between the
+        measurement and the fix (already counted by the triggers) are kept.
+        Rolling-window values are stored as measured.
+        """
+        since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+        truth, stored, truth_daily, stored_daily, snapshots = await self._measure(since)
+
+        counters = {}
+        for name, value in truth.items():
+            delta = value - stored.get(name, 0)
+            if abs(delta) > _EPSILON:
+                counters[name] = delta
+        daily = {}
+        for key in set(truth_daily) | set(stored_daily):
+            delta = truth_daily.get(key, 0) - stored_daily.get(key, 0)
+            if abs(delta) > _EPSILON:
+                daily[key] = delta
+
+        async def _correct(conn):
+            await conn.executemany("""
+                INSERT INTO stats_counters (name, value) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = value + excluded.value,
+                                                updated_at = CURRENT_TIMESTAMP
+            """, list(counters.items()))
+            await conn.executemany("""
+                INSERT INTO stats_daily (day, name, value) VALUES (?, ?, ?)
+                ON CONFLICT(day, name) DO UPDATE SET value = value + excluded.value
+            """, [(day, name, delta) for (day, name), delta in daily.items()])
+            await conn.executemany("""
+                INSERT INTO stats_counters (name, value) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            """, list(snapshots.items()))
+
+        await self.data.run_in_transaction(_correct)
+        if counters or daily:
+            logger.warning(f"⚠️ Stats counters drifted: {len(counters)} totals and "
+                           f"{len(daily)} daily values corrected")
+
+        result = {
+            'checked_at': datetime.now().isoformat(),
+            'counters': counters,
+            'daily': {f"{day} {name}": delta for (day, name), delta in daily.items()},
+            'snapshots': snapshots,
+        }
+        self.last_reconcile = result
+        return result
+
+    async def _loop(self, interval_minutes: float):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"❌ Stats counter reconciliation failed: {e}")
+            await asyncio.sleep(interval_minutes * 60)
+
+    def start(self, interval_minutes: float = STATS_RECONCILE_INTERVAL_MINUTES) -> asyncio.Task:
+        """Reconcile now and then every ``interval_minutes`` in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(interval_minutes))
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_counters: Dict[str, StatsCounters] = {}
+
+
+def get_stats_counters(db_path: str = "bot.db") -> StatsCounters:
+    """Get (or create) the statistics counters for a database file"""
+    counters = _counters.get(db_path)
+    if counters is None:
+        counters = StatsCounters(db_path)
+        _counters[db_path] = counters
+    return counters
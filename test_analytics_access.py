@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test Analytics Access
+Validates that analytics reads bypass the OLTP pool, see one consistent
+state inside a snapshot, and can run against a refreshed snapshot copy
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analytics_access import AnalyticsReader
+from connection_pool import close_all_pools, get_pool
+from schema_migrations import migrate
+
+
+async def _analytics_while_writer_busy(db_path: str):
+    pool = get_pool(db_path)
+    reader = AnalyticsReader(db_path, connections=1, snapshot=False)
+    await pool.write_queue.executemany(
+        "INSERT INTO users (user_id, username) VALUES (?, ?)", [(i, f'u{i}') for i in range(50)]
+    )
+    reader_acquires = pool.get_stats()['reader_acquires']
+
+    # An open write transaction on the pool's writer does not stall analytics
+    async with pool.writer() as conn:
+        await conn.execute("INSERT INTO users (user_id, username) VALUES (999, 'pending')")
+        total = await asyncio.wait_for(reader.fetchval("SELECT COUNT(*) FROM users"), timeout=2)
+        await conn.commit()
+
+    # Inside a snapshot, writes committed meanwhile stay invisible
+    async with reader.snapshot() as snap:
+        before = await snap.fetchval("SELECT COUNT(*) FROM users")
+        await pool.write_queue.execute("INSERT INTO users (user_id, username) VALUES (1000, 'late')")
+        during = await snap.fetchval("SELECT COUNT(*) FROM users")
+    after = await reader.fetchval("SELECT COUNT(*) FROM users")
+
+    untouched = pool.get_stats()['reader_acquires'] == reader_acquires
+    await reader.close()
+    await close_all_pools()
+    return total, before, during, after, untouched
+
+
+def test_analytics_reads_are_isolated():
+    """Analytics queries use their own connections and snapshot isolation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "analytics_test.db")
+        migrate(db_path)
+        total, before, during, after, untouched = asyncio.run(_analytics_while_writer_busy(db_path))
+
+    assert total == 50
+    assert before == during == 51
+    assert after == 52
+    assert untouched, "analytics reads went through the OLTP reader pool"
+    print("✅ Analytics reads isolated from the OLTP pool")
+
+
+async def _snapshot_copy(db_path: str):
+    pool = get_pool(db_path)
+    reader = AnalyticsReader(db_path, connections=1, snapshot=True)
+    await pool.write_queue.execute("INSERT INTO users (user_id, username) VALUES (1, 'first')")
+
+    await reader.refresh_snapshot()
+    on_copy = await reader.fetchval("SELECT COUNT(*) FROM users")
+    await pool.write_queue.execute("INSERT INTO users (user_id, username) VALUES (2, 'second')")
+    stale = await reader.fetchval("SELECT COUNT(*) FROM users")
+    await reader.refresh_snapshot()
+    fresh = await reader.fetchval("SELECT COUNT(*) FROM users")
+
+    source = reader.source_path
+    stats = reader.get_stats()
+    await reader.close()
+    await close_all_pools()
+    return on_copy, stale, fresh, source, stats
+
+
+def test_snapshot_copy_refresh():
+    """With a snapshot configured, analytics read the copy until it is refreshed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "analytics_snapshot.db")
+        migrate(db_path)
+        on_copy, stale, fresh, source, stats = asyncio.run(_snapshot_copy(db_path))
+
+    assert (on_copy, stale, fresh) == (1, 1, 2)
+    assert source.endswith(".analytics-snapshot")
+    assert stats['snapshots'] == 2
+    print(f"✅ Snapshot copy refreshed in {stats['snapshot_ms_last']}ms")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Analytics Access")
+    print("=" * 50)
+    test_analytics_reads_are_isolated()
+    test_snapshot_copy_refresh()
+    print("✅ All analytics access tests passed")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test Async Data-Access Layer
+Validates pooled reads/writes, queued sequence logging, the blocking
+executor and the event loop watchdog
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from async_data_access import (
+    AsyncDataAccess, dispatch_write, drain_background_tasks, run_blocking
+)
+from connection_pool import close_all_pools
+from event_loop_watchdog import EventLoopWatchdog
+from global_sequence_system import GlobalSequenceManager
+
+
+async def _run_data_access_checks(db_path: str):
+    data = AsyncDataAccess(db_path)
+    await data.executescript("""
+        CREATE TABLE posts (id INTEGER PRIMARY KEY, status TEXT, attempts INTEGER DEFAULT 0);
+    """)
+
+    result = await data.executemany("INSERT INTO posts (status) VALUES (?)",
+                                    [('scheduled',)] * 5)
+    assert result.rowcount == 5
+    await data.execute("UPDATE posts SET status = 'published' WHERE id = 1")
+
+    rows = await data.fetchall("SELECT id, status FROM posts ORDER BY id")
+    assert rows[0] == {'id': 1, 'status': 'published'}
+    assert await data.fetchval("SELECT COUNT(*) FROM posts WHERE status = 'scheduled'") == 4
+    assert await data.fetchone("SELECT * FROM posts WHERE id = 99") is None
+
+    # Read-modify-write units run inside the queued transaction
+    async def bump(conn):
+        cursor = await conn.execute("SELECT attempts FROM posts WHERE id = 2")
+        attempts = (await cursor.fetchone())[0]
+        await conn.execute("UPDATE posts SET attempts = ? WHERE id = 2", (attempts + 1,))
+        return attempts + 1
+
+    results = await asyncio.gather(*[data.run_in_transaction(bump) for _ in range(10)])
+    assert sorted(results) == list(range(1, 11))
+
+    # Fire-and-forget writes from sync call sites are queued, not run on the loop
+    dispatch_write(db_path, [("UPDATE posts SET status = 'failed' WHERE id = 3", ())], "test write")
+    await drain_background_tasks()
+    assert await data.fetchval("SELECT status FROM posts WHERE id = 3") == 'failed'
+    # ... and can still be awaited by async callers that need the commit
+    task = dispatch_write(db_path, [("UPDATE posts SET status = 'failed' WHERE id > 3", ())], "test write")
+    assert await task == 2
+
+    # Blocking calls go to the executor and leave the loop responsive
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    name = await run_blocking(lambda: (time.sleep(0.1), threading.current_thread().name)[1])
+    task.cancel()
+    assert name.startswith("i3lani-blocking")
+    assert ticks >= 5, ticks
+
+    await close_all_pools()
+
+
+async def _run_sequence_checks(db_path: str):
+    manager = GlobalSequenceManager(db_path)
+    sequence_id = manager.start_user_sequence(42, "tester", "en")
+    for i in range(5):
+        manager.log_step(sequence_id, f"Step_{i}", "tests")
+    await drain_background_tasks()
+
+    assert await manager.aget_user_active_sequence(42) == sequence_id
+    details = manager.get_sequence_details(sequence_id)
+    assert details['step_count'] == 6, details['step_count']
+    assert [s['step_order'] for s in details['steps']] == list(range(1, 7))
+
+    manager.complete_sequence(sequence_id)
+    await drain_background_tasks()
+    assert await manager.aget_user_active_sequence(42) is None
+    await close_all_pools()
+
+
+async def _run_awaited_sequence_checks(db_path: str):
+    manager = GlobalSequenceManager(db_path)
+    # No draining: each awaitable call returns once its write is committed
+    sequence_id = await manager.astart_user_sequence(7, "tester", "en")
+    started = manager.get_sequence_details(sequence_id)
+    step_id = await manager.alog_step(sequence_id, "Step_A", "tests")
+    missing = await manager.alog_step("SEQ-2000-01-00000", "Step_A", "tests")
+    linked = await manager.alink_component(sequence_id, "ads", "ad", "1")
+    completed = await manager.acomplete_sequence(sequence_id)
+    details = manager.get_sequence_details(sequence_id)
+    await close_all_pools()
+    return sequence_id, started, step_id, missing, linked, completed, details
+
+
+async def _run_watchdog_checks():
+    watchdog = EventLoopWatchdog(threshold_ms=50)
+    watchdog.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.2)  # deliberately block the loop
+    await asyncio.sleep(0.05)
+    await watchdog.stop()
+    return watchdog
+
+
+def test_async_data_access():
+    """Test pooled async reads, queued writes and the blocking executor"""
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run_data_access_checks(os.path.join(tmp, "data_test.db")))
+        print("✅ Async data access OK")
+
+
+def test_global_sequence_writes_are_queued():
+    """Sequence steps logged from the loop land in order without blocking it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run_sequence_checks(os.path.join(tmp, "sequence_test.db")))
+        print("✅ Global sequence queued writes OK")
+
+
+def test_global_sequence_awaitable_writes():
+    """Sequence IDs from the awaitable API refer to committed rows"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sequence_id, started, step_id, missing, linked, completed, details = \
+            asyncio.run(_run_awaited_sequence_checks(os.path.join(tmp, "sequence_test.db")))
+    assert started is not None and started['step_count'] == 1
+    assert step_id == f"{sequence_id}:Step_A" and missing == ""
+    assert linked and completed
+    assert details['status'] == 'completed' and details['step_count'] == 2
+    assert [link['entity_id'] for link in details['component_links']] == ['1']
+    print("✅ Global sequence awaitable writes OK")
+
+
+def test_failed_fingerprint_releases_database():
+    """A rejected content fingerprint insert does not keep the database locked"""
+    from content_integrity_system import ContentIntegritySystem
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "integrity_test.db")
+        integrity = ContentIntegritySystem(db_path)
+        failure = None
+        try:
+            # sequence_id is NOT NULL, so the insert fails inside its transaction
+            integrity.register_content_fingerprint('CAM-1', 1, None, 'Integrity test')
+        except sqlite3.IntegrityError as e:
+            # Held like a logged or reported exception, which keeps its frames alive
+            failure = e
+        assert failure is not None
+
+        conn = sqlite3.connect(db_path, timeout=0)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ROLLBACK")
+        finally:
+            conn.close()
+    print("✅ Failed fingerprint insert released the database")
+
+
+def test_loop_watchdog_reports_block():
+    """Watchdog catches a blocking call and records its stack"""
+    watchdog = asyncio.run(_run_watchdog_checks())
+    stats = watchdog.get_stats()
+    assert stats['stalls'] >= 1, stats
+    assert stats['max_stall_ms'] >= 100, stats
+    assert "time.sleep(0.2)" in watchdog.last_stack
+    print(f"✅ Loop watchdog OK: {stats['stalls']} stall(s), max {stats['max_stall_ms']}ms")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Async Data-Access Layer")
+    print("=" * 50)
+    test_async_data_access()
+    test_global_sequence_writes_are_queued()
+    test_global_sequence_awaitable_writes()
+    test_failed_fingerprint_releases_database()
+    test_loop_watchdog_reports_block()
+    print("✅ All async data-access tests passed")
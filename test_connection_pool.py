@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test SQLite Connection Pool
+Validates writer/reader leasing, pragmas and pool statistics
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_pool import ConnectionPool
+
+
+async def _run_pool_checks(db_path: str):
+    pool = ConnectionPool(db_path, readers=2)
+
+    async with pool.writer() as conn:
+        await conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        await conn.execute("INSERT INTO items (name) VALUES ('first')")
+        await conn.commit()
+
+        cursor = await conn.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0].lower() == 'wal'
+
+    # Re-entrant writer inside the same task must not deadlock
+    async with pool.writer() as outer:
+        async with pool.writer() as inner:
+            await inner.execute("INSERT INTO items (name) VALUES ('nested')")
+        await outer.commit()
+
+    # Uncommitted work is discarded on release, like a plain connection close
+    async with pool.writer() as conn:
+        await conn.execute("INSERT INTO items (name) VALUES ('discarded')")
+
+    # Readers are read-only
+    async with pool.reader() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM items")
+        assert (await cursor.fetchone())[0] == 2
+        try:
+            await conn.execute("INSERT INTO items (name) VALUES ('nope')")
+            assert False, "reader accepted a write"
+        except Exception:
+            pass
+
+    # Awaited form is released by close()
+    conn = await pool.writer()
+    await conn.execute("SELECT 1")
+    await conn.close()
+    assert not pool.get_stats()['writer_busy']
+
+    # Concurrent readers and writers share the pool
+    async def write(i):
+        async with pool.writer() as c:
+            await c.execute("INSERT INTO items (name) VALUES (?)", (f"item_{i}",))
+            await c.commit()
+
+    async def read():
+        async with pool.reader() as c:
+            cursor = await c.execute("SELECT COUNT(*) FROM items")
+            return (await cursor.fetchone())[0]
+
+    await asyncio.gather(*[write(i) for i in range(10)], *[read() for _ in range(10)])
+    assert await read() == 12
+
+    stats = pool.get_stats()
+    assert stats['connections_opened'] == 3
+    assert stats['readers_idle'] == 2
+    assert stats['rollbacks_on_release'] == 1
+
+    await pool.close()
+    return stats
+
+
+def test_connection_pool():
+    """Test pooled writer/reader connections"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = asyncio.run(_run_pool_checks(os.path.join(tmp, "pool_test.db")))
+        print(f"✅ Connection pool OK: {stats['writer_acquires']} writer / {stats['reader_acquires']} reader leases")
+
+
+def test_pool_survives_new_event_loop():
+    """Pool reopens itself when used from a fresh asyncio.run()"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "loop_test.db"), readers=1)
+
+        async def touch():
+            async with pool.reader() as conn:
+                cursor = await conn.execute("SELECT 1")
+                return (await cursor.fetchone())[0]
+
+        assert asyncio.run(touch()) == 1
+        assert asyncio.run(touch()) == 1
+        assert pool.get_stats()['reopened_for_new_loop'] == 1
+        asyncio.run(pool.close())
+
+
+def test_pool_closes_after_worker_thread_died():
+    """A connection whose query outlived its event loop does not hang close()"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "dead_worker.db"), readers=1)
+
+        async def slow_query(conn):
+            await conn.execute(
+                "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 2000000) "
+                "SELECT COUNT(*) FROM n"
+            )
+
+        async def abandon_query():
+            conn = await pool.reader()
+            asyncio.get_running_loop().create_task(slow_query(conn))
+            await asyncio.sleep(0.05)
+
+        # The loop closes mid-query; handing back the result kills the reader's thread
+        asyncio.run(abandon_query())
+        time.sleep(1.5)
+        started = time.perf_counter()
+        asyncio.run(asyncio.wait_for(pool.close(), timeout=5))
+        assert not pool.is_open
+        print(f"✅ Pool closed in {(time.perf_counter() - started) * 1000:.0f}ms after a worker thread died")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing SQLite Connection Pool")
+    print("=" * 50)
+    test_connection_pool()
+    test_pool_survives_new_event_loop()
+    test_pool_closes_after_worker_thread_died()
+    print("✅ All connection pool tests passed")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test Log Retention
+Validates that expired log rows are rolled up, archived and deleted while
+recent and protected rows stay, that rows reach the archive only once their
+delete commits, and that a run reports reclaimed space
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_pool import close_all_pools
+from log_retention import LogRetentionManager, _archive_rows, format_retention_report, read_archive
+from schema_migrations import migrate
+
+
+def _ts(days_ago: int) -> str:
+    return (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+async def _run_retention(db_path: str, archive_dir: str):
+    manager = LogRetentionManager(db_path, archive_dir=archive_dir, batch_size=100)
+    data = manager.data
+
+    old_rows = [('CAM-1', f'@ch{i % 3}', 'success', _ts(40 + i % 2)) for i in range(250)]
+    new_rows = [('CAM-2', '@ch0', 'success', _ts(1)) for _ in range(20)]
+    await data.executemany(
+        "INSERT INTO channel_publishing_logs (campaign_id, channel_id, status, created_at) VALUES (?, ?, ?, ?)",
+        old_rows + new_rows
+    )
+    # Unreviewed high-risk fraud logs are kept regardless of age
+    await data.executemany(
+        "INSERT INTO fraud_logs (timestamp, type, risk_level, admin_reviewed, created_at) VALUES (?, ?, ?, ?, ?)",
+        [(_ts(200), 'memo', 'high', 0, _ts(200)), (_ts(200), 'memo', 'low', 0, _ts(200))]
+    )
+
+    report = await manager.run_once()
+    remaining = await data.fetchval("SELECT COUNT(*) FROM channel_publishing_logs")
+    rolled_up = await data.fetchval(
+        "SELECT SUM(row_count) FROM log_daily_rollups WHERE table_name = 'channel_publishing_logs'"
+    )
+    dimensions = await data.fetchval(
+        "SELECT COUNT(DISTINCT dimension) FROM log_daily_rollups WHERE table_name = 'channel_publishing_logs'"
+    )
+    fraud_left = await data.fetchall("SELECT risk_level FROM fraud_logs")
+
+    # A second run finds nothing to do
+    second = await manager.run_once()
+    await close_all_pools()
+    return report, remaining, rolled_up, dimensions, fraud_left, second
+
+
+def test_retention_rolls_up_archives_and_deletes():
+    """Old rows become daily rollups plus archive lines; recent rows stay"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "retention_test.db")
+        archive_dir = os.path.join(tmp, "archive")
+        migrate(db_path)
+        report, remaining, rolled_up, dimensions, fraud_left, second = asyncio.run(
+            _run_retention(db_path, archive_dir)
+        )
+
+        result = report['tables']['channel_publishing_logs']
+        assert result['deleted'] == rolled_up == 250
+        assert remaining == 20
+        assert dimensions == 3
+        archived = read_archive(result['archive'])
+        assert len(archived) == 250 and archived[0]['campaign_id'] == 'CAM-1'
+
+        assert [row['risk_level'] for row in fraud_left] == ['high']
+        assert report['rows_deleted'] == 251
+        assert second['rows_deleted'] == 0
+        assert 'channel_publishing_logs: 250 rows' in format_retention_report(report)
+
+    print(f"✅ Retention OK: {report['rows_deleted']} rows purged, vacuum {report['vacuum']}")
+
+
+async def _run_failed_delete(db_path: str, archive_dir: str):
+    manager = LogRetentionManager(db_path, archive_dir=archive_dir, batch_size=100)
+    data = manager.data
+    await data.executemany(
+        "INSERT INTO channel_publishing_logs (campaign_id, channel_id, status, created_at) VALUES (?, ?, ?, ?)",
+        [('CAM-F', '@ch0', 'success', _ts(40)) for _ in range(30)]
+    )
+    purge = manager._rollup_and_delete
+
+    async def failing_purge(*args):
+        raise RuntimeError('database is locked')
+
+    manager._rollup_and_delete = failing_purge
+    failed = await manager.run_once()
+    files_after_failure = sorted(os.listdir(os.path.join(archive_dir, 'channel_publishing_logs')))
+
+    # A pending file left for rows that are still in the table is dropped, not committed
+    policy = manager.policies[0]
+    rows = await data.fetchall("SELECT rowid AS _rowid, * FROM channel_publishing_logs")
+    stale = _archive_rows(archive_dir, policy.table, rows)
+    manager._rollup_and_delete = purge
+    report = await manager.run_once()
+    await close_all_pools()
+    return failed, files_after_failure, stale, report
+
+
+def test_failed_delete_archives_nothing():
+    """Rows are archived once, and only after their delete commits"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "retention_test.db")
+        archive_dir = os.path.join(tmp, "archive")
+        migrate(db_path)
+        failed, files_after_failure, stale, report = asyncio.run(_run_failed_delete(db_path, archive_dir))
+
+        assert 'error' in failed['tables']['channel_publishing_logs']
+        assert files_after_failure == []
+        result = report['tables']['channel_publishing_logs']
+        assert result['deleted'] == 30
+        assert not os.path.exists(stale)
+        assert len(read_archive(result['archive'])) == 30
+    print("✅ Failed retention delete leaves no archived rows behind")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Log Retention")
+    print("=" * 50)
+    test_retention_rolls_up_archives_and_deletes()
+    test_failed_delete_archives_nothing()
+    print("✅ All log retention tests passed")
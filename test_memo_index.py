@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test Memo Index
+Validates that open payment memos are loaded from payment_memo_tracking and
+payments, follow track_user_payment and mark_payment_confirmed, and that the
+scanner matches any amount or product with exact amount validation and no
+database reads, and that failed confirmations are retried only until the
+memo settles or the attempts run out
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from async_data_access import get_data_access
+from automatic_payment_confirmation import AutomaticPaymentConfirmation
+from connection_pool import close_all_pools
+from memo_index import MemoIndex, get_memo_index
+from payment_ledger import PaymentLedger
+from query_profiler import configure_query_profiler, get_query_profiler
+from schema_migrations import migrate
+
+
+async def _seed(db_path: str):
+    await AutomaticPaymentConfirmation(db_path).init_tables()
+    data = get_data_access(db_path)
+    await data.executemany(
+        "INSERT INTO payment_memo_tracking (user_id, memo, amount, ad_data, status, created_at) "
+        "VALUES (?, ?, ?, ?, ?, datetime('now', ?))", [
+            (1, 'IDXCAM', 0.36, json.dumps({'posts_per_day': 2}), 'pending', '-1 hours'),
+            (2, 'IDXPKG', 1.5, json.dumps({'type': 'post_package', 'posts_total': 10}), 'pending', '-2 hours'),
+            (3, 'IDXDONE', 0.36, None, 'confirmed', '-1 hours'),
+            (4, 'IDXOLD', 0.36, None, 'pending', '-3 days'),
+        ])
+    await data.execute("INSERT INTO payments (user_id, amount, currency, payment_method, memo) "
+                       "VALUES (5, 2.0, 'TON', 'ton', 'IDXSUB')")
+
+
+async def _load_and_track(db_path: str):
+    await _seed(db_path)
+    index = MemoIndex(db_path)
+    await index.load()
+    loaded = {memo: (index.get(memo).user_id, index.get(memo).product) for memo in list(index._open)}
+    matches = {
+        'exact': index.match('IDXPKG', 1.504).status,
+        'under': index.match('IDXSUB', 1.9).status,
+        'over': index.match('IDXCAM', 0.5).status,
+        'unknown': index.match('NOSUCH', 0.36).status,
+        'closed': index.match('IDXDONE', 0.36).status,
+    }
+
+    confirmation = AutomaticPaymentConfirmation(db_path)
+    await confirmation.track_user_payment(6, 'IDXNEW', 3.25, {'ad_content': 'Hello', 'duration_days': 3})
+    shared = get_memo_index(db_path)
+    tracked = shared.get('IDXNEW')
+    await confirmation.mark_payment_confirmed('IDXNEW')
+    closed = shared.get('IDXNEW')
+    await close_all_pools()
+    return loaded, matches, tracked, closed
+
+
+def test_index_loads_and_follows_tracking():
+    """Pending, recent memos load from both tables; tracking opens and confirming closes a memo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "memo_index.db")
+        migrate(db_path)
+        loaded, matches, tracked, closed = asyncio.run(_load_and_track(db_path))
+
+    assert loaded == {'IDXCAM': (1, 'campaign'), 'IDXPKG': (2, 'post_package'), 'IDXSUB': (5, 'subscription')}
+    assert matches == {'exact': 'exact', 'under': 'underpayment', 'over': 'overpayment',
+                       'unknown': 'unknown', 'closed': 'unknown'}
+    assert tracked.user_id == 6 and tracked.amount == 3.25 and tracked.ad_data['ad_content'] == 'Hello'
+    assert closed is None
+    print("✅ Memo index loaded 3 open memos and followed tracking and confirmation")
+
+
+def _tx(memo, amount, lt):
+    return {'transaction_id': {'lt': str(lt), 'hash': f"h{lt}"}, 'utime': lt,
+            'in_msg': {'source': 'UQ-payer', 'value': str(int(round(amount * 1e9))), 'message': memo}}
+
+
+async def _scan(db_path: str):
+    from continuous_payment_scanner import ContinuousPaymentScanner
+
+    await _seed(db_path)
+    index = MemoIndex(db_path)
+    await index.load()
+
+    class RecordingScanner(ContinuousPaymentScanner):
+        async def confirm_missed_payment(self, memo, amount, sender, timestamp, open_memo=None):
+            self.confirmed.append((memo, amount, open_memo.product if open_memo else None))
+            if open_memo:
+                self.memo_index.discard(memo)
+            return True
+
+    scanner = RecordingScanner()
+    scanner.memo_index = index
+    scanner.ledger = PaymentLedger(db_path)
+    scanner.pending_payments_file = os.path.join(os.path.dirname(db_path), "pending_payments.json")
+    await scanner.ledger.load()
+    scanner.confirmed = []
+    transactions = [
+        _tx('IDXCAM', 0.36, 1), _tx('IDXPKG', 1.5, 2), _tx('IDXSUB', 1.0, 3),
+        _tx('IDXDONE', 0.36, 4), _tx('ZZ9999', 0.2, 5), _tx('not-a-bot-memo', 0.36, 6),
+    ]
+    profiler = configure_query_profiler(True)
+    profiler.reset()
+    await scanner.scan_for_payments(transactions[:3])
+    # Confirmed payments are written to the ledger; nothing is read
+    reads_for_open_memos = sum(entry['count'] for entry in profiler.get_top(100)
+                               if entry['fingerprint'].lstrip().upper().startswith('SELECT'))
+    await scanner.scan_for_payments(transactions)
+    await close_all_pools()
+    return scanner.confirmed, reads_for_open_memos, index.get_stats()
+
+
+def test_scanner_matches_any_product_exactly():
+    """Campaigns and packages at their own prices confirm; an underpayment, closed and foreign memos do not"""
+    profiling = get_query_profiler().enabled
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "memo_scan.db")
+            migrate(db_path)
+            confirmed, reads, stats = asyncio.run(_scan(db_path))
+    finally:
+        configure_query_profiler(profiling)
+
+    # IDXDONE was paid before and ZZ9999 was never issued: only the unknown bot-style memo is escalated
+    assert confirmed == [('IDXCAM', 0.36, 'campaign'), ('IDXPKG', 1.5, 'post_package'), ('ZZ9999', 0.2, None)]
+    assert reads == 0
+    assert stats['underpayment'] == 2 and stats['open'] == 1
+    print(f"✅ Scanner matched {len(confirmed) - 1} open memos with {reads} database reads")
+
+
+async def _retries(db_path: str):
+    from continuous_payment_scanner import MAX_CONFIRM_ATTEMPTS, ContinuousPaymentScanner
+
+    await _seed(db_path)
+    index = MemoIndex(db_path)
+    await index.load()
+
+    class FailingScanner(ContinuousPaymentScanner):
+        async def confirm_missed_payment(self, memo, amount, sender, timestamp, open_memo=None):
+            self.attempts.append(memo)
+            return False
+
+    scanner = FailingScanner()
+    scanner.memo_index = index
+    scanner.ledger = PaymentLedger(db_path)
+    scanner.pending_payments_file = os.path.join(os.path.dirname(db_path), "pending_payments.json")
+    await scanner.ledger.load()
+    scanner.attempts = []
+    await scanner.scan_for_payments([_tx('IDXCAM', 0.36, 1), _tx('IDXPKG', 1.5, 2)])
+    retrying = sorted(scanner.unconfirmed)
+    # Another payment path settles IDXCAM; IDXPKG keeps failing
+    await scanner.ledger.record('h-other', 'IDXCAM', 1, 0.36, source='ton')
+    for _ in range(MAX_CONFIRM_ATTEMPTS):
+        await scanner.scan_for_payments([])
+    await close_all_pools()
+    return retrying, scanner.attempts, scanner.unconfirmed, scanner.confirm_attempts, MAX_CONFIRM_ATTEMPTS
+
+
+def test_scanner_stops_retrying_settled_or_hopeless_memos():
+    """A memo settled elsewhere leaves the retry set, and a failing one is given up after the cap"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "memo_retry.db")
+        migrate(db_path)
+        retrying, attempts, unconfirmed, counts, cap = asyncio.run(_retries(db_path))
+
+    assert retrying == ['IDXCAM', 'IDXPKG']
+    assert attempts.count('IDXCAM') == 1
+    assert attempts.count('IDXPKG') == cap
+    assert unconfirmed == {} and counts == {}
+    print(f"✅ Scanner dropped a settled memo and gave up on a failing one after {cap} attempts")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Memo Index")
+    print("=" * 50)
+    test_index_loads_and_follows_tracking()
+    test_scanner_matches_any_product_exactly()
+    test_scanner_stops_retrying_settled_or_hopeless_memos()
+    print("✅ All memo index tests passed")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test Notification Digest
+Validates that publishing events are coalesced into one digest per user per
+window, while failures and completions go out immediately
+"""
+
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from notification_digest import NotificationDigest
+from publishing_engine import ChatRateLimiter
+
+
+class FakeBot:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text):
+        self.messages.append((chat_id, text, asyncio.get_running_loop().time()))
+
+
+async def _language(user_id):
+    return 'en'
+
+
+async def _digest_run():
+    bot = FakeBot()
+    digest = NotificationDigest(bot, _language, window=0.3, limiter=ChatRateLimiter(global_rate=1000))
+    await digest.start()
+    started = asyncio.get_running_loop().time()
+
+    for n in range(12):
+        digest.published(101, 'CAM-D', f'@channel{n % 6}')
+    digest.published(202, 'CAM-E', '@solo')
+    await digest.post_failed(101, 'CAM-D', '@gone')
+    failed_at = len(bot.messages)
+
+    await asyncio.sleep(1.5)
+    digest.published(101, 'CAM-D', '@channel0')
+    await digest.campaign_completed(101, 'CAM-D', published=13, failed=1)
+    await digest.stop()
+    return bot.messages, started, failed_at, digest.get_stats()
+
+
+def test_events_coalesce_into_digests():
+    """12 posts become one digest; failures and completion are not held back"""
+    messages, started, failed_at, stats = asyncio.run(_digest_run())
+    user_101 = [text for chat, text, _ in messages if chat == 101]
+
+    assert failed_at == 1 and 'could not be published in @gone' in user_101[0]
+    assert '12 posts published across 6 channels' in user_101[1]
+    assert 'CAM-D' in user_101[1]
+    assert any(chat == 202 and 'published in @solo' in text for chat, text, _ in messages)
+    # The last post's digest is flushed ahead of the completion notice
+    assert 'published in @channel0' in user_101[2] and 'finished publishing' in user_101[3]
+    assert len(user_101) == 4
+    digest_delay = [at for chat, text, at in messages if chat == 101][1] - started
+    # Due after the 0.3s window, sent on the next (1s) check
+    assert 0.3 <= digest_delay < 1.4, digest_delay
+    assert stats['events'] == 14 and stats['digests'] == 3 and stats['immediate'] == 2
+    print(f"✅ 14 publishing events sent as {stats['digests']} digests ({len(messages)} messages in all)")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Notification Digest")
+    print("=" * 50)
+    test_events_coalesce_into_digests()
+    print("✅ All notification digest tests passed")
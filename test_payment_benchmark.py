@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test Payment Benchmark
+Validates the fake TON API's toncenter and tonapi pages against the real
+monitor's paging and memo extraction, and runs a small replay benchmark end
+to end with API errors and double payments
+"""
+
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_ton_payment_monitoring import EnhancedTONPaymentMonitor
+from fake_ton_api import FakeTONAPI
+from payment_benchmark import format_report, run_benchmark
+from ton_http import CircuitBreaker, Provider, TONHttpClient, configure_ton_http_client, get_ton_http_client
+
+
+def _parsed(monitor, page):
+    return [(monitor.extract_memo_from_transaction(tx), monitor.extract_amount_from_transaction(tx),
+             monitor.extract_sender_from_transaction(tx)) for tx in page]
+
+
+async def _pages(api: FakeTONAPI):
+    monitor = EnhancedTONPaymentMonitor()
+    wallet = api.wallet
+    newest = await monitor.get_transactions_toncenter(wallet, 2)
+    cursor = newest['result'][-1]['transaction_id']
+    older = await monitor.get_transactions_toncenter(wallet, 2, lt=int(cursor['lt']), tx_hash=cursor['hash'])
+    tonapi = await monitor.get_transactions_tonapi(wallet, 10, after_lt=int(cursor['lt']) - 1)
+    # Once the earlier requests leave the one-second window, one request per second is allowed
+    await asyncio.sleep(1.05)
+    api.profiles['toncenter'].rate_limit_per_second = 1
+    limited = [await monitor.get_transactions_toncenter(wallet, 1) for _ in range(2)]
+    await get_ton_http_client().close()
+    return monitor, newest['result'], older['result'], tonapi['transactions'], limited
+
+
+def test_fake_api_serves_both_formats():
+    """toncenter pages back inclusively from (lt, hash), tonapi exclusively; both extract the same payments"""
+    api = FakeTONAPI(latency_ms=1, jitter_ms=1, seed=3)
+    for n, amount in enumerate([0.36, 0.72, 1.08, 2.16]):
+        api.add_payment(f"FK{n:04d}", amount, source=f"UQ-sender-{n}")
+    api.start_in_thread()
+    previous = get_ton_http_client()
+    configure_ton_http_client(TONHttpClient({
+        name: Provider(name, f"{api.base_url}/{name}", 2, breaker=CircuitBreaker(10, 1))
+        for name in ('toncenter', 'tonapi')
+    }, timeout=5))
+    try:
+        monitor, newest, older, tonapi, limited = asyncio.run(_pages(api))
+    finally:
+        configure_ton_http_client(previous)
+        api.stop_thread()
+
+    assert _parsed(monitor, newest) == [('FK0003', 2.16, 'UQ-sender-3'), ('FK0002', 1.08, 'UQ-sender-2')]
+    assert [memo for memo, _, _ in _parsed(monitor, older)] == ['FK0002', 'FK0001']
+    assert _parsed(monitor, tonapi) == _parsed(monitor, newest)
+    assert limited[0] is not None and limited[1] is None
+    assert api.get_stats()['toncenter']['rate_limited'] == 1
+
+    # A recorded toncenter page replays through the other provider's format
+    replay = FakeTONAPI(seed=3)
+    assert replay.load_transactions({'ok': True, 'result': newest + older}) == 3
+    assert [replay._tonapi_tx(tx)['in_msg']['decoded_body']['text'] for tx in replay._page(None, None, 10)] == \
+        ['FK0003', 'FK0002', 'FK0001']
+    print("✅ Fake TON API pages match in toncenter and tonapi formats")
+
+
+def test_small_benchmark_confirms_every_checkout():
+    """Every checkout confirms into exactly one campaign despite API errors and double payments"""
+    cwd = os.getcwd()
+    report = run_benchmark(checkouts=12, spread_seconds=1.0, poll_interval=0.4, latency_ms=5, jitter_ms=5,
+                           error_rate=0.2, duplicate_rate=0.5, timeout=60, seed=5)
+
+    assert os.getcwd() == cwd
+    assert not report['timed_out']
+    assert report['confirmed'] == report['campaigns'] == report['activations'] == 12
+    assert report['escalated'] == 0
+    assert 0 < report['ttc_p50_ms'] <= report['ttc_p95_ms'] <= report['ttc_p99_ms'] <= report['ttc_max_ms']
+    # One shared poller: API calls follow the poll interval, not the number of checkouts
+    assert 0 < report['api_calls'] < 2 * report['checkouts']
+    assert report['db_writes_by_table']['payment_ledger'] == 12
+    assert report['db_writes_by_table']['campaigns'] == 12
+    assert report['db_writes_per_confirmation'] > 0
+    assert 'calls/confirmation' in format_report(report)
+    print(format_report(report))
+    print("✅ Benchmark confirmed all checkouts through the fake TON API")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Payment Benchmark")
+    print("=" * 50)
+    test_fake_api_serves_both_formats()
+    test_small_benchmark_confirms_every_checkout()
+    print("✅ All payment benchmark tests passed")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test Payment Ledger
+Validates that a payment memo activates at most one campaign even when
+confirmed twice at once, that new memos are answered by the bloom filter
+without a database read, and that pending_payments.json is imported once
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_pool import close_all_pools
+from payment_ledger import IMPORTED_TX, BloomFilter, PaymentLedger
+from query_profiler import configure_query_profiler, get_query_profiler
+from schema_migrations import migrate
+
+AD_DATA = {'ad_content': 'Ledger test', 'selected_channels': ['@one'], 'duration_days': 1, 'posts_per_day': 1}
+
+
+async def _concurrent_activation(db_path: str):
+    from campaign_management import CampaignManager
+
+    manager = CampaignManager(db_path)
+    first = await asyncio.gather(*(manager.create_campaign(7, 'LEDG01', 1.0, AD_DATA, tx_hash='tx-1')
+                                   for _ in range(2)))
+    # A retry after the first commit is stopped by the in-memory front
+    retry = await manager.create_campaign(7, 'LEDG01', 1.0, AD_DATA, tx_hash='tx-1')
+    campaigns = await manager.data.fetchval("SELECT COUNT(*) FROM campaigns WHERE payment_memo = 'LEDG01'")
+    rows = await manager.data.fetchall("SELECT tx_hash, memo, user_id, campaign_id FROM payment_ledger")
+    await close_all_pools()
+    return first, retry, campaigns, rows
+
+
+def test_payment_activates_one_campaign():
+    """Two simultaneous confirmations and a retry of one memo leave one campaign and one ledger row"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "ledger_activation.db")
+        migrate(db_path)
+        first, retry, campaigns, rows = asyncio.run(_concurrent_activation(db_path))
+
+    created = [campaign_id for campaign_id in first if campaign_id]
+    assert len(created) == 1 and retry is None
+    assert campaigns == 1
+    assert rows == [{'tx_hash': 'tx-1', 'memo': 'LEDG01', 'user_id': 7, 'campaign_id': created[0]}]
+    print(f"✅ Memo LEDG01 activated only {created[0]}")
+
+
+async def _front(db_path: str):
+    await PaymentLedger(db_path).record('tx-old', 'OLD001', 1, 0.5, source='scanner')
+    ledger = PaymentLedger(db_path, capacity=1000, cache_size=10)
+    await ledger.load()
+
+    profiler = configure_query_profiler(True)
+    profiler.reset()
+    new = [await ledger.seen(f"NEW{n:03d}") for n in range(200)]
+    new_reads = profiler.get_stats()['queries']
+    # Loaded from disk, so the first check reads once and the LRU answers after that
+    old = [await ledger.seen('OLD001') for _ in range(3)]
+    old_reads = profiler.get_stats()['queries'] - new_reads
+    duplicate = await ledger.record('tx-other', 'OLD001', 2, 0.5)
+    await close_all_pools()
+    return new, new_reads, old, old_reads, duplicate, ledger.get_stats()
+
+
+def test_new_memos_skip_the_database():
+    """Unseen memos are rejected by the bloom filter; a recorded memo is read once, then cached"""
+    profiling = get_query_profiler().enabled
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "ledger_front.db")
+            migrate(db_path)
+            new, new_reads, old, old_reads, duplicate, stats = asyncio.run(_front(db_path))
+    finally:
+        configure_query_profiler(profiling)
+
+    assert not any(new) and all(old) and duplicate is False
+    # At 1% error a couple of false positives may reach the database
+    assert new_reads == stats['false_positives'] <= 10
+    assert old_reads == 1 and stats['cache_hits'] == 2
+    bloom = BloomFilter(1000)
+    bloom.add('OLD001')
+    assert 'OLD001' in bloom
+    print(f"✅ 200 new memos cost {new_reads} database reads")
+
+
+async def _import(db_path: str, path: str):
+    ledger = PaymentLedger(db_path)
+    imported = await ledger.import_json(path)
+    again = await ledger.import_json(path)
+    seen = await ledger.seen('JSON02')
+    rows = await ledger.data.fetchall("SELECT tx_hash, memo, source FROM payment_ledger ORDER BY memo")
+    await close_all_pools()
+    return imported, again, seen, rows
+
+
+def test_pending_payments_json_is_imported_once():
+    """The old confirmed_payments list becomes ledger rows and the file is set aside"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "ledger_import.db")
+        migrate(db_path)
+        path = os.path.join(tmp, "pending_payments.json")
+        with open(path, 'w') as f:
+            json.dump({'confirmed_payments': ['JSON01', 'JSON02', 'JSON02'], 'last_updated': 0}, f)
+        imported, again, seen, rows = asyncio.run(_import(db_path, path))
+        renamed = os.path.exists(path + '.imported') and not os.path.exists(path)
+
+    assert imported == 2 and again == 0 and seen and renamed
+    assert rows == [{'tx_hash': IMPORTED_TX, 'memo': memo, 'source': 'import'} for memo in ('JSON01', 'JSON02')]
+    print("✅ Imported 2 confirmed payments from pending_payments.json")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Payment Ledger")
+    print("=" * 50)
+    test_payment_activates_one_campaign()
+    test_new_memos_skip_the_database()
+    test_pending_payments_json_is_imported_once()
+    print("✅ All payment ledger tests passed")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test Publish Batch
+Validates that per-post bookkeeping is written in one transaction per batch
+and that campaign completion is read from the per-campaign counters
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from campaign_schedule import format_timestamp
+from connection_pool import close_all_pools
+from publish_leases import claim_posts
+from publishing_engine import ChatRateLimiter, PublishingEngine
+from schema_migrations import DUE_POSTS_QUERY, migrate
+
+
+async def _claim_due(data, owner: str):
+    """Claim every due post the way the publisher does: read the sweep's ids, then claim them"""
+    rows = await data.fetchall(DUE_POSTS_QUERY, (format_timestamp(datetime.now()),))
+    return await claim_posts(data, [row['id'] for row in rows], owner)
+
+
+class FakeBot:
+    """Answers sends with increasing message ids"""
+
+    def __init__(self):
+        self.sent = []
+        self.chat_lookups = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(chat_id)
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def get_chat(self, chat_id):
+        self.chat_lookups += 1
+        return SimpleNamespace(title=f"Channel {chat_id}", username=None)
+
+
+async def _publish_batch(db_path: str):
+    from enhanced_campaign_publisher import EnhancedCampaignPublisher
+
+    class BatchPublisher(EnhancedCampaignPublisher):
+        identity_lookups = 0
+
+        async def _ensure_campaign_post_identity(self, post_data):
+            BatchPublisher.identity_lookups += 1
+            identity = f"ID-{post_data['campaign_id']}"
+            await self.data.execute(
+                "INSERT OR IGNORE INTO post_identity (post_id, campaign_id, user_id, advertiser_username, "
+                "content_text, verification_hash) VALUES (?, ?, ?, 'advertiser', ?, 'stale')",
+                (identity, post_data['campaign_id'], post_data['user_id'], post_data['ad_content']))
+            await self.data.execute("INSERT OR IGNORE INTO content_verification (post_id, original_content_hash) "
+                                    "VALUES (?, 'stale')", (identity,))
+            return identity
+
+    bot = FakeBot()
+    publisher = BatchPublisher(bot_instance=bot, db_path=db_path)
+    publisher.engine = PublishingEngine(limiter=ChatRateLimiter(global_rate=1000, chat_burst=10))
+    publisher.notifier.limiter = publisher.engine.limiter
+    data = publisher.data
+    await data.executemany(
+        "INSERT INTO campaigns (campaign_id, user_id, ad_content, status) VALUES (?, 1, 'hello', 'active')",
+        [('CAM-A',), ('CAM-B',)]
+    )
+    await data.executemany(
+        "INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status) "
+        "VALUES (?, ?, '2025-01-01 00:00:00', 'scheduled')",
+        [('CAM-A', '@one'), ('CAM-A', '@two'), ('CAM-A', '@one'), ('CAM-B', '@two'), ('CAM-B', '@later')]
+    )
+    # CAM-B keeps one post for later, so only CAM-A completes
+    await data.execute("UPDATE campaign_posts SET scheduled_time = '2999-01-01 00:00:00' WHERE channel_id = '@later'")
+
+    published = 0
+    while True:
+        claimed = await _claim_due(data, publisher.worker_id)
+        if not claimed:
+            break
+        published += await publisher._publish_claimed(claimed)
+
+    result = {
+        'published': published,
+        'sent': len([chat for chat in bot.sent if str(chat).startswith('@')]),
+        'user_messages': [chat for chat in bot.sent if chat == 1],
+        'chat_lookups': bot.chat_lookups,
+        'identity_lookups': BatchPublisher.identity_lookups,
+        'stats': publisher.batch.get_stats(),
+        'statuses': await data.fetchall("SELECT status, lease_owner FROM campaign_posts WHERE channel_id != '@later'"),
+        'publication_logs': await data.fetchval("SELECT COUNT(*) FROM post_publishing_log"),
+        'mismatches': await data.fetchval(
+            "SELECT COUNT(*) FROM content_verification WHERE match_status = 'mismatch'"),
+        'channel_logs': await data.fetchval(
+            "SELECT COUNT(*) FROM channel_publishing_logs WHERE status = 'success'"),
+        'counts': {row['campaign_id']: (row['total'], row['pending'], row['published'])
+                   for row in await data.fetchall("SELECT * FROM campaign_post_counts")},
+        'campaigns': {row['campaign_id']: row['status']
+                      for row in await data.fetchall("SELECT campaign_id, status FROM campaigns")},
+        'notifications': publisher.notifier.get_stats(),
+    }
+    await close_all_pools()
+    return result
+
+
+def test_batch_bookkeeping_and_completion():
+    """One flush writes every post's bookkeeping; counters drive completion"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "publish_batch.db")
+        migrate(db_path)
+        result = asyncio.run(_publish_batch(db_path))
+
+    assert result['published'] == result['sent'] == 4
+    assert result['stats']['flushes'] == 1 and result['stats']['published'] == 4
+    assert result['stats']['pending'] == 0
+    assert result['identity_lookups'] == 2
+    assert result['chat_lookups'] == 2
+    assert all((row['status'], row['lease_owner']) == ('published', None) for row in result['statuses'])
+    assert result['publication_logs'] == 4 and result['channel_logs'] == 4
+    assert result['mismatches'] == 2
+    assert result['counts'] == {'CAM-A': (3, 0, 3), 'CAM-B': (2, 1, 1)}
+    assert result['campaigns'] == {'CAM-A': 'completed', 'CAM-B': 'active'}
+    # CAM-A's completion flushed the advertiser's digest and sent the completion notice
+    assert result['user_messages'] == [1, 1]
+    assert result['notifications']['events'] == 4 and result['notifications']['digests'] == 1
+    assert result['notifications']['immediate'] == 1
+    print(f"✅ 4 posts bookkept in {result['stats']['flushes']} transaction, CAM-A completed from counters")
+
+
+def test_counters_follow_status_changes():
+    """Triggers keep campaign_post_counts equal to a recount"""
+    import sqlite3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "post_counts.db")
+        migrate(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO campaign_posts (campaign_id, channel_id, status) VALUES (?, ?, 'scheduled')",
+                         [('CAM-X', f'@c{i}') for i in range(6)])
+        conn.execute("UPDATE campaign_posts SET status = 'claimed' WHERE id <= 4")
+        conn.execute("UPDATE campaign_posts SET status = 'published' WHERE id <= 2")
+        conn.execute("UPDATE campaign_posts SET status = 'failed' WHERE id = 3")
+        conn.execute("UPDATE campaign_posts SET campaign_id = 'CAM-Y' WHERE id = 5")
+        conn.execute("DELETE FROM campaign_posts WHERE id = 6")
+        counted = conn.execute("SELECT campaign_id, total, pending, published, failed FROM campaign_post_counts "
+                               "WHERE total > 0 ORDER BY campaign_id").fetchall()
+        recount = conn.execute("""
+            SELECT campaign_id, COUNT(*), SUM(status IN ('scheduled', 'claimed')),
+                   SUM(status = 'published'), SUM(status = 'failed')
+            FROM campaign_posts GROUP BY campaign_id ORDER BY campaign_id
+        """).fetchall()
+        conn.close()
+
+    assert counted == recount == [('CAM-X', 4, 1, 2, 1), ('CAM-Y', 1, 1, 0, 0)]
+    print("✅ Per-campaign counters match a recount")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Batch")
+    print("=" * 50)
+    test_counters_follow_status_changes()
+    test_batch_bookkeeping_and_completion()
+    print("✅ All publish batch tests passed")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test Publish Benchmark
+Runs a small benchmark end to end: the real publisher against the fake Bot
+API, with random 429s that have to be retried
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from publish_benchmark import format_report, run_benchmark
+
+
+def test_small_benchmark_publishes_everything():
+    """Every seeded post is published despite flood errors, and the report is filled in"""
+    cwd = os.getcwd()
+    report = run_benchmark(campaigns=2, channels=3, posts=2, latency_ms=2, jitter_ms=2,
+                           flood_rate=0.25, chat_rate_per_minute=6000, timeout=60, seed=7)
+
+    assert os.getcwd() == cwd
+    assert not report['timed_out']
+    assert report['posts'] == report['published'] == 12
+    # Every flooded channel post was retried; advertiser notifications can be flooded too
+    assert 1 <= report['publisher']['engine']['failed'] <= report['api']['flooded']
+    assert 0 <= report['lag_p50_ms'] <= report['lag_p95_ms'] <= report['lag_max_ms']
+    # Flooded posts wait out retry_after, so the slowest post is at least a second late
+    assert report['lag_max_ms'] >= 1000
+    assert report['db_queries'] > 0 and report['db_ms_per_post'] > 0
+    assert report['posts_per_s'] > 0 and report['loop_blocked_ms'] >= 0
+    assert 'posts/s' in format_report(report)
+    print(format_report(report))
+    print("✅ Benchmark published all posts through the fake Bot API")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Benchmark")
+    print("=" * 50)
+    test_small_benchmark_publishes_everything()
+    print("✅ All publish benchmark tests passed")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test Publish Leases
+Validates that publisher workers sharing a database claim disjoint posts,
+that expired leases go back on the schedule, that release hands back claims,
+and that a worker whose lease was taken over cannot finish the post
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from async_data_access import get_data_access
+from campaign_schedule import format_timestamp
+from connection_pool import close_all_pools
+from publish_batch import PublishBatch
+from publish_leases import claim_posts, recover_expired_leases, release_claims, renew_leases
+from publish_retry import PERMANENT, TRANSIENT, PublishFailure, dead_letter, schedule_retry
+from schema_migrations import DUE_POSTS_QUERY, migrate
+
+
+async def _claim_due(data, owner: str):
+    """Claim every due post the way the publisher does: read the sweep's ids, then claim them"""
+    rows = await data.fetchall(DUE_POSTS_QUERY, (format_timestamp(datetime.now()),))
+    return await claim_posts(data, [row['id'] for row in rows], owner)
+
+
+async def _seed(data, count: int):
+    await data.executemany(
+        "INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status) "
+        "VALUES ('CAM-L', ?, '2025-01-01 00:00:00', 'scheduled')",
+        [(f'@ch{i}',) for i in range(count)]
+    )
+    return [row['id'] for row in await data.fetchall("SELECT id FROM campaign_posts ORDER BY id")]
+
+
+async def _competing_claims(db_path: str):
+    data = get_data_access(db_path)
+    ids = await _seed(data, 40)
+    # Both workers race for the same ids, then for whatever is still due
+    first, second = await asyncio.gather(
+        claim_posts(data, ids, 'worker-a'), claim_posts(data, ids, 'worker-b'))
+    due_a, due_b = await asyncio.gather(
+        _claim_due(data, 'worker-a'), _claim_due(data, 'worker-b'))
+    owners = await data.fetchall("SELECT lease_owner, COUNT(*) AS n FROM campaign_posts "
+                                 "WHERE status = 'claimed' GROUP BY lease_owner")
+    await close_all_pools()
+    return ids, first, second, due_a, due_b, owners
+
+
+def test_workers_claim_disjoint_posts():
+    """Each post is claimed by exactly one worker"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "leases_test.db")
+        migrate(db_path)
+        ids, first, second, due_a, due_b, owners = asyncio.run(_competing_claims(db_path))
+
+    assert not set(first) & set(second)
+    assert sorted(first + second) == ids
+    assert due_a == [] and due_b == []
+    assert sum(row['n'] for row in owners) == len(ids)
+    print(f"✅ {len(first)} + {len(second)} posts claimed without overlap")
+
+
+async def _expiry_and_release(db_path: str):
+    data = get_data_access(db_path)
+    ids = await _seed(data, 4)
+    crashed = await claim_posts(data, ids[:2], 'crashed', lease_seconds=-1)
+    live = await _claim_due(data, 'live')
+    recovered = await recover_expired_leases(data)
+    reclaimed = await _claim_due(data, 'live')
+    released = await release_claims(data, 'live')
+    rows = await data.fetchall("SELECT status, lease_owner, lease_expires FROM campaign_posts")
+    await close_all_pools()
+    return crashed, live, recovered, reclaimed, released, rows
+
+
+def test_expired_leases_and_release():
+    """A dead worker's posts are recovered; a stopping worker hands its claims back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "leases_test.db")
+        migrate(db_path)
+        crashed, live, recovered, reclaimed, released, rows = asyncio.run(_expiry_and_release(db_path))
+
+    assert len(crashed) == 2 and len(live) == 2
+    assert sorted(recovered) == sorted(crashed)
+    assert sorted(reclaimed) == sorted(crashed)
+    assert released == 4
+    assert all((r['status'], r['lease_owner'], r['lease_expires']) == ('scheduled', None, None) for r in rows)
+    print("✅ Expired leases recovered and claims released on shutdown")
+
+
+async def _lost_lease(db_path: str):
+    data = get_data_access(db_path)
+    ids = await _seed(data, 4)
+    # The slow worker's leases run out and another worker takes the posts over
+    slow = await claim_posts(data, ids, 'slow', lease_seconds=-1)
+    await recover_expired_leases(data)
+    taken = await _claim_due(data, 'fast')
+    renewed = (await renew_leases(data, 'slow'), await renew_leases(data, 'fast', lease_seconds=600))
+
+    batch = PublishBatch(data, 'slow')
+    await batch.published({'id': ids[0], 'campaign_id': 'CAM-L', 'channel_id': '@ch0'},
+                          'ID-L', 'Channel 0', 42, 'hello')
+    await batch.flush()
+    retry = await schedule_retry(data, ids[1], PublishFailure(TRANSIENT, 5, 'timeout'), 'slow')
+    parked = await dead_letter(data, {'id': ids[2], 'campaign_id': 'CAM-L', 'channel_id': '@ch2'},
+                               PublishFailure(PERMANENT, error='bad'), 'slow')
+    # The new owner can still finish its own post
+    owned = await dead_letter(data, {'id': ids[3], 'campaign_id': 'CAM-L', 'channel_id': '@ch3'},
+                              PublishFailure(PERMANENT, error='bad'), 'fast')
+    rows = await data.fetchall("SELECT status, lease_owner FROM campaign_posts ORDER BY id")
+    dead = await data.fetchval("SELECT COUNT(*) FROM publish_dead_letters")
+    await close_all_pools()
+    return slow, taken, renewed, batch.get_stats(), retry, parked, owned, rows, dead
+
+
+def test_lost_lease_cannot_finish_post():
+    """Writes from a worker that lost the lease leave the post to its new owner"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "leases_test.db")
+        migrate(db_path)
+        slow, taken, renewed, stats, retry, parked, owned, rows, dead = asyncio.run(_lost_lease(db_path))
+
+    assert sorted(taken) == sorted(slow)
+    assert renewed == (0, 4)
+    assert stats['lost_leases'] == 1 and stats['published'] == 1
+    assert retry is None and parked is None and owned is not None
+    assert [(r['status'], r['lease_owner']) for r in rows] == [('claimed', 'fast')] * 3 + [('failed', None)]
+    assert dead == 1
+    print("✅ Lost leases leave the post to its new owner")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Leases")
+    print("=" * 50)
+    test_workers_claim_disjoint_posts()
+    test_expired_leases_and_release()
+    test_lost_lease_cannot_finish_post()
+    print("✅ All publish leases tests passed")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test Publish Media
+Validates album building from the stored media list, file_id reuse
+across channels (in memory, across concurrent sends and across workers),
+and splitting long media lists into albums, and releasing an upload claim
+when a send fails before it reaches Telegram
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from async_data_access import get_data_access
+from connection_pool import close_all_pools
+from publish_media import FileIdCache, album_chunks, campaign_media, send_campaign_content
+from schema_migrations import migrate
+
+PHOTOS = ['https://cdn.example/a.jpg', 'https://cdn.example/b.jpg']
+
+
+class FakeBot:
+    """Records what each send carried; uploads of a URL get a fresh file_id"""
+
+    def __init__(self, fail_album: int = 0):
+        self.calls = []
+        # 1-based album send that raises, to simulate a failure partway through
+        self.fail_album = fail_album
+
+    def _message(self, ref, kind):
+        file_id = f"FILE-{ref.rsplit('/', 1)[-1]}" if ref.startswith('http') else ref
+        media = SimpleNamespace(file_id=file_id)
+        return SimpleNamespace(message_id=len(self.calls), photo=[media] if kind == 'photo' else None,
+                               video=media if kind == 'video' else None)
+
+    async def send_media_group(self, chat_id, media):
+        self.calls.append(('album', chat_id, [(item.media, item.caption) for item in media]))
+        if len(self.calls) == self.fail_album:
+            raise RuntimeError('Bad Gateway')
+        await asyncio.sleep(0.01)
+        return [self._message(item.media, item.type) for item in media]
+
+    async def send_photo(self, chat_id, photo, caption=None):
+        self.calls.append(('photo', chat_id, photo, caption))
+        return self._message(photo, 'photo')
+
+    async def send_message(self, chat_id, text):
+        self.calls.append(('text', chat_id, text))
+        return self._message('', 'text')
+
+
+def test_campaign_media_from_metadata():
+    """The stored media list wins over media_url; text campaigns send no media"""
+    metadata = json.dumps({'media': [{'file_id': 'AgAC1', 'type': 'photo'}, 'AgAC2']})
+    album = campaign_media({'content_type': 'photo', 'media_url': 'AgAC1', 'campaign_metadata': metadata})
+    single = campaign_media({'content_type': 'video_only', 'media_url': 'BAAC1', 'campaign_metadata': None})
+    assert album == [{'type': 'photo', 'file_id': 'AgAC1'}, {'type': 'photo', 'file_id': 'AgAC2'}]
+    assert single == [{'type': 'video', 'file_id': 'BAAC1'}]
+    assert campaign_media({'content_type': 'text', 'media_url': 'AgAC1'}) == []
+    print("✅ Campaign media built from metadata and media_url")
+
+
+async def _album_to_channels(db_path: str):
+    data = get_data_access(db_path)
+    bot = FakeBot()
+    cache = FileIdCache(data)
+    media = [{'type': 'photo', 'file_id': ref} for ref in PHOTOS]
+
+    # Three channels at once: one uploads, the others wait and reuse its file_ids
+    first = await asyncio.gather(*(
+        send_campaign_content(bot, chat, 'Buy now', 'photo', media, cache) for chat in ('@one', '@two', '@three')
+    ))
+    # A second worker finds the file_ids in the database
+    other_worker = FileIdCache(data)
+    await send_campaign_content(bot, '@four', 'Buy now', 'photo_only', media[:1], other_worker)
+    stored = await data.fetchval("SELECT COUNT(*) FROM media_file_ids")
+    await close_all_pools()
+    return bot.calls, first, cache.get_stats(), other_worker.get_stats(), stored
+
+
+def test_album_uploads_once_and_reuses_file_ids():
+    """Only the first channel sends the URLs; later sends and other workers use file_ids"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "publish_media.db")
+        migrate(db_path)
+        calls, first, stats, other_stats, stored = asyncio.run(_album_to_channels(db_path))
+
+    albums = [call for call in calls if call[0] == 'album']
+    uploads = [call for call in albums if any(ref.startswith('http') for ref, _ in call[2])]
+    assert len(albums) == 3 and len(uploads) == 1
+    assert all(call[2] == [('FILE-a.jpg', 'Buy now'), ('FILE-b.jpg', None)] for call in albums if call not in uploads)
+    assert all(message is not None for message in first)
+    assert calls[-1] == ('photo', '@four', 'FILE-a.jpg', None)
+    assert (stats['uploads'], stats['reused']) == (2, 4)
+    assert (other_stats['uploads'], other_stats['reused']) == (0, 1)
+    assert stored == 2
+    print(f"✅ Album uploaded once, file_ids reused {stats['reused'] + other_stats['reused']} times")
+
+
+async def _long_albums(db_path: str):
+    data = get_data_access(db_path)
+    media = [{'type': 'photo', 'file_id': f"AgAC{n}"} for n in range(11)]
+    whole, partial = FakeBot(), FakeBot(fail_album=2)
+    sent = await send_campaign_content(whole, '@one', 'Buy now', 'photo', media, FileIdCache(data))
+    kept = await send_campaign_content(partial, '@two', 'Buy now', 'photo', media, FileIdCache(data))
+    await close_all_pools()
+    return whole.calls, sent, partial.calls, kept
+
+
+def test_long_media_lists_split_into_valid_albums():
+    """No album carries a single item, and a failure after the first album still counts as sent"""
+    assert album_chunks(11) == [(0, 5), (5, 11)]
+    assert all(end - start >= 2 for n in range(2, 60) for start, end in album_chunks(n))
+    assert all(end - start <= 10 for n in range(2, 60) for start, end in album_chunks(n))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "publish_media.db")
+        migrate(db_path)
+        calls, sent, partial_calls, kept = asyncio.run(_long_albums(db_path))
+
+    assert [len(call[2]) for call in calls] == [5, 6]
+    assert [caption for _, caption in calls[0][2]] == ['Buy now'] + [None] * 4
+    assert sent is not None and kept is not None
+    assert len(partial_calls) == 2
+    print("✅ Long media lists split into albums of 2-10 items")
+
+
+class FailingLoadCache(FileIdCache):
+    """The second database lookup fails"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.loads = 0
+
+    async def _load(self, key):
+        self.loads += 1
+        if self.loads == 2:
+            raise RuntimeError('database is locked')
+        return None
+
+
+async def _resolve_after_failed_send(db_path: str):
+    data = get_data_access(db_path)
+    cache = FailingLoadCache(data)
+    media = [{'type': 'photo', 'file_id': ref} for ref in PHOTOS]
+    try:
+        await send_campaign_content(FakeBot(), '@one', 'Buy now', 'photo', media, cache)
+    except RuntimeError:
+        pass
+    # The first URL was claimed before the second lookup failed; it must not stay pending
+    resolved = await asyncio.wait_for(cache.resolve(PHOTOS[0]), timeout=1)
+    await close_all_pools()
+    return resolved
+
+
+def test_failed_resolve_releases_upload_claim():
+    """A send that fails while resolving media does not leave later sends waiting forever"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "publish_media.db")
+        migrate(db_path)
+        resolved = asyncio.run(_resolve_after_failed_send(db_path))
+
+    assert resolved == (PHOTOS[0], True)
+    print("✅ Failed send released its upload claim")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Media")
+    print("=" * 50)
+    test_campaign_media_from_metadata()
+    test_album_uploads_once_and_reuses_file_ids()
+    test_long_media_lists_split_into_valid_albums()
+    test_failed_resolve_releases_upload_claim()
+    print("✅ All publish media tests passed")
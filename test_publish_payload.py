@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test Publish Payload
+Validates that a campaign's payload is rendered once, shared between workers
+through the database, dropped when the campaign is edited, and that
+publishing reads nothing about the campaign beyond the claimed post rows
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from async_data_access import get_data_access
+from campaign_schedule import format_timestamp
+from connection_pool import close_all_pools
+from publish_leases import claim_posts
+from publish_payload import PayloadStore, PublishPayload, render_payload
+from publishing_engine import ChatRateLimiter, PublishingEngine
+from query_profiler import configure_query_profiler, get_query_profiler
+from schema_migrations import DUE_POSTS_QUERY, migrate
+
+METADATA = json.dumps({
+    'media': ['AgAC1', 'AgAC2'],
+    'parse_mode': 'HTML',
+    'buttons': [{'text': 'Visit', 'url': 'https://example.com'}, {'text': 'No url'}],
+})
+
+
+async def _claim_due(data, owner: str):
+    """Claim every due post the way the publisher does: read the sweep's ids, then claim them"""
+    rows = await data.fetchall(DUE_POSTS_QUERY, (format_timestamp(datetime.now()),))
+    return await claim_posts(data, [row['id'] for row in rows], owner)
+
+
+def test_render_and_blob_round_trip():
+    """Caption, media, parse mode and buttons survive the compressed blob"""
+    payload = render_payload({'campaign_id': 'CAM-P', 'user_id': 7, 'ad_content': '<b>Sale</b>',
+                              'content_type': 'photo', 'media_url': 'AgAC1', 'campaign_metadata': METADATA},
+                             'POST-1')
+    restored = PublishPayload.from_blob(payload.to_blob())
+
+    assert restored == payload
+    assert restored.media == [{'type': 'photo', 'file_id': 'AgAC1'}, {'type': 'photo', 'file_id': 'AgAC2'}]
+    assert restored.parse_mode == 'HTML' and restored.post_identity_id == 'POST-1'
+    assert restored.buttons == [[{'text': 'Visit', 'url': 'https://example.com'}]]
+    assert restored.reply_markup().inline_keyboard[0][0].url == 'https://example.com'
+    assert render_payload({'campaign_id': 'CAM-T', 'user_id': 1, 'ad_content': 'hi',
+                           'campaign_metadata': '{"parse_mode": "bogus"}'}, None).parse_mode is None
+    print("✅ Payload rendered and restored from its blob")
+
+
+async def _store_lifecycle(db_path: str):
+    data = get_data_access(db_path)
+    await data.execute("INSERT INTO campaigns (campaign_id, user_id, ad_content, status) "
+                       "VALUES ('CAM-S', 5, 'first text', 'active')")
+    renders = []
+
+    async def identity_of(campaign):
+        renders.append(campaign['ad_content'])
+        return f"ID-{campaign['campaign_id']}"
+
+    worker_a = PayloadStore(data, identity_of)
+    first = await asyncio.gather(*(worker_a.get('CAM-S') for _ in range(5)))
+    # Another worker finds the stored blob and renders nothing
+    worker_b = PayloadStore(data, identity_of)
+    shared = await worker_b.get('CAM-S')
+    # Editing the campaign drops the stored payload; a fresh worker renders the new text
+    await data.execute("UPDATE campaigns SET ad_content = 'second text' WHERE campaign_id = 'CAM-S'")
+    edited = await PayloadStore(data, identity_of).get('CAM-S')
+    missing = await worker_a.get('CAM-NONE')
+    await close_all_pools()
+    return first, shared, edited, missing, renders, worker_a.get_stats(), worker_b.get_stats()
+
+
+def test_store_renders_once_and_follows_edits():
+    """Concurrent gets render once; other workers load the blob; edits re-render"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "publish_payload.db")
+        migrate(db_path)
+        first, shared, edited, missing, renders, stats_a, stats_b = asyncio.run(_store_lifecycle(db_path))
+
+    assert all(payload.text == 'first text' for payload in first)
+    assert shared == first[0] and shared.post_identity_id == 'ID-CAM-S'
+    assert edited.text == 'second text'
+    assert missing is None
+    assert renders == ['first text', 'second text']
+    assert stats_a['rendered'] == 1 and stats_a['cache']['coalesced'] == 4
+    assert stats_b['rendered'] == 0 and stats_b['loaded'] == 1
+    print("✅ Payload rendered once, shared through the database and re-rendered after an edit")
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text, kwargs))
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def get_chat(self, chat_id):
+        return SimpleNamespace(title=f"Channel {chat_id}", username=None)
+
+
+async def _hot_path(db_path: str):
+    from enhanced_campaign_publisher import EnhancedCampaignPublisher
+
+    class PayloadPublisher(EnhancedCampaignPublisher):
+        async def _ensure_campaign_post_identity(self, post_data):
+            await self.data.execute(
+                "INSERT OR IGNORE INTO post_identity (post_id, campaign_id, user_id, advertiser_username, "
+                "content_text) VALUES (?, ?, ?, 'advertiser', ?)",
+                (f"ID-{post_data['campaign_id']}", post_data['campaign_id'], post_data['user_id'],
+                 post_data['ad_content']))
+            return f"ID-{post_data['campaign_id']}"
+
+    bot = FakeBot()
+    publisher = PayloadPublisher(bot_instance=bot, db_path=db_path)
+    publisher.engine = PublishingEngine(limiter=ChatRateLimiter(global_rate=1000, chat_burst=10))
+    publisher.notifier.limiter = publisher.engine.limiter
+    data = publisher.data
+    await data.execute("INSERT INTO campaigns (campaign_id, user_id, ad_content, status, campaign_metadata) "
+                       "VALUES ('CAM-H', 9, '<b>hot</b>', 'active', ?)",
+                       (json.dumps({'parse_mode': 'HTML', 'buttons': [{'text': 'Visit', 'url': 'https://example.com'}]}),))
+    await data.executemany(
+        "INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status) "
+        "VALUES ('CAM-H', ?, '2025-01-01 00:00:00', 'scheduled')", [('@one',), ('@two',), ('@three',)])
+    # Activation renders the payload
+    await publisher.schedule_campaign('CAM-H')
+
+    claimed = await _claim_due(data, publisher.worker_id)
+    profiler = configure_query_profiler(True)
+    profiler.reset()
+    published = await publisher._publish_claimed(claimed)
+    reads = [entry['fingerprint'] for entry in profiler.get_top(100) if entry['fingerprint'].startswith('SELECT')]
+    await close_all_pools()
+    return published, bot.sent, reads
+
+
+def test_publishing_reads_only_post_rows():
+    """With the payload rendered, a batch reads no campaign, identity or user rows"""
+    profiling = get_query_profiler().enabled
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "payload_hot_path.db")
+            migrate(db_path)
+            published, sent, reads = asyncio.run(_hot_path(db_path))
+    finally:
+        configure_query_profiler(profiling)
+
+    assert published == 3
+    channel_sends = [entry for entry in sent if entry[0] != 9]
+    assert len(channel_sends) == 3
+    assert all(text == '<b>hot</b>' and kwargs['parse_mode'] == 'HTML' and kwargs['reply_markup']
+               for _, text, kwargs in channel_sends)
+    # The campaign completes: its counters, schedules and the advertiser's language are read once afterwards
+    after_batch = ('campaign_post_counts', 'campaign_schedules', 'FROM users')
+    hot_reads = [sql for sql in reads if not any(table in sql for table in after_batch)]
+    assert len(hot_reads) == 1 and 'FROM campaign_posts WHERE id IN' in hot_reads[0], reads
+    print(f"✅ 3 posts published with 1 read ({len(reads)} including completion)")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Payload")
+    print("=" * 50)
+    test_render_and_blob_round_trip()
+    test_store_renders_once_and_follows_edits()
+    test_publishing_reads_only_post_rows()
+    print("✅ All publish payload tests passed")
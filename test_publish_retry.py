@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test Publish Retry
+Validates failure classification, flood-wait and backoff rescheduling,
+channel deactivation on a lost chat, dead-letter replay, and completion of
+a campaign whose last post was dead-lettered
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter
+)
+from aiogram.methods import SendMessage
+
+from campaign_schedule import format_timestamp
+from connection_pool import close_all_pools
+from publish_leases import claim_posts
+from publishing_engine import ChatRateLimiter, PublishingEngine
+from publish_payload import PublishPayload
+from publish_retry import (
+    CHAT_GONE, EXHAUSTED, FLOOD, PERMANENT, TRANSIENT, NoMessageError, UnpublishableError, classify_failure,
+    list_dead_letters, replay_dead_letters
+)
+from schema_migrations import DUE_POSTS_QUERY, migrate
+
+METHOD = SendMessage(chat_id='@one', text='hello')
+
+
+async def _claim_due(data, owner: str):
+    """Claim every due post the way the publisher does: read the sweep's ids, then claim them"""
+    rows = await data.fetchall(DUE_POSTS_QUERY, (format_timestamp(datetime.now()),))
+    return await claim_posts(data, [row['id'] for row in rows], owner)
+
+
+def test_classify_failures():
+    """Each Bot API error maps to the right handling"""
+    flood = classify_failure(TelegramRetryAfter(method=METHOD, message='Flood', retry_after=7))
+    assert (flood.kind, flood.delay) == (FLOOD, 7.0)
+    assert classify_failure(TelegramForbiddenError(METHOD, 'Forbidden: bot was kicked')).kind == CHAT_GONE
+    assert classify_failure(TelegramBadRequest(METHOD, 'Bad Request: chat not found')).kind == CHAT_GONE
+    assert classify_failure(TelegramBadRequest(METHOD, 'Bad Request: message is too long')).kind == PERMANENT
+    assert classify_failure(UnpublishableError('no content')).kind == PERMANENT
+    assert classify_failure(NoMessageError('no message')).kind == TRANSIENT
+
+    network = TelegramNetworkError(METHOD, 'timeout')
+    first = classify_failure(network, attempts=0, max_attempts=3)
+    third = classify_failure(network, attempts=2, max_attempts=5)
+    assert first.kind == TRANSIENT and first.retry
+    assert classify_failure(network, attempts=2, max_attempts=3).kind == EXHAUSTED
+    assert third.delay > first.delay
+    print(f"✅ Failures classified (backoff {first.delay:.1f}s -> {third.delay:.1f}s)")
+
+
+async def _failure_handling(db_path: str):
+    from enhanced_campaign_publisher import EnhancedCampaignPublisher
+
+    publisher = EnhancedCampaignPublisher(bot_instance=None, db_path=db_path)
+    # A private limiter, so the flood pause does not leak into other tests
+    publisher.engine = PublishingEngine(limiter=ChatRateLimiter())
+    data = publisher.data
+    await data.execute("INSERT INTO channels (channel_id, name, telegram_channel_id, is_active) "
+                       "VALUES ('@gone', 'Gone', '@gone', 1)")
+    await data.executemany(
+        "INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status) "
+        "VALUES ('CAM-R', ?, '2025-01-01 00:00:00', 'scheduled')", [('@one',), ('@two',), ('@gone',)]
+    )
+    await _claim_due(data, publisher.worker_id)
+    posts = {row['channel_id']: row for row in await data.fetchall("SELECT * FROM campaign_posts")}
+
+    started = time.time()
+    await publisher._handle_publish_failure(
+        posts['@one'], TelegramRetryAfter(method=METHOD, message='Flood', retry_after=30))
+    await publisher._handle_publish_failure(posts['@two'], TelegramNetworkError(METHOD, 'timeout'))
+    await publisher._handle_publish_failure(
+        posts['@gone'], TelegramForbiddenError(METHOD, 'Forbidden: bot was kicked from the channel chat'))
+
+    after = {row['channel_id']: row for row in await data.fetchall("SELECT * FROM campaign_posts")}
+    channel_active = await data.fetchval("SELECT is_active FROM channels WHERE channel_id = '@gone'")
+    chat_wait = publisher.engine.limiter.chat_delay('@one')
+    due_one = publisher.timer._due.get(after['@one']['id'])
+    dead = await list_dead_letters(data)
+
+    campaigns = await replay_dead_letters(data)
+    replayed = await data.fetchone("SELECT status, attempts FROM campaign_posts WHERE channel_id = '@gone'")
+    remaining = await list_dead_letters(data)
+    await close_all_pools()
+    return started, after, channel_active, chat_wait, due_one, dead, campaigns, replayed, remaining
+
+
+def test_failures_retry_or_dead_letter():
+    """Flood waits and transient errors are rescheduled; a lost chat is dead-lettered and replayable"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "retry_test.db")
+        migrate(db_path)
+        started, after, channel_active, chat_wait, due_one, dead, campaigns, replayed, remaining = \
+            asyncio.run(_failure_handling(db_path))
+
+    assert after['@one']['status'] == 'scheduled' and after['@one']['attempts'] == 0
+    assert 29 <= due_one - started <= 31
+    assert 29 <= chat_wait <= 31
+    assert after['@two']['status'] == 'scheduled' and after['@two']['attempts'] == 1
+    assert after['@gone']['status'] == 'failed' and not channel_active
+    assert [(d['channel_id'], d['error_kind']) for d in dead] == [('@gone', CHAT_GONE)]
+    assert campaigns == ['CAM-R']
+    assert (replayed['status'], replayed['attempts']) == ('scheduled', 0)
+    assert remaining == []
+    print("✅ Flood wait honoured, transient retried, lost chat dead-lettered and replayed")
+
+
+class _SilentBot:
+    """Sends that return no message"""
+
+    async def send_message(self, **kwargs):
+        return None
+
+
+async def _unsendable_posts(db_path: str):
+    from enhanced_campaign_publisher import EnhancedCampaignPublisher
+
+    publisher = EnhancedCampaignPublisher(bot_instance=_SilentBot(), db_path=db_path)
+    data = publisher.data
+    await data.executemany(
+        "INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status) "
+        "VALUES ('CAM-U', ?, '2025-01-01 00:00:00', 'scheduled')", [('@anon',), ('@empty',), ('@silent',)]
+    )
+    await _claim_due(data, publisher.worker_id)
+    posts = {row['channel_id']: row for row in await data.fetchall("SELECT * FROM campaign_posts")}
+    payloads = {
+        '@anon': PublishPayload('CAM-U', 1, 'hello'),
+        '@empty': PublishPayload('CAM-U', 1, '', post_identity_id='ID-U'),
+        '@silent': PublishPayload('CAM-U', 1, 'hello', post_identity_id='ID-U'),
+    }
+    sent = [await publisher._publish_campaign_post({**posts[channel], 'user_id': 1, 'payload': payload})
+            for channel, payload in payloads.items()]
+    await publisher.batch.flush()
+    after = {row['channel_id']: row for row in await data.fetchall("SELECT * FROM campaign_posts")}
+    dead = await list_dead_letters(data)
+    logged = await data.fetchval("SELECT COUNT(*) FROM channel_publishing_logs WHERE status = 'failed'")
+    await close_all_pools()
+    return sent, after, dead, logged
+
+
+def test_unsendable_posts_go_through_failure_handling():
+    """Missing identity or content dead-letters the post; a send with no message is retried"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "retry_test.db")
+        migrate(db_path)
+        sent, after, dead, logged = asyncio.run(_unsendable_posts(db_path))
+
+    assert sent == [False, False, False]
+    assert after['@anon']['status'] == after['@empty']['status'] == 'failed'
+    assert sorted((d['channel_id'], d['error_kind']) for d in dead) == [('@anon', PERMANENT), ('@empty', PERMANENT)]
+    assert (after['@silent']['status'], after['@silent']['attempts']) == ('scheduled', 1)
+    assert logged == 3
+    print("✅ Unsendable posts dead-lettered, empty sends retried")
+
+
+async def _dead_lettered_last_post(db_path: str):
+    from enhanced_campaign_publisher import EnhancedCampaignPublisher
+
+    publisher = EnhancedCampaignPublisher(bot_instance=_SilentBot(), db_path=db_path)
+    publisher.engine = PublishingEngine(limiter=ChatRateLimiter())
+    data = publisher.data
+    await data.execute("INSERT INTO campaigns (campaign_id, user_id, ad_content, status) "
+                       "VALUES ('CAM-D', 1, 'hello', 'active')")
+    await data.execute("INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status) "
+                       "VALUES ('CAM-D', '@one', '2025-01-01 00:00:00', 'scheduled')")
+    await _claim_due(data, publisher.worker_id)
+    post = await data.fetchone("SELECT * FROM campaign_posts")
+    # No post identity: the only post is dead-lettered, nothing in the batch publishes
+    published = await publisher._publish_posts([{**post, 'user_id': 1, 'payload': PublishPayload('CAM-D', 1, 'hello')}])
+    status = await data.fetchval("SELECT status FROM campaigns WHERE campaign_id = 'CAM-D'")
+    await close_all_pools()
+    return published, status
+
+
+def test_campaign_completes_when_last_post_is_dead_lettered():
+    """A batch that publishes nothing still completes the campaigns whose posts are all done"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "retry_test.db")
+        migrate(db_path)
+        published, status = asyncio.run(_dead_lettered_last_post(db_path))
+
+    assert published == 0
+    assert status == 'completed'
+    print("✅ Campaign completed after its last post was dead-lettered")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Retry")
+    print("=" * 50)
+    test_classify_failures()
+    test_failures_retry_or_dead_letter()
+    test_unsendable_posts_go_through_failure_handling()
+    test_campaign_completes_when_last_post_is_dead_lettered()
+    print("✅ All publish retry tests passed")
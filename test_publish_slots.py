@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test Publish Slots
+Validates that campaigns paid at the same moment are spread over per-channel
+slots within the hourly cap, that the search widens past the shift window
+instead of booking a full hour, and that the slot index rebuilt from the
+database matches what was allocated
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from collections import Counter
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from campaign_schedule import ScheduleRule
+from connection_pool import close_all_pools
+from publish_slots import SlotIndex
+from schema_migrations import migrate
+
+CHANNELS = ['@one', '@two']
+
+
+def test_simultaneous_campaigns_get_separate_slots():
+    """13 campaigns paid in the same second: 12 fit the next hour's slots, the 13th is the only collision"""
+    index = SlotIndex(max_posts_per_hour=12, max_shift_minutes=60)
+    start = datetime(2030, 1, 1, 9, 0, 17)
+    rules = [ScheduleRule.daily(f'CAM-{n}', CHANNELS, 4, 2, start_time=start) for n in range(13)]
+    offsets = [index.allocate(rule) for rule in rules]
+
+    posts = Counter()
+    for rule, rule_offsets in zip(rules, offsets):
+        rule.channel_offsets = rule_offsets
+        for row in rule.rows(0, rule.times()):
+            posts[(row[2], row[7])] += 1
+    # Every post starts on a 5-minute slot boundary, no more than an hour late
+    assert all(datetime.fromisoformat(when).minute % 5 == 0 and datetime.fromisoformat(when).second == 0
+               for _, when in posts)
+    assert all(0 < offset <= 3600 for rule_offsets in offsets for offset in rule_offsets.values())
+    assert len({rule_offsets['@one'] for rule_offsets in offsets[:12]}) == 12
+    assert max(posts.values()) == 2 and sum(1 for n in posts.values() if n == 2) == 8 * len(CHANNELS)
+    # Within any clock hour a channel gets at most the 12 allowed posts (bar the one collision)
+    per_hour = Counter((channel, when[:13]) for (channel, when), n in posts.items() for _ in range(n))
+    assert max(per_hour.values()) <= 13
+    assert index.get_stats()['collisions'] == 8 * len(CHANNELS)
+    print(f"✅ 13 simultaneous campaigns spread over {len(posts)} channel slots")
+
+
+def test_full_window_widens_instead_of_exceeding_cap():
+    """Once every hour within the shift window is full, later campaigns move further out"""
+    index = SlotIndex(max_posts_per_hour=2, max_shift_minutes=60)
+    start = datetime(2030, 1, 1, 9, 0, 17)
+    rules = [ScheduleRule.daily(f'CAM-{n}', ['@one'], 1, 1, start_time=start) for n in range(6)]
+    offsets = [index.allocate(rule)['@one'] for rule in rules]
+
+    per_hour = Counter(int((start.timestamp() + offset) // 3600) for offset in offsets)
+    assert max(per_hour.values()) <= 2
+    assert all(offset <= 3600 for offset in offsets[:4])
+    assert all(offset > 3600 for offset in offsets[4:])
+    stats = index.get_stats()
+    assert stats['searches_widened'] == 2 and stats['over_cap'] == 0
+    print(f"✅ Full hours skipped: last campaign moved {max(offsets) / 60:.0f} minutes")
+
+
+async def _rebuild_matches(db_path: str):
+    from campaign_management import CampaignManager
+
+    manager = CampaignManager(db_path)
+    await manager.schedule_campaign_posts('CAM-LAZY', CHANNELS, 4, 3, lazy=True)
+    await manager.schedule_campaign_posts('CAM-BULK', CHANNELS, 4, 3, lazy=False)
+    allocated = {channel: dict(slots) for channel, slots in manager.slots._slots.items()}
+
+    fresh = SlotIndex()
+    await fresh.rebuild(manager.data)
+    rebuilt = {channel: dict(slots) for channel, slots in fresh._slots.items()}
+    await close_all_pools()
+    return allocated, rebuilt
+
+
+def test_rebuild_matches_allocation():
+    """Bulk rows and lazy rules (with their stored offsets) rebuild the same occupancy"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "publish_slots.db")
+        migrate(db_path)
+        allocated, rebuilt = asyncio.run(_rebuild_matches(db_path))
+
+    assert rebuilt == allocated
+    assert sum(sum(slots.values()) for slots in rebuilt.values()) == 2 * 4 * 3 * len(CHANNELS)
+    # The two campaigns were paid together but never share a slot
+    assert all(count == 1 for slots in rebuilt.values() for count in slots.values())
+    print("✅ Slot index rebuilt from campaign_posts and schedule rules")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Slots")
+    print("=" * 50)
+    test_simultaneous_campaigns_get_separate_slots()
+    test_full_window_widens_instead_of_exceeding_cap()
+    test_rebuild_matches_allocation()
+    print("✅ All publish slot tests passed")
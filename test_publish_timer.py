@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test Publish Timer
+Validates the due-time priority queue and that the publisher fires posts at
+their scheduled time without polling the database between sweeps
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_pool import close_all_pools
+from publish_timer import PostTimerQueue, due_timestamp
+from schema_migrations import migrate
+
+
+def test_timer_queue_order_and_reschedule():
+    """Posts pop in due order; a reschedule supersedes the earlier entry"""
+    timer = PostTimerQueue()
+    now = time.time()
+    timer.push(1, now + 30)
+    timer.push(2, now - 5)
+    timer.push(3, now - 1)
+    timer.push(1, now - 2)  # moved earlier
+
+    assert len(timer) == 3
+    assert timer.pop_due(now) == [2, 1, 3]
+    assert timer.next_due() is None and len(timer) == 0
+    assert due_timestamp('2025-07-01 09:00:00') == datetime(2025, 7, 1, 9).timestamp()
+    assert due_timestamp('2025-07-01 09:00:00.250000') == datetime(2025, 7, 1, 9, 0, 0, 250000).timestamp()
+    print("✅ Timer queue pops in due order")
+
+
+async def _wake_on_earlier_post():
+    timer = PostTimerQueue()
+    timer.push(1, time.time() + 60)
+    started = time.perf_counter()
+    waiter = asyncio.create_task(timer.wait(time.time() + 60))
+    await asyncio.sleep(0.05)
+    timer.push(2, time.time() + 0.1)
+    await waiter
+    first = time.perf_counter() - started
+    await timer.wait(time.time() + 60)
+    return first, time.perf_counter() - started, timer.pop_due()
+
+
+def test_timer_wakes_for_earlier_post():
+    """An earlier post interrupts the wait and the timer sleeps exactly until it"""
+    first, total, fired = asyncio.run(_wake_on_earlier_post())
+    assert first < 0.1
+    assert 0.1 <= total < 0.3, total
+    assert fired == [2]
+    print(f"✅ Timer woke for the earlier post after {total * 1000:.0f}ms")
+
+
+async def _publisher_fires_on_time(db_path: str):
+    from enhanced_campaign_publisher import EnhancedCampaignPublisher
+
+    class RecordingPublisher(EnhancedCampaignPublisher):
+        """Records publish times instead of calling the Bot API"""
+        published = []
+
+        async def _publish_campaign_post(self, post_data):
+            self.published.append((post_data['id'], time.time()))
+            await self.data.execute("UPDATE campaign_posts SET status = 'published' WHERE id = ?",
+                                    (post_data['id'],))
+            return True
+
+        async def _check_campaign_completion(self, campaign_id, user_id):
+            pass
+
+    publisher = RecordingPublisher(bot_instance=None, db_path=db_path)
+    data = publisher.data
+    await data.execute("INSERT INTO campaigns (campaign_id, user_id, ad_content) VALUES ('CAM-T', 1, 'hello')")
+    publisher.running = True
+    loop_task = asyncio.create_task(publisher._publishing_loop())
+    await asyncio.sleep(0.1)
+
+    due = datetime.now() + timedelta(milliseconds=400)
+    await data.executemany(
+        "INSERT INTO campaign_posts (campaign_id, channel_id, scheduled_time, status) VALUES (?, ?, ?, 'scheduled')",
+        [('CAM-T', '@one', due.isoformat(sep=' ')), ('CAM-T', '@two', due.isoformat(sep=' '))]
+    )
+    queued = await publisher.schedule_campaign('CAM-T')
+    await asyncio.sleep(0.8)
+
+    await publisher.stop()
+    await asyncio.wait_for(loop_task, timeout=2)
+    await close_all_pools()
+    return queued, due.timestamp(), RecordingPublisher.published
+
+
+def test_publisher_fires_at_due_time():
+    """Both channels' posts go out right at their scheduled time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "publish_timer.db")
+        migrate(db_path)
+        queued, due, published = asyncio.run(_publisher_fires_on_time(db_path))
+
+    assert queued == 2
+    assert len(published) == 2, published
+    lags = [(at - due) * 1000 for _, at in published]
+    assert all(0 <= lag < 200 for lag in lags), lags
+    print(f"✅ Publisher fired {len(published)} posts, max lag {max(lags):.0f}ms")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publish Timer")
+    print("=" * 50)
+    test_timer_queue_order_and_reschedule()
+    test_timer_wakes_for_earlier_post()
+    test_publisher_fires_at_due_time()
+    print("✅ All publish timer tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test Publishing Engine
+Validates that posts for different channels go out in parallel while the
+per-chat and global token buckets hold each channel and the bot to their
+limits
+"""
+
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from publishing_engine import ChatRateLimiter, PublishingEngine, TokenBucket
+
+
+async def _send_batch(posts, limiter, concurrency, send_seconds=0.0):
+    engine = PublishingEngine(concurrency=concurrency, limiter=limiter)
+    sent = []
+
+    async def send(post):
+        sent.append((post['channel_id'], post['n'], time.perf_counter()))
+        await asyncio.sleep(send_seconds)
+        return post['n'] != 'fail'
+
+    started = time.perf_counter()
+    results = await engine.run(posts, send, chat_of=lambda post: post['channel_id'])
+    return results, [(c, n, t - started) for c, n, t in sent], time.perf_counter() - started, engine.get_stats()
+
+
+def test_channels_publish_in_parallel():
+    """Ten channels with a 100ms send each finish in about one send time"""
+    posts = [{'channel_id': f'@ch{i}', 'n': i} for i in range(10)]
+    limiter = ChatRateLimiter(global_rate=100, chat_rate_per_minute=60, chat_burst=1)
+    results, _, elapsed, stats = asyncio.run(_send_batch(posts, limiter, concurrency=10, send_seconds=0.1))
+
+    assert all(results)
+    assert elapsed < 0.3, elapsed
+    assert stats['published'] == 10 and stats['queue_depth'] == 0 and stats['in_flight'] == 0
+    print(f"✅ 10 channels published in {elapsed * 1000:.0f}ms")
+
+
+def test_per_chat_limit_and_order():
+    """One busy chat is paced by its bucket and keeps its order; failures are reported"""
+    posts = [{'channel_id': '@busy', 'n': n} for n in range(5)]
+    posts.append({'channel_id': '@quiet', 'n': 'fail'})
+    limiter = ChatRateLimiter(global_rate=100, chat_rate_per_minute=600, chat_burst=1)  # 10/s per chat
+    results, sent, elapsed, stats = asyncio.run(_send_batch(posts, limiter, concurrency=4))
+
+    busy = [(n, at) for channel, n, at in sent if channel == '@busy']
+    assert [n for n, _ in busy] == list(range(5))
+    gaps = [b[1] - a[1] for a, b in zip(busy, busy[1:])]
+    assert all(gap >= 0.09 for gap in gaps), gaps
+    quiet_at = next(at for channel, _, at in sent if channel == '@quiet')
+    assert quiet_at < 0.05, "the quiet chat waited behind the busy one"
+    assert results == [True] * 5 + [False]
+    assert stats['failed'] == 1 and stats['queue_ms_max'] >= 350
+    print(f"✅ Busy chat paced at {min(gaps) * 1000:.0f}ms+ per post, quiet chat unaffected")
+
+
+def test_global_limit():
+    """The global bucket caps total throughput across chats"""
+    posts = [{'channel_id': f'@ch{i}', 'n': i} for i in range(30)]
+    limiter = ChatRateLimiter(global_rate=20, chat_rate_per_minute=600, chat_burst=1)
+    _, _, elapsed, _ = asyncio.run(_send_batch(posts, limiter, concurrency=30))
+
+    # 20 tokens up front, the other 10 at 20/s
+    assert 0.45 <= elapsed < 0.8, elapsed
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.take(); bucket.take()
+    assert 0.9 < bucket.delay() <= 1.0
+    print(f"✅ Global limit held 30 sends to {elapsed * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Publishing Engine")
+    print("=" * 50)
+    test_channels_publish_in_parallel()
+    test_per_chat_limit_and_order()
+    test_global_limit()
+    print("✅ All publishing engine tests passed")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test Read-Through Cache
+Validates TTL expiry, LRU eviction, coalesced loads, invalidation racing a
+load, and that Database lookups hit the cache until a write invalidates them,
+including a write through another Database instance on the same file
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_pool import close_all_pools
+from database import Database
+from read_cache import TTLCache
+
+
+def test_ttl_and_lru_eviction():
+    """Entries expire after the TTL and the least recently used is evicted first"""
+    cache = TTLCache('test', maxsize=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' is now most recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1 and stats['expirations'] == 1
+    print("✅ TTL and LRU eviction OK")
+
+
+async def _coalesce_and_race():
+    cache = TTLCache('test', maxsize=10, ttl=60)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return 'value'
+
+    results = await asyncio.gather(*[cache.get_or_load('k', loader) for _ in range(20)])
+    assert results == ['value'] * 20
+    assert loads == 1
+    assert cache.get_stats()['coalesced'] == 19
+
+    # A write landing while a load is in flight must not be overwritten by stale data
+    async def stale_loader():
+        await asyncio.sleep(0.01)
+        return 'stale'
+
+    cache.invalidate('k')
+    load = asyncio.create_task(cache.get_or_load('k', stale_loader))
+    await asyncio.sleep(0)
+    cache.invalidate('k')
+    assert await load == 'stale'
+    assert cache.get('k') is None
+
+
+def test_coalescing_and_invalidation_race():
+    """Concurrent misses share one load; invalidation during a load wins"""
+    asyncio.run(_coalesce_and_race())
+    print("✅ Coalesced loads and invalidation race OK")
+
+
+class _StatsBot:
+    """Answers the calls ChannelManager makes to refresh a channel's stats"""
+
+    async def get_chat(self, chat_id):
+        return SimpleNamespace(id=chat_id, title='Cache Test', description='')
+
+    async def get_chat_member_count(self, chat_id):
+        return 900
+
+
+async def _database_cache_roundtrip(db_path: str):
+    database = Database(db_path)
+    await database.init_db()
+    await database.create_user(1001, 'cached', 'en')
+
+    assert await database.get_user_language(1001) == 'en'
+    assert await database.get_user_language(1001) == 'en'
+    await database.set_user_language(1001, 'ar')
+    assert await database.get_user_language(1001) == 'ar'
+
+    # Mutating a returned row must not leak into the cache
+    user = await database.get_user(1001)
+    user['language'] = 'ru'
+    assert (await database.get_user(1001))['language'] == 'ar'
+
+    assert await database.get_active_channels() == []
+    await database.add_channel_automatically('cache_test', 'Cache Test', '@cache_test', 500)
+    channels = await database.get_active_channels()
+    assert [c['telegram_channel_id'] for c in channels] == ['@cache_test']
+
+    # Channel stats refreshed from Telegram show up in the cached list right away
+    from channel_manager import ChannelManager
+    await ChannelManager(_StatsBot(), database).update_channel_stats('@cache_test')
+    channels = await database.get_active_channels()
+    assert channels[0]['subscribers'] == 900
+
+    await database.set_bot_setting('welcome', 'hello')
+    assert await database.get_bot_setting('welcome') == 'hello'
+    await database.execute_query(
+        "UPDATE bot_settings SET setting_value = ? WHERE setting_key = ?", ('hi', 'welcome')
+    )
+    assert await database.get_bot_setting('welcome') == 'hi'
+
+    stats = database.get_cache_stats()
+    await close_all_pools()
+    return stats
+
+
+def test_database_lookups_use_cache():
+    """Repeated lookups hit the cache and every write path invalidates it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = asyncio.run(_database_cache_roundtrip(os.path.join(tmp, "cache_test.db")))
+    assert stats['users']['hits'] >= 2, stats['users']
+    assert stats['users']['invalidations'] >= 2
+    assert stats['channels']['invalidations'] >= 2
+    print(f"✅ Database cache OK: users hit rate {stats['users']['hit_rate']:.0%}")
+
+
+async def _shared_between_instances(db_path: str):
+    handlers_db = Database(db_path)
+    await handlers_db.init_db()
+    await handlers_db.add_channel_automatically('shared_test', 'Shared Test', '@shared_test', 500)
+    before = [c['telegram_channel_id'] for c in await handlers_db.get_active_channels()]
+    # The publisher builds its own Database on the same file
+    await Database(db_path).deactivate_channel('@shared_test')
+    after = [c['telegram_channel_id'] for c in await handlers_db.get_active_channels()]
+    await close_all_pools()
+    return before, after
+
+
+def test_cache_shared_between_database_instances():
+    """A channel deactivated through one Database disappears from another's cached list"""
+    with tempfile.TemporaryDirectory() as tmp:
+        before, after = asyncio.run(_shared_between_instances(os.path.join(tmp, "cache_test.db")))
+    assert before == ['@shared_test']
+    assert after == []
+    print("✅ Read caches shared per database file")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Read-Through Cache")
+    print("=" * 50)
+    test_ttl_and_lru_eviction()
+    test_coalescing_and_invalidation_race()
+    test_database_lookups_use_cache()
+    test_cache_shared_between_database_instances()
+    print("✅ All read cache tests passed")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test Schema Migrations
+Validates apply-once migrations on fresh and legacy databases and that the
+hot publisher/admin queries use the curated indexes
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_pool import close_all_pools
+from database import Database
+from schema_migrations import LATEST_VERSION, get_schema_version, migrate, verify_query_plans
+
+
+async def _init_fresh_database(db_path: str):
+    database = Database(db_path)
+    await database.init_db()
+    packages = await database.get_packages()
+    await close_all_pools()
+    return packages
+
+
+def test_fresh_database_migrates():
+    """A brand new database initializes and records every migration once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "fresh.db")
+        packages = asyncio.run(_init_fresh_database(db_path))
+        assert packages, "default packages not seeded"
+        assert get_schema_version(db_path) == LATEST_VERSION
+
+        # Second run is a no-op
+        assert migrate(db_path) == []
+        conn = sqlite3.connect(db_path)
+        versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+        conn.close()
+        assert versions == list(range(1, LATEST_VERSION + 1))
+        print(f"✅ Fresh database migrated to version {LATEST_VERSION}")
+
+
+def test_legacy_database_gets_missing_columns():
+    """Tables created by older code get their missing columns and indexes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT,
+                                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+            CREATE INDEX idx_users_user_id ON users(user_id);
+            CREATE TABLE campaign_posts (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                         campaign_id TEXT NOT NULL, channel_id TEXT NOT NULL,
+                                         scheduled_time TIMESTAMP, status TEXT DEFAULT 'pending');
+            INSERT INTO users (user_id, username) VALUES (1, 'legacy');
+        """)
+        conn.close()
+
+        applied = migrate(db_path)
+        assert applied == list(range(1, LATEST_VERSION + 1)), applied
+
+        conn = sqlite3.connect(db_path)
+        user_columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+        post_columns = {row[1] for row in conn.execute("PRAGMA table_info(campaign_posts)")}
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        username = conn.execute("SELECT username FROM users WHERE user_id = 1").fetchone()[0]
+        conn.close()
+
+        assert {'last_activity', 'free_trial_used', 'ton_wallet_address'} <= user_columns
+        assert {'user_id', 'content', 'content_type', 'media_url', 'message_id'} <= post_columns
+        assert 'idx_campaign_posts_status_scheduled' in indexes
+        assert 'idx_users_user_id' not in indexes
+        assert username == 'legacy'
+        print("✅ Legacy database upgraded in place")
+
+
+def test_hot_queries_use_indexes():
+    """EXPLAIN QUERY PLAN shows every hot query on its curated index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "plans.db")
+        migrate(db_path)
+        results = verify_query_plans(db_path)
+        missing = {name: r['plan'] for name, r in results.items() if not r['uses_index']}
+        assert not missing, missing
+        print(f"✅ {len(results)} hot queries use their indexes")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Schema Migrations")
+    print("=" * 50)
+    test_fresh_database_migrates()
+    test_legacy_database_gets_missing_columns()
+    test_hot_queries_use_indexes()
+    print("✅ All schema migration tests passed")
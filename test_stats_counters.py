@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test Stats Counters
+Validates that the trigger-maintained admin statistics follow the source
+tables through inserts, status changes and deletes, that reconciliation
+corrects injected drift, and that active users are stored at reconciliation
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analytics_access import AnalyticsReader
+from async_data_access import get_data_access
+from connection_pool import close_all_pools
+from schema_migrations import migrate
+from stats_counters import StatsCounters
+
+PAYMENT = "INSERT INTO payments (user_id, amount, currency, payment_method, status) VALUES (?, ?, 'USD', 'ton', ?)"
+
+
+async def _write_paths(db_path: str):
+    data = get_data_access(db_path)
+    reader = AnalyticsReader(db_path, connections=1, snapshot=False)
+    counters = StatsCounters(db_path, reader=reader)
+
+    await data.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)",
+                           [(i, f'u{i}') for i in range(1, 6)])
+    await data.execute("INSERT OR IGNORE INTO users (user_id, username) VALUES (1, 'again')")
+    await data.executemany(PAYMENT, [(1, 10.0, 'confirmed'), (1, 5.0, 'confirmed'),
+                                     (2, 7.5, 'pending'), (3, 2.0, 'confirmed')])
+    await data.execute("UPDATE payments SET status = 'confirmed' WHERE user_id = 2")
+    await data.execute("UPDATE payments SET status = 'failed' WHERE user_id = 3")
+    await data.execute("DELETE FROM payments WHERE payment_id = 1")
+    await data.executemany(
+        "INSERT INTO subscriptions (user_id, ad_id, channel_id, duration_months, total_price, status) "
+        "VALUES (?, 1, '@one', 1, 10.0, ?)", [(1, 'active'), (2, 'active'), (3, 'pending')]
+    )
+    await data.execute("UPDATE subscriptions SET status = 'completed' WHERE user_id = 2")
+    await data.execute("INSERT INTO campaign_posts (campaign_id, channel_id, status) VALUES ('CAM-1', '@one', 'scheduled')")
+    await data.execute("UPDATE campaign_posts SET status = 'published', published_at = CURRENT_TIMESTAMP")
+    await data.execute("DELETE FROM users WHERE user_id = 5")
+
+    summary = await counters.get_summary()
+    clean = await counters.reconcile()
+    await reader.close()
+    await close_all_pools()
+    return summary, clean
+
+
+def test_triggers_follow_write_paths():
+    """Counters match the source tables without any reconciliation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stats_test.db")
+        migrate(db_path)
+        summary, clean = asyncio.run(_write_paths(db_path))
+
+    assert summary['users_total'] == 4
+    assert summary['new_users_today'] == 4
+    assert summary['paid_users'] == 2, summary
+    assert summary['revenue_today'] == summary['revenue_month'] == 12.5
+    assert (summary['subscriptions_active'], summary['subscriptions_completed']) == (1, 1)
+    assert summary['posts_today'] == 1
+    assert not clean['counters'] and not clean['daily'], clean
+    print("✅ Trigger-maintained counters follow every write path")
+
+
+async def _drift(db_path: str):
+    data = get_data_access(db_path)
+    reader = AnalyticsReader(db_path, connections=1, snapshot=False)
+    counters = StatsCounters(db_path, reader=reader)
+
+    await data.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)",
+                           [(i, f'u{i}') for i in range(1, 4)])
+    await data.execute(PAYMENT, (1, 20.0, 'confirmed'))
+    # Simulate drift: a bad counter and rows written while the triggers were missing
+    await data.execute("UPDATE stats_counters SET value = 42 WHERE name = 'users_total'")
+    await data.execute("DELETE FROM stats_daily WHERE name = 'revenue'")
+
+    fixed = await counters.reconcile()
+    summary = await counters.get_summary()
+    again = await counters.reconcile()
+    await reader.close()
+    await close_all_pools()
+    return fixed, summary, again
+
+
+def test_reconcile_corrects_drift():
+    """Reconciliation applies the difference and then finds nothing to do"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stats_drift.db")
+        migrate(db_path)
+        fixed, summary, again = asyncio.run(_drift(db_path))
+
+    assert fixed['counters'] == {'users_total': 3 - 42}
+    assert len(fixed['daily']) == 1
+    assert summary['users_total'] == 3 and summary['revenue_today'] == 20.0
+    assert not again['counters'] and not again['daily']
+    print("✅ Reconciliation corrected drifted counters")
+
+
+async def _active_users(db_path: str):
+    data = get_data_access(db_path)
+    reader = AnalyticsReader(db_path, connections=1, snapshot=False)
+    counters = StatsCounters(db_path, reader=reader)
+
+    await data.executemany("INSERT INTO users (user_id, username, last_activity) VALUES (?, ?, ?)",
+                           [(1, 'u1', None), (2, 'u2', None), (3, 'u3', '2000-01-01 00:00:00')])
+    await data.execute("UPDATE users SET last_activity = CURRENT_TIMESTAMP WHERE user_id IN (1, 2)")
+    before = (await counters.get_summary())['active_users']
+    result = await counters.reconcile()
+    after = (await counters.get_summary())['active_users']
+    await reader.close()
+    await close_all_pools()
+    return before, result, after
+
+
+def test_active_users_stored_at_reconcile():
+    """The panel reads active users from a stored counter that reconciliation refreshes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stats_active.db")
+        migrate(db_path)
+        before, result, after = asyncio.run(_active_users(db_path))
+
+    assert before == 0
+    assert result['snapshots'] == {'active_users': 2}
+    assert after == 2
+    print("✅ Active users served from the stored counter")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Stats Counters")
+    print("=" * 50)
+    test_triggers_follow_write_paths()
+    test_reconcile_corrects_drift()
+    test_active_users_stored_at_reconcile()
+    print("✅ All stats counter tests passed")
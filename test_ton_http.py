@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Test TON HTTP Client
+Validates the pooled aiohttp client against a local server: the loop keeps
+running during slow requests, connections are reused, per-provider
+concurrency is capped, circuit breakers open and recover (also when the
+trial request is cancelled while queued or gets a client error), and a slow
+toncenter is hedged with tonapi
+"""
+
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+from ton_http import CircuitBreaker, Provider, TONHttpClient
+
+
+class LocalTONServer:
+    """Two providers on one aiohttp server, each with a settable delay and status"""
+
+    def __init__(self):
+        self.delay = {'toncenter': 0.0, 'tonapi': 0.0}
+        self.status = {'toncenter': 200, 'tonapi': 200}
+        self.hits = {'toncenter': 0, 'tonapi': 0}
+        self.active = {'toncenter': 0, 'tonapi': 0}
+        self.max_active = {'toncenter': 0, 'tonapi': 0}
+        self.peers = set()
+        self.runner = None
+        self.base_url = None
+
+    async def _handle(self, request):
+        name = request.match_info['provider']
+        self.hits[name] += 1
+        self.peers.add(request.transport.get_extra_info('peername'))
+        self.active[name] += 1
+        self.max_active[name] = max(self.max_active[name], self.active[name])
+        try:
+            await asyncio.sleep(self.delay[name])
+        finally:
+            self.active[name] -= 1
+        if self.status[name] != 200:
+            return web.json_response({'ok': False}, status=self.status[name])
+        return web.json_response({'ok': True, 'provider': name})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/{provider}/tx', self._handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def client(self, concurrency=2, failures=3, reset_after=0.2, timeout=5):
+        return TONHttpClient({
+            name: Provider(name, f"{self.base_url}/{name}", concurrency,
+                           breaker=CircuitBreaker(failures, reset_after))
+            for name in ('toncenter', 'tonapi')
+        }, timeout=timeout)
+
+
+async def _pooled_and_non_blocking():
+    server = LocalTONServer()
+    await server.start()
+    client = server.client(concurrency=2)
+    server.delay['toncenter'] = 0.2
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    results = await asyncio.gather(*(client.get_json('toncenter', '/tx') for _ in range(6)))
+    ticking.cancel()
+    server.delay['toncenter'] = 0.0
+    for _ in range(5):
+        await client.get_json('toncenter', '/tx')
+    stats = client.get_stats()
+    await client.close()
+    await server.stop()
+    return results, ticks, server, stats
+
+
+def test_requests_are_pooled_limited_and_non_blocking():
+    """Six slow requests run two at a time on reused connections while the loop keeps ticking"""
+    results, ticks, server, stats = asyncio.run(_pooled_and_non_blocking())
+
+    assert all(result == {'ok': True, 'provider': 'toncenter'} for result in results)
+    assert server.max_active['toncenter'] == 2
+    # Three rounds of 0.2 s: the loop ticked throughout instead of freezing
+    assert ticks >= 30
+    assert len(server.peers) <= 2
+    provider = stats['providers']['toncenter']
+    assert provider['requests'] == provider['ok'] == 11 and provider['error_rate'] == 0.0
+    assert provider['p90_ms'] >= 150 and provider['breaker'] == 'closed'
+    print(f"✅ 11 requests over {len(server.peers)} connections, loop ticked {ticks} times")
+
+
+async def _breaker():
+    server = LocalTONServer()
+    await server.start()
+    client = server.client(failures=3, reset_after=0.2)
+    server.status['toncenter'] = 503
+    failed = [await client.get_json('toncenter', '/tx') for _ in range(5)]
+    hits_while_open = server.hits['toncenter']
+    opened = client.get_stats()['providers']['toncenter']
+    await asyncio.sleep(0.25)
+    server.status['toncenter'] = 200
+    recovered = await client.get_json('toncenter', '/tx')
+    closed = client.get_stats()['providers']['toncenter']
+    await client.close()
+    await server.stop()
+    return failed, hits_while_open, opened, recovered, closed
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Three 503s open the circuit; later calls never reach the server until a trial succeeds"""
+    failed, hits_while_open, opened, recovered, closed = asyncio.run(_breaker())
+
+    assert failed == [None] * 5
+    assert hits_while_open == 3
+    assert opened['breaker'] == 'open' and opened['short_circuited'] == 2 and opened['errors'] == 3
+    assert recovered == {'ok': True, 'provider': 'toncenter'}
+    assert closed['breaker'] == 'closed' and closed['breaker_trips'] == 1
+    print("✅ Circuit opened after 3 failures and closed after a successful trial")
+
+
+async def _cancelled_trial():
+    server = LocalTONServer()
+    await server.start()
+    client = server.client(concurrency=1, failures=3, reset_after=0.1)
+    server.status['toncenter'] = 503
+    for _ in range(3):
+        await client.get_json('toncenter', '/tx')
+    await asyncio.sleep(0.15)
+    server.status['toncenter'] = 200
+    # Another request holds the only slot, so the trial waits on the semaphore when it is cancelled
+    semaphore = client.providers['toncenter'].semaphore
+    await semaphore.acquire()
+    trial = asyncio.create_task(client.get_json('toncenter', '/tx'))
+    await asyncio.sleep(0.02)
+    trial.cancel()
+    await asyncio.gather(trial, return_exceptions=True)
+    semaphore.release()
+    recovered = await client.get_json('toncenter', '/tx')
+    closed = client.get_stats()['providers']['toncenter']
+    await client.close()
+    await server.stop()
+    return recovered, closed
+
+
+def test_trial_cancelled_while_queued_does_not_disable_provider():
+    """A half-open trial cancelled before it got a connection slot lets the next request try"""
+    recovered, closed = asyncio.run(_cancelled_trial())
+
+    assert recovered == {'ok': True, 'provider': 'toncenter'}
+    assert closed['breaker'] == 'closed'
+    print("✅ Cancelled queued trial released the half-open breaker")
+
+
+async def _client_error_trial():
+    server = LocalTONServer()
+    await server.start()
+    client = server.client(failures=2, reset_after=0.1)
+    server.status['toncenter'] = 500
+    for _ in range(2):
+        await client.get_json('toncenter', '/tx')
+    await asyncio.sleep(0.15)
+    # The half-open trial gets a 400 (toncenter answers bad lookups that way)
+    server.status['toncenter'] = 400
+    trial = await client.get_json('toncenter', '/tx')
+    server.status['toncenter'] = 200
+    recovered = await client.get_json('toncenter', '/tx')
+    closed = client.get_stats()['providers']['toncenter']
+    await client.close()
+    await server.stop()
+    return trial, recovered, closed
+
+
+def test_trial_with_client_error_does_not_disable_provider():
+    """A 4xx on the half-open trial ends the trial, so the next request can close the circuit"""
+    trial, recovered, closed = asyncio.run(_client_error_trial())
+
+    assert trial is None
+    assert recovered == {'ok': True, 'provider': 'toncenter'}
+    assert closed['breaker'] == 'closed' and closed['short_circuited'] == 0
+    print("✅ Client error on the half-open trial released the breaker")
+
+
+async def _hedging():
+    server = LocalTONServer()
+    await server.start()
+    client = server.client()
+    # Teach the client toncenter's usual latency
+    for _ in range(10):
+        await client.get_json('toncenter', '/tx')
+    server.delay['toncenter'] = 1.0
+    started = time.monotonic()
+    result = await client.hedged(lambda: client.get_json('toncenter', '/tx'),
+                                 lambda: client.get_json('tonapi', '/tx'), 'toncenter')
+    elapsed = time.monotonic() - started
+    await asyncio.sleep(0.05)
+    server.delay['toncenter'] = 0.0
+    server.status['toncenter'] = 500
+    # Without hedging the backup only runs once toncenter has failed
+    client.hedge = False
+    fallback = await client.hedged(lambda: client.get_json('toncenter', '/tx'),
+                                   lambda: client.get_json('tonapi', '/tx'), 'toncenter')
+    stats = client.get_stats()
+    await client.close()
+    await server.stop()
+    return result, elapsed, fallback, stats
+
+
+def test_slow_toncenter_is_hedged_with_tonapi():
+    """Past toncenter's p90 tonapi is asked too and wins; a failing toncenter falls back to tonapi"""
+    result, elapsed, fallback, stats = asyncio.run(_hedging())
+
+    assert result == {'ok': True, 'provider': 'tonapi'}
+    assert elapsed < 0.5
+    assert fallback == {'ok': True, 'provider': 'tonapi'}
+    assert stats['hedges'] == stats['hedge_wins'] == 1
+    assert stats['fallbacks'] == stats['fallback_wins'] == 1
+    # The losing toncenter request was cancelled, not counted as an error
+    assert stats['providers']['toncenter']['errors'] == 1
+    assert stats['providers']['tonapi']['ok'] == 2
+    print(f"✅ Hedged request answered by tonapi in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing TON HTTP Client")
+    print("=" * 50)
+    test_requests_are_pooled_limited_and_non_blocking()
+    test_circuit_breaker_opens_and_recovers()
+    test_trial_cancelled_while_queued_does_not_disable_provider()
+    test_trial_with_client_error_does_not_disable_provider()
+    test_slow_toncenter_is_hedged_with_tonapi()
+    print("✅ All TON HTTP client tests passed")
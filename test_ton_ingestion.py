@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test TON Ingestion
+Validates that checkouts share one poll of the bot wallet, that the (lt, hash)
+cursor only fetches new transactions (walking back over full pages), and that
+memo waiters resolve, time out and skip handled transactions
+"""
+
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_ton_payment_monitoring import EnhancedTONPaymentMonitor
+from ton_ingestion import TransactionIngestor, transaction_cursor
+
+WALLET = "UQ-test-wallet"
+
+
+class FakeChain(EnhancedTONPaymentMonitor):
+    """The wallet's transactions served like toncenter (newest first), or tonapi when toncenter is down"""
+
+    def __init__(self):
+        super().__init__()
+        self.transactions = []
+        self.calls = []
+        self.toncenter_down = False
+        self.fetches = 0
+        # Fetches (counted from 1) that fail on both providers
+        self.failing_fetches = set()
+
+    def pay(self, memo, amount=0.36):
+        lt = 1000 + len(self.transactions)
+        self.transactions.append({
+            'transaction_id': {'lt': str(lt), 'hash': f"h{lt}"}, 'utime': lt,
+            'in_msg': {'source': 'UQ-user', 'value': str(int(amount * 1e9)), 'message': memo},
+        })
+
+    def _page(self, limit, before_lt=None, after_lt=None):
+        txs = [tx for tx in reversed(self.transactions)
+               if (before_lt is None or int(tx['transaction_id']['lt']) <= before_lt)
+               and (after_lt is None or int(tx['transaction_id']['lt']) > after_lt)]
+        return txs[:limit]
+
+    async def get_transactions(self, *args, **kwargs):
+        self.fetches += 1
+        if self.fetches in self.failing_fetches:
+            return None
+        return await super().get_transactions(*args, **kwargs)
+
+    async def get_transactions_toncenter(self, bot_wallet, limit=100, lt=None, tx_hash=None, to_lt=None):
+        self.calls.append(('toncenter', lt, to_lt))
+        if self.toncenter_down:
+            return None
+        return {'ok': True, 'result': self._page(limit, lt, to_lt)}
+
+    async def get_transactions_tonapi(self, bot_wallet, limit=100, before_lt=None, after_lt=None):
+        self.calls.append(('tonapi', before_lt, after_lt))
+        page = self._page(limit, before_lt - 1 if before_lt else None, after_lt)
+        return {'transactions': [{'lt': int(tx['transaction_id']['lt']), 'hash': tx['transaction_id']['hash'],
+                                  'in_msg': tx['in_msg']} for tx in page]}
+
+
+async def _many_checkouts():
+    chain = FakeChain()
+    ingestor = TransactionIngestor(WALLET, chain, poll_interval=0.02)
+    memos = [f"M{n:05d}" for n in range(200)]
+    waits = [asyncio.create_task(ingestor.wait_for_memo(memo, timeout=5)) for memo in memos]
+    await asyncio.sleep(0.05)
+    for memo in memos:
+        chain.pay(memo)
+    results = await asyncio.gather(*waits)
+    await asyncio.sleep(0.05)
+    return memos, results, chain.calls, ingestor.get_stats()
+
+
+def test_checkouts_share_one_poll():
+    """200 concurrent checkouts resolve from the same polls, not 200 downloads each"""
+    memos, results, calls, stats = asyncio.run(_many_checkouts())
+
+    assert [tx['in_msg']['message'] for tx in results] == memos
+    assert stats['dispatched'] == 200 and stats['waiting_memos'] == 0
+    # A few polls (the burst of payments is walked back in pages of 100), never one per checkout
+    assert stats['polls'] < 20 and stats['fetches'] == len(calls) < 40
+    print(f"✅ 200 checkouts confirmed with {len(calls)} API calls over {stats['polls']} polls")
+
+
+async def _cursor_walk():
+    chain = FakeChain()
+    ingestor = TransactionIngestor(WALLET, chain, page_limit=5)
+    for n in range(3):
+        chain.pay(f"OLD{n}")
+    first = await ingestor.poll_once()
+    nothing = await ingestor.poll_once()
+    for n in range(12):
+        chain.pay(f"NEW{n}")
+    chain.calls.clear()
+    walked = await ingestor.poll_once()
+    walk_calls = list(chain.calls)
+    chain.toncenter_down = True
+    chain.pay("API")
+    fallback = await ingestor.poll_once()
+    return first, nothing, walked, walk_calls, fallback, ingestor.cursor
+
+
+def test_cursor_fetches_only_new_transactions():
+    """The cursor skips known transactions, walks back over full pages and survives a provider switch"""
+    first, nothing, walked, walk_calls, fallback, cursor = asyncio.run(_cursor_walk())
+
+    assert [tx['in_msg']['message'] for tx in first] == ['OLD0', 'OLD1', 'OLD2']
+    assert nothing == []
+    # 12 new transactions in pages of 5: three pages, oldest first, no duplicates
+    assert [tx['in_msg']['message'] for tx in walked] == [f"NEW{n}" for n in range(12)]
+    assert len(walk_calls) == 3 and all(to_lt == 1002 for _, _, to_lt in walk_calls)
+    assert [tx['in_msg']['message'] for tx in fallback] == ['API']
+    assert cursor == transaction_cursor(fallback[0]) == (1015, 'h1015')
+    print("✅ Cursor fetched only new transactions, across pages and providers")
+
+
+async def _interrupted_walk():
+    chain = FakeChain()
+    ingestor = TransactionIngestor(WALLET, chain, page_limit=5)
+    await ingestor.poll_once()
+    for n in range(13):
+        chain.pay(f"GAP{n}")
+    # The second page of the walk back fails on both providers
+    chain.failing_fetches = {chain.fetches + 2}
+    interrupted = await ingestor.poll_once()
+    cursor_after_failure = ingestor.cursor
+    resumed = await ingestor.poll_once()
+    return interrupted, cursor_after_failure, resumed, ingestor.cursor, ingestor.get_stats()
+
+
+def test_interrupted_walk_resumes_without_gaps():
+    """A page failing mid-walk leaves the cursor alone; the next poll resumes and delivers everything"""
+    interrupted, cursor_after_failure, resumed, cursor, stats = asyncio.run(_interrupted_walk())
+
+    assert interrupted == [] and cursor_after_failure == (0, '')
+    assert [tx['in_msg']['message'] for tx in resumed] == [f"GAP{n}" for n in range(13)]
+    assert cursor == (1012, 'h1012')
+    assert stats['partial_walks'] == 1 and stats['dispatched'] == 0
+    print("✅ Interrupted walk resumed and delivered all 13 transactions")
+
+
+async def _waiter_edges():
+    chain = FakeChain()
+    ingestor = TransactionIngestor(WALLET, chain, poll_interval=0.02)
+    timed_out = await ingestor.wait_for_memo("NOPE", timeout=0.1)
+    chain.pay("EARLY")
+    await ingestor.poll_once()
+    # The payment landed before the checkout started waiting
+    early = await ingestor.wait_for_memo("EARLY", timeout=1)
+    # Having handled it, waiting again only returns a later transaction with the memo
+    again = asyncio.create_task(ingestor.wait_for_memo("EARLY", timeout=1, skip=early))
+    await asyncio.sleep(0.05)
+    chain.pay("EARLY", amount=0.5)
+    later = await again
+    await asyncio.sleep(0.05)
+    return timed_out, early, later, ingestor.get_stats()
+
+
+def test_waiters_time_out_and_skip_handled_transactions():
+    """Unpaid memos time out; already-seen memos resolve at once; skip waits for a newer one"""
+    timed_out, early, later, stats = asyncio.run(_waiter_edges())
+
+    assert timed_out is None and stats['timeouts'] == 1
+    assert early['in_msg']['message'] == 'EARLY'
+    assert later is not early and later['in_msg']['value'] == str(int(0.5 * 1e9))
+    assert stats['waiting_memos'] == 0
+    print("✅ Memo waiters time out, resolve from recent transactions and skip handled ones")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing TON Ingestion")
+    print("=" * 50)
+    test_checkouts_share_one_poll()
+    test_cursor_fetches_only_new_transactions()
+    test_interrupted_walk_resumes_without_gaps()
+    test_waiters_time_out_and_skip_handled_transactions()
+    print("✅ All TON ingestion tests passed")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test Group-Commit Write Queue
+Validates batching, per-operation failure isolation, inline execution
+and that stopping the queue commits the writes it already took
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_pool import ConnectionPool
+
+
+async def _run_write_queue_checks(db_path: str):
+    pool = ConnectionPool(db_path, readers=1, write_batch=50, write_latency_ms=20)
+    queue = pool.write_queue
+
+    async with pool.writer() as conn:
+        await conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, status TEXT UNIQUE)")
+        await conn.commit()
+
+    # Many concurrent writers end up in a handful of transactions
+    results = await asyncio.gather(*[
+        queue.execute("INSERT INTO posts (status) VALUES (?)", (f"s{i}",))
+        for i in range(100)
+    ])
+    assert all(r.rowcount == 1 for r in results)
+    stats = queue.get_stats()
+    assert stats['operations'] == 100
+    assert stats['batches'] <= 4, stats
+
+    # A failing write fails only its own caller
+    outcomes = await asyncio.gather(
+        queue.execute("INSERT INTO posts (status) VALUES ('s0')"),  # UNIQUE violation
+        queue.execute("INSERT INTO posts (status) VALUES ('ok')"),
+        return_exceptions=True
+    )
+    assert isinstance(outcomes[0], Exception)
+    assert outcomes[1].rowcount == 1
+
+    # executemany and atomic multi-statement submissions
+    result = await queue.executemany("UPDATE posts SET status = ? WHERE id = ?",
+                                     [(f"published_{i}", i) for i in range(1, 11)])
+    assert result.rowcount == 10
+
+    # A multi-statement submission is atomic
+    try:
+        await queue.submit([
+            ("INSERT INTO posts (status) VALUES ('atomic')", ()),
+            ("INSERT INTO posts (status) VALUES ('atomic')", ()),
+        ])
+        assert False, "duplicate insert accepted"
+    except Exception:
+        pass
+
+    # Writes issued while already holding the writer run inline (no deadlock)
+    async with pool.writer() as conn:
+        await queue.execute("INSERT INTO posts (status) VALUES ('inline')")
+        await conn.commit()
+
+    async with pool.reader() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM posts")
+        total = (await cursor.fetchone())[0]
+        cursor = await conn.execute("SELECT COUNT(*) FROM posts WHERE status = 'atomic'")
+        atomic = (await cursor.fetchone())[0]
+    assert total == 102, total
+    assert atomic == 0
+
+    await pool.close()
+    return queue.get_stats()
+
+
+async def _run_window_edge_checks(db_path: str):
+    pool = ConnectionPool(db_path, readers=1, write_batch=3, write_latency_ms=1)
+    queue = pool.write_queue
+    async with pool.writer() as conn:
+        await conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, status TEXT)")
+        await conn.commit()
+
+    async def _staggered(i: int):
+        # Land writes on and around the collection window's timeout
+        await asyncio.sleep((i % 7) * 0.0005)
+        return await queue.execute("INSERT INTO posts (status) VALUES (?)", (f"s{i}",))
+
+    results = await asyncio.wait_for(asyncio.gather(*[_staggered(i) for i in range(300)]), 30)
+    async with pool.reader() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM posts")
+        total = (await cursor.fetchone())[0]
+    await pool.close()
+    return results, total
+
+
+def test_write_queue_window_keeps_every_write():
+    """Writes arriving as a collection window times out are neither lost nor left waiting"""
+    with tempfile.TemporaryDirectory() as tmp:
+        results, total = asyncio.run(_run_window_edge_checks(os.path.join(tmp, "queue_test.db")))
+    assert len(results) == total == 300
+    print(f"✅ Write queue kept all {total} writes across collection windows")
+
+
+async def _run_stop_checks(db_path: str):
+    pool = ConnectionPool(db_path, readers=1, write_batch=200, write_latency_ms=50)
+    queue = pool.write_queue
+    async with pool.writer() as conn:
+        await conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, status TEXT)")
+        await conn.commit()
+
+    writes = [asyncio.ensure_future(queue.execute("INSERT INTO posts (status) VALUES (?)", (f"s{i}",)))
+              for i in range(50)]
+    # Let the worker take the writes into a batch that is still collecting
+    await asyncio.sleep(0.01)
+    await queue.stop()
+    outcomes = await asyncio.wait_for(asyncio.gather(*writes, return_exceptions=True), 5)
+    async with pool.reader() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM posts")
+        total = (await cursor.fetchone())[0]
+    await pool.close()
+    return outcomes, total
+
+
+def test_write_queue_stop_commits_taken_batch():
+    """stop() commits the batch the worker is collecting instead of dropping it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        outcomes, total = asyncio.run(_run_stop_checks(os.path.join(tmp, "queue_test.db")))
+    assert total == 50
+    assert all(r.rowcount == 1 for r in outcomes)
+    print(f"✅ Write queue stop committed all {total} pending writes")
+
+
+def test_write_queue():
+    """Test group commit write queue"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = asyncio.run(_run_write_queue_checks(os.path.join(tmp, "queue_test.db")))
+        print(f"✅ Write queue OK: {stats['operations']} writes in {stats['batches']} commits")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Group-Commit Write Queue")
+    print("=" * 50)
+    test_write_queue()
+    test_write_queue_window_keeps_every_write()
+    test_write_queue_stop_commits_taken_batch()
+    print("✅ All write queue tests passed")
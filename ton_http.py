@@ -0,0 +1,269 @@
+"""
+Async HTTP client for the TON APIs used by I3lani Telegram Bot
+One keep-alive aiohttp session shared by toncenter and tonapi, with a
+concurrency limit and a circuit breaker per provider, latency/error metrics,
+and hedged requests: if the primary provider has not answered within its p90
+latency the backup is asked too and whichever answers first wins
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+from config import (
+    TON_API_KEY, TON_BREAKER_FAILURES, TON_BREAKER_RESET_SECONDS, TON_HEDGE_REQUESTS, TON_HTTP_TIMEOUT,
+    TONAPI_MAX_CONCURRENCY, TONAPI_URL, TONCENTER_MAX_CONCURRENCY, TONCENTER_URL
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+# Hedge delay until a provider has enough samples for a p90
+MIN_SAMPLES = 10
+DEFAULT_HEDGE_DELAY = 2.0
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class CircuitBreaker:
+    """Opens after ``failures`` consecutive failures; one trial request is let through after ``reset_after``"""
+
+    def __init__(self, failures: int = TON_BREAKER_FAILURES, reset_after: float = TON_BREAKER_RESET_SECONDS):
+        self.failures = max(1, failures)
+        self.reset_after = reset_after
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_after else 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive = 0
+        self.opened_at = None
+        self.trial = False
+
+    def release(self):
+        """A request ended without an answer either way (a hedge that lost the race)"""
+        self.trial = False
+
+    def record_failure(self):
+        self.consecutive += 1
+        if self.trial or self.consecutive >= self.failures:
+            if self.opened_at is None or self.trial:
+                self.trips += 1
+                logger.warning(f"⚡ TON API circuit opened after {self.consecutive} failures")
+            self.opened_at = time.monotonic()
+        self.trial = False
+
+
+class Provider:
+    """A TON API base URL with its own limits, breaker and metrics"""
+
+    def __init__(self, name: str, base_url: str, max_concurrency: int, headers: Optional[Dict[str, str]] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max(1, max_concurrency)
+        self.headers = headers or {}
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self._stats = {'requests': 0, 'ok': 0, 'errors': 0, 'timeouts': 0, 'rate_limited': 0,
+                       'short_circuited': 0}
+
+    def p90(self) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        return _percentile(self.latencies, 90)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        latencies = list(self.latencies)
+        stats['p50_ms'] = round(_percentile(latencies, 50) * 1000, 1) if latencies else None
+        stats['p90_ms'] = round(_percentile(latencies, 90) * 1000, 1) if latencies else None
+        stats['error_rate'] = round(stats['errors'] / stats['requests'], 3) if stats['requests'] else 0.0
+        stats['in_flight'] = self.in_flight
+        stats['breaker'] = self.breaker.state
+        stats['breaker_trips'] = self.breaker.trips
+        return stats
+
+
+async def hedged(primary: Callable[[], Awaitable[Any]], backup: Callable[[], Awaitable[Any]],
+                 delay: Optional[float]) -> Tuple[Any, Optional[str], Optional[str]]:
+    """(first truthy result, 'primary' | 'backup' | None, why the backup ran: 'hedge' | 'fallback' | None).
+
+    ``backup`` starts after ``delay`` seconds, or as soon as ``primary``
+    fails (falsy result); ``delay=None`` only falls back on failure.
+    """
+    first = asyncio.ensure_future(primary())
+    second = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done and first.result():
+            return first.result(), 'primary', None
+        second = asyncio.ensure_future(backup())
+        reason = 'fallback' if done else 'hedge'
+        pending = {second} if done else {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result():
+                    return task.result(), 'primary' if task is first else 'backup', reason
+        return None, None, reason
+    finally:
+        for task in (first, second):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+class TONHttpClient:
+    """Pooled GETs against the TON providers; failures come back as None, like the old requests calls"""
+
+    def __init__(self, providers: Optional[Dict[str, Provider]] = None, timeout: float = TON_HTTP_TIMEOUT,
+                 hedge: bool = TON_HEDGE_REQUESTS):
+        if providers is None:
+            toncenter_headers = {'X-API-Key': TON_API_KEY} if TON_API_KEY else {}
+            providers = {
+                'toncenter': Provider('toncenter', TONCENTER_URL, TONCENTER_MAX_CONCURRENCY, toncenter_headers),
+                'tonapi': Provider('tonapi', TONAPI_URL, TONAPI_MAX_CONCURRENCY),
+            }
+        self.providers = providers
+        self.timeout = timeout
+        self.hedge = hedge
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {'hedges': 0, 'hedge_wins': 0, 'fallbacks': 0, 'fallback_wins': 0}
+
+    def _session_for_loop(self) -> aiohttp.ClientSession:
+        """The session and semaphores belong to one event loop; make new ones on another"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._loop = loop
+            connector = aiohttp.TCPConnector(limit=sum(p.max_concurrency for p in self.providers.values()),
+                                             keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept': 'application/json', 'User-Agent': 'I3lani-Bot/1.0'})
+            for provider in self.providers.values():
+                provider.semaphore = asyncio.Semaphore(provider.max_concurrency)
+        return self._session
+
+    async def get_json(self, name: str, path: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """GET ``path`` from provider ``name``; None on any failure or while its breaker is open"""
+        provider = self.providers[name]
+        session = self._session_for_loop()
+        if not provider.breaker.allow():
+            provider._stats['short_circuited'] += 1
+            return None
+        params = {key: str(value) for key, value in (params or {}).items() if value is not None}
+        try:
+            async with provider.semaphore:
+                provider.in_flight += 1
+                provider._stats['requests'] += 1
+                started = time.monotonic()
+                try:
+                    async with session.get(provider.base_url + path, params=params,
+                                           headers=provider.headers) as response:
+                        if response.status == 200:
+                            data = await response.json(content_type=None)
+                            provider.latencies.append(time.monotonic() - started)
+                            provider._stats['ok'] += 1
+                            provider.breaker.record_success()
+                            return data
+                        provider._stats['errors'] += 1
+                        if response.status == 429:
+                            provider._stats['rate_limited'] += 1
+                        if response.status == 429 or response.status >= 500:
+                            provider.breaker.record_failure()
+                        else:
+                            # A client error says nothing about the provider, but must end a half-open trial
+                            provider.breaker.release()
+                        logger.warning(f"{name} API request failed with status {response.status}")
+                except asyncio.TimeoutError:
+                    provider._stats['errors'] += 1
+                    provider._stats['timeouts'] += 1
+                    provider.breaker.record_failure()
+                    logger.warning(f"{name} API request timed out after {self.timeout}s")
+                except Exception as e:
+                    provider._stats['errors'] += 1
+                    provider.breaker.record_failure()
+                    logger.error(f"Error calling {name} API: {e}")
+                finally:
+                    provider.in_flight -= 1
+        except asyncio.CancelledError:
+            # A hedge lost the race, possibly while still queued for the semaphore;
+            # that says nothing about the provider
+            provider.breaker.release()
+            raise
+        return None
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """How long to give provider ``name`` before asking the backup (None: only on failure)"""
+        if not self.hedge:
+            return None
+        provider = self.providers[name]
+        if provider.breaker.state == 'open':
+            return 0.0
+        p90 = provider.p90()
+        return DEFAULT_HEDGE_DELAY if p90 is None else p90
+
+    async def hedged(self, primary: Callable[[], Awaitable[Any]], backup: Callable[[], Awaitable[Any]],
+                     primary_name: str) -> Any:
+        """``hedged`` with the primary provider's delay, counting hedges and which side won them"""
+        result, winner, reason = await hedged(primary, backup, self.hedge_delay(primary_name))
+        if reason:
+            self._stats[reason + 's'] += 1
+            if winner == 'backup':
+                self._stats[reason + '_wins'] += 1
+        return result
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['hedging'] = self.hedge
+        stats['providers'] = {name: provider.get_stats() for name, provider in self.providers.items()}
+        return stats
+
+
+_client: Optional[TONHttpClient] = None
+
+
+def get_ton_http_client() -> TONHttpClient:
+    """Process-wide TON API client"""
+    global _client
+    if _client is None:
+        _client = TONHttpClient()
+    return _client
+
+
+def configure_ton_http_client(client: Optional[TONHttpClient] = None) -> TONHttpClient:
+    """Replace the process-wide client (benchmarks point it at a fake server); None restores the default"""
+    global _client
+    _client = client or TONHttpClient()
+    return _client
@@ -0,0 +1,236 @@
+"""
+Shared TON transaction ingestion for I3lani Telegram Bot
+One poller per bot wallet downloads only the transactions newer than its
+(lt, hash) cursor and hands them out: checkouts wait on their memo through a
+memo -> future map, and listeners (the continuous scanner) get every new
+batch. However many users are paying, the wallet costs one API call per poll
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import TON_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+PAGE_LIMIT = 100
+# Pages walked back per poll when more than a page arrived since the cursor
+MAX_PAGES = 10
+# Memos seen recently, so a checkout that starts waiting after its payment landed still resolves
+RECENT_MEMOS = 1000
+
+Cursor = Tuple[int, str]
+Listener = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+
+def transaction_cursor(tx: Dict[str, Any]) -> Optional[Cursor]:
+    """(lt, hash) of a transaction in either toncenter or tonapi format"""
+    ident = tx.get('transaction_id') if isinstance(tx.get('transaction_id'), dict) else tx
+    try:
+        return int(ident['lt']), str(ident.get('hash') or '')
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class TransactionIngestor:
+    """Polls one wallet and dispatches new incoming transactions.
+
+    ``monitor`` provides the API calls and the memo extraction
+    (``EnhancedTONPaymentMonitor`` by default).
+    """
+
+    def __init__(self, bot_wallet: str, monitor=None, poll_interval: float = TON_POLL_INTERVAL,
+                 page_limit: int = PAGE_LIMIT):
+        if monitor is None:
+            from enhanced_ton_payment_monitoring import ton_monitor
+            monitor = ton_monitor
+        self.bot_wallet = bot_wallet
+        self.monitor = monitor
+        self.poll_interval = poll_interval
+        self.page_limit = page_limit
+        self.cursor: Optional[Cursor] = None
+        # An unfinished walk back: what it fetched so far and where to continue from
+        self._partial: List[Dict[str, Any]] = []
+        self._resume: Optional[Cursor] = None
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._listeners: List[Listener] = []
+        self._recent: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {'polls': 0, 'fetches': 0, 'fetch_failures': 0, 'partial_walks': 0, 'transactions': 0,
+                       'dispatched': 0, 'waits': 0, 'timeouts': 0}
+
+    def _bind_loop(self):
+        """Futures and the poll task belong to one event loop; start afresh on a new one"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._task = None
+            self._waiters.clear()
+
+    async def _fetch(self, before: Optional[Cursor]) -> Optional[List[Dict[str, Any]]]:
+        """One page, newest first (toncenter hedged with tonapi)"""
+        self._stats['fetches'] += 1
+        data = await self.monitor.get_transactions(self.bot_wallet, self.page_limit, before=before,
+                                                   since_lt=self.cursor[0] if self.cursor else None)
+        if not data:
+            self._stats['fetch_failures'] += 1
+            return None
+        return data.get('result') or data.get('transactions') or []
+
+    def _is_new(self, cursor: Optional[Cursor]) -> bool:
+        return cursor is not None and (self.cursor is None or cursor[0] > self.cursor[0])
+
+    async def poll_once(self) -> List[Dict[str, Any]]:
+        """Fetch everything after the cursor, dispatch it oldest first and return it.
+
+        The cursor only moves once a walk has reached it. A walk cut short by a
+        failed page or by MAX_PAGES is kept and resumed on the next poll, so no
+        transaction between the cursor and the oldest fetched one is skipped.
+        """
+        self._stats['polls'] += 1
+        fresh: List[Dict[str, Any]] = list(self._partial)
+        seen = {transaction_cursor(tx) for tx in fresh}
+        before = self._resume
+        complete = False
+        for _ in range(MAX_PAGES):
+            page = await self._fetch(before)
+            if page is None:
+                break
+            new, reached = [], False
+            for tx in page:
+                cursor = transaction_cursor(tx)
+                if not self._is_new(cursor):
+                    reached = True
+                elif cursor not in seen:
+                    seen.add(cursor)
+                    new.append(tx)
+            fresh.extend(new)
+            # The first poll takes one page; later polls walk back until they reach the cursor
+            if self.cursor is None or reached or len(page) < self.page_limit or not new:
+                complete = True
+                break
+            before = transaction_cursor(new[-1])
+
+        if not complete:
+            if fresh:
+                self._partial = fresh
+                self._resume = before
+                self._stats['partial_walks'] += 1
+                logger.warning(f"⚠️ TON ingestion walked back {len(fresh)} transactions without reaching "
+                               f"the cursor; resuming from lt {before[0]} on the next poll")
+            return []
+
+        self._partial, self._resume = [], None
+        fresh.sort(key=lambda tx: transaction_cursor(tx)[0])
+        if self.cursor is None and not fresh:
+            # An empty wallet: everything from now on is new
+            self.cursor = (0, '')
+        if fresh:
+            self.cursor = transaction_cursor(fresh[-1])
+            self._stats['transactions'] += len(fresh)
+            await self._dispatch(fresh)
+        return fresh
+
+    async def _dispatch(self, transactions: List[Dict[str, Any]]):
+        incoming = [tx for tx in transactions if tx.get('in_msg')]
+        for tx in incoming:
+            memo = self.monitor.extract_memo_from_transaction(tx)
+            if not memo:
+                continue
+            self._recent[memo] = tx
+            self._recent.move_to_end(memo)
+            while len(self._recent) > RECENT_MEMOS:
+                self._recent.popitem(last=False)
+            for future in self._waiters.pop(memo, []):
+                if not future.done():
+                    future.set_result(tx)
+                    self._stats['dispatched'] += 1
+        for listener in list(self._listeners):
+            try:
+                await listener(incoming)
+            except Exception as e:
+                logger.error(f"❌ TON ingestion listener failed: {e}")
+
+    async def wait_for_memo(self, memo: str, timeout: float,
+                            skip: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """The next incoming transaction carrying ``memo`` (or one already seen), None on timeout.
+
+        ``skip`` is a transaction the caller already handled, so waiting again
+        only returns a later one.
+        """
+        self._bind_loop()
+        self._stats['waits'] += 1
+        seen = self._recent.get(memo)
+        if seen is not None and seen is not skip:
+            return seen
+        future = self._loop.create_future()
+        self._waiters.setdefault(memo, []).append(future)
+        self.ensure_running()
+        try:
+            return await asyncio.wait_for(future, max(0.0, timeout))
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            return None
+        finally:
+            waiters = self._waiters.get(memo)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[memo]
+
+    def add_listener(self, listener: Listener):
+        """Call ``listener`` with every batch of new incoming transactions"""
+        self._bind_loop()
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+        self.ensure_running()
+
+    def remove_listener(self, listener: Listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def ensure_running(self) -> asyncio.Task:
+        """Start the poll loop on this event loop if it is not already running"""
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def _run(self):
+        logger.info(f"📡 TON ingestion started for {self.bot_wallet}")
+        # Polls while anyone is waiting; the next waiter or listener restarts it
+        while self._waiters or self._listeners:
+            started = time.monotonic()
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"❌ TON ingestion poll failed: {e}")
+            await asyncio.sleep(max(0.0, self.poll_interval - (time.monotonic() - started)))
+        logger.info(f"📡 TON ingestion idle for {self.bot_wallet}")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['cursor'] = list(self.cursor) if self.cursor else None
+        stats['waiting_memos'] = len(self._waiters)
+        stats['listeners'] = len(self._listeners)
+        return stats
+
+
+_ingestors: Dict[str, TransactionIngestor] = {}
+
+
+def get_ingestor(bot_wallet: str) -> TransactionIngestor:
+    """Shared ingestor for a bot wallet (every checkout and the scanner use the same one)"""
+    bot_wallet = bot_wallet.strip()
+    ingestor = _ingestors.get(bot_wallet)
+    if ingestor is None:
+        ingestor = _ingestors[bot_wallet] = TransactionIngestor(bot_wallet)
+    return ingestor
@@ -3,7 +3,6 @@ User Post Manager for I3lani Bot
 Manages user post credits, usage tracking, and expiration
 """
 
-import aiosqlite
 import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
@@ -11,6 +10,8 @@ from dataclasses import dataclass
 from enum import Enum
 import json
 
+from connection_pool import get_pool
+
 class PostStatus(Enum):
     """Post usage status"""
     AVAILABLE = "available"
@@ -35,11 +36,12 @@ class UserPostManager:
     
     def __init__(self, db_path: str = "ads.db"):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
         self.post_expiry_days = 90
     
     async def initialize_database(self):
         """Initialize post management database tables"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             # User post credits table
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS user_post_credits (
@@ -107,7 +109,7 @@ class UserPostManager:
         credit_id = purchase_id or get_global_sequence_manager().generate_id("CREDIT")
         expires_at = datetime.now() + timedelta(days=self.post_expiry_days)
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             await db.execute("""
                 INSERT OR REPLACE INTO user_post_credits 
                 (credit_id, user_id, package_name, posts_total, posts_used, expires_at)
@@ -120,7 +122,7 @@ class UserPostManager:
     
     async def get_user_post_balance(self, user_id: int) -> Dict:
         """Get user's current post balance"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             # Get active credits
             cursor = await db.execute("""
                 SELECT credit_id, package_name, posts_total, posts_used, expires_at
@@ -162,7 +164,7 @@ class UserPostManager:
         """Use a post credit for a campaign"""
         from global_sequence_system import get_global_sequence_manager
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             # Find oldest available credit
             cursor = await db.execute("""
                 SELECT credit_id, posts_total, posts_used
@@ -208,7 +210,7 @@ class UserPostManager:
         purchase_id = get_global_sequence_manager().generate_id("SCHEDULE")
         expires_at = datetime.now() + timedelta(days=365)  # Auto-schedule doesn't expire quickly
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             await db.execute("""
                 INSERT INTO auto_schedule_purchases 
                 (purchase_id, user_id, days_purchased, price_paid, expires_at)
@@ -221,7 +223,7 @@ class UserPostManager:
     
     async def get_user_auto_schedule_balance(self, user_id: int) -> Dict:
         """Get user's auto-scheduling balance"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             cursor = await db.execute("""
                 SELECT SUM(days_purchased - days_used) as available_days
                 FROM auto_schedule_purchases 
@@ -238,7 +240,7 @@ class UserPostManager:
     
     async def use_auto_schedule_day(self, user_id: int) -> Tuple[bool, str]:
         """Use one auto-scheduling day"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             # Find oldest available auto-schedule purchase
             cursor = await db.execute("""
                 SELECT purchase_id, days_purchased, days_used
@@ -277,7 +279,7 @@ class UserPostManager:
         purchase_id = get_global_sequence_manager().generate_id("ADDON")
         expires_at = datetime.now() + timedelta(days=365)  # Add-ons expire after 1 year
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             await db.execute("""
                 INSERT INTO addon_purchases 
                 (purchase_id, user_id, addon_key, addon_name, price_paid, expires_at, uses_remaining)
@@ -290,7 +292,7 @@ class UserPostManager:
     
     async def get_user_addons(self, user_id: int) -> List[Dict]:
         """Get user's active add-ons"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             cursor = await db.execute("""
                 SELECT addon_key, addon_name, uses_remaining, expires_at
                 FROM addon_purchases 
@@ -312,7 +314,7 @@ class UserPostManager:
     
     async def use_addon(self, user_id: int, addon_key: str) -> Tuple[bool, str]:
         """Use an add-on"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             # Find available add-on
             cursor = await db.execute("""
                 SELECT purchase_id, uses_remaining
@@ -372,7 +374,7 @@ class UserPostManager:
     
     async def expire_old_credits(self):
         """Expire old credits (maintenance function)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             await db.execute("""
                 UPDATE user_post_credits 
                 SET status = 'expired' 
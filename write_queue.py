@@ -0,0 +1,261 @@
+"""
+Group-commit write queue for I3lani Telegram Bot
+Batches writes from many coroutines into one SQLite transaction per flush
+window; each caller's awaitable resolves once its write is committed
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from query_profiler import get_query_profiler
+
+logger = logging.getLogger(__name__)
+_profiler = get_query_profiler()
+
+Statement = Tuple[str, Sequence[Any]]
+
+# Queued by stop(): the worker commits the batch it holds and exits
+_STOP = object()
+
+
+class WriteResult:
+    """Outcome of one queued write operation"""
+
+    __slots__ = ('rowcount', 'lastrowid')
+
+    def __init__(self, rowcount: int = 0, lastrowid: Optional[int] = None):
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+    def __repr__(self):
+        return f"WriteResult(rowcount={self.rowcount}, lastrowid={self.lastrowid})"
+
+
+class _PendingWrite:
+    __slots__ = ('statements', 'many', 'func', 'future', 'enqueued_at', 'caller')
+
+    def __init__(self, statements: List[Statement], many: bool, future: asyncio.Future,
+                 func: Optional[Callable[[Any], Awaitable[Any]]] = None,
+                 caller: Optional[str] = None):
+        self.statements = statements
+        self.many = many
+        self.func = func
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        # Module that queued the write, so profiled statements are attributed to it
+        self.caller = caller
+
+
+class WriteQueue:
+    """Single-writer queue that commits pending writes in batches.
+
+    Every submitted operation runs inside its own SAVEPOINT, so a failing
+    operation only fails its own caller while the rest of the batch commits.
+    """
+
+    def __init__(self, pool, max_batch: int = 200, max_latency_ms: float = 5.0):
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max(0.0, max_latency_ms) / 1000.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self._stats = {
+            'operations': 0,
+            'batches': 0,
+            'failed_operations': 0,
+            'failed_batches': 0,
+            'largest_batch': 0,
+            'queue_wait_ms_total': 0.0,
+            'commit_ms_total': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, statements: List[Statement]) -> WriteResult:
+        """Queue statements to run atomically; resolves after commit"""
+        return await self._enqueue(statements, many=False)
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> WriteResult:
+        """Queue a single statement"""
+        return await self._enqueue([(query, params)], many=False)
+
+    async def executemany(self, query: str, seq_of_params: Sequence[Sequence[Any]]) -> WriteResult:
+        """Queue one statement executed for every parameter set"""
+        return await self._enqueue([(query, list(seq_of_params))], many=True)
+
+    async def run(self, func: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Queue a read-modify-write unit; ``await func(conn)`` runs inside the batch"""
+        return await self._enqueue([], many=False, func=func)
+
+    async def _enqueue(self, statements: List[Statement], many: bool,
+                       func: Optional[Callable[[Any], Awaitable[Any]]] = None) -> Any:
+        if self.pool.owns_writer():
+            # Caller already holds the writer (inside its own transaction);
+            # queueing would deadlock, so join that transaction instead.
+            async with self.pool.writer() as conn:
+                return await self._apply(conn, statements, many, func)
+        self._ensure_worker()
+        future = self._loop.create_future()
+        caller = _profiler.caller_module() if _profiler.enabled else None
+        self._queue.put_nowait(_PendingWrite(statements, many, future, func, caller))
+        return await future
+
+    async def _apply(self, conn, statements: List[Statement], many: bool,
+                     func: Optional[Callable[[Any], Awaitable[Any]]] = None) -> Any:
+        if func is not None:
+            return await func(conn)
+        rowcount = 0
+        lastrowid = None
+        for query, params in statements:
+            if many:
+                cursor = await conn.executemany(query, params)
+            else:
+                cursor = await conn.execute(query, params)
+            rowcount += max(cursor.rowcount, 0)
+            lastrowid = cursor.lastrowid
+            await cursor.close()
+        return WriteResult(rowcount, lastrowid)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+    async def _run(self):
+        queue = self._queue
+        # One get() stays pending across collection windows; cancelling it on a
+        # timeout (as wait_for does) can drop an item it already took
+        getter: Optional[asyncio.Task] = None
+        batch: List[_PendingWrite] = []
+        stopping = False
+        try:
+            while not stopping:
+                if getter is None:
+                    getter = self._loop.create_task(queue.get())
+                item = await getter
+                getter = None
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.perf_counter() + self.max_latency
+                while len(batch) < self.max_batch and not stopping:
+                    while len(batch) < self.max_batch and not queue.empty():
+                        item = queue.get_nowait()
+                        if item is _STOP:
+                            stopping = True
+                            break
+                        batch.append(item)
+                    remaining = deadline - time.perf_counter()
+                    if stopping or len(batch) >= self.max_batch or remaining <= 0:
+                        break
+                    getter = self._loop.create_task(queue.get())
+                    done, _ = await asyncio.wait({getter}, timeout=remaining)
+                    if not done:
+                        # Still waiting: the next batch starts from this get()
+                        break
+                    item = getter.result()
+                    getter = None
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                try:
+                    await self._flush(batch)
+                except Exception as e:
+                    logger.error(f"❌ Write queue flush failed: {e}")
+                    self._fail(batch, e)
+                batch = []
+        finally:
+            if getter is not None:
+                getter.cancel()
+            # Cancelled mid-batch: these callers would otherwise wait forever
+            self._fail(batch, RuntimeError("Write queue stopped before the write was committed"))
+
+    @staticmethod
+    def _fail(batch: List[_PendingWrite], error: Exception):
+        for item in batch:
+            if not item.future.done():
+                item.future.set_exception(error)
+
+    async def _flush(self, batch: List[_PendingWrite]):
+        started = time.perf_counter()
+        results: List[Tuple[_PendingWrite, bool, Any]] = []
+
+        async with self.pool.writer() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                for index, item in enumerate(batch):
+                    savepoint = f"wq_{index}"
+                    await conn.execute(f"SAVEPOINT {savepoint}")
+                    try:
+                        with _profiler.attributed_to(item.caller):
+                            outcome = await self._apply(conn, item.statements, item.many, item.func)
+                        await conn.execute(f"RELEASE {savepoint}")
+                        results.append((item, True, outcome))
+                    except Exception as e:
+                        await conn.execute(f"ROLLBACK TO {savepoint}")
+                        await conn.execute(f"RELEASE {savepoint}")
+                        results.append((item, False, e))
+                await conn.commit()
+            except Exception:
+                self._stats['failed_batches'] += 1
+                await conn.rollback()
+                raise
+
+        finished = time.perf_counter()
+        self._stats['batches'] += 1
+        self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+        self._stats['commit_ms_total'] += (finished - started) * 1000
+        for item, ok, outcome in results:
+            self._stats['operations'] += 1
+            self._stats['queue_wait_ms_total'] += (started - item.enqueued_at) * 1000
+            if item.future.done():
+                continue
+            if ok:
+                item.future.set_result(outcome)
+            else:
+                self._stats['failed_operations'] += 1
+                item.future.set_exception(outcome)
+
+    # ------------------------------------------------------------------
+    # Lifecycle / stats
+    # ------------------------------------------------------------------
+    async def stop(self):
+        """Stop the flush worker once it has committed everything queued before the call"""
+        if self._worker is None:
+            return
+        worker, queue = self._worker, self._queue
+        self._worker = None
+        if not worker.done():
+            queue.put_nowait(_STOP)
+            try:
+                await worker
+            except (asyncio.CancelledError, Exception):
+                pass
+        # Writes queued behind the stop never reach a batch
+        stranded = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not _STOP:
+                stranded.append(item)
+        self._fail(stranded, RuntimeError("Write queue stopped before the write was committed"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Write queue statistics"""
+        stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize() if self._queue else 0
+        stats['avg_batch_size'] = stats['operations'] / stats['batches'] if stats['batches'] else 0.0
+        stats['avg_queue_wait_ms'] = (
+            stats['queue_wait_ms_total'] / stats['operations'] if stats['operations'] else 0.0
+        )
+        return stats